@@ -17,6 +17,7 @@ class JobSubmissionStatus(AutoNameEnum):
     Notice only the statuses that are relevant to the cluster-agent are defined here.
     """
 
+    CREATED = auto()
     CANCELLED = auto()
 
 
@@ -32,3 +33,11 @@ INFLUXDB_MEASUREMENT = Literal[
     "VMSize",
     "WriteMB",
 ]
+
+INFLUXDB_INTEGER_MEASUREMENTS: frozenset[INFLUXDB_MEASUREMENT] = frozenset(
+    ("GPUMemMB", "Pages", "RSS", "ReadMB", "VMSize", "WriteMB")
+)
+"""Measurements stored as integers by the API, hence sent as int64 in the columnar format."""
+
+METRICS_COLUMNAR_CONTENT_TYPE = "application/vnd.jobbergate.metrics-columnar+msgpack"
+"""Content type used to upload job metrics in the columnar format."""
@@ -0,0 +1,76 @@
+"""
+Wait for the job submissions notified by the Jobbergate API and run the tasks that handle them right away.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+import httpx
+from apscheduler.schedulers.base import BaseScheduler
+from loguru import logger
+
+from jobbergate_agent.clients.cluster_api import backend_client as jobbergate_api_client
+from jobbergate_agent.jobbergate.constants import JobSubmissionStatus
+from jobbergate_agent.jobbergate.submit import submit_pending_jobs
+from jobbergate_agent.jobbergate.update import update_active_jobs
+from jobbergate_agent.settings import SETTINGS
+from jobbergate_agent.utils.exception import JobbergateApiError
+
+NOTIFIED_TASKS: dict[JobSubmissionStatus, Callable[..., Any]] = {
+    JobSubmissionStatus.CREATED: submit_pending_jobs,
+    JobSubmissionStatus.CANCELLED: update_active_jobs,
+}
+
+
+async def wait_for_notifications(timeout: int) -> set[JobSubmissionStatus]:
+    """
+    Wait until the API notifies job submissions created or cancelled for this agent, up to ``timeout`` seconds.
+
+    Return the statuses notified, or an empty set if the timeout expired.
+    """
+    request_timeout = None if SETTINGS.REQUESTS_TIMEOUT is None else SETTINGS.REQUESTS_TIMEOUT + timeout
+    with JobbergateApiError.handle_errors("Failed to wait for notifications"):
+        response = await jobbergate_api_client.get(
+            "/jobbergate/job-submissions/agent/notifications",
+            params={"timeout": timeout},
+            timeout=request_timeout,
+        )
+        response.raise_for_status()
+        return {JobSubmissionStatus(status) for status in response.json()["statuses"] if status in NOTIFIED_TASKS}
+
+
+def run_now(scheduler: BaseScheduler, func: Callable[..., Any]) -> None:
+    """
+    Bring forward the next run of the scheduled jobs that call a function, so they run right away.
+    """
+    for job in scheduler.get_jobs():
+        if job.func is func:
+            logger.debug("Running {} right away upon notification", job.name)
+            job.modify(next_run_time=datetime.now(timezone.utc))
+
+
+async def listen_for_notifications(scheduler: BaseScheduler) -> None:
+    """
+    Run the jobs that handle the job submissions as soon as the API notifies them.
+
+    The jobs keep running on their interval too, so nothing is missed if a notification is lost.
+    The listening stops if the API does not provide the notifications.
+    """
+    timeout = SETTINGS.TASK_NOTIFICATIONS_TIMEOUT_SECONDS
+    if timeout is None:
+        return
+    logger.info("Listening for job submissions notified by the API")
+    while True:
+        try:
+            statuses = await wait_for_notifications(timeout)
+        except JobbergateApiError as err:
+            if isinstance(err.__cause__, httpx.HTTPStatusError) and err.__cause__.response.status_code == 404:
+                logger.warning("The API does not provide notifications, relying on the task interval only")
+                return
+            logger.warning("{}, retrying in {} seconds", err.message, SETTINGS.TASK_JOBS_INTERVAL_SECONDS)
+            await asyncio.sleep(SETTINGS.TASK_JOBS_INTERVAL_SECONDS)
+            continue
+
+        for status in statuses:
+            run_now(scheduler, NOTIFIED_TASKS[status])
@@ -2,39 +2,134 @@
 Helper functions for paginating through the Jobbergate API.
 """
 
-from typing import Type, TypeVar
+import time
+from typing import Generic, Optional, Type, TypeVar
 
 import pydantic
 from loguru import logger
 
 from jobbergate_agent.clients.cluster_api import backend_client as jobbergate_api_client
-from jobbergate_agent.jobbergate.schemas import ListResponseEnvelope
+from jobbergate_agent.jobbergate.schemas import ChangesResponseEnvelope, ListResponseEnvelope
 from jobbergate_agent.settings import SETTINGS
 
 T = TypeVar("T", bound=pydantic.BaseModel)
 
 
-async def fetch_page(url: str, base_model: Type[T], page: int = 1) -> ListResponseEnvelope[T]:
+async def fetch_page(
+    url: str, base_model: Type[T], page: int = 1, cursor: Optional[str] = None
+) -> ListResponseEnvelope[T]:
     """
     Retrieve a page of job submissions.
+
+    If a cursor is provided (empty for the first page), the keyset pagination is requested instead of the page number.
     """
     response_model = ListResponseEnvelope[base_model]  # type: ignore
-    response = await jobbergate_api_client.get(url, params={"page": page, "size": SETTINGS.ITEMS_PER_PAGE})
+    params: dict[str, int | str] = {"page": page, "size": SETTINGS.ITEMS_PER_PAGE}
+    if cursor is not None:
+        params["cursor"] = cursor
+    response = await jobbergate_api_client.get(url, params=params)
     response.raise_for_status()
     result = response_model.model_validate(response.json())
-    logger.debug("Retrieved page {} out of {} for {}", result.page, result.pages, url)
+    if result.page is None:
+        logger.debug("Retrieved page with {} items for {} using keyset pagination", len(result.items), url)
+    else:
+        logger.debug("Retrieved page {} out of {} for {}", result.page, result.pages, url)
     return result
 
 
 async def fetch_paginated_result(url: str, base_model: Type[T]) -> list[T]:
     """
     Retrieve a list of job submissions.
+
+    The keyset pagination is used to follow the pages, so the API does not count the rows nor skip
+    them with an offset. It falls back to page numbers if the API does not support it.
     """
     results = []
-    for page in range(1, SETTINGS.MAX_PAGES_PER_CYCLE + 1):
-        page_entries = await fetch_page(url, base_model, page)
+    page = 1
+    cursor: Optional[str] = ""
+    for _ in range(SETTINGS.MAX_PAGES_PER_CYCLE):
+        page_entries = await fetch_page(url, base_model, page=page, cursor=cursor)
         results.extend(page_entries.items)
-        if page_entries.page >= page_entries.pages:
-            break
+        if page_entries.page is None:
+            cursor = page_entries.next_cursor
+            if cursor is None:
+                break
+        else:
+            cursor = None
+            if page_entries.page >= (page_entries.pages or 0):
+                break
+            page = page_entries.page + 1
 
     return results
+
+
+class ChangesFeed(Generic[T]):
+    """
+    Keep a local copy of a set of job submissions in sync with the changes feed of the API.
+
+    After a full sync, only the job submissions that entered, changed in, or left the set since the
+    last watermark are fetched and merged into the local copy. A full sync is made again every
+    ``CHANGES_FEED_RESYNC_INTERVAL`` seconds, and the list endpoint is used instead if the API does
+    not provide the changes feed.
+    """
+
+    def __init__(self, url: str, list_url: str, base_model: Type[T]):
+        self.url = url
+        self.list_url = list_url
+        self.base_model = base_model
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Drop the local copy, so the next fetch makes a full sync.
+        """
+        self.items: dict[int, T] = {}
+        self.watermark: Optional[str] = None
+        self.synced_at: Optional[float] = None
+        self.unsupported = False
+
+    async def fetch(self) -> list[T]:
+        """
+        Retrieve the job submissions in the set, fetching only the changes since the last call.
+        """
+        if not SETTINGS.CHANGES_FEED_RESYNC_INTERVAL:
+            return await fetch_paginated_result(self.list_url, self.base_model)
+
+        if self.synced_at is not None and time.monotonic() - self.synced_at >= SETTINGS.CHANGES_FEED_RESYNC_INTERVAL:
+            logger.debug("Resyncing the job submissions from {}", self.url)
+            self.reset()
+
+        if self.unsupported:
+            return await fetch_paginated_result(self.list_url, self.base_model)
+
+        response_model = ChangesResponseEnvelope[self.base_model]  # type: ignore
+        for _ in range(SETTINGS.MAX_PAGES_PER_CYCLE):
+            params: dict[str, int | str] = {"size": SETTINGS.ITEMS_PER_PAGE}
+            if self.watermark is not None:
+                params["watermark"] = self.watermark
+            else:
+                self.synced_at = time.monotonic()
+            response = await jobbergate_api_client.get(self.url, params=params)
+            if response.status_code == 404:
+                logger.warning("The changes feed is not provided at {}, using {} instead", self.url, self.list_url)
+                self.unsupported = True
+                return await fetch_paginated_result(self.list_url, self.base_model)
+            if response.status_code == 400:
+                self.reset()
+            response.raise_for_status()
+
+            changes = response_model.model_validate(response.json())
+            self.items.update((item.id, item) for item in changes.items)  # type: ignore[attr-defined]
+            for removed_id in changes.removed_ids:
+                self.items.pop(removed_id, None)
+            self.watermark = changes.watermark
+            logger.debug(
+                "Retrieved {} changed and {} removed job submissions from {}",
+                len(changes.items),
+                len(changes.removed_ids),
+                self.url,
+            )
+            if not changes.has_more:
+                break
+
+        return list(self.items.values())
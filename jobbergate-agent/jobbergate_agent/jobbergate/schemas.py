@@ -55,13 +55,28 @@ EnvelopeT = TypeVar("EnvelopeT")
 class ListResponseEnvelope(pydantic.BaseModel, Generic[EnvelopeT]):
     """
     A model describing the structure of response envelopes from "list" endpoints.
+
+    The fields ``total``, ``page`` and ``pages`` are not provided with the keyset pagination,
+    where ``next_cursor`` is provided instead, unless it is the last page.
     """
 
     items: list[EnvelopeT]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class ChangesResponseEnvelope(pydantic.BaseModel, Generic[EnvelopeT]):
+    """
+    A model describing the structure of response envelopes from "changes" endpoints.
+    """
+
+    items: list[EnvelopeT]
+    removed_ids: list[int]
+    watermark: str
+    has_more: bool
 
 
 class SlurmSubmitError(pydantic.BaseModel):
@@ -113,6 +128,16 @@ class SlurmJobData(pydantic.BaseModel, extra="ignore"):
         return value
 
 
+class JobSubmissionAgentBatchUpdateResult(pydantic.BaseModel, extra="ignore"):
+    """
+    Model for the outcome of each item in the response of the `/jobbergate/job-submissions/agent/batch` endpoint.
+    """
+
+    id: int
+    status_code: int
+    detail: Optional[str] = None
+
+
 class InfluxDBMeasurementDict(TypedDict):
     """
     Map each entry in the list returned by `InfluxDBClient(...).get_list_measurements(...)`.
@@ -129,20 +154,6 @@ class InfluxDBGenericMeasurementDict(TypedDict):
     name: str
 
 
-class InfluxDBPointDict(TypedDict):
-    """
-    Map each entry in the generator returned by InfluxDBClient(...).query(...).get_points().
-    """
-
-    time: int
-    host: str
-    job: str
-    step: str
-    task: str
-    value: float
-    measurement: INFLUXDB_MEASUREMENT
-
-
 class JobSubmissionMetricsMaxTime(pydantic.BaseModel):
     """
     Model for the max_times field of the JobSubmissionMetricsMaxResponse.
@@ -171,3 +182,17 @@ GPUUtilization, Pages, RSS, VMSize, ReadMB, WriteMB)
 JobMetricData: TypeAlias = list[
     tuple[int, str, str, str, float, float, float, float, float, float, float, float, float, float]
 ]
+
+
+class ColumnarJobMetricData(TypedDict):
+    """
+    Columnar representation of the job metric data.
+
+    Each column is a little-endian buffer following the same order as ``JobMetricData``.
+    Measurements listed on ``INFLUXDB_INTEGER_MEASUREMENTS`` and the key columns are encoded as int64,
+    while the other measurements are encoded as float64. The host column holds indexes on ``node_hosts``.
+    """
+
+    rows: int
+    node_hosts: list[str]
+    columns: list[bytes]
@@ -13,11 +13,12 @@ from loguru import logger
 
 from jobbergate_agent.clients.cluster_api import backend_client as jobbergate_api_client
 from jobbergate_agent.jobbergate.constants import FileType
-from jobbergate_agent.jobbergate.pagination import fetch_paginated_result
+from jobbergate_agent.jobbergate.pagination import ChangesFeed
 from jobbergate_agent.jobbergate.schemas import JobScriptFile, PendingJobSubmission, SlurmJobData
 from jobbergate_agent.jobbergate.update import SubprocessAsUserHandler, fetch_job_data
 from jobbergate_agent.settings import SETTINGS
 from jobbergate_agent.user_mapper.base import manufacture
+from jobbergate_agent.utils.concurrency import run_blocking, run_concurrently
 from jobbergate_agent.utils.exception import JobbergateApiError, JobSubmissionError
 from jobbergate_agent.utils.logging import log_error
 from jobbergate_agent.utils.plugin import get_plugin_manager, hookimpl, hookspec
@@ -110,15 +111,19 @@ async def get_job_script_file(pending_job_submission: PendingJobSubmission, subm
     return write_submission_file(job_script, job_script_file.filename, submit_dir)
 
 
+pending_submissions_feed = ChangesFeed(
+    url="/jobbergate/job-submissions/agent/pending/changes",
+    list_url="/jobbergate/job-submissions/agent/pending",
+    base_model=PendingJobSubmission,
+)
+
+
 async def fetch_pending_submissions() -> list[PendingJobSubmission]:
     """
     Retrieve a list of pending job_submissions.
     """
     with JobbergateApiError.handle_errors("Failed to fetch pending job submissions", do_except=log_error):
-        results = await fetch_paginated_result(
-            url="/jobbergate/job-submissions/agent/pending",
-            base_model=PendingJobSubmission,
-        )
+        results = await pending_submissions_feed.fetch()
 
     logger.debug(f"Retrieved {len(results)} pending job submissions")
     return results
@@ -214,7 +219,7 @@ async def submit_job_script(context: PendingJobSubmissionContext) -> int:
     async with handle_errors_async(
         "Execution directory is invalid", raise_exc_class=JobSubmissionError, do_except=do_except
     ):
-        validate_submit_dir(context.submission_dir, context.subprocess_handler)
+        await run_blocking(validate_submit_dir, context.submission_dir, context.subprocess_handler)
 
     async with handle_errors_async(
         "Error processing job-script files", raise_exc_class=JobSubmissionError, do_except=do_except
@@ -229,9 +234,11 @@ async def submit_job_script(context: PendingJobSubmissionContext) -> int:
             job_script = await get_job_script_file(context.data, tmp_dir_path)
 
             if SETTINGS.WRITE_SUBMISSION_FILES:
-                job_script = context.submission_handler.copy_file_to_submission_directory(job_script)
+                job_script = await run_blocking(
+                    context.submission_handler.copy_file_to_submission_directory, job_script
+                )
                 for file in supporting_files:
-                    context.submission_handler.copy_file_to_submission_directory(file)
+                    await run_blocking(context.submission_handler.copy_file_to_submission_directory, file)
 
     async with handle_errors_async(
         "Failed to submit job to slurm",
@@ -239,7 +246,7 @@ async def submit_job_script(context: PendingJobSubmissionContext) -> int:
         do_except=do_except,
     ):
         logger.debug(f"Submitting job script for job submission {context.data.id}")
-        slurm_job_id = context.submission_handler.submit_job(job_script)
+        slurm_job_id = await run_blocking(context.submission_handler.submit_job, job_script)
 
     return slurm_job_id
 
@@ -334,7 +341,8 @@ def pending_job_submission_strategy(context: PendingJobSubmissionContext) -> Job
 
         context.set_slurm_job_id(slurm_job_id)
 
-        await mark_as_submitted(context.data.id, slurm_job_id, context.slurm_job_data)
+        slurm_job_data = await run_blocking(lambda: context.slurm_job_data)
+        await mark_as_submitted(context.data.id, slurm_job_id, slurm_job_data)
         cache_file.unlink(missing_ok=True)
 
     return helper
@@ -356,14 +364,15 @@ async def submit_pending_jobs() -> None:
     user_mapper = manufacture()
     plugin_manager = pending_submission_plugin_manager()
     pending_job_submissions = await fetch_pending_submissions()
-    for pending_job in pending_job_submissions:
+
+    async def process_pending_job(pending_job: PendingJobSubmission) -> None:
         try:
             username = user_mapper[pending_job.owner_email]
         except KeyError:
             message = "Username could not be resolved from owner email"
             logger.error(f"{message} for job submission {pending_job.id}")
             await mark_as_rejected(pending_job.id, message)
-            continue
+            return
         except Exception as e:
             logger.error(
                 "Transient error resolving username for job submission {} (owner_email={}): {}. "
@@ -372,7 +381,7 @@ async def submit_pending_jobs() -> None:
                 pending_job.owner_email,
                 e,
             )
-            continue
+            return
 
         try:
             for strategy in plugin_manager.hook.pending_submission(
@@ -383,4 +392,6 @@ async def submit_pending_jobs() -> None:
         except Exception as e:
             logger.error("Error processing pending job submission {}: {}", pending_job.id, e)
 
+    await run_concurrently(pending_job_submissions, process_pending_job)
+
     logger.debug("...Finished submitting pending jobs")
@@ -3,31 +3,42 @@ import json
 import os
 import pwd
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import cached_property, partial
-from itertools import chain
 from pathlib import Path
 from subprocess import CompletedProcess
-from textwrap import dedent
-from typing import Any, Callable, Coroutine, List, get_args
+from typing import Any, Callable, Coroutine, Iterable, List, get_args
 
 import msgpack
 from loguru import logger
+from pydantic import TypeAdapter, ValidationError
 
 from jobbergate_agent.clients.cluster_api import backend_client as jobbergate_api_client
 from jobbergate_agent.clients.influx import influxdb_client
-from jobbergate_agent.jobbergate.constants import INFLUXDB_MEASUREMENT, JobSubmissionStatus
-from jobbergate_agent.jobbergate.pagination import fetch_paginated_result
+from jobbergate_agent.jobbergate.constants import (
+    INFLUXDB_MEASUREMENT,
+    METRICS_COLUMNAR_CONTENT_TYPE,
+    JobSubmissionStatus,
+)
+from jobbergate_agent.jobbergate.pagination import ChangesFeed
 from jobbergate_agent.jobbergate.schemas import (
     ActiveJobSubmission,
     InfluxDBGenericMeasurementDict,
     InfluxDBMeasurementDict,
-    InfluxDBPointDict,
+    JobSubmissionAgentBatchUpdateResult,
     JobSubmissionMetricsMaxResponse,
     SlurmJobData,
 )
 from jobbergate_agent.settings import SETTINGS
-from jobbergate_agent.utils.compute import aggregate_influx_measures
+from jobbergate_agent.utils.compute import (
+    InfluxDBColumns,
+    aggregate_influx_measures,
+    aggregate_influx_measures_columnar,
+    concatenate_influx_columns,
+    drop_stored_influx_points,
+    influx_series_to_columns,
+)
+from jobbergate_agent.utils.concurrency import run_blocking, run_concurrently
 from jobbergate_agent.utils.exception import JobbergateAgentError, JobbergateApiError, SbatchError
 from jobbergate_agent.utils.logging import log_error
 from jobbergate_agent.utils.plugin import get_plugin_manager, hookimpl, hookspec
@@ -68,11 +79,47 @@ class SubprocessAsUserHandler(SubprocessHandler):
         return {g for g in map(int, result.stdout.split()) if g != self.gid}
 
 
+@dataclass
+class JobDataUpdateBatch:
+    """
+    Collect the job data updates produced in an agent cycle to send them to the API in batches.
+    """
+
+    updates: dict[int, SlurmJobData] = field(default_factory=dict)
+
+    def add(self, job_submission_id: int, slurm_job_data: SlurmJobData) -> None:
+        """Add the job data for a job submission to the batch, replacing any previous one."""
+        self.updates[job_submission_id] = slurm_job_data
+
+    async def flush(self) -> None:
+        """
+        Send the collected updates to the API in chunks of ``ITEMS_PER_BATCH_UPDATE`` items.
+
+        If a chunk can not be sent as a batch, its items are sent one by one as a fallback.
+        """
+        items = list(self.updates.items())
+        self.updates.clear()
+        chunk_size = SETTINGS.ITEMS_PER_BATCH_UPDATE
+        for start in range(0, len(items), chunk_size):
+            chunk = dict(items[start : start + chunk_size])
+            try:
+                await update_job_data_batch(chunk)
+            except Exception as e:
+                logger.warning("Batch update failed, falling back to one request per job submission: {}", e)
+                for job_submission_id, slurm_job_data in chunk.items():
+                    try:
+                        await update_job_data(job_submission_id, slurm_job_data)
+                    except Exception as e:
+                        logger.error(f"API update failed: {e}")
+
+
 @dataclass
 class ActiveSubmissionContext:
     """Context for active job submission processing."""
 
     data: ActiveJobSubmission
+    job_data_updates: JobDataUpdateBatch | None = None
+    slurm_jobs_data: dict[int, SlurmJobData] | None = None
 
     @property
     def slurm_job_id(self) -> int:
@@ -109,7 +156,13 @@ class ActiveSubmissionContext:
 
     @cached_property
     def slurm_job_data(self) -> SlurmJobData:
-        """Fetch the Slurm job data for the job submission."""
+        """
+        Fetch the Slurm job data for the job submission.
+
+        The data is taken from the snapshot of the current cycle when it includes the job.
+        """
+        if self.slurm_jobs_data is not None and self.slurm_job_id in self.slurm_jobs_data:
+            return self.slurm_jobs_data[self.slurm_job_id]
         return fetch_job_data(self.slurm_job_id, self.info_handler)
 
     @cached_property
@@ -119,6 +172,17 @@ class ActiveSubmissionContext:
             return {}
         return json.loads(self.slurm_job_data.job_info)
 
+    async def report_job_data(self, slurm_job_data: SlurmJobData) -> None:
+        """
+        Report the job data for the job submission to the API.
+
+        The update is deferred to the batch of the current cycle when there is one.
+        """
+        if self.job_data_updates is not None:
+            self.job_data_updates.add(self.data.id, slurm_job_data)
+            return
+        await update_job_data(self.data.id, slurm_job_data)
+
 
 JobProcessStrategy = Callable[[], Coroutine[Any, Any, None]]
 """Type alias for job process strategy functions."""
@@ -151,8 +215,7 @@ def pending_job_cancellation_strategy(context: ActiveSubmissionContext) -> JobPr
     async def helper() -> None:
         logger.debug(f"Updating job submission {context.data.id} to cancelled state")
         try:
-            await update_job_data(
-                context.data.id,
+            await context.report_job_data(
                 SlurmJobData(
                     job_state="CANCELLED",
                     state_reason="Job was cancelled by the user before a slurm job was created",
@@ -185,7 +248,7 @@ def active_job_cancellation_strategy(context: ActiveSubmissionContext) -> JobPro
         logger.debug(f"Cancelling job for job submission {context.data.id}")
         scancel_handler = ScancelHandler(scancel_path=SETTINGS.SCANCEL_PATH)
         try:
-            scancel_handler.cancel_job(actual_job_id)
+            await run_blocking(scancel_handler.cancel_job, actual_job_id)
         except RuntimeError as e:
             logger.error(f"Failed to cancel slurm job {actual_job_id}: {e}")
 
@@ -219,17 +282,16 @@ def job_data_update_strategy(context: ActiveSubmissionContext) -> JobProcessStra
 
     if not isinstance(context.data.slurm_job_id, int):
         return empty_strategy
-    actual_job_id = context.data.slurm_job_id  # make type checker happy
 
     async def helper() -> None:
         try:
-            slurm_job_data = fetch_job_data(actual_job_id, context.info_handler)
+            slurm_job_data = await run_blocking(lambda: context.slurm_job_data)
         except Exception as e:
             logger.error(f"Failed to update job data for job submission {context.data.id}: {e}")
             return
 
         try:
-            await update_job_data(context.data.id, slurm_job_data)
+            await context.report_job_data(slurm_job_data)
         except Exception as e:
             logger.error(f"API update failed: {e}")
 
@@ -257,16 +319,54 @@ def fetch_job_data(slurm_job_id: int, info_handler: InfoHandler) -> SlurmJobData
     return slurm_state
 
 
+def fetch_jobs_data(slurm_job_ids: Iterable[int], info_handler: InfoHandler) -> dict[int, SlurmJobData]:
+    """
+    Fetch the Slurm job data for multiple jobs with a single call to Slurm.
+
+    Jobs that Slurm no longer knows about are reported as ``UNKNOWN``, just like ``fetch_job_data`` does.
+    Jobs whose info can not be parsed are left out, so they can be fetched individually.
+    """
+    slurm_job_ids = set(slurm_job_ids)
+    logger.debug(f"Fetching slurm job status for {len(slurm_job_ids)} slurm jobs")
+
+    jobs_info = info_handler.get_jobs_info(slurm_job_ids)
+
+    result: dict[int, SlurmJobData] = {}
+    for slurm_job_id in slurm_job_ids:
+        data = jobs_info.get(slurm_job_id)
+        if data is None:
+            result[slurm_job_id] = SlurmJobData(
+                job_id=slurm_job_id,
+                job_state="UNKNOWN",
+                job_info="{}",
+                state_reason=f"Slurm did not find a job matching id {slurm_job_id}",
+            )
+            continue
+        try:
+            slurm_state = SlurmJobData.model_validate(data)
+        except ValidationError as e:
+            logger.error(f"Failed parse info from slurm for slurm job {slurm_job_id}: {e}")
+            continue
+        slurm_state.job_info = json.dumps(data)
+        result[slurm_job_id] = slurm_state
+
+    return result
+
+
+active_submissions_feed = ChangesFeed(
+    url="/jobbergate/job-submissions/agent/active/changes",
+    list_url="/jobbergate/job-submissions/agent/active",
+    base_model=ActiveJobSubmission,
+)
+
+
 async def fetch_active_submissions() -> List[ActiveJobSubmission]:
     """
     Retrieve a list of active job_submissions.
     """
     logger.debug("Fetching active jobs")
     with JobbergateApiError.handle_errors("Failed to fetch active job submissions", do_except=log_error):
-        results = await fetch_paginated_result(
-            url="/jobbergate/job-submissions/agent/active",
-            base_model=ActiveJobSubmission,
-        )
+        results = await active_submissions_feed.fetch()
 
     logger.debug(f"Retrieved {len(results)} active job submissions")
     return results
@@ -297,30 +397,60 @@ async def update_job_data(
         response.raise_for_status()
 
 
+async def update_job_data_batch(updates: dict[int, SlurmJobData]) -> list[JobSubmissionAgentBatchUpdateResult]:
+    """
+    Update multiple job submissions with their job state in a single request.
+
+    The API reports the outcome for each job submission, so the ones it rejected are logged individually.
+    """
+    logger.debug(f"Updating {len(updates)} job submissions in a batch")
+
+    with JobbergateApiError.handle_errors(
+        f"Could not update job data for {len(updates)} job submissions via the API",
+        do_except=log_error,
+    ):
+        response = await jobbergate_api_client.put(
+            "jobbergate/job-submissions/agent/batch",
+            json=[
+                {
+                    "id": job_submission_id,
+                    "slurm_job_id": slurm_job_data.job_id,
+                    "slurm_job_state": slurm_job_data.job_state,
+                    "slurm_job_info": slurm_job_data.job_info,
+                    "slurm_job_state_reason": slurm_job_data.state_reason,
+                }
+                for job_submission_id, slurm_job_data in updates.items()
+            ],
+        )
+        response.raise_for_status()
+        results = TypeAdapter(list[JobSubmissionAgentBatchUpdateResult]).validate_python(response.json())
+
+    for result in results:
+        if result.status_code >= 400:
+            logger.error(
+                "API rejected the update for job submission {} with status {}: {}",
+                result.id,
+                result.status_code,
+                result.detail,
+            )
+    return results
+
+
 def fetch_influx_data(
     job: int,
     measurement: INFLUXDB_MEASUREMENT,
     *,
     time: int | None = None,
-    host: str | None = None,
-    step: int | None = None,
-    task: int | None = None,
-) -> list[InfluxDBPointDict]:
+) -> InfluxDBColumns:
     """
-    Fetch data from InfluxDB for a given host, step and task.
+    Fetch data from InfluxDB for all hosts, steps and tasks of a job, optionally after a given time (in ns).
+
+    The raw series from the response are read straight into columns instead of one dictionary per point.
     """
     with JobbergateAgentError.handle_errors("Failed to fetch measures from InfluxDB", do_except=log_error):
-        all_none = all(arg is None for arg in [time, host, step, task])
-        all_set = all(arg is not None for arg in [time, host, step, task])
-
-        if not (all_none or all_set):
-            raise ValueError("Invalid argument combination: all optional arguments must be either set or None.")
-
-        if all_set:
-            query = dedent(f"""
-            SELECT * FROM {measurement} WHERE time > $time AND host = $host AND step = $step AND task = $task AND job = $job
-            """)
-            params = {"time": time, "host": host, "step": str(step), "task": str(task), "job": str(job)}
+        if time is not None:
+            query = f"SELECT * FROM {measurement} WHERE time > $time AND job = $job"
+            params: dict[str, int | str] = {"time": time, "job": str(job)}
         else:
             query = f"SELECT * FROM {measurement} WHERE job = $job"
             params = {"job": str(job)}
@@ -331,18 +461,7 @@ def fetch_influx_data(
         result = influxdb_client.query(query, bind_params=params, epoch="s")
         logger.debug("Successfully fetched data from InfluxDB")
 
-        return [
-            InfluxDBPointDict(
-                time=point["time"],
-                host=point["host"],
-                job=point["job"],
-                step=point["step"],
-                task=point["task"],
-                value=point["value"] if point["value"] < 2**63 - 1 else 0,  # prevent int64 overflow
-                measurement=measurement,
-            )
-            for point in result.get_points()
-        ]
+        return influx_series_to_columns(result.raw.get("series", []), measurement)
 
 
 def fetch_influx_measurements() -> list[InfluxDBMeasurementDict]:
@@ -384,41 +503,48 @@ async def update_job_metrics(active_job_submittion: ActiveJobSubmission) -> None
 
         influx_measurements = fetch_influx_measurements()
 
-        if not job_max_times.max_times:
-            tasks = (
-                asyncio.to_thread(
-                    fetch_influx_data,
-                    active_job_submittion.slurm_job_id,
-                    measurement["name"],
-                )
-                for measurement in influx_measurements
-            )
-        else:
-            tasks = (
-                asyncio.to_thread(
-                    fetch_influx_data,
-                    active_job_submittion.slurm_job_id,
-                    measurement["name"],
-                    time=int(job_max_time.max_time * 1e9),  # convert to ns since the agent sends in seconds
-                    host=job_max_time.node_host,
-                    step=job_max_time.step,
-                    task=job_max_time.task,
-                )
+        # Query each measurement once for the whole job, starting at the oldest cutoff among the
+        # (host, step, task) keys, and drop the points already stored by the API on the client side
+        min_time = (
+            int(min(job_max_time.max_time for job_max_time in job_max_times.max_times) * 1e9)  # convert to ns
+            if job_max_times.max_times
+            else None
+        )
+        slurm_job_id = active_job_submittion.slurm_job_id
+        semaphore = asyncio.Semaphore(SETTINGS.INFLUX_MAX_CONCURRENT_QUERIES)
+
+        async def fetch_measurement(measurement: InfluxDBMeasurementDict) -> InfluxDBColumns:
+            async with semaphore:
+                return await asyncio.to_thread(fetch_influx_data, slurm_job_id, measurement["name"], time=min_time)
+
+        results = await asyncio.gather(*(fetch_measurement(measurement) for measurement in influx_measurements))
+        data_points = drop_stored_influx_points(
+            concatenate_influx_columns(results),
+            {
+                (job_max_time.node_host, str(job_max_time.step), str(job_max_time.task)): job_max_time.max_time
                 for job_max_time in job_max_times.max_times
-                for measurement in influx_measurements
-            )
-        results = await asyncio.gather(*list(tasks))
-        data_points = chain.from_iterable(results)
-        aggregated_data_points = aggregate_influx_measures(data_points)
-        if not aggregated_data_points:
-            # defer the API call since there's no data to be sent
-            return
-        packed_data = msgpack.packb(aggregated_data_points)
+            },
+        )
+        if SETTINGS.INFLUX_COLUMNAR_UPLOAD:
+            columnar_data = aggregate_influx_measures_columnar(data_points)
+            if not columnar_data["rows"]:
+                # defer the API call since there's no data to be sent
+                return
+            packed_data = msgpack.packb(columnar_data)
+            content_type = METRICS_COLUMNAR_CONTENT_TYPE
+        else:
+            aggregated_data_points = aggregate_influx_measures(data_points)
+            if not aggregated_data_points:
+                # defer the API call since there's no data to be sent
+                return
+            packed_data = msgpack.packb(aggregated_data_points)
+            content_type = "application/octet-stream"
 
         response = await jobbergate_api_client.put(
             f"jobbergate/job-submissions/agent/metrics/{active_job_submittion.id}",
+            params={"ignore_duplicates": True},
             content=packed_data,
-            headers={"Content-Type": "application/octet-stream"},
+            headers={"Content-Type": content_type},
         )
         response.raise_for_status()
 
@@ -439,12 +565,31 @@ async def update_active_jobs() -> None:
 
     plugin_manager = active_submission_plugin_manager()
     active_job_submissions = await fetch_active_submissions()
-    for active_job in active_job_submissions:
+    job_data_updates = JobDataUpdateBatch()
+
+    slurm_jobs_data: dict[int, SlurmJobData] | None = None
+    slurm_job_ids = {job.slurm_job_id for job in active_job_submissions if job.slurm_job_id is not None}
+    if slurm_job_ids:
         try:
-            for strategy in plugin_manager.hook.active_submission(context=ActiveSubmissionContext(data=active_job)):
+            slurm_jobs_data = await run_blocking(
+                fetch_jobs_data, slurm_job_ids, InfoHandler(scontrol_path=SETTINGS.SCONTROL_PATH)
+            )
+        except Exception as e:
+            logger.error("Failed to fetch job data from slurm in bulk, falling back to one call per job: {}", e)
+
+    async def process_active_job(active_job: ActiveJobSubmission) -> None:
+        try:
+            context = ActiveSubmissionContext(
+                data=active_job, job_data_updates=job_data_updates, slurm_jobs_data=slurm_jobs_data
+            )
+            for strategy in plugin_manager.hook.active_submission(context=context):
                 await strategy()
             logger.debug("Finished handling active job_submission {}", active_job.id)
         except Exception as e:
             logger.error("Error processing active job submission {}: {}", active_job.id, e)
 
+    await run_concurrently(active_job_submissions, process_active_job)
+
+    await job_data_updates.flush()
+
     logger.debug("...Finished updating slurm job data for active jobs")
@@ -35,6 +35,10 @@ class Settings(BaseSettings):
     BASE_API_URL: str = "https://apis.vantagehpc.io"
     MAX_PAGES_PER_CYCLE: int = Field(5, ge=1)
     ITEMS_PER_PAGE: int = Field(100, ge=1, le=100)
+    ITEMS_PER_BATCH_UPDATE: int = Field(100, ge=1, le=500)
+    # Seconds between full syncs of pending and active job submissions, only changes are fetched in between.
+    # Set it to 0 to fetch them in full on every cycle.
+    CHANGES_FEED_RESYNC_INTERVAL: int = Field(3600, ge=0)
 
     # Sentry
     SENTRY_DSN: Optional[AnyHttpUrl] = None
@@ -61,6 +65,12 @@ class Settings(BaseSettings):
     # Task settings
     TASK_JOBS_INTERVAL_SECONDS: int = Field(60, ge=10, le=3600)  # seconds
     TASK_SELF_UPDATE_INTERVAL_SECONDS: Optional[int] = Field(None, ge=10)  # seconds
+    TASK_NOTIFICATIONS_TIMEOUT_SECONDS: Optional[int] = Field(
+        30, ge=1, le=60, description="Seconds to wait on each request for job submissions notified by the API"
+    )
+    TASK_MAX_CONCURRENCY: int = Field(
+        8, ge=1, description="Maximum number of job submissions processed at the same time on each task"
+    )
 
     # Job submission settings
     WRITE_SUBMISSION_FILES: bool = True
@@ -71,11 +81,17 @@ class Settings(BaseSettings):
         None, description="InfluxDB DSN. Only supports the schemes 'influxdb', 'https+influxdb' and 'udp+influxdb'"
     )
     INFLUX_POOL_SIZE: int = Field(10, ge=1, description="Number of InfluxDB connections to pool")
+    INFLUX_MAX_CONCURRENT_QUERIES: int = Field(
+        4, ge=1, description="Maximum number of InfluxDB queries running at the same time for a job submission"
+    )
     INFLUX_SSL: bool = Field(False, description="Use SSL for InfluxDB connection")
     INFLUX_VERIFY_SSL: bool = Field(False, description="Verify SSL certificate for InfluxDB connection")
     INFLUX_TIMEOUT: Optional[int] = Field(None, ge=1, description="Timeout for InfluxDB connection")
     INFLUX_UDP_PORT: int = Field(4444, ge=1, le=65535, description="UDP port for InfluxDB connection")
     INFLUX_CERT_PATH: Optional[Path] = Field(None, description="Path to InfluxDB certificate file")
+    INFLUX_COLUMNAR_UPLOAD: bool = Field(
+        False, description="Upload the job metrics to the API in the columnar format, which requires a recent API"
+    )
 
     @property
     def influx_integration_enabled(self) -> bool:
@@ -1,6 +1,7 @@
 """Task definitions for the Jobbergate Agent."""
 
 from jobbergate_agent.internals.update import self_update_agent
+from jobbergate_agent.jobbergate.notifications import listen_for_notifications
 from jobbergate_agent.jobbergate.report_health import report_health_status
 from jobbergate_agent.jobbergate.submit import submit_pending_jobs
 from jobbergate_agent.jobbergate.update import update_active_jobs
@@ -31,6 +32,17 @@ def pending_submissions_task(scheduler: BaseScheduler) -> Job:
     return scheduler.add_job(submit_pending_jobs, "interval", seconds=SETTINGS.TASK_JOBS_INTERVAL_SECONDS)
 
 
+def notifications_task(scheduler: BaseScheduler) -> Job | None:
+    """
+    Schedule a task to submit pending jobs and cancel jobs as soon as the API notifies them.
+
+    The task runs once and keeps waiting for notifications, while the interval tasks remain as a fallback.
+    """
+    if SETTINGS.TASK_NOTIFICATIONS_TIMEOUT_SECONDS is None:
+        return None
+    return scheduler.add_job(listen_for_notifications, kwargs={"scheduler": scheduler})
+
+
 def status_report_task(scheduler: BaseScheduler) -> Job:
     """
     Schedule a task to report the status.
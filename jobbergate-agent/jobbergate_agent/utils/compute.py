@@ -1,45 +1,108 @@
 """Core module for compute related functions."""
 
-import tracemalloc
-from collections.abc import Callable, Iterator
-from functools import wraps
-from typing import Any, cast, get_args
+from collections.abc import Mapping, Sequence
+from typing import Any, NamedTuple, cast, get_args
 
 import numpy as np
-from loguru import logger
 from numba import njit
 
-from jobbergate_agent.jobbergate.constants import INFLUXDB_MEASUREMENT
-from jobbergate_agent.jobbergate.schemas import InfluxDBPointDict, JobMetricData
+from jobbergate_agent.jobbergate.constants import INFLUXDB_INTEGER_MEASUREMENTS, INFLUXDB_MEASUREMENT
+from jobbergate_agent.jobbergate.schemas import ColumnarJobMetricData, JobMetricData
 
 
-def measure_memory_usage(func: Callable) -> Callable:
-    """Decorator to measure the memory usage of a function.
+class InfluxDBColumns(NamedTuple):
+    """
+    Columnar representation of the data points fetched from InfluxDB.
 
-    Args:
-        func: Function whose memory usage should be measured.
+    Each field holds one entry per data point, so no Python object is created per point.
+    The measurement column holds the index of the measurement in ``INFLUXDB_MEASUREMENT``.
+    """
 
-    Returns:
-        Decorated function.
+    time: np.ndarray
+    host: np.ndarray
+    step: np.ndarray
+    task: np.ndarray
+    value: np.ndarray
+    measurement: np.ndarray
+
+
+def _empty_influx_columns() -> InfluxDBColumns:
+    """Create the columns for an empty set of data points."""
+    return InfluxDBColumns(
+        time=np.empty(0, dtype=np.int64),
+        host=np.empty(0, dtype=np.object_),
+        step=np.empty(0, dtype=np.object_),
+        task=np.empty(0, dtype=np.object_),
+        value=np.empty(0, dtype=np.float64),
+        measurement=np.empty(0, dtype=np.int8),
+    )
+
+
+def concatenate_influx_columns(parts: Sequence[InfluxDBColumns]) -> InfluxDBColumns:
+    """Concatenate the columns fetched by multiple InfluxDB queries."""
+    if not parts:
+        return _empty_influx_columns()
+    return InfluxDBColumns(*(np.concatenate(arrays) for arrays in zip(*parts, strict=True)))
+
+
+def influx_series_to_columns(series: list[dict[str, Any]], measurement: INFLUXDB_MEASUREMENT) -> InfluxDBColumns:
     """
+    Build the columns from the raw series returned by InfluxDB for a given measurement.
+
+    The rows of each series are read into a single array and sliced by column, skipping
+    the per-point dictionaries created by ``ResultSet.get_points()``.
+    """
+    measurement_index = get_args(INFLUXDB_MEASUREMENT).index(measurement)
+    parts = []
+    for serie in series:
+        rows = serie.get("values") or []
+        if not rows:
+            continue
+        column_index = {name: idx for idx, name in enumerate(serie["columns"])}
+        table = np.array(rows, dtype=np.object_)
+
+        values = table[:, column_index["value"]].astype(np.float64)
+        values[values >= 2**63 - 1] = 0  # prevent int64 overflow
+
+        parts.append(
+            InfluxDBColumns(
+                time=table[:, column_index["time"]].astype(np.int64),
+                host=table[:, column_index["host"]],
+                step=table[:, column_index["step"]],
+                task=table[:, column_index["task"]],
+                value=values,
+                measurement=np.full(len(rows), measurement_index, dtype=np.int8),
+            )
+        )
+    return concatenate_influx_columns(parts)
 
-    @wraps(func)
-    def wrapper(*args: Any, **kwargs: Any) -> Any:
-        tracemalloc.start()
-        result = func(*args, **kwargs)
-        current, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
 
-        logger.debug(f"Memory usage for function '{func.__name__}': {current=}B, {peak=}B")
-        return result
+def drop_stored_influx_points(data: InfluxDBColumns, cutoffs: Mapping[tuple[str, str, str], float]) -> InfluxDBColumns:
+    """
+    Drop the data points that are not newer than the cutoff time of their (host, step, task) key.
 
-    return wrapper
+    Keys without a cutoff are kept entirely. The cutoffs are only looked up once per unique key
+    and then broadcast to the data points, so the filter itself is vectorized.
+    """
+    if not cutoffs or not len(data.time):
+        return data
 
+    hosts, host_indices = np.unique(data.host, return_inverse=True)
+    steps, step_indices = np.unique(data.step, return_inverse=True)
+    tasks, task_indices = np.unique(data.task, return_inverse=True)
+    keys = np.stack((host_indices, step_indices, task_indices), axis=1)
+    unique_keys, key_indices = np.unique(keys, axis=0, return_inverse=True)
 
-def _create_mapping(column):
-    """Create a mapping of unique strings to integers."""
-    unique_values = sorted(set(column))
-    return {val: idx for idx, val in enumerate(unique_values)}
+    host_labels, step_labels, task_labels = hosts.tolist(), steps.tolist(), tasks.tolist()
+    key_cutoffs = np.array(
+        [
+            cutoffs.get((host_labels[host], step_labels[step], task_labels[task]), -np.inf)
+            for host, step, task in unique_keys.tolist()
+        ],
+        dtype=np.float64,
+    )
+    mask = data.time > key_cutoffs[key_indices]
+    return InfluxDBColumns(*(column[mask] for column in data))
 
 
 @njit
@@ -59,66 +122,75 @@ def _aggregate_with_numba(
     return aggregated_values
 
 
-@measure_memory_usage
-def aggregate_influx_measures(
-    data_points: Iterator[InfluxDBPointDict],
-) -> JobMetricData:
-    """Aggregate the list of data points by time, host, step and task.
+def _aggregate_influx_measures(
+    data: InfluxDBColumns,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Aggregate the data points by time, host, step and task.
 
-    The output data is a list of tuples with the following format:
-    [
-        (time, host, step, task, CPUFrequency, CPUTime, CPUUtilization, GPUMemMB,
-        GPUUtilization, Pages, RSS, VMSize, ReadMB, WriteMB),
-        ...
-    ]
+    Returns:
+        The unique keys as an array of (time, host index, step index, task index), the sorted hosts,
+        steps and tasks referenced by the indexes, and the aggregated values for each key and measurement.
     """
-    measurement_names = get_args(INFLUXDB_MEASUREMENT)
-    measurement_mapping = {name: idx for idx, name in enumerate(measurement_names)}
-    num_measurements = len(measurement_names)
-
-    data_points_list = list(data_points)
-
-    # Extract columns and map strings to integers
-    times = np.fromiter((d["time"] for d in data_points_list), dtype=np.int64)
-    hosts = np.fromiter((d["host"] for d in data_points_list), dtype=np.object_)
-    steps = np.fromiter((d["step"] for d in data_points_list), dtype=np.object_)
-    tasks = np.fromiter((d["task"] for d in data_points_list), dtype=np.object_)
-    measurements = np.fromiter((measurement_mapping[d["measurement"]] for d in data_points_list), dtype=np.int8)
-    values = np.fromiter((d["value"] for d in data_points_list), dtype=np.float64)
-
-    # Create mappings for string columns
-    host_mapping = _create_mapping(hosts)
-    step_mapping = _create_mapping(steps)
-    task_mapping = _create_mapping(tasks)
-
-    # Map strings to integers
-    host_indices = np.array([host_mapping[h] for h in hosts], dtype=np.int64)
-    step_indices = np.array([step_mapping[s] for s in steps], dtype=np.int64)
-    task_indices = np.array([task_mapping[t] for t in tasks], dtype=np.int64)
+    num_measurements = len(get_args(INFLUXDB_MEASUREMENT))
+
+    # Factorize the string columns into sorted labels and integer codes
+    hosts, host_indices = np.unique(data.host, return_inverse=True)
+    steps, step_indices = np.unique(data.step, return_inverse=True)
+    tasks, task_indices = np.unique(data.task, return_inverse=True)
 
     # Combine keys for grouping
-    keys = np.stack((times, host_indices, step_indices, task_indices), axis=1)
+    keys = np.stack((data.time, host_indices, step_indices, task_indices), axis=1)
     unique_keys, key_indices = np.unique(keys, axis=0, return_inverse=True)
     num_keys = len(unique_keys)
 
     # Perform aggregation
-    aggregated_values = _aggregate_with_numba(values, key_indices, measurements, num_keys, num_measurements)
+    aggregated_values = _aggregate_with_numba(data.value, key_indices, data.measurement, num_keys, num_measurements)
 
-    # Convert results back to original format
-    reverse_host_mapping = {v: k for k, v in host_mapping.items()}
-    reverse_step_mapping = {v: k for k, v in step_mapping.items()}
-    reverse_task_mapping = {v: k for k, v in task_mapping.items()}
+    return unique_keys, hosts, steps, tasks, aggregated_values
 
+
+def aggregate_influx_measures(data: InfluxDBColumns) -> JobMetricData:
+    """Aggregate the data points by time, host, step and task.
+
+    The output data is a list of tuples with the following format:
+    [
+        (time, host, step, task, CPUFrequency, CPUTime, CPUUtilization, GPUMemMB,
+        GPUUtilization, Pages, RSS, VMSize, ReadMB, WriteMB),
+        ...
+    ]
+    """
+    unique_keys, hosts, steps, tasks, aggregated_values = _aggregate_influx_measures(data)
+
+    host_labels, step_labels, task_labels = hosts.tolist(), steps.tolist(), tasks.tolist()
     return cast(
         JobMetricData,
         [
-            (
-                int(unique_key[0]),  # time
-                reverse_host_mapping[unique_key[1]],  # host
-                reverse_step_mapping[unique_key[2]],  # step
-                reverse_task_mapping[unique_key[3]],  # task
-                *map(float, aggregated_values[i]),
-            )
-            for i, unique_key in enumerate(unique_keys)
+            (time, host_labels[host], step_labels[step], task_labels[task], *values)
+            for (time, host, step, task), values in zip(unique_keys.tolist(), aggregated_values.tolist(), strict=True)
         ],
     )
+
+
+def aggregate_influx_measures_columnar(data: InfluxDBColumns) -> ColumnarJobMetricData:
+    """Aggregate the data points by time, host, step and task into the columnar format.
+
+    The columns are taken straight from the aggregated arrays, so no Python object is built per row.
+    """
+    unique_keys, hosts, steps, tasks, aggregated_values = _aggregate_influx_measures(data)
+
+    columns = [
+        unique_keys[:, 0].astype("<i8"),  # time
+        unique_keys[:, 1].astype("<i8"),  # host index
+        steps.astype("<i8")[unique_keys[:, 2]],
+        tasks.astype("<i8")[unique_keys[:, 3]],
+        *(
+            aggregated_values[:, idx].astype("<i8" if name in INFLUXDB_INTEGER_MEASUREMENTS else "<f8")
+            for idx, name in enumerate(get_args(INFLUXDB_MEASUREMENT))
+        ),
+    ]
+
+    return ColumnarJobMetricData(
+        rows=len(unique_keys),
+        node_hosts=[str(host) for host in hosts],
+        columns=[column.tobytes() for column in columns],
+    )
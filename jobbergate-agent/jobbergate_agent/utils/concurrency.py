@@ -0,0 +1,59 @@
+"""
+Provide tools to process job submissions concurrently while keeping the amount of work in flight bounded.
+
+Blocking calls (i.e., subprocesses like sbatch and scontrol) are offloaded to a thread pool
+so they do not block the event loop while other job submissions are processed.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Iterable, TypeVar
+
+from jobbergate_agent.settings import SETTINGS
+from jobbergate_agent.utils.logging import logger
+
+T = TypeVar("T")
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Get the thread pool used to run blocking calls, creating it on first use.
+
+    The pool is sized by ``TASK_MAX_CONCURRENCY``, matching the number of job submissions processed at once.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=SETTINGS.TASK_MAX_CONCURRENCY, thread_name_prefix="jobbergate-agent-worker"
+        )
+    return _executor
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking callable in the worker thread pool without blocking the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), partial(func, *args, **kwargs))
+
+
+async def run_concurrently(items: Iterable[T], handler: Callable[[T], Awaitable[None]]) -> None:
+    """
+    Run the handler for each item, with at most ``TASK_MAX_CONCURRENCY`` of them running at the same time.
+
+    The handler is expected to deal with its own errors, but any exception that escapes it is
+    logged so the remaining items are still processed.
+    """
+    semaphore = asyncio.Semaphore(SETTINGS.TASK_MAX_CONCURRENCY)
+
+    async def worker(item: T) -> None:
+        async with semaphore:
+            try:
+                await handler(item)
+            except Exception as e:
+                logger.error("Unhandled error while processing {}: {}", item, e)
+
+    await asyncio.gather(*(worker(item) for item in items))
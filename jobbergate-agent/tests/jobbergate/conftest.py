@@ -6,6 +6,18 @@ from textwrap import dedent
 
 import pytest
 
+from jobbergate_agent.jobbergate.submit import pending_submissions_feed
+from jobbergate_agent.jobbergate.update import active_submissions_feed
+
+
+@pytest.fixture(autouse=True)
+def reset_changes_feeds():
+    """
+    Drop the local copies of the changes feeds, so each test starts with a full sync.
+    """
+    pending_submissions_feed.reset()
+    active_submissions_feed.reset()
+
 
 @pytest.fixture(scope="module")
 def dummy_template_source():
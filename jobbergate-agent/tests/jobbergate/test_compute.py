@@ -4,20 +4,22 @@ import itertools
 from collections import defaultdict
 from collections.abc import Callable
 from datetime import datetime
-from typing import cast, get_args
-from unittest import mock
+from typing import Any, cast, get_args
 
 import numpy as np
 import pytest
 from faker import Faker
 
-from jobbergate_agent.jobbergate.constants import INFLUXDB_MEASUREMENT
-from jobbergate_agent.jobbergate.schemas import InfluxDBPointDict, JobMetricData
+from jobbergate_agent.jobbergate.constants import INFLUXDB_INTEGER_MEASUREMENTS, INFLUXDB_MEASUREMENT
+from jobbergate_agent.jobbergate.schemas import JobMetricData
 from jobbergate_agent.utils.compute import (
+    InfluxDBColumns,
     _aggregate_with_numba,
-    _create_mapping,
     aggregate_influx_measures,
-    measure_memory_usage,
+    aggregate_influx_measures_columnar,
+    concatenate_influx_columns,
+    drop_stored_influx_points,
+    influx_series_to_columns,
 )
 
 
@@ -29,18 +31,29 @@ def _create_influx_point(
     task: str,
     measurement: str,
     value: float,
-) -> InfluxDBPointDict:
+) -> dict[str, Any]:
     """Create a single InfluxDB point dictionary."""
-    return InfluxDBPointDict(
-        **{
-            "time": time,
-            "host": host,
-            "job": job,
-            "step": step,
-            "task": task,
-            "value": value,
-            "measurement": measurement,
-        }
+    return {
+        "time": time,
+        "host": host,
+        "job": job,
+        "step": step,
+        "task": task,
+        "value": value,
+        "measurement": measurement,
+    }
+
+
+def _build_influx_columns(points: list[dict[str, Any]]) -> InfluxDBColumns:
+    """Build the InfluxDB columns for a list of point dictionaries."""
+    measurement_names = get_args(INFLUXDB_MEASUREMENT)
+    return InfluxDBColumns(
+        time=np.array([point["time"] for point in points], dtype=np.int64),
+        host=np.array([point["host"] for point in points], dtype=np.object_),
+        step=np.array([point["step"] for point in points], dtype=np.object_),
+        task=np.array([point["task"] for point in points], dtype=np.object_),
+        value=np.array([point["value"] for point in points], dtype=np.float64),
+        measurement=np.array([measurement_names.index(point["measurement"]) for point in points], dtype=np.int8),
     )
 
 
@@ -52,7 +65,7 @@ def _generate_measures_for_iteration(
     num_steps: int,
     num_tasks: int,
     measurement_names: tuple,
-) -> tuple[list[InfluxDBPointDict], dict, int]:
+) -> tuple[list[dict[str, Any]], dict, int]:
     """Generate measures for one iteration and return measures, aggregated data, and updated time."""
     measures = []
     default_measurements: dict[str, float] = dict.fromkeys(measurement_names, 0.0)
@@ -92,7 +105,7 @@ def generate_and_aggregate_job_metrics_data(
 ) -> Callable[
     [int, int, int, int, int],
     tuple[
-        list[InfluxDBPointDict],
+        list[dict[str, Any]],
         JobMetricData,
     ],
 ]:
@@ -105,7 +118,7 @@ def generate_and_aggregate_job_metrics_data(
     def _generate_and_aggregate(
         num_points_per_measurement: int, num_hosts: int, num_jobs: int, num_steps: int, num_tasks: int
     ) -> tuple[
-        list[InfluxDBPointDict],
+        list[dict[str, Any]],
         JobMetricData,
     ]:
         # Initialize data structures
@@ -161,20 +174,20 @@ async def test_aggregate_influx_measures__success(
     generate_and_aggregate_job_metrics_data: Callable[
         [int, int, int, int, int],
         tuple[
-            list[InfluxDBPointDict],
+            list[dict[str, Any]],
             JobMetricData,
         ],
     ],
 ):
     """
     Test that the ``aggregate_influx_measures()`` function can successfully aggregate
-    a list of InfluxDBPointDict data points.
+    the columns of InfluxDB data points.
     """
     measures, expected_aggregated_data = generate_and_aggregate_job_metrics_data(
         num_points_per_measurement, num_hosts, num_jobs, num_steps, num_tasks
     )
 
-    aggregated_data = aggregate_influx_measures(iter(measures))
+    aggregated_data = aggregate_influx_measures(_build_influx_columns(measures))
 
     for data_point in aggregated_data:
         assert data_point in expected_aggregated_data
@@ -184,121 +197,168 @@ async def test_aggregate_influx_measures__success(
 async def test_aggregate_influx_measures__empty_data_points():
     """
     Test that the ``aggregate_influx_measures()`` function returns an empty list
-    when given an empty iterator of data points.
+    when given no data points.
     """
-    data_points = []
-
-    result = aggregate_influx_measures(iter(data_points))
+    result = aggregate_influx_measures(concatenate_influx_columns([]))
 
     assert result == []
 
 
 @pytest.mark.parametrize(
-    "current, peak",
-    [(0, 0), (100, 200), (87, 100), (34, 43), (0, 98654), (3245879, 0)],
-)
-@mock.patch("jobbergate_agent.utils.compute.logger")
-@mock.patch("jobbergate_agent.utils.compute.tracemalloc")
-def test_measure_memory_usage_decorator(
-    mocked_tracemalloc: mock.MagicMock, mocked_logger: mock.MagicMock, current: int, peak: int
-):
-    """Test the measure_memory_usage decorator."""
-
-    mocked_tracemalloc.get_traced_memory.return_value = (current, peak)
-
-    @measure_memory_usage
-    def dummy_function():
-        return sum(list(range(10000)))
-
-    result = dummy_function()
-
-    assert result == sum(range(10000))
-    mocked_logger.debug.assert_called_once_with(
-        f"Memory usage for function '{dummy_function.__name__}': {current=}B, {peak=}B"
-    )
-    mocked_tracemalloc.start.assert_called_once_with()
-    mocked_tracemalloc.get_traced_memory.assert_called_once_with()
-    mocked_tracemalloc.stop.assert_called_once_with()
-
-
-@pytest.mark.parametrize(
-    "current, peak",
-    [(0, 0), (100, 200), (87, 100), (34, 43), (0, 98654), (3245879, 0)],
+    "num_points_per_measurement, num_hosts, num_jobs, num_steps, num_tasks",
+    [
+        (1, 1, 1, 1, 1),
+        (3, 10, 1, 5, 10),
+    ],
 )
-@mock.patch("jobbergate_agent.utils.compute.logger")
-@mock.patch("jobbergate_agent.utils.compute.tracemalloc")
-def test_measure_memory_usage_decorator_with_args(
-    mocked_tracemalloc: mock.MagicMock, mocked_logger: mock.MagicMock, current: int, peak: int
+def test_aggregate_influx_measures_columnar__matches_the_row_format(
+    num_points_per_measurement: int,
+    num_hosts: int,
+    num_jobs: int,
+    num_steps: int,
+    num_tasks: int,
+    generate_and_aggregate_job_metrics_data: Callable[
+        [int, int, int, int, int],
+        tuple[
+            list[dict[str, Any]],
+            JobMetricData,
+        ],
+    ],
 ):
-    """Test the measure_memory_usage decorator with arguments."""
-    mocked_tracemalloc.get_traced_memory.return_value = (current, peak)
-
-    @measure_memory_usage
-    def dummy_function_with_args(a, b):
-        return a + b
-
-    result = dummy_function_with_args(5, 10)
-
-    assert result == 15
-    mocked_logger.debug.assert_called_once_with(
-        f"Memory usage for function '{dummy_function_with_args.__name__}': {current=}B, {peak=}B"
+    """
+    Test that the ``aggregate_influx_measures_columnar()`` function produces the same data as
+    ``aggregate_influx_measures()``, encoded as one little-endian buffer per column.
+    """
+    measures, _ = generate_and_aggregate_job_metrics_data(
+        num_points_per_measurement, num_hosts, num_jobs, num_steps, num_tasks
     )
-    mocked_tracemalloc.start.assert_called_once_with()
-    mocked_tracemalloc.get_traced_memory.assert_called_once_with()
-    mocked_tracemalloc.stop.assert_called_once_with()
-
-
-def test_measure_memory_usage_decorator_logging(caplog):
-    """Test the measure_memory_usage decorator logging."""
 
-    @measure_memory_usage
-    def dummy_function():
-        return sum(list(range(10000)))
-
-    with caplog.at_level("DEBUG"):
-        dummy_function()
+    columnar_data = aggregate_influx_measures_columnar(_build_influx_columns(measures))
+    row_data = aggregate_influx_measures(_build_influx_columns(measures))
+
+    assert columnar_data["rows"] == len(row_data)
+    assert columnar_data["node_hosts"] == sorted({row[1] for row in row_data})
+    integer_columns = {
+        idx + 4 for idx, name in enumerate(get_args(INFLUXDB_MEASUREMENT)) if name in INFLUXDB_INTEGER_MEASUREMENTS
+    }
+    columns = [
+        np.frombuffer(buffer, dtype="<f8" if idx >= 4 and idx not in integer_columns else "<i8")
+        for idx, buffer in enumerate(columnar_data["columns"])
+    ]
+    decoded_rows = [
+        (
+            int(columns[0][i]),
+            columnar_data["node_hosts"][columns[1][i]],
+            str(columns[2][i]),
+            str(columns[3][i]),
+            *(float(column[i]) for column in columns[4:]),
+        )
+        for i in range(columnar_data["rows"])
+    ]
+    expected_rows = [
+        (*row[:4], *(float(int(value)) if idx + 4 in integer_columns else value for idx, value in enumerate(row[4:])))
+        for row in row_data
+    ]
+    assert decoded_rows == expected_rows
 
-    assert any("Memory usage for function 'dummy_function'" in message for message in caplog.messages)
 
+def test_aggregate_influx_measures_columnar__empty_data_points():
+    """
+    Test that the ``aggregate_influx_measures_columnar()`` function returns empty columns
+    when given no data points.
+    """
+    result = aggregate_influx_measures_columnar(concatenate_influx_columns([]))
 
-def test_create_mapping():
-    """Test the _create_mapping function."""
-    column = ["apple", "banana", "apple", "orange", "banana", "apple"]
-    expected_mapping = {"apple": 0, "banana": 1, "orange": 2}
+    assert result == {"rows": 0, "node_hosts": [], "columns": [b""] * 14}
 
-    result = _create_mapping(column)
 
-    assert result == expected_mapping
+def test_influx_series_to_columns__reads_the_raw_series():
+    """
+    Test that the ``influx_series_to_columns()`` function reads the raw InfluxDB series into columns,
+    regardless of the column order, and replaces values that would overflow an int64 by zero.
+    """
+    series = [
+        {
+            "name": "RSS",
+            "columns": ["time", "host", "job", "step", "task", "value"],
+            "values": [[10, "host_1", "1", "0", "1", 2.5], [20, "host_2", "1", "0", "1", 2**63]],
+        },
+        {
+            "name": "RSS",
+            "columns": ["value", "time", "task", "step", "job", "host"],
+            "values": [[7, 30, "2", "1", "1", "host_1"]],
+        },
+        {"name": "RSS", "columns": ["time", "host", "job", "step", "task", "value"], "values": []},
+    ]
+
+    result = influx_series_to_columns(series, "RSS")
+
+    np.testing.assert_array_equal(result.time, [10, 20, 30])
+    assert result.time.dtype == np.int64
+    assert result.host.tolist() == ["host_1", "host_2", "host_1"]
+    assert result.step.tolist() == ["0", "0", "1"]
+    assert result.task.tolist() == ["1", "1", "2"]
+    np.testing.assert_array_equal(result.value, [2.5, 0.0, 7.0])
+    np.testing.assert_array_equal(result.measurement, [get_args(INFLUXDB_MEASUREMENT).index("RSS")] * 3)
+
+
+def test_influx_series_to_columns__no_series():
+    """
+    Test that the ``influx_series_to_columns()`` function returns empty columns when there are no series.
+    """
+    result = influx_series_to_columns([], "CPUTime")
 
+    assert all(len(column) == 0 for column in result)
+    assert result.time.dtype == np.int64
+    assert result.value.dtype == np.float64
 
-def test_create_mapping_empty():
-    """Test the _create_mapping function with an empty list."""
-    column = []
-    expected_mapping = {}
 
-    result = _create_mapping(column)
+def test_concatenate_influx_columns():
+    """
+    Test that the ``concatenate_influx_columns()`` function concatenates each column of the given parts.
+    """
+    first = _build_influx_columns([_create_influx_point(1, "host_1", "1", "0", "0", "CPUTime", 1.0)])
+    second = _build_influx_columns([_create_influx_point(2, "host_2", "1", "0", "1", "RSS", 2.0)])
 
-    assert result == expected_mapping
+    result = concatenate_influx_columns([first, second])
 
+    np.testing.assert_array_equal(result.time, [1, 2])
+    assert result.host.tolist() == ["host_1", "host_2"]
+    assert result.task.tolist() == ["0", "1"]
+    np.testing.assert_array_equal(result.value, [1.0, 2.0])
+    np.testing.assert_array_equal(result.measurement, np.concatenate([first.measurement, second.measurement]))
 
-def test_create_mapping_single_value():
-    """Test the _create_mapping function with a single value list."""
-    column = ["apple"]
-    expected_mapping = {"apple": 0}
 
-    result = _create_mapping(column)
+def test_drop_stored_influx_points():
+    """
+    Test that the ``drop_stored_influx_points()`` function drops the points that are not newer than
+    the cutoff of their (host, step, task) key and keeps every point of keys without a cutoff.
+    """
+    data = _build_influx_columns(
+        [
+            _create_influx_point(10, "host_1", "1", "0", "0", "CPUTime", 1.0),
+            _create_influx_point(20, "host_1", "1", "0", "0", "RSS", 2.0),
+            _create_influx_point(30, "host_1", "1", "0", "0", "CPUTime", 3.0),
+            _create_influx_point(10, "host_2", "1", "0", "0", "CPUTime", 4.0),
+            _create_influx_point(20, "host_1", "1", "1", "0", "CPUTime", 5.0),
+        ]
+    )
 
-    assert result == expected_mapping
+    result = drop_stored_influx_points(data, {("host_1", "0", "0"): 20, ("host_2", "0", "0"): 10})
 
+    np.testing.assert_array_equal(result.time, [30, 20])
+    assert result.host.tolist() == ["host_1", "host_1"]
+    assert result.step.tolist() == ["0", "1"]
+    np.testing.assert_array_equal(result.value, [3.0, 5.0])
 
-def test_create_mapping_multiple_unique_values():
-    """Test the _create_mapping function with multiple unique values."""
-    column = ["apple", "banana", "cherry", "date"]
-    expected_mapping = {"apple": 0, "banana": 1, "cherry": 2, "date": 3}
 
-    result = _create_mapping(column)
+def test_drop_stored_influx_points__no_cutoffs():
+    """
+    Test that the ``drop_stored_influx_points()`` function keeps all the points when there are no cutoffs.
+    """
+    data = _build_influx_columns([_create_influx_point(10, "host_1", "1", "0", "0", "CPUTime", 1.0)])
 
-    assert result == expected_mapping
+    assert drop_stored_influx_points(data, {}) is data
 
 
 def test_aggregate_with_numba():
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import httpx
+import pytest
+import respx
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from jobbergate_agent.jobbergate.constants import JobSubmissionStatus
+from jobbergate_agent.jobbergate.notifications import listen_for_notifications, run_now, wait_for_notifications
+from jobbergate_agent.jobbergate.submit import submit_pending_jobs
+from jobbergate_agent.jobbergate.update import update_active_jobs
+from jobbergate_agent.settings import SETTINGS
+from jobbergate_agent.utils.exception import JobbergateApiError
+
+NOTIFICATIONS_URL = f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/notifications"
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_access_token")
+async def test_wait_for_notifications__success():
+    async with respx.mock:
+        route = respx.get(NOTIFICATIONS_URL)
+        route.mock(return_value=httpx.Response(status_code=200, json={"statuses": ["CREATED", "SUBMITTED"]}))
+
+        statuses = await wait_for_notifications(30)
+
+    assert statuses == {JobSubmissionStatus.CREATED}
+    assert dict(route.calls.last.request.url.params) == {"timeout": "30"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_access_token")
+@pytest.mark.parametrize("requests_timeout, expected_timeout", [(15, 45), (None, None)])
+async def test_wait_for_notifications__request_timeout(requests_timeout, expected_timeout, tweak_settings):
+    async with respx.mock:
+        route = respx.get(NOTIFICATIONS_URL)
+        route.mock(return_value=httpx.Response(status_code=200, json={"statuses": []}))
+
+        with tweak_settings(REQUESTS_TIMEOUT=requests_timeout):
+            await wait_for_notifications(30)
+
+    assert route.calls.last.request.extensions["timeout"]["read"] == expected_timeout
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_access_token")
+async def test_wait_for_notifications__failure():
+    async with respx.mock:
+        respx.get(NOTIFICATIONS_URL).mock(return_value=httpx.Response(status_code=500))
+
+        with pytest.raises(JobbergateApiError, match="Failed to wait for notifications"):
+            await wait_for_notifications(30)
+
+
+@pytest.mark.asyncio
+async def test_run_now__brings_forward_matching_jobs():
+    scheduler = AsyncIOScheduler()
+    scheduler.start(paused=True)
+    try:
+        pending_job = scheduler.add_job(submit_pending_jobs, "interval", seconds=3600)
+        active_job = scheduler.add_job(update_active_jobs, "interval", seconds=3600)
+
+        run_now(scheduler, submit_pending_jobs)
+
+        soon = datetime.now(timezone.utc) + timedelta(seconds=60)
+        assert scheduler.get_job(pending_job.id).next_run_time < soon
+        assert scheduler.get_job(active_job.id).next_run_time > soon
+    finally:
+        scheduler.shutdown(wait=False)
+
+
+@pytest.mark.asyncio
+async def test_listen_for_notifications__runs_notified_tasks_until_unsupported():
+    scheduler = mock.Mock()
+    side_effect = [
+        {JobSubmissionStatus.CREATED, JobSubmissionStatus.CANCELLED},
+        set(),
+        JobbergateApiError("Failed to wait for notifications"),
+        {JobSubmissionStatus.CREATED},
+        JobbergateApiError("Failed to wait for notifications"),
+    ]
+    not_found = httpx.HTTPStatusError("Not Found", request=mock.Mock(), response=httpx.Response(404))
+    side_effect[-1].__cause__ = not_found
+
+    with (
+        mock.patch(
+            "jobbergate_agent.jobbergate.notifications.wait_for_notifications", side_effect=side_effect
+        ) as mocked_wait,
+        mock.patch("jobbergate_agent.jobbergate.notifications.run_now") as mocked_run_now,
+        mock.patch("jobbergate_agent.jobbergate.notifications.asyncio.sleep") as mocked_sleep,
+    ):
+        await listen_for_notifications(scheduler)
+
+    assert mocked_wait.call_count == 5
+    assert mocked_sleep.call_count == 1
+    assert sorted(call.args[1].__name__ for call in mocked_run_now.call_args_list) == [
+        "submit_pending_jobs",
+        "submit_pending_jobs",
+        "update_active_jobs",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_listen_for_notifications__disabled(tweak_settings):
+    with (
+        tweak_settings(TASK_NOTIFICATIONS_TIMEOUT_SECONDS=None),
+        mock.patch("jobbergate_agent.jobbergate.notifications.wait_for_notifications") as mocked_wait,
+    ):
+        await listen_for_notifications(mock.Mock())
+
+    assert mocked_wait.call_count == 0
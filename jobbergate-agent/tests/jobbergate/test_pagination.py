@@ -11,8 +11,13 @@ import respx
 from httpx import Response
 from polyfactory.factories.pydantic_factory import ModelFactory
 
-from jobbergate_agent.jobbergate.pagination import fetch_page, fetch_paginated_result
-from jobbergate_agent.jobbergate.schemas import ActiveJobSubmission, ListResponseEnvelope, PendingJobSubmission
+from jobbergate_agent.jobbergate.pagination import ChangesFeed, fetch_page, fetch_paginated_result
+from jobbergate_agent.jobbergate.schemas import (
+    ActiveJobSubmission,
+    ChangesResponseEnvelope,
+    ListResponseEnvelope,
+    PendingJobSubmission,
+)
 
 
 class PendingJobSubmissionFactory(ModelFactory[PendingJobSubmission]):
@@ -62,6 +67,28 @@ def multi_paged_items_wrapper(items: list[pydantic.BaseModel], page_size: int) -
     ]
 
 
+def cursor_paged_items_wrapper(items: list[pydantic.BaseModel], page_size: int) -> list[ListResponseEnvelope]:
+    """
+    Wrap a list of items into multiple pages of ListResponseEnvelope, as returned by the keyset pagination.
+
+    Args:
+        items: A list of pydantic models to include in the response.
+        page_size: The number of items per page.
+
+    Returns:
+        A list of ListResponseEnvelope objects representing paginated data, chained by their cursors.
+    """
+    starts = range(0, len(items), page_size)
+    return [
+        ListResponseEnvelope(
+            items=items[i : i + page_size],
+            size=page_size,
+            next_cursor=f"cursor-{i + page_size}" if i + page_size < len(items) else None,
+        )
+        for i in starts
+    ]
+
+
 @pytest.mark.parametrize(
     "base_model, factory",
     [
@@ -116,6 +143,25 @@ class TestFetchPage:
         assert results.pages == 0
         assert results == mock_response
 
+    async def test_fetch_page__with_cursor(self, base_model, factory, tweak_settings):
+        """
+        Test that `fetch_page` requests the keyset pagination when a cursor is provided.
+        """
+        ITEMS_PER_PAGE = 10
+
+        mock_data = factory.batch(ITEMS_PER_PAGE)
+        mock_response = cursor_paged_items_wrapper(items=mock_data, page_size=ITEMS_PER_PAGE)[0]
+
+        with respx.mock, tweak_settings(ITEMS_PER_PAGE=ITEMS_PER_PAGE):
+            route = respx.get("mock-url", params={"cursor": "", "size": ITEMS_PER_PAGE}).mock(
+                return_value=Response(200, content=mock_response.model_dump_json(exclude_none=True))
+            )
+            results = await fetch_page("mock-url", base_model, cursor="")
+
+        assert route.call_count == 1
+        assert results == mock_response
+        assert results.page is None
+
     async def test_fetch_page__request_error(self, base_model, factory):
         """
         Test that `fetch_page` raises an exception when the API returns an error.
@@ -220,6 +266,28 @@ class TestFetchPaginatedResult:
         assert len(results) == len(mock_data) - 1  # exclude the last item
         assert results == [item for page in mock_response[:MAX_PAGES_PER_CYCLE] for item in page.items]
 
+    async def test_fetch_paginated_result__multiple_pages_with_cursor(self, base_model, factory, tweak_settings):
+        """
+        Test that `fetch_paginated_result` follows the cursors when the API uses the keyset pagination.
+        """
+        ITEMS_PER_PAGE = 5
+        MAX_PAGES_PER_CYCLE = 5
+
+        mock_data = factory.batch(ITEMS_PER_PAGE * 3 - 1)
+        mock_response = cursor_paged_items_wrapper(items=mock_data, page_size=ITEMS_PER_PAGE)
+
+        with respx.mock, tweak_settings(ITEMS_PER_PAGE=ITEMS_PER_PAGE, MAX_PAGES_PER_CYCLE=MAX_PAGES_PER_CYCLE):
+            route = respx.get("mock-url")
+            route.side_effect = (
+                Response(200, content=page.model_dump_json(exclude_none=True)) for page in mock_response
+            )
+
+            results = await fetch_paginated_result("mock-url", base_model)
+
+        assert route.call_count == 3
+        assert [call.request.url.params["cursor"] for call in route.calls] == ["", "cursor-5", "cursor-10"]
+        assert results == mock_data
+
     async def test_fetch_paginated_result__empty_response(self, base_model, factory, tweak_settings):
         """
         Test that `fetch_paginated_result` handles an empty response gracefully.
@@ -238,3 +306,127 @@ class TestFetchPaginatedResult:
 
         assert route.call_count == 1
         assert results == mock_response.items
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_access_token")
+class TestChangesFeed:
+    """
+    Test the `ChangesFeed` class for keeping a local copy of job submissions in sync.
+    """
+
+    async def test_fetch__merges_changes(self, tweak_settings):
+        """
+        Test that the changes are merged into the local copy and the watermark is passed back.
+        """
+        (first, second, third) = ActiveJobSubmissionFactory.batch(3)
+        changes = [
+            ChangesResponseEnvelope(items=[first, second], removed_ids=[], watermark="w1", has_more=False),
+            ChangesResponseEnvelope(items=[third], removed_ids=[first.id], watermark="w2", has_more=False),
+        ]
+        feed = ChangesFeed("changes-url", "list-url", ActiveJobSubmission)
+
+        with respx.mock, tweak_settings(ITEMS_PER_PAGE=10):
+            route = respx.get("changes-url")
+            route.side_effect = (Response(200, content=page.model_dump_json()) for page in changes)
+
+            assert await feed.fetch() == [first, second]
+            assert await feed.fetch() == [second, third]
+
+        assert [dict(call.request.url.params) for call in route.calls] == [
+            {"size": "10"},
+            {"size": "10", "watermark": "w1"},
+        ]
+
+    async def test_fetch__follows_has_more(self, tweak_settings):
+        """
+        Test that the changes are fetched until the API has no more, up to the maximum pages per cycle.
+        """
+        items = ActiveJobSubmissionFactory.batch(3)
+        changes = [
+            ChangesResponseEnvelope(items=[item], removed_ids=[], watermark=f"w{i}", has_more=True)
+            for (i, item) in enumerate(items)
+        ]
+        feed = ChangesFeed("changes-url", "list-url", ActiveJobSubmission)
+
+        with respx.mock, tweak_settings(MAX_PAGES_PER_CYCLE=2):
+            route = respx.get("changes-url")
+            route.side_effect = (Response(200, content=page.model_dump_json()) for page in changes)
+
+            assert await feed.fetch() == items[:2]
+
+        assert route.call_count == 2
+        assert feed.watermark == "w1"
+
+    async def test_fetch__resyncs_after_interval(self, tweak_settings, mocker):
+        """
+        Test that the local copy is dropped and fetched in full once the resync interval is over.
+        """
+        (first, second) = ActiveJobSubmissionFactory.batch(2)
+        changes = [
+            ChangesResponseEnvelope(items=[first], removed_ids=[], watermark="w1", has_more=False),
+            ChangesResponseEnvelope(items=[second], removed_ids=[], watermark="w2", has_more=False),
+        ]
+        feed = ChangesFeed("changes-url", "list-url", ActiveJobSubmission)
+        mocked_time = mocker.patch("jobbergate_agent.jobbergate.pagination.time")
+        mocked_time.monotonic.side_effect = [0, 100, 100]
+
+        with respx.mock, tweak_settings(CHANGES_FEED_RESYNC_INTERVAL=60):
+            route = respx.get("changes-url")
+            route.side_effect = (Response(200, content=page.model_dump_json()) for page in changes)
+
+            await feed.fetch()
+            assert await feed.fetch() == [second]
+
+        assert "watermark" not in route.calls.last.request.url.params
+        assert mocked_time.monotonic.call_count == 3
+
+    async def test_fetch__resets_on_invalid_watermark(self):
+        """
+        Test that the local copy is dropped when the API rejects the watermark.
+        """
+        feed = ChangesFeed("changes-url", "list-url", ActiveJobSubmission)
+        feed.items = {item.id: item for item in ActiveJobSubmissionFactory.batch(2)}
+        feed.watermark = "stale-watermark"
+
+        with respx.mock, pytest.raises(Exception, match="Bad Request"):
+            respx.get("changes-url").mock(return_value=Response(400, json={"detail": "Invalid watermark"}))
+            await feed.fetch()
+
+        assert feed.items == {}
+        assert feed.watermark is None
+
+    async def test_fetch__falls_back_to_list_endpoint(self, tweak_settings):
+        """
+        Test that the list endpoint is used if the API does not provide the changes feed.
+        """
+        mock_data = ActiveJobSubmissionFactory.batch(3)
+        feed = ChangesFeed("changes-url", "list-url", ActiveJobSubmission)
+
+        with respx.mock:
+            changes_route = respx.get("changes-url").mock(return_value=Response(404))
+            list_route = respx.get("list-url").mock(
+                return_value=Response(200, content=single_paged_items_wrapper(mock_data).model_dump_json())
+            )
+
+            assert await feed.fetch() == mock_data
+            assert await feed.fetch() == mock_data
+
+        assert changes_route.call_count == 1
+        assert list_route.call_count == 2
+
+    async def test_fetch__disabled(self, tweak_settings):
+        """
+        Test that the list endpoint is always used if the resync interval is set to 0.
+        """
+        mock_data = ActiveJobSubmissionFactory.batch(3)
+        feed = ChangesFeed("changes-url", "list-url", ActiveJobSubmission)
+
+        with respx.mock, tweak_settings(CHANGES_FEED_RESYNC_INTERVAL=0):
+            list_route = respx.get("list-url").mock(
+                return_value=Response(200, content=single_paged_items_wrapper(mock_data).model_dump_json())
+            )
+
+            assert await feed.fetch() == mock_data
+
+        assert list_route.call_count == 1
@@ -274,13 +274,12 @@ async def test_fetch_pending_submissions__success(dummy_job_script_files):
                 "slurm_job_id": 333,
             },
         ],
-        "page": 1,
-        "pages": 1,
-        "size": 3,
-        "total": 3,
+        "removed_ids": [],
+        "watermark": "dummy-watermark",
+        "has_more": False,
     }
     async with respx.mock:
-        respx.get(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/pending").mock(
+        respx.get(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/pending/changes").mock(
             return_value=httpx.Response(
                 status_code=200,
                 json=pending_job_submissions_data,
@@ -301,7 +300,7 @@ async def test_fetch_pending_submissions__raises_jobbergate_api_error_if_respons
     JobbergateApiError if the response from the API is not OK (200).
     """
     with respx.mock:
-        respx.get(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/pending").mock(
+        respx.get(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/pending/changes").mock(
             return_value=httpx.Response(status_code=400)
         )
 
@@ -320,7 +319,7 @@ async def test_fetch_pending_submissions__raises_jobbergate_api_error_if_respons
         {"bad": "data"},
     ]
     with respx.mock:
-        respx.get(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/pending").mock(
+        respx.get(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/pending/changes").mock(
             return_value=httpx.Response(
                 status_code=200,
                 json=pending_job_submissions_data,
@@ -1,14 +1,16 @@
 import json
+import struct
+import threading
+import time
 import uuid
 from collections.abc import Callable
 from datetime import datetime
-from itertools import combinations
 from pathlib import Path
-from textwrap import dedent
 from typing import Any, NamedTuple, get_args
 from unittest import mock
 
 import httpx
+import msgpack
 import pytest
 import respx
 from faker import Faker
@@ -17,6 +19,7 @@ from jobbergate_agent.jobbergate.constants import INFLUXDB_MEASUREMENT, JobSubmi
 from jobbergate_agent.jobbergate.schemas import ActiveJobSubmission, SlurmJobData
 from jobbergate_agent.jobbergate.update import (
     ActiveSubmissionContext,
+    JobDataUpdateBatch,
     active_job_cancellation_strategy,
     active_submission_plugin_manager,
     empty_strategy,
@@ -24,14 +27,17 @@ from jobbergate_agent.jobbergate.update import (
     fetch_influx_data,
     fetch_influx_measurements,
     fetch_job_data,
+    fetch_jobs_data,
     job_data_update_strategy,
     job_metrics_strategy,
     pending_job_cancellation_strategy,
     update_active_jobs,
     update_job_data,
+    update_job_data_batch,
     update_job_metrics,
 )
 from jobbergate_agent.settings import SETTINGS
+from jobbergate_agent.utils.compute import InfluxDBColumns, concatenate_influx_columns, influx_series_to_columns
 from jobbergate_agent.utils.exception import JobbergateAgentError, JobbergateApiError, SbatchError
 
 
@@ -156,6 +162,33 @@ def test_fetch_job_data__reports_status_as_unknown_if_slurm_job_id_is_not_found(
     assert result.state_reason == "Slurm did not find a job matching id 123"
 
 
+def test_fetch_jobs_data__success():
+    """
+    Test that the ``fetch_jobs_data()`` function retrieves the data for all the jobs with a single call to Slurm.
+
+    Jobs missing from Slurm are reported as UNKNOWN, while jobs whose info can not be parsed are left out.
+    """
+    mocked_sbatch = mock.MagicMock()
+    mocked_sbatch.get_jobs_info.return_value = {
+        123: {"job_state": ["RUNNING"], "job_id": 123, "state_reason": "None"},
+        456: {"job_state": [], "job_id": 456, "state_reason": "None"},
+    }
+
+    result = fetch_jobs_data([123, 456, 789], mocked_sbatch)
+
+    mocked_sbatch.get_jobs_info.assert_called_once_with({123, 456, 789})
+    assert result.keys() == {123, 789}
+    assert result[123].job_state == "RUNNING"
+    assert result[123].job_info is not None
+    assert json.loads(result[123].job_info) == {"job_state": ["RUNNING"], "job_id": 123, "state_reason": "None"}
+    assert result[789] == SlurmJobData(
+        job_id=789,
+        job_state="UNKNOWN",
+        job_info="{}",
+        state_reason="Slurm did not find a job matching id 789",
+    )
+
+
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_access_token")
 async def test_fetch_active_submissions__success():
@@ -178,13 +211,12 @@ async def test_fetch_active_submissions__success():
                 "slurm_job_id": 33,
             },
         ],
-        "page": 1,
-        "pages": 1,
-        "size": 3,
-        "total": 3,
+        "removed_ids": [],
+        "watermark": "dummy-watermark",
+        "has_more": False,
     }
     with respx.mock:
-        respx.get(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/active").mock(
+        respx.get(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/active/changes").mock(
             return_value=httpx.Response(
                 status_code=200,
                 json=pending_job_submissions_data,
@@ -206,7 +238,7 @@ async def test_fetch_active_submissions__raises_jobbergate_api_error_if_response
     JobbergateApiError if the response from the API is not OK (200).
     """
     with respx.mock:
-        respx.get(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/active").mock(
+        respx.get(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/active/changes").mock(
             return_value=httpx.Response(status_code=400)
         )
 
@@ -225,7 +257,7 @@ async def test_fetch_active_submissions__raises_jobbergate_api_error_if_response
         {"bad": "data"},
     ]
     with respx.mock:
-        respx.get(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/active").mock(
+        respx.get(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/active/changes").mock(
             return_value=httpx.Response(
                 status_code=200,
                 json=active_job_submissions_data,
@@ -288,6 +320,149 @@ async def test_update_job_data__raises_jobbergate_api_error_if_the_response_is_n
         assert update_route.called
 
 
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_access_token")
+async def test_update_job_data_batch__success():
+    """
+    Test that the ``update_job_data_batch()`` sends all the updates in a single request.
+    """
+    with respx.mock:
+        batch_route = respx.put(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/batch")
+        batch_route.mock(
+            return_value=httpx.Response(
+                status_code=200,
+                json=[
+                    {"id": 1, "status_code": 202, "detail": None},
+                    {"id": 2, "status_code": 404, "detail": "Job submission with id=2 not found"},
+                ],
+            )
+        )
+
+        results = await update_job_data_batch(
+            {
+                1: SlurmJobData(job_id=13, job_state="FAILED", job_info="some job info", state_reason="Oops"),
+                2: SlurmJobData(job_id=14, job_state="RUNNING"),
+            }
+        )
+
+        assert batch_route.call_count == 1
+        assert json.loads(batch_route.calls.last.request.content) == [
+            {
+                "id": 1,
+                "slurm_job_id": 13,
+                "slurm_job_state": "FAILED",
+                "slurm_job_info": "some job info",
+                "slurm_job_state_reason": "Oops",
+            },
+            {
+                "id": 2,
+                "slurm_job_id": 14,
+                "slurm_job_state": "RUNNING",
+                "slurm_job_info": "{}",
+                "slurm_job_state_reason": None,
+            },
+        ]
+        assert [(result.id, result.status_code) for result in results] == [(1, 202), (2, 404)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_access_token")
+async def test_update_job_data_batch__raises_jobbergate_api_error_if_the_response_is_not_200():
+    """
+    Test that the ``update_job_data_batch()`` raises a JobbergateApiError if the response is not OK (200).
+    """
+    with respx.mock:
+        batch_route = respx.put(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/batch")
+        batch_route.mock(return_value=httpx.Response(status_code=404))
+
+        with pytest.raises(JobbergateApiError, match="Could not update job data for 1 job submissions"):
+            await update_job_data_batch({1: SlurmJobData(job_id=13, job_state="RUNNING")})
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_access_token")
+async def test_job_data_update_batch__flush_sends_updates_in_chunks(tweak_settings):
+    """
+    Test that ``JobDataUpdateBatch.flush()`` splits the updates in chunks of ``ITEMS_PER_BATCH_UPDATE``.
+    """
+    batch = JobDataUpdateBatch()
+    for job_submission_id in range(1, 6):
+        batch.add(job_submission_id, SlurmJobData(job_id=job_submission_id * 10, job_state="RUNNING"))
+
+    with respx.mock, tweak_settings(ITEMS_PER_BATCH_UPDATE=2):
+        batch_route = respx.put(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/batch")
+        batch_route.mock(side_effect=lambda request: httpx.Response(status_code=200, json=[]))
+
+        await batch.flush()
+
+        assert batch_route.call_count == 3
+        assert [[item["id"] for item in json.loads(call.request.content)] for call in batch_route.calls] == [
+            [1, 2],
+            [3, 4],
+            [5],
+        ]
+    assert batch.updates == {}
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_access_token")
+async def test_job_data_update_batch__flush_falls_back_to_single_updates():
+    """
+    Test that ``JobDataUpdateBatch.flush()`` updates the job submissions one by one if the batch request fails.
+    """
+    batch = JobDataUpdateBatch()
+    batch.add(1, SlurmJobData(job_id=10, job_state="RUNNING"))
+    batch.add(2, SlurmJobData(job_id=20, job_state="COMPLETED"))
+
+    with respx.mock:
+        batch_route = respx.put(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/batch")
+        batch_route.mock(return_value=httpx.Response(status_code=405))
+        single_route = respx.put(url__regex=rf"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/\d+$")
+        single_route.mock(return_value=httpx.Response(status_code=200))
+
+        await batch.flush()
+
+        assert batch_route.call_count == 1
+        assert single_route.call_count == 2
+        assert {str(call.request.url).rsplit("/", 1)[-1] for call in single_route.calls} == {"1", "2"}
+
+
+@pytest.mark.asyncio
+async def test_update_active_jobs__flushes_job_data_updates_in_a_single_batch():
+    """
+    Test that the job data reported by the strategies is sent to the API at the end of the cycle.
+    """
+    mock_submissions = [
+        ActiveJobSubmission(id=1, slurm_job_id=100, status="ACTIVE"),
+        ActiveJobSubmission(id=2, slurm_job_id=101, status="ACTIVE"),
+    ]
+
+    def active_submission(context: ActiveSubmissionContext):
+        async def strategy():
+            await context.report_job_data(SlurmJobData(job_id=context.data.slurm_job_id, job_state="RUNNING"))
+
+        return [strategy]
+
+    mock_pm = mock.Mock()
+    mock_pm.hook.active_submission.side_effect = active_submission
+
+    with (
+        mock.patch("jobbergate_agent.jobbergate.update.active_submission_plugin_manager", return_value=mock_pm),
+        mock.patch("jobbergate_agent.jobbergate.update.fetch_active_submissions", return_value=mock_submissions),
+        mock.patch("jobbergate_agent.jobbergate.update.update_job_data_batch") as mock_batch,
+        mock.patch("jobbergate_agent.jobbergate.update.update_job_data") as mock_update,
+    ):
+        await update_active_jobs()
+
+    mock_update.assert_not_called()
+    mock_batch.assert_awaited_once_with(
+        {
+            1: SlurmJobData(job_id=100, job_state="RUNNING"),
+            2: SlurmJobData(job_id=101, job_state="RUNNING"),
+        }
+    )
+
+
 @pytest.mark.asyncio
 async def test_update_active_jobs():
     """
@@ -322,6 +497,41 @@ async def test_update_active_jobs():
         assert mock_strategy_2.call_count == 2
 
 
+@pytest.mark.asyncio
+async def test_update_active_jobs__shares_a_single_slurm_snapshot():
+    """
+    Test that the job data from Slurm is fetched once per cycle and shared with all the contexts.
+    """
+    mock_submissions = [
+        ActiveJobSubmission(id=1, slurm_job_id=100, status="ACTIVE"),
+        ActiveJobSubmission(id=2, slurm_job_id=101, status="ACTIVE"),
+        ActiveJobSubmission(id=3, slurm_job_id=None, status="CANCELLED"),
+    ]
+    slurm_jobs_data = {
+        100: SlurmJobData(job_id=100, job_state="RUNNING"),
+        101: SlurmJobData(job_id=101, job_state="COMPLETED"),
+    }
+    contexts: list[ActiveSubmissionContext] = []
+
+    mock_pm = mock.Mock()
+    mock_pm.hook.active_submission.side_effect = lambda context: contexts.append(context) or []
+
+    with (
+        mock.patch("jobbergate_agent.jobbergate.update.active_submission_plugin_manager", return_value=mock_pm),
+        mock.patch("jobbergate_agent.jobbergate.update.fetch_active_submissions", return_value=mock_submissions),
+        mock.patch("jobbergate_agent.jobbergate.update.InfoHandler") as mock_info_class,
+        mock.patch("jobbergate_agent.jobbergate.update.fetch_jobs_data", return_value=slurm_jobs_data) as mock_fetch,
+        mock.patch("jobbergate_agent.jobbergate.update.fetch_job_data") as mock_fetch_single,
+    ):
+        await update_active_jobs()
+
+        mock_fetch.assert_called_once_with({100, 101}, mock_info_class.return_value)
+        assert [context.slurm_jobs_data for context in contexts] == [slurm_jobs_data] * 3
+        assert contexts[0].slurm_job_data == slurm_jobs_data[100]
+        assert contexts[1].slurm_job_data == slurm_jobs_data[101]
+        mock_fetch_single.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_update_active_jobs_handles_exceptions():
     """Test that exceptions in strategy execution are caught and logged."""
@@ -369,22 +579,33 @@ class InfluxData(NamedTuple):
     def fetch_data_kwargs(self) -> dict[str, Any]:
         return {
             "time": self.time,
-            "host": self.host,
-            "step": self.step,
-            "task": self.task,
             "job": self.job,
             "measurement": self.measurement,
         }
 
-    def query_return_value(self) -> dict[str, Any]:
-        return {k: v for k, v in self._asdict().items() if k != "measurement"}
+    def query_raw_result(self) -> dict[str, Any]:
+        columns = ["time", "host", "job", "step", "task", "value"]
+        return {
+            "series": [
+                {
+                    "name": self.measurement,
+                    "columns": columns,
+                    "values": [[self.time, self.host, str(self.job), str(self.step), str(self.task), self.value]],
+                }
+            ]
+        }
+
+    def assert_columns(self, columns: InfluxDBColumns) -> None:
+        assert columns.time.tolist() == [self.time]
+        assert columns.host.tolist() == [self.host]
+        assert columns.step.tolist() == [str(self.step)]
+        assert columns.task.tolist() == [str(self.task)]
+        assert columns.value.tolist() == [self.value]
+        assert columns.measurement.tolist() == [get_args(INFLUXDB_MEASUREMENT).index(self.measurement)]
 
     def bind_params(self) -> dict[str, Any]:
         return {
             "time": self.time,
-            "host": self.host,
-            "step": str(self.step),
-            "task": str(self.task),
             "job": str(self.job),
         }
 
@@ -407,19 +628,15 @@ def influx_data(faker: Faker) -> InfluxData:
 def test_fetch_influx_data__success_with_all_set(mocked_influxdb_client: mock.MagicMock, influx_data: InfluxData):
     """
     Test that the ``fetch_influx_data()`` function can successfully retrieve
-    data from InfluxDB as a list of ``InfluxDBPointDict`` when all arguments
-    are passed.
+    data from InfluxDB as ``InfluxDBColumns`` when a start time is passed.
     """
-    mocked_influxdb_client.query.return_value.get_points.return_value = [influx_data.query_return_value()]
+    mocked_influxdb_client.query.return_value.raw = influx_data.query_raw_result()
 
-    query = dedent(f"""
-    SELECT * FROM {influx_data.measurement} WHERE time > $time AND host = $host AND step = $step AND task = $task AND job = $job
-    """)
+    query = f"SELECT * FROM {influx_data.measurement} WHERE time > $time AND job = $job"
 
     result = fetch_influx_data(**influx_data.fetch_data_kwargs())
 
-    assert len(result) == 1
-    assert result[0] == influx_data._asdict()
+    influx_data.assert_columns(result)
 
     mocked_influxdb_client.query.assert_called_once_with(query, bind_params=influx_data.bind_params(), epoch="s")
 
@@ -432,16 +649,13 @@ def test_fetch_influx_data__data_point_overflow(mocked_influxdb_client: mock.Mag
     """
     influx_data = influx_data._replace(value=influx_data.value + 2**63 - 1)  # cause overflow
 
-    mocked_influxdb_client.query.return_value.get_points.return_value = [influx_data.query_return_value()]
+    mocked_influxdb_client.query.return_value.raw = influx_data.query_raw_result()
 
-    query = dedent(f"""
-    SELECT * FROM {influx_data.measurement} WHERE time > $time AND host = $host AND step = $step AND task = $task AND job = $job
-    """)
+    query = f"SELECT * FROM {influx_data.measurement} WHERE time > $time AND job = $job"
 
     result = fetch_influx_data(**influx_data.fetch_data_kwargs())
 
-    assert len(result) == 1
-    assert result[0] == influx_data._replace(value=0)._asdict()
+    influx_data._replace(value=0).assert_columns(result)
     mocked_influxdb_client.query.assert_called_once_with(query, bind_params=influx_data.bind_params(), epoch="s")
 
 
@@ -451,56 +665,20 @@ async def test_fetch_influx_data__success_with_all_none(
 ):
     """
     Test that the ``fetch_influx_data()`` function can successfully retrieve
-    data from InfluxDB as a list of ``InfluxDBPointDict`` when some arguments
+    data from InfluxDB as ``InfluxDBColumns`` when some arguments
     are None.
     """
-    mocked_influxdb_client.query.return_value.get_points.return_value = [influx_data.query_return_value()]
+    mocked_influxdb_client.query.return_value.raw = influx_data.query_raw_result()
 
     query = f"SELECT * FROM {influx_data.measurement} WHERE job = $job"
     params = {"job": str(influx_data.job)}
 
     result = fetch_influx_data(influx_data.job, influx_data.measurement)
 
-    assert len(result) == 1
-    assert result[0] == influx_data._asdict()
+    influx_data.assert_columns(result)
     mocked_influxdb_client.query.assert_called_once_with(query, bind_params=params, epoch="s")
 
 
-@pytest.mark.parametrize(
-    "time, host, step, task",
-    [
-        tuple(1 if i not in combination else None for i in range(4))
-        for r in range(1, 4)
-        for combination in combinations(range(4), r)
-    ],
-)
-@mock.patch("jobbergate_agent.jobbergate.update.influxdb_client")
-def test_fetch_influx_data__raises_jobbergate_agent_error_if_bad_arguments_are_passed(
-    mocked_influxdb_client: mock.MagicMock,
-    time: int | None,
-    host: int | None,
-    step: int | None,
-    task: int | None,
-    faker: Faker,
-):
-    job = faker.random_int(min=0, max=100)
-    measurement = faker.random_element(get_args(INFLUXDB_MEASUREMENT))
-
-    with pytest.raises(
-        JobbergateAgentError, match="Invalid argument combination: all optional arguments must be either set or None."
-    ):
-        fetch_influx_data(
-            job,
-            measurement,
-            time=time,
-            host=str(host) if host is not None else None,
-            step=step,
-            task=task,
-        )
-
-    mocked_influxdb_client.query.assert_not_called()
-
-
 @mock.patch("jobbergate_agent.jobbergate.update.influxdb_client")
 def test_fetch_influx_data__raises_jobbergate_agent_error_if_query_fails(
     mocked_influxdb_client: mock.MagicMock, influx_data: InfluxData
@@ -511,9 +689,7 @@ def test_fetch_influx_data__raises_jobbergate_agent_error_if_query_fails(
     """
     mocked_influxdb_client.query = mock.Mock(side_effect=Exception("BOOM!"))
 
-    query = dedent(f"""
-    SELECT * FROM {influx_data.measurement} WHERE time > $time AND host = $host AND step = $step AND task = $task AND job = $job
-    """)
+    query = f"SELECT * FROM {influx_data.measurement} WHERE time > $time AND job = $job"
 
     with pytest.raises(JobbergateAgentError, match="Failed to fetch measures from InfluxDB -- Exception: BOOM!"):
         fetch_influx_data(**influx_data.fetch_data_kwargs())
@@ -619,9 +795,11 @@ async def test_update_job_metrics__error_getting_metrics_from_api(job_submission
 @mock.patch("jobbergate_agent.jobbergate.update.fetch_influx_data")
 @mock.patch("jobbergate_agent.jobbergate.update.aggregate_influx_measures")
 @mock.patch("jobbergate_agent.jobbergate.update.msgpack")
-@mock.patch("jobbergate_agent.jobbergate.update.chain")
+@mock.patch("jobbergate_agent.jobbergate.update.drop_stored_influx_points")
+@mock.patch("jobbergate_agent.jobbergate.update.concatenate_influx_columns")
 async def test_update_job_metrics__error_sending_metrics_to_api(
-    mocked_chain: mock.MagicMock,
+    mocked_concatenate_influx_columns: mock.MagicMock,
+    mocked_drop_stored_influx_points: mock.MagicMock,
     mocked_msgpack: mock.MagicMock,
     mocked_aggregate_influx_measures: mock.MagicMock,
     mocked_fetch_influx_data: mock.MagicMock,
@@ -645,22 +823,15 @@ async def test_update_job_metrics__error_sending_metrics_to_api(
     assert isinstance(job_max_times["max_times"], list)
     max_times_list = job_max_times["max_times"]
 
-    dummy_data_point = {
-        "time": 1,
-        "host": "host_1",
-        "job": "1",
-        "step": "1",
-        "task": "1",
-        "value": 1.0,
-        "measurement": "measurement1",
-    }
-    dummy_data_points = [dummy_data_point] * len(measurements) * len(max_times_list)
-    iter_dummy_data_points = iter(dummy_data_points)
+    dummy_columns = mock.Mock(name="dummy-influx-columns")
+    dummy_concatenated_columns = mock.Mock(name="dummy-concatenated-columns")
+    dummy_filtered_columns = mock.Mock(name="dummy-filtered-columns")
 
     mocked_fetch_influx_measurements.return_value = measurements
-    mocked_fetch_influx_data.return_value = dummy_data_points
+    mocked_fetch_influx_data.return_value = dummy_columns
     # doesn't return the real aggregated data due to test complexity
-    mocked_chain.from_iterable.return_value = iter_dummy_data_points
+    mocked_concatenate_influx_columns.return_value = dummy_concatenated_columns
+    mocked_drop_stored_influx_points.return_value = dummy_filtered_columns
     mocked_aggregate_influx_measures.return_value = "super-dummy-aggregated-data"
     mocked_msgpack.packb.return_value = b"dummy-msgpack-data"
 
@@ -683,23 +854,21 @@ async def test_update_job_metrics__error_sending_metrics_to_api(
             await update_job_metrics(active_job_submission)
 
     mocked_fetch_influx_measurements.assert_called_once_with()
+    min_time = int(min(job_max_time["max_time"] for job_max_time in max_times_list) * 1e9)  # type: ignore
     mocked_fetch_influx_data.assert_has_calls(
-        [
-            mock.call(
-                slurm_job_id,
-                measurement["name"],
-                time=int(job_max_time["max_time"] * 1e9),  # type: ignore
-                host=job_max_time["node_host"],
-                step=job_max_time["step"],
-                task=job_max_time["task"],
-            )
-            for job_max_time in max_times_list
-            for measurement in measurements
-        ],
+        [mock.call(slurm_job_id, measurement["name"], time=min_time) for measurement in measurements],
         any_order=True,
     )
-    mocked_chain.from_iterable.assert_called_once_with([dummy_data_points] * len(measurements) * len(max_times_list))
-    mocked_aggregate_influx_measures.assert_called_once_with(iter_dummy_data_points)
+    assert mocked_fetch_influx_data.call_count == len(measurements)
+    mocked_concatenate_influx_columns.assert_called_once_with([dummy_columns] * len(measurements))
+    mocked_drop_stored_influx_points.assert_called_once_with(
+        dummy_concatenated_columns,
+        {
+            (job_max_time["node_host"], str(job_max_time["step"]), str(job_max_time["task"])): job_max_time["max_time"]
+            for job_max_time in max_times_list
+        },
+    )
+    mocked_aggregate_influx_measures.assert_called_once_with(dummy_filtered_columns)
     mocked_msgpack.packb.assert_called_once_with("super-dummy-aggregated-data")
 
 
@@ -717,9 +886,11 @@ async def test_update_job_metrics__error_sending_metrics_to_api(
 @mock.patch("jobbergate_agent.jobbergate.update.fetch_influx_data")
 @mock.patch("jobbergate_agent.jobbergate.update.aggregate_influx_measures")
 @mock.patch("jobbergate_agent.jobbergate.update.msgpack")
-@mock.patch("jobbergate_agent.jobbergate.update.chain")
+@mock.patch("jobbergate_agent.jobbergate.update.drop_stored_influx_points")
+@mock.patch("jobbergate_agent.jobbergate.update.concatenate_influx_columns")
 async def test_update_job_metrics__success(
-    mocked_chain: mock.MagicMock,
+    mocked_concatenate_influx_columns: mock.MagicMock,
+    mocked_drop_stored_influx_points: mock.MagicMock,
     mocked_msgpack: mock.MagicMock,
     mocked_aggregate_influx_measures: mock.MagicMock,
     mocked_fetch_influx_data: mock.MagicMock,
@@ -743,22 +914,15 @@ async def test_update_job_metrics__success(
     assert isinstance(job_max_times["max_times"], list)
     max_times_list = job_max_times["max_times"]
 
-    dummy_data_point = {
-        "time": 1,
-        "host": "host_1",
-        "job": "1",
-        "step": "1",
-        "task": "1",
-        "value": 1.0,
-        "measurement": "measurement1",
-    }
-    dummy_data_points = [dummy_data_point] * len(measurements) * len(max_times_list)
-    iter_dummy_data_points = iter(dummy_data_points)
+    dummy_columns = mock.Mock(name="dummy-influx-columns")
+    dummy_concatenated_columns = mock.Mock(name="dummy-concatenated-columns")
+    dummy_filtered_columns = mock.Mock(name="dummy-filtered-columns")
 
     mocked_fetch_influx_measurements.return_value = measurements
-    mocked_fetch_influx_data.return_value = dummy_data_points
+    mocked_fetch_influx_data.return_value = dummy_columns
     # doesn't return the real aggregated data due to test complexity
-    mocked_chain.from_iterable.return_value = iter_dummy_data_points
+    mocked_concatenate_influx_columns.return_value = dummy_concatenated_columns
+    mocked_drop_stored_influx_points.return_value = dummy_filtered_columns
     mocked_aggregate_influx_measures.return_value = "super-dummy-aggregated-data"
     mocked_msgpack.packb.return_value = b"dummy-msgpack-data"
 
@@ -769,7 +933,7 @@ async def test_update_job_metrics__success(
                 json=job_max_times,
             )
         )
-        respx.put(
+        upload_route = respx.put(
             f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/metrics/{job_submission_id}",
             content=b"dummy-msgpack-data",
             headers={"Content-Type": "application/octet-stream"},
@@ -777,24 +941,24 @@ async def test_update_job_metrics__success(
 
         await update_job_metrics(active_job_submission)
 
+        assert upload_route.calls.last.request.url.params["ignore_duplicates"] == "true"
+
     mocked_fetch_influx_measurements.assert_called_once_with()
+    min_time = int(min(job_max_time["max_time"] for job_max_time in max_times_list) * 1e9)  # type: ignore
     mocked_fetch_influx_data.assert_has_calls(
-        [
-            mock.call(
-                slurm_job_id,
-                measurement["name"],
-                time=int(job_max_time["max_time"] * 1e9),  # type: ignore
-                host=job_max_time["node_host"],
-                step=job_max_time["step"],
-                task=job_max_time["task"],
-            )
-            for job_max_time in max_times_list
-            for measurement in measurements
-        ],
+        [mock.call(slurm_job_id, measurement["name"], time=min_time) for measurement in measurements],
         any_order=True,
     )
-    mocked_chain.from_iterable.assert_called_once_with([dummy_data_points] * len(measurements) * len(max_times_list))
-    mocked_aggregate_influx_measures.assert_called_once_with(iter_dummy_data_points)
+    assert mocked_fetch_influx_data.call_count == len(measurements)
+    mocked_concatenate_influx_columns.assert_called_once_with([dummy_columns] * len(measurements))
+    mocked_drop_stored_influx_points.assert_called_once_with(
+        dummy_concatenated_columns,
+        {
+            (job_max_time["node_host"], str(job_max_time["step"]), str(job_max_time["task"])): job_max_time["max_time"]
+            for job_max_time in max_times_list
+        },
+    )
+    mocked_aggregate_influx_measures.assert_called_once_with(dummy_filtered_columns)
     mocked_msgpack.packb.assert_called_once_with("super-dummy-aggregated-data")
 
 
@@ -812,9 +976,9 @@ async def test_update_job_metrics__success(
 @mock.patch("jobbergate_agent.jobbergate.update.fetch_influx_data")
 @mock.patch("jobbergate_agent.jobbergate.update.aggregate_influx_measures")
 @mock.patch("jobbergate_agent.jobbergate.update.msgpack")
-@mock.patch("jobbergate_agent.jobbergate.update.chain")
+@mock.patch("jobbergate_agent.jobbergate.update.concatenate_influx_columns")
 async def test_update_job_metrics__success_with_max_times_empty(
-    mocked_chain: mock.MagicMock,
+    mocked_concatenate_influx_columns: mock.MagicMock,
     mocked_msgpack: mock.MagicMock,
     mocked_aggregate_influx_measures: mock.MagicMock,
     mocked_fetch_influx_data: mock.MagicMock,
@@ -831,22 +995,13 @@ async def test_update_job_metrics__success_with_max_times_empty(
     active_job_submission = ActiveJobSubmission(id=job_submission_id, slurm_job_id=slurm_job_id)
     job_max_times = job_max_times_response(job_submission_id, 0, 0, 0)
 
-    dummy_data_point = {
-        "time": 1,
-        "host": "host_1",
-        "job": "1",
-        "step": "1",
-        "task": "1",
-        "value": 1.0,
-        "measurement": "measurement1",
-    }
-    dummy_data_points = [dummy_data_point] * len(measurements)
-    iter_dummy_data_points = iter(dummy_data_points)
+    dummy_columns = mock.Mock(name="dummy-influx-columns")
+    dummy_concatenated_columns = mock.Mock(name="dummy-concatenated-columns")
 
     mocked_fetch_influx_measurements.return_value = measurements
-    mocked_fetch_influx_data.return_value = dummy_data_points
+    mocked_fetch_influx_data.return_value = dummy_columns
     # doesn't return the real aggregated data due to test complexity
-    mocked_chain.from_iterable.return_value = iter_dummy_data_points
+    mocked_concatenate_influx_columns.return_value = dummy_concatenated_columns
     mocked_aggregate_influx_measures.return_value = "super-dummy-aggregated-data"
     mocked_msgpack.packb.return_value = b"dummy-msgpack-data"
 
@@ -867,10 +1022,10 @@ async def test_update_job_metrics__success_with_max_times_empty(
 
     mocked_fetch_influx_measurements.assert_called_once_with()
     mocked_fetch_influx_data.assert_has_calls(
-        [mock.call(slurm_job_id, measurement["name"]) for measurement in measurements], any_order=True
+        [mock.call(slurm_job_id, measurement["name"], time=None) for measurement in measurements], any_order=True
     )
-    mocked_chain.from_iterable.assert_called_once_with([dummy_data_points] * len(measurements))
-    mocked_aggregate_influx_measures.assert_called_once_with(iter_dummy_data_points)
+    mocked_concatenate_influx_columns.assert_called_once_with([dummy_columns] * len(measurements))
+    mocked_aggregate_influx_measures.assert_called_once_with(dummy_concatenated_columns)
     mocked_msgpack.packb.assert_called_once_with("super-dummy-aggregated-data")
 
 
@@ -888,9 +1043,9 @@ async def test_update_job_metrics__success_with_max_times_empty(
 @mock.patch("jobbergate_agent.jobbergate.update.fetch_influx_data")
 @mock.patch("jobbergate_agent.jobbergate.update.aggregate_influx_measures")
 @mock.patch("jobbergate_agent.jobbergate.update.msgpack")
-@mock.patch("jobbergate_agent.jobbergate.update.chain")
+@mock.patch("jobbergate_agent.jobbergate.update.concatenate_influx_columns")
 async def test_update_job_metrics__defer_api_call_upon_no_new_data(
-    mocked_chain: mock.MagicMock,
+    mocked_concatenate_influx_columns: mock.MagicMock,
     mocked_msgpack: mock.MagicMock,
     mocked_aggregate_influx_measures: mock.MagicMock,
     mocked_fetch_influx_data: mock.MagicMock,
@@ -906,10 +1061,12 @@ async def test_update_job_metrics__defer_api_call_upon_no_new_data(
     """
     active_job_submission = ActiveJobSubmission(id=job_submission_id, slurm_job_id=slurm_job_id)
     job_max_times = job_max_times_response(job_submission_id, 0, 0, 0)
+    dummy_columns = mock.Mock(name="dummy-influx-columns")
+    dummy_concatenated_columns = mock.Mock(name="dummy-concatenated-columns")
 
     mocked_fetch_influx_measurements.return_value = measurements
-    mocked_fetch_influx_data.return_value = []
-    mocked_chain.from_iterable.return_value = []
+    mocked_fetch_influx_data.return_value = dummy_columns
+    mocked_concatenate_influx_columns.return_value = dummy_concatenated_columns
     mocked_aggregate_influx_measures.return_value = []
 
     with respx.mock:
@@ -924,13 +1081,107 @@ async def test_update_job_metrics__defer_api_call_upon_no_new_data(
 
     mocked_fetch_influx_measurements.assert_called_once_with()
     mocked_fetch_influx_data.assert_has_calls(
-        [mock.call(slurm_job_id, measurement["name"]) for measurement in measurements], any_order=True
+        [mock.call(slurm_job_id, measurement["name"], time=None) for measurement in measurements], any_order=True
     )
-    mocked_chain.from_iterable.assert_called_once_with([[] for _ in range(len(measurements))])
-    mocked_aggregate_influx_measures.assert_called_once_with([])
+    mocked_concatenate_influx_columns.assert_called_once_with([dummy_columns] * len(measurements))
+    mocked_aggregate_influx_measures.assert_called_once_with(dummy_concatenated_columns)
     mocked_msgpack.packb.assert_not_called()
 
 
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_access_token")
+@mock.patch("jobbergate_agent.jobbergate.update.fetch_influx_measurements")
+@mock.patch("jobbergate_agent.jobbergate.update.fetch_influx_data")
+async def test_update_job_metrics__limits_concurrent_influx_queries(
+    mocked_fetch_influx_data: mock.MagicMock,
+    mocked_fetch_influx_measurements: mock.MagicMock,
+    job_max_times_response: Callable[[int, int, int, int], dict[str, int | list[dict[str, int | str]]]],
+    tweak_settings,
+):
+    """
+    Test that the ``update_job_metrics()`` function queries InfluxDB once per measurement, for all
+    the (host, step, task) keys at once, and never runs more than ``INFLUX_MAX_CONCURRENT_QUERIES`` queries
+    at the same time.
+    """
+    job_submission_id = 1
+    active_job_submission = ActiveJobSubmission(id=job_submission_id, slurm_job_id=22)
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def fetch(*args, **kwargs) -> InfluxDBColumns:
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return concatenate_influx_columns([])
+
+    mocked_fetch_influx_measurements.return_value = [{"name": name} for name in get_args(INFLUXDB_MEASUREMENT)]
+    mocked_fetch_influx_data.side_effect = fetch
+
+    with respx.mock, tweak_settings(INFLUX_MAX_CONCURRENT_QUERIES=2):
+        respx.get(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/metrics/{job_submission_id}").mock(
+            return_value=httpx.Response(status_code=200, json=job_max_times_response(job_submission_id, 4, 2, 2))
+        )
+
+        await update_job_metrics(active_job_submission)
+
+    assert mocked_fetch_influx_data.call_count == len(get_args(INFLUXDB_MEASUREMENT))
+    assert max_running == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_access_token")
+@mock.patch("jobbergate_agent.jobbergate.update.fetch_influx_measurements")
+@mock.patch("jobbergate_agent.jobbergate.update.fetch_influx_data")
+async def test_update_job_metrics__uploads_columnar_data_when_enabled(
+    mocked_fetch_influx_data: mock.MagicMock,
+    mocked_fetch_influx_measurements: mock.MagicMock,
+    job_max_times_response: Callable[[int, int, int, int], dict[str, int | list[dict[str, int | str]]]],
+    tweak_settings,
+):
+    """
+    Test that the ``update_job_metrics()`` function uploads the metrics in the columnar format
+    with the matching content type when ``INFLUX_COLUMNAR_UPLOAD`` is enabled.
+    """
+    job_submission_id = 1
+    active_job_submission = ActiveJobSubmission(id=job_submission_id, slurm_job_id=22)
+
+    mocked_fetch_influx_measurements.return_value = [{"name": "CPUTime"}]
+    mocked_fetch_influx_data.return_value = influx_series_to_columns(
+        [
+            {
+                "name": "CPUTime",
+                "columns": ["time", "host", "job", "step", "task", "value"],
+                "values": [[10, "host_1", "22", "0", "1", 1.5], [20, "host_1", "22", "0", "1", 2.5]],
+            }
+        ],
+        "CPUTime",
+    )
+
+    with respx.mock, tweak_settings(INFLUX_COLUMNAR_UPLOAD=True):
+        respx.get(f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/metrics/{job_submission_id}").mock(
+            return_value=httpx.Response(status_code=200, json=job_max_times_response(job_submission_id, 0, 0, 0))
+        )
+        upload_route = respx.put(
+            f"{SETTINGS.BASE_API_URL}/jobbergate/job-submissions/agent/metrics/{job_submission_id}"
+        ).mock(return_value=httpx.Response(status_code=204))
+
+        await update_job_metrics(active_job_submission)
+
+    request = upload_route.calls.last.request
+    assert request.headers["Content-Type"] == "application/vnd.jobbergate.metrics-columnar+msgpack"
+    payload = msgpack.unpackb(request.content)
+    assert payload["rows"] == 2
+    assert payload["node_hosts"] == ["host_1"]
+    assert len(payload["columns"]) == 14
+    assert payload["columns"][0] == struct.pack("<2q", 10, 20)
+    assert payload["columns"][5] == struct.pack("<2d", 1.5, 2.5)
+
+
 class TestPendingJobCancellationStrategy:
     """Tests for PendingJobCancellationStrategy."""
 
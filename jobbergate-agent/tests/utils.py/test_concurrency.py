@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+import pytest
+
+from jobbergate_agent.utils.concurrency import run_blocking, run_concurrently
+
+
+@pytest.mark.asyncio
+async def test_run_blocking__runs_on_a_worker_thread():
+    """Test that run_blocking runs the callable out of the event loop thread and returns its result."""
+
+    def blocking(value: int, *, offset: int) -> tuple[int, str]:
+        return value + offset, threading.current_thread().name
+
+    result, thread_name = await run_blocking(blocking, 1, offset=2)
+
+    assert result == 3
+    assert thread_name != threading.current_thread().name
+    assert thread_name.startswith("jobbergate-agent-worker")
+
+
+@pytest.mark.asyncio
+async def test_run_concurrently__limits_the_number_of_running_handlers(tweak_settings):
+    """Test that run_concurrently never runs more than TASK_MAX_CONCURRENCY handlers at the same time."""
+    running = 0
+    max_running = 0
+    processed = []
+
+    async def handler(item: int) -> None:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        processed.append(item)
+        running -= 1
+
+    with tweak_settings(TASK_MAX_CONCURRENCY=3):
+        await run_concurrently(range(10), handler)
+
+    assert sorted(processed) == list(range(10))
+    assert max_running == 3
+
+
+@pytest.mark.asyncio
+async def test_run_concurrently__isolates_errors_per_item():
+    """Test that an error on one item does not prevent the other ones from being processed."""
+    processed = []
+
+    async def handler(item: int) -> None:
+        if item == 1:
+            raise RuntimeError("Boom!")
+        processed.append(item)
+
+    await run_concurrently([0, 1, 2], handler)
+
+    assert sorted(processed) == [0, 2]
@@ -2,6 +2,7 @@
 
 from jobbergate_agent.tasks import (
     active_submissions_task,
+    notifications_task,
     pending_submissions_task,
     self_update_task,
     status_report_task,
@@ -15,6 +16,7 @@ def test_discover_tasks__success():
     """Test that discover_tasks returns the expected result."""
     expected_result = {
         "active-jobs": active_submissions_task,
+        "notifications": notifications_task,
         "pending-jobs": pending_submissions_task,
         "report-status": status_report_task,
         "self-update": self_update_task,
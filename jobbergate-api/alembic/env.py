@@ -9,6 +9,7 @@ from jobbergate_api.apps.job_script_templates import models  # noqa # must be im
 from jobbergate_api.apps.job_scripts import models  # noqa # must be imported for metadata to work
 from jobbergate_api.apps.job_submissions import models  # noqa # must be imported for metadata to work
 from jobbergate_api.apps.models import Base
+from jobbergate_api.apps.outbox import models  # noqa # must be imported for metadata to work
 from jobbergate_api.storage import build_db_url
 
 # this is the Alembic Config object, which provides
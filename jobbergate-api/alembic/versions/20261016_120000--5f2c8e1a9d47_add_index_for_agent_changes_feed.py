@@ -0,0 +1,38 @@
+"""add index for the agent changes feed
+
+Revision ID: 5f2c8e1a9d47
+Revises: b16b218ef5d6
+Create Date: 2026-10-16 12:00:00.000000
+
+This migration adds a composite index on job_submissions to list the rows of a client
+updated after a watermark, ordered by (updated_at, id), as done by the agent changes feed.
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "5f2c8e1a9d47"
+down_revision = "b16b218ef5d6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Add the index used by the agent changes feed.
+    """
+    op.create_index(
+        "idx_job_submissions_client_id_updated_at_id",
+        "job_submissions",
+        ["client_id", "updated_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    """
+    Remove the index used by the agent changes feed.
+    """
+    op.drop_index("idx_job_submissions_client_id_updated_at_id", table_name="job_submissions")
@@ -0,0 +1,58 @@
+"""add outbox_messages table
+
+Revision ID: 8d3b6a2f4c19
+Revises: 5f2c8e1a9d47
+Create Date: 2026-10-16 15:00:00.000000
+
+This migration adds the outbox where the notifications of the job submissions are written in the
+same transaction as the change that causes them, to be delivered in the background.
+
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "8d3b6a2f4c19"
+down_revision = "5f2c8e1a9d47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Add the outbox_messages table and the index used to deliver its messages in order.
+    """
+    op.create_table(
+        "outbox_messages",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column(
+            "kind",
+            sa.Enum("STATUS_CHANGE", "SUBMISSION_REJECTED", name="outboxmessagekind", native_enum=False),
+            nullable=False,
+        ),
+        sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("organization_id", sa.String(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "idx_outbox_messages_available_at_id",
+        "outbox_messages",
+        ["available_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    """
+    Remove the outbox_messages table.
+    """
+    op.drop_index("idx_outbox_messages_available_at_id", table_name="outbox_messages")
+    op.drop_table("outbox_messages")
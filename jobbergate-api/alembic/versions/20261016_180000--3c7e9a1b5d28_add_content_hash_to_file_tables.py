@@ -0,0 +1,39 @@
+"""add content hash to the file tables
+
+Revision ID: 3c7e9a1b5d28
+Revises: 8d3b6a2f4c19
+Create Date: 2026-10-16 18:00:00.000000
+
+This migration adds a nullable content_hash column to the file tables. Files with a content hash
+are kept in the content-addressed storage, under a key derived from it, and the existing files
+keep their per-file keys.
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3c7e9a1b5d28"
+down_revision = "8d3b6a2f4c19"
+branch_labels = None
+depends_on = None
+
+FILE_TABLES = ("job_script_files", "job_script_template_files", "workflow_files")
+
+
+def upgrade():
+    """
+    Add the content_hash column to the file tables.
+    """
+    for table_name in FILE_TABLES:
+        op.add_column(table_name, sa.Column("content_hash", sa.String(), nullable=True))
+
+
+def downgrade():
+    """
+    Remove the content_hash column from the file tables.
+    """
+    for table_name in FILE_TABLES:
+        op.drop_column(table_name, "content_hash")
@@ -0,0 +1,58 @@
+"""add trigram search indexes
+
+Revision ID: 6a1f4d8e2b37
+Revises: 3c7e9a1b5d28
+Create Date: 2026-10-16 21:00:00.000000
+
+This migration enables the pg_trgm extension and adds a GIN trigram index on the search document
+of the job script templates, job scripts and job submissions, so the ILIKE predicates built by
+``jobbergate_api.storage.search_clause`` use an index instead of a sequential scan.
+
+The indexed expressions must match the ones built by ``jobbergate_api.storage.search_document``,
+which concatenates the searchable fields sorted by their names.
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "6a1f4d8e2b37"
+down_revision = "3c7e9a1b5d28"
+branch_labels = None
+depends_on = None
+
+SEARCH_INDEXES = {
+    "idx_job_script_templates_search_trgm": (
+        "job_script_templates",
+        ["description", "identifier", "name", "owner_email"],
+    ),
+    "idx_job_scripts_search_trgm": (
+        "job_scripts",
+        ["description", "name", "owner_email"],
+    ),
+    "idx_job_submissions_search_trgm": (
+        "job_submissions",
+        ["client_id", "description", "name", "owner_email"],
+    ),
+}
+
+
+def upgrade():
+    """
+    Enable pg_trgm and add the trigram indexes on the search documents.
+    """
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for index_name, (table_name, fields) in SEARCH_INDEXES.items():
+        document = " || ' ' || ".join(f"coalesce({field}, '')" for field in fields)
+        op.execute(f"CREATE INDEX {index_name} ON {table_name} USING gin (({document}) gin_trgm_ops)")
+
+
+def downgrade():
+    """
+    Remove the trigram indexes on the search documents.
+
+    The pg_trgm extension is left in place, as it may be used by other objects of the database.
+    """
+    for index_name in SEARCH_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {index_name}")
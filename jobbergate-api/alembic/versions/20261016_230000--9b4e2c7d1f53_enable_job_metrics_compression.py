@@ -0,0 +1,55 @@
+"""enable compression on the job metrics
+
+Revision ID: 9b4e2c7d1f53
+Revises: 6a1f4d8e2b37
+Create Date: 2026-10-16 23:00:00.000000
+
+This migration enables the TimescaleDB native compression on the job_submission_metrics hypertable,
+segmented by job submission and node host and ordered by time, and adds a compression policy with
+the default interval. The compression and retention policies are kept in sync with the settings by
+the cron job afterwards.
+
+The step and task columns are appended to the ordering because every column of the primary key must
+be either segmented or ordered by.
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9b4e2c7d1f53"
+down_revision = "6a1f4d8e2b37"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Enable the compression on the job metrics and add the default compression policy.
+    """
+    op.execute(
+        sa.text(
+            """
+            ALTER TABLE job_submission_metrics SET (
+                timescaledb.compress,
+                timescaledb.compress_segmentby = 'job_submission_id, node_host',
+                timescaledb.compress_orderby = 'time, step, task'
+            )
+            """
+        )
+    )
+    op.execute(
+        sa.text("SELECT add_compression_policy('job_submission_metrics', INTERVAL '7 days', if_not_exists => true)")
+    )
+
+
+def downgrade():
+    """
+    Remove the compression and retention policies, decompress the chunks and disable the compression.
+    """
+    op.execute(sa.text("SELECT remove_retention_policy('job_submission_metrics', if_exists => true)"))
+    op.execute(sa.text("SELECT remove_compression_policy('job_submission_metrics', if_exists => true)"))
+    op.execute(sa.text("SELECT decompress_chunk(chunk, true) FROM show_chunks('job_submission_metrics') AS chunk"))
+    op.execute(sa.text("ALTER TABLE job_submission_metrics SET (timescaledb.compress = false)"))
@@ -0,0 +1,48 @@
+"""add job_submission_tombstones table
+
+Revision ID: 2e8c5f1a7b64
+Revises: 9b4e2c7d1f53
+Create Date: 2026-10-17 09:00:00.000000
+
+This migration adds the tombstones written when job submissions are deleted, so the changes feed
+of the agents can report them as removed.
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "2e8c5f1a7b64"
+down_revision = "9b4e2c7d1f53"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Add the job_submission_tombstones table and the index used by the changes feed.
+    """
+    op.create_table(
+        "job_submission_tombstones",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("client_id", sa.String(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "idx_job_submission_tombstones_client_id_deleted_at_id",
+        "job_submission_tombstones",
+        ["client_id", "deleted_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    """
+    Remove the job_submission_tombstones table.
+    """
+    op.drop_index("idx_job_submission_tombstones_client_id_deleted_at_id", table_name="job_submission_tombstones")
+    op.drop_table("job_submission_tombstones")
@@ -10,6 +10,7 @@ app = typer.Typer()
 app.command(name="dev-server")(dev_server.dev_server)
 app.command(name="show-env")(show_env.show_env)
 app.command(name="generate-metrics")(metrics.generate_metrics)
+app.command(name="benchmark-metrics")(metrics.benchmark_metrics)
 app.add_typer(db.app, name="db")
 
 
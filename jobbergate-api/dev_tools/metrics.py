@@ -1,14 +1,23 @@
 """
-Provide command for generating dummy job metrics for testing purposes.
+Provide commands for generating dummy job metrics and for benchmarking the queries on them.
 """
 
+import asyncio
 import random
+import statistics
+import time
 from collections.abc import Iterator
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import Generator, Literal, TypedDict, cast, get_args
 
 import msgpack
 import typer
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from jobbergate_api.apps.job_submissions.constants import JobSubmissionMetricSampleRate
+from jobbergate_api.apps.job_submissions.helpers import build_job_metric_aggregation_query
+from jobbergate_api.storage import build_db_url
 
 app = typer.Typer()
 
@@ -143,3 +152,49 @@ def generate_metrics(
 
     with open(path, "wb") as f:
         f.write(binary_data)
+
+
+async def _time_metrics_query(query: str, params: dict, repetitions: int) -> tuple[list[float], int]:
+    """Run a metrics query a number of times, returning the latency of each run in milliseconds and the rows."""
+    engine = create_async_engine(build_db_url())
+    latencies = []
+    num_rows = 0
+    try:
+        async with engine.connect() as connection:
+            for _ in range(repetitions):
+                start = time.perf_counter()
+                result = await connection.execute(text(query), params)
+                num_rows = len(result.fetchall())
+                latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        await engine.dispose()
+    return latencies, num_rows
+
+
+@app.command()
+def benchmark_metrics(
+    job_submission_id: int = typer.Option(..., help="Job submission whose metrics are queried."),
+    node: str | None = typer.Option(None, help="Node host to query. If omitted, all nodes are queried."),
+    hours: float = typer.Option(1.0, help="Size, in hours up to now, of the time window queried."),
+    repetitions: int = typer.Option(20, min=2, help="Number of times each query is run."),
+):
+    """
+    Compare the latency of the metrics queries with and without real-time aggregation, for each sample rate.
+    """
+    end_time = datetime.now(tz=timezone.utc)
+    params: dict = {
+        "job_submission_id": job_submission_id,
+        "start_time": end_time - timedelta(hours=hours),
+        "end_time": end_time,
+    }
+    if node is not None:
+        params["node_host"] = node
+
+    print(f"{'sample rate':>12} {'real-time':>10} {'rows':>8} {'median ms':>10} {'p95 ms':>10}")
+    for sample_rate in JobSubmissionMetricSampleRate:
+        for real_time in (False, True):
+            query = build_job_metric_aggregation_query(node, sample_rate, real_time=real_time)
+            latencies, num_rows = asyncio.run(_time_metrics_query(query, params, repetitions))
+            median = statistics.median(latencies)
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            print(f"{sample_rate.value:>12} {str(real_time):>10} {num_rows:>8} {median:>10.2f} {p95:>10.2f}")
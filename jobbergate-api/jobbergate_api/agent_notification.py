@@ -0,0 +1,145 @@
+"""
+Agent notification system for Jobbergate, based on PostgreSQL LISTEN/NOTIFY.
+
+A notification is sent on the database when a job submission is created or cancelled, and it is
+delivered when the transaction is committed. The API listens to the notifications on a dedicated
+connection per database and wakes up the agents waiting on the long-poll endpoint for that client.
+"""
+
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import asyncpg
+from loguru import logger
+from yarl import URL
+
+from jobbergate_api.apps.job_submissions.constants import JobSubmissionStatus
+from jobbergate_api.config import settings
+from jobbergate_api.storage import build_db_url
+
+AGENT_NOTIFICATION_CHANNEL = "jobbergate_agent"
+
+AGENT_NOTIFICATION_STATUSES = {JobSubmissionStatus.CREATED, JobSubmissionStatus.CANCELLED}
+
+
+def build_agent_notification_payload(client_id: str, status: JobSubmissionStatus) -> str:
+    """
+    Build the payload of a notification sent to the agent of a client.
+    """
+    return json.dumps({"client_id": client_id, "status": status.value})
+
+
+def mask_db_url(db_url: str) -> str:
+    """
+    Mask the password in a database url so it can be logged.
+    """
+    url = URL(db_url)
+    return str(url.with_password("***")) if url.password else db_url
+
+
+class AgentNotificationListener:
+    """
+    Listen to the agent notifications and dispatch them to the waiting requests.
+
+    A connection is opened per database the first time an agent waits on it, and it is kept open
+    to be shared by all the agents waiting on that database.
+    """
+
+    def __init__(self):
+        """
+        Initialize the listener with no connections nor waiters.
+        """
+        self.connections: dict[str, asyncpg.Connection] = {}
+        self.waiters: dict[tuple[str, str], set[asyncio.Queue[JobSubmissionStatus]]] = defaultdict(set)
+        self.lock = asyncio.Lock()
+
+    async def listen(self, db_url: str) -> None:
+        """
+        Open the connection that listens to the notifications on a database, unless it is already open.
+        """
+        async with self.lock:
+            if db_url in self.connections:
+                return
+            safe_db_url = mask_db_url(db_url)
+            logger.debug("Listening to agent notifications on {}", safe_db_url)
+            connection = await asyncpg.connect(db_url)
+
+            def dispatch(_connection, _pid, _channel, payload: str) -> None:
+                self.dispatch(db_url, payload)
+
+            def terminate(_connection) -> None:
+                logger.warning("Connection listening to agent notifications on {} was lost", safe_db_url)
+                self.connections.pop(db_url, None)
+
+            await connection.add_listener(AGENT_NOTIFICATION_CHANNEL, dispatch)
+            connection.add_termination_listener(terminate)
+            self.connections[db_url] = connection
+
+    def dispatch(self, db_url: str, payload: str) -> None:
+        """
+        Dispatch a notification to the requests waiting for the client it is addressed to.
+        """
+        try:
+            data = json.loads(payload)
+            key = (db_url, data["client_id"])
+            status = JobSubmissionStatus(data["status"])
+        except (ValueError, KeyError, TypeError) as err:
+            logger.warning("Ignoring malformed agent notification {}: {}", payload, err)
+            return
+        for queue in self.waiters.get(key, ()):
+            queue.put_nowait(status)
+
+    @asynccontextmanager
+    async def subscribe(
+        self, client_id: str, override_db_name: str | None = None
+    ) -> AsyncIterator[asyncio.Queue[JobSubmissionStatus]]:
+        """
+        Provide a queue that receives the statuses notified to a client while the context is open.
+        """
+        db_url = build_db_url(
+            override_db_name=override_db_name,
+            force_test=settings.DEPLOY_ENV.lower() == "test",
+            asynchronous=False,
+        )
+        await self.listen(db_url)
+        key = (db_url, client_id)
+        queue: asyncio.Queue[JobSubmissionStatus] = asyncio.Queue()
+        self.waiters[key].add(queue)
+        try:
+            yield queue
+        finally:
+            self.waiters[key].discard(queue)
+            if not self.waiters[key]:
+                del self.waiters[key]
+
+    async def wait(
+        self, client_id: str, timeout: float, override_db_name: str | None = None
+    ) -> set[JobSubmissionStatus]:
+        """
+        Wait until a notification is sent to a client, or the timeout expires.
+
+        Return the statuses notified, or an empty set if the timeout expired.
+        """
+        async with self.subscribe(client_id, override_db_name=override_db_name) as queue:
+            try:
+                statuses = {await asyncio.wait_for(queue.get(), timeout=timeout)}
+            except asyncio.TimeoutError:
+                return set()
+            while not queue.empty():
+                statuses.add(queue.get_nowait())
+            return statuses
+
+    async def cleanup(self) -> None:
+        """
+        Close all the connections listening to notifications.
+        """
+        async with self.lock:
+            for connection in self.connections.values():
+                await connection.close()
+            self.connections = {}
+
+
+agent_notification_listener = AgentNotificationListener()
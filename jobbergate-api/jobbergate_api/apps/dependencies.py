@@ -5,12 +5,15 @@ Note:
     The dependencies can be reused multiple times, since FastAPI caches the results.
 """
 
-from contextlib import asynccontextmanager, contextmanager
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
 from dataclasses import dataclass
+from functools import partial
 from itertools import chain
-from typing import Annotated, AsyncIterator, Iterator, NamedTuple
+from typing import Annotated, Any, AsyncIterator, Awaitable, Callable, Iterator, NamedTuple
 
 from aioboto3.session import Session
+from aiobotocore.config import AioConfig
 from fastapi import Depends
 
 from jobbergate_api.apps.job_script_templates.models import (
@@ -26,6 +29,7 @@ from jobbergate_api.apps.job_scripts.models import JobScript, JobScriptFile
 from jobbergate_api.apps.job_scripts.services import JobScriptCrudService, JobScriptFileService
 from jobbergate_api.apps.job_submissions.models import JobProgress, JobSubmission
 from jobbergate_api.apps.job_submissions.services import JobProgressService, JobSubmissionService
+from jobbergate_api.apps.outbox.services import OutboxService
 from jobbergate_api.config import settings
 from jobbergate_api.safe_types import Bucket
 from jobbergate_api.security import PermissionMode
@@ -34,14 +38,70 @@ from jobbergate_api.storage import AsyncSession, SecureSession, secure_session
 session = Session()
 
 
+def s3_config() -> AioConfig:
+    """Get the configuration used for the s3 clients, including the size of their connection pool."""
+    return AioConfig(max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS)
+
+
 @asynccontextmanager
 async def s3_bucket(bucket_name: str, s3_url: str | None) -> AsyncIterator[Bucket]:
     """Create a bucket using a context manager."""
-    async with session.resource("s3", endpoint_url=s3_url) as s3:
+    async with session.resource("s3", endpoint_url=s3_url, config=s3_config()) as s3:
         bucket = await s3.Bucket(bucket_name)
         yield bucket
 
 
+class BucketFactory:
+    """
+    Provide a factory class that creates s3 buckets and keeps track of them in a bucket mapping.
+
+    One s3 resource (and so one client and connection pool) is created per endpoint url on first use
+    and reused by every request until the app is shut down.
+    """
+
+    resource_map: dict[str | None, Any]
+    bucket_map: dict[tuple[str | None, str], Bucket]
+
+    def __init__(self):
+        """
+        Initialize the BucketFactory.
+        """
+        self.exit_stack = AsyncExitStack()
+        self.resource_map = {}
+        self.bucket_map = {}
+        self.lock = asyncio.Lock()
+
+    async def cleanup(self):
+        """
+        Close all s3 resources opened by the factory and clear the mappings.
+        """
+        await self.exit_stack.aclose()
+        self.resource_map = {}
+        self.bucket_map = {}
+
+    async def get_bucket(self, bucket_name: str, s3_url: str | None) -> Bucket:
+        """
+        Get a bucket.
+
+        If the bucket is already in the bucket map, return the bucket stored there. Otherwise, build
+        a new one on the s3 resource for the endpoint url (creating it if needed), store it, and return it.
+        """
+        bucket_key = (s3_url, bucket_name)
+        if bucket_key not in self.bucket_map:
+            # Concurrent file operations may request the same bucket before it is created
+            async with self.lock:
+                if s3_url not in self.resource_map:
+                    self.resource_map[s3_url] = await self.exit_stack.enter_async_context(
+                        session.resource("s3", endpoint_url=s3_url, config=s3_config())
+                    )
+                if bucket_key not in self.bucket_map:
+                    self.bucket_map[bucket_key] = await self.resource_map[s3_url].Bucket(bucket_name)
+        return self.bucket_map[bucket_key]
+
+
+bucket_factory = BucketFactory()
+
+
 def get_bucket_name(override_bucket_name: str | None = None) -> str:
     """
     Get the bucket name based on the environment.
@@ -84,20 +144,29 @@ class Services(NamedTuple):
 
     crud: CrudServices
     file: FileServices
+    outbox: OutboxService
 
 
 @dataclass
 class SecureService(SecureSession):
-    """Dataclass to hold the secure session and the bucket."""
+    """Dataclass to hold the secure session and the services."""
 
-    bucket: Bucket
     crud: CrudServices
     file: FileServices
+    outbox: OutboxService
 
 
 @contextmanager
-def service_factory(session: AsyncSession, bucket: Bucket) -> Iterator[Services]:
-    """Create the services and bind them to a db section and s3 bucket."""
+def service_factory(
+    session: AsyncSession,
+    bucket: Bucket | None = None,
+    bucket_loader: Callable[[], Awaitable[Bucket]] | None = None,
+) -> Iterator[Services]:
+    """
+    Create the services and bind them to a db section and s3 bucket.
+
+    Instead of a bucket, a loader can be supplied so the bucket is only acquired when a file service uses it.
+    """
     crud = CrudServices(
         template=JobScriptTemplateService(model_type=JobScriptTemplate),
         job_script=JobScriptCrudService(model_type=JobScript),
@@ -110,12 +179,15 @@ def service_factory(session: AsyncSession, bucket: Bucket) -> Iterator[Services]
         job_script=JobScriptFileService(model_type=JobScriptFile),
     )
 
-    [service.bind_session(session) for service in chain(crud, file)]
-    [service.bind_bucket(bucket) for service in file]
+    outbox = OutboxService()
 
-    yield Services(crud=crud, file=file)
+    [service.bind_session(session) for service in chain(crud, file, [outbox])]
+    [service.bind_bucket(bucket) for service in file if bucket is not None]
+    [service.bind_bucket_loader(bucket_loader) for service in file if bucket_loader is not None]
 
-    [service.unbind_session() for service in chain(crud, file)]
+    yield Services(crud=crud, file=file, outbox=outbox)
+
+    [service.unbind_session() for service in chain(crud, file, [outbox])]
     [service.unbind_bucket() for service in file]
 
 
@@ -147,18 +219,23 @@ def secure_services(
     ) -> AsyncIterator[SecureService]:
         """
         Bind each service to the secure session and then return the session.
+
+        The bucket is acquired lazily from the app-wide bucket factory, so requests that
+        do not use the file services do not touch s3 at all.
         """
-        bucket_name = get_bucket_name(secure_session.identity_payload.organization_id)
-        s3_url = get_bucket_url()
-
-        async with s3_bucket(bucket_name, s3_url) as bucket:
-            with service_factory(secure_session.session, bucket) as services:
-                yield SecureService(
-                    identity_payload=secure_session.identity_payload,
-                    session=secure_session.session,
-                    bucket=bucket,
-                    crud=services.crud,
-                    file=services.file,
-                )
+        bucket_loader = partial(
+            bucket_factory.get_bucket,
+            get_bucket_name(secure_session.identity_payload.organization_id),
+            get_bucket_url(),
+        )
+
+        with service_factory(secure_session.session, bucket_loader=bucket_loader) as services:
+            yield SecureService(
+                identity_payload=secure_session.identity_payload,
+                session=secure_session.session,
+                crud=services.crud,
+                file=services.file,
+                outbox=services.outbox,
+            )
 
     return dependency
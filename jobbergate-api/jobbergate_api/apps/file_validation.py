@@ -12,6 +12,8 @@ from jinja2 import Environment
 from loguru import logger
 from yaml import safe_load as yaml_safe_load
 
+from jobbergate_api.config import settings
+
 
 def get_suffix(filename: str) -> str:
     """
@@ -20,13 +22,18 @@ def get_suffix(filename: str) -> str:
     return PurePath(filename).suffix
 
 
-def check_uploaded_file_syntax(file_obj: BinaryIO, filename: str) -> bool:
+def check_uploaded_file_syntax(file_obj: BinaryIO, filename: str, size: int | None = None) -> bool:
     """
     Check the syntax of a given file.
+
+    Files larger than ``SYNTAX_VALIDATION_MAX_SIZE`` are not checked, as they would be read in full into memory.
     """
     logger.debug(f"Validating source code on {filename=}")
     suffix = get_suffix(filename)
     if suffix in syntax_validation_dispatch:
+        if size is not None and size > settings.SYNTAX_VALIDATION_MAX_SIZE:
+            logger.debug(f"Skipping because {filename} is larger than {settings.SYNTAX_VALIDATION_MAX_SIZE} bytes")
+            return True
         validator = syntax_validation_dispatch[suffix]
         result = validator(file_obj.read())
         file_obj.seek(0)
@@ -2,12 +2,14 @@
 
 import asyncio
 from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 
 from loguru import logger
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from jobbergate_api.apps.protocols import FileModelProto
+from jobbergate_api.config import settings
 from jobbergate_api.safe_types import Bucket
 
 
@@ -15,6 +17,12 @@ from jobbergate_api.safe_types import Bucket
 class GarbageCollector:
     """
     Class to delete unused files from Jobbergate's file storage.
+
+    The objects are compared by their keys, so an object in the content-addressed storage, shared by
+    the files with the same content, is only deleted once none of them references it.
+
+    The objects written in the last ``FILE_STORAGE_GC_MIN_AGE`` seconds are left alone, as the rows
+    referencing them may not be committed yet.
     """
 
     model_type: type[FileModelProto]
@@ -47,9 +55,14 @@ class GarbageCollector:
         return result
 
     async def _get_set_of_files_from_bucket(self) -> set[str]:
-        """Get a set of files from the bucket."""
+        """Get a set of files from the bucket, except the recently written ones."""
         prefix = self.model_type.__tablename__
-        result = {obj.key async for obj in self.bucket.objects.filter(Prefix=prefix)}
+        written_before = datetime.now(timezone.utc) - timedelta(seconds=settings.FILE_STORAGE_GC_MIN_AGE)
+        result = {
+            obj.key
+            async for obj in self.bucket.objects.filter(Prefix=prefix)
+            if await obj.last_modified <= written_before  # type: ignore
+        }
         logger.debug(f"Total of files found in the bucket {self.bucket.name} with prefix {prefix}: {len(result)}")
         return result
 
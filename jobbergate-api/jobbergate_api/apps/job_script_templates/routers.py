@@ -10,6 +10,7 @@ from fastapi import (
     Depends,
     File,
     Form,
+    Header,
     HTTPException,
     Path,
     Query,
@@ -17,10 +18,10 @@ from fastapi import (
     status,
 )
 from fastapi import Response as FastAPIResponse
-from fastapi_pagination import Page
 from loguru import logger
 from pydantic import AnyUrl
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import set_committed_value
 
 from jobbergate_api.apps.constants import FileType
 from jobbergate_api.apps.dependencies import SecureService, secure_services
@@ -37,6 +38,7 @@ from jobbergate_api.apps.job_script_templates.schemas import (
     WorkflowFileDetailedView,
 )
 from jobbergate_api.apps.job_script_templates.tools import coerce_id_or_identifier
+from jobbergate_api.apps.pagination import Page
 from jobbergate_api.apps.permissions import Permissions, can_bypass_ownership_check
 from jobbergate_api.apps.schemas import ListParams
 from jobbergate_api.apps.services import ServiceError
@@ -127,13 +129,15 @@ async def job_script_template_clone(
         logger.error(message)
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=message) from err
 
-    for file in original_instance.template_files:
-        await secure_services.file.template.clone_instance(file, cloned_instance.id)
-    for file in original_instance.workflow_files:
-        await secure_services.file.workflow.clone_instance(file, cloned_instance.id)
-
-    # Get again to update the file data
-    return await secure_services.crud.template.get(cloned_instance.id, include_files=True)
+    template_files = await secure_services.file.template.bulk_clone(
+        original_instance.template_files, cloned_instance.id
+    )
+    workflow_files = await secure_services.file.workflow.bulk_clone(
+        original_instance.workflow_files, cloned_instance.id
+    )
+    set_committed_value(cloned_instance, "template_files", template_files)
+    set_committed_value(cloned_instance, "workflow_files", workflow_files)
+    return cloned_instance
 
 
 @router.get(
@@ -223,6 +227,8 @@ async def job_script_template_get_file(
     ],
     id_or_identifier: Annotated[str, Path()],
     file_name: Annotated[str, Path()],
+    range_header: Annotated[str | None, Header(alias="Range")] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
     """
     Get a job script template file by id or identifier.
@@ -234,10 +240,8 @@ async def job_script_template_get_file(
     logger.debug(f"Getting template file {file_name=} from job script template {typed_id_or_identifier=}")
     job_script_template = await secure_services.crud.template.get(typed_id_or_identifier)
     job_script_template_file = await secure_services.file.template.get(job_script_template.id, file_name)
-    return FastAPIResponse(
-        content=await secure_services.file.template.get_file_content(job_script_template_file),
-        media_type="text/plain",
-        headers={"filename": job_script_template_file.filename},
+    return await secure_services.file.template.stream_file_response(
+        job_script_template_file, range_header=range_header, if_none_match=if_none_match
     )
 
 
@@ -405,6 +409,8 @@ async def job_script_workflow_get_file(
         Depends(secure_services(Permissions.ADMIN, Permissions.JOB_TEMPLATES_READ, commit=False)),
     ],
     id_or_identifier: Annotated[str, Path()],
+    range_header: Annotated[str | None, Header(alias="Range")] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
     """
     Get a workflow file by id or identifier.
@@ -416,10 +422,8 @@ async def job_script_workflow_get_file(
     logger.debug(f"Getting workflow file from job script template {typed_id_or_identifier=}")
     job_script_template = await secure_services.crud.template.get(typed_id_or_identifier)
     workflow_file = await secure_services.file.workflow.get(job_script_template.id, WORKFLOW_FILE_NAME)
-    return FastAPIResponse(
-        content=await secure_services.file.workflow.get_file_content(workflow_file),
-        media_type="text/plain",
-        headers={"filename": WORKFLOW_FILE_NAME},
+    return await secure_services.file.workflow.stream_file_response(
+        workflow_file, range_header=range_header, if_none_match=if_none_match
     )
 
 
@@ -12,6 +12,7 @@ from sqlalchemy.sql.expression import Select
 from jobbergate_api.apps.job_script_templates.models import JobScriptTemplate
 from jobbergate_api.apps.job_scripts.models import JobScript
 from jobbergate_api.apps.services import AutoCleanResponse, CrudModel, CrudService, FileService, ServiceError
+from jobbergate_api.apps.template_cache import template_cache
 from jobbergate_api.config import settings
 
 
@@ -156,9 +157,11 @@ class JobScriptTemplateService(CrudService):
 
 class JobScriptTemplateFileService(FileService):
     """
-    Provide an empty derived class of FileService.
+    Provide a derived class of FileService that keeps the template files in the template cache.
 
-    Although it doesn't do anything, it fixes errors with mypy:
+    It also fixes errors with mypy:
         error: Value of type variable "FileModel" of "FileService" cannot be "JobScriptTemplateFile"
         error: Value of type variable "FileModel" of "FileService" cannot be "WorkflowFile"
     """
+
+    template_cache = template_cache
@@ -4,11 +4,11 @@ from typing import Annotated, cast
 
 import snick
 from buzz import handle_errors, require_condition
-from fastapi import APIRouter, Depends, File, HTTPException, Path, Query, UploadFile, status
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Path, Query, UploadFile, status
 from fastapi import Response as FastAPIResponse
-from fastapi_pagination import Page
 from loguru import logger
 from pydantic import AnyUrl
+from sqlalchemy.orm.attributes import set_committed_value
 
 from jobbergate_api.apps.constants import FileType
 from jobbergate_api.apps.dependencies import SecureService, secure_services
@@ -25,9 +25,10 @@ from jobbergate_api.apps.job_scripts.schemas import (
     RenderFromTemplateRequest,
 )
 from jobbergate_api.apps.job_scripts.tools import inject_sbatch_params
+from jobbergate_api.apps.pagination import Page
 from jobbergate_api.apps.permissions import Permissions, can_bypass_ownership_check
 from jobbergate_api.apps.schemas import ListParams
-from jobbergate_api.apps.services import ServiceError
+from jobbergate_api.apps.services import FileUpload, ServiceError, gather_with_limit
 
 router = APIRouter(prefix="/job-scripts", tags=["Job Scripts"])
 
@@ -86,11 +87,9 @@ async def job_script_clone(
         **clone_request.model_dump(exclude_unset=True, exclude_none=True),
     )
 
-    for file in original_instance.files:
-        await secure_services.file.job_script.clone_instance(file, cloned_instance.id)
-
-    # Get again to update the file data
-    return await secure_services.crud.job_script.get(cloned_instance.id, include_files=True)
+    cloned_files = await secure_services.file.job_script.bulk_clone(original_instance.files, cloned_instance.id)
+    set_committed_value(cloned_instance, "files", cloned_files)
+    return cloned_instance
 
 
 @router.post(
@@ -142,18 +141,16 @@ async def job_script_create_from_template(
             detail=f"Exactly one entrypoint file must be specified, got {len(entrypoint_files)}",
         )
 
-    job_script = await secure_services.crud.job_script.create(
-        owner_email=secure_services.identity_payload.email,
-        parent_template_id=base_template.id,
-        **create_request.model_dump(exclude_unset=True),
+    # The templates are rendered concurrently, since they are fetched from the cache or s3 without touching the db
+    rendered_contents = await gather_with_limit(
+        secure_services.file.template.render(template_file, render_request.param_dict)
+        for template_file in mapped_template_files.values()
     )
 
-    for new_filename, template_file in mapped_template_files.items():
-        file_content = await secure_services.file.template.render(
-            template_file,
-            render_request.param_dict,
-        )
-
+    uploads = []
+    for (new_filename, template_file), file_content in zip(
+        mapped_template_files.items(), rendered_contents, strict=True
+    ):
         if template_file.file_type == FileType.ENTRYPOINT and render_request.sbatch_params:
             with handle_errors(
                 "Failed to inject sbatch params into the entrypoint file",
@@ -161,13 +158,15 @@ async def job_script_create_from_template(
                 raise_kwargs={"status_code": status.HTTP_422_UNPROCESSABLE_CONTENT},
             ):
                 file_content = inject_sbatch_params(file_content, render_request.sbatch_params)
+        uploads.append(FileUpload(new_filename, file_content, {"file_type": template_file.file_type}))
 
-        await secure_services.file.job_script.upsert(
-            parent_id=job_script.id,
-            filename=new_filename,
-            upload_content=file_content,
-            file_type=template_file.file_type,
-        )
+    job_script = await secure_services.crud.job_script.create(
+        owner_email=secure_services.identity_payload.email,
+        parent_template_id=base_template.id,
+        **create_request.model_dump(exclude_unset=True),
+    )
+
+    await secure_services.file.job_script.bulk_create(job_script.id, uploads)
 
     return await secure_services.crud.job_script.get(job_script.id, include_files=True)
 
@@ -270,6 +269,8 @@ async def job_script_get_file(
     ],
     job_script_id: Annotated[int, Path()],
     file_name: Annotated[str, Path()],
+    range_header: Annotated[str | None, Header(alias="Range")] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
     """
     Get a job script file.
@@ -278,10 +279,8 @@ async def job_script_get_file(
         See https://fastapi.tiangolo.com/advanced/custom-response/#streamingresponse
     """
     job_script_file = await secure_services.file.job_script.get(job_script_id, file_name)
-    return FastAPIResponse(
-        content=await secure_services.file.job_script.get_file_content(job_script_file),
-        media_type="text/plain",
-        headers={"filename": job_script_file.filename},
+    return await secure_services.file.job_script.stream_file_response(
+        job_script_file, range_header=range_header, if_none_match=if_none_match
     )
 
 
@@ -254,3 +254,76 @@ class JobSubmissionMetricAggregateNames(AutoNameEnum):
     metrics_nodes_mv_10_minutes_all_nodes = auto()
     metrics_nodes_mv_1_minute_all_nodes = auto()
     metrics_nodes_mv_10_seconds_all_nodes = auto()
+
+
+class JobSubmissionMetricDownsampling(AutoNameEnum):
+    """
+    Defines the methods to downsample the job submission metrics to a maximum number of points.
+
+    Attributes:
+        lttb: Keep the points selected by the Largest-Triangle-Three-Buckets algorithm.
+        min_max: Keep the minimum and the maximum of each metric over groups of consecutive points.
+    """
+
+    lttb = auto()
+    min_max = auto()
+
+
+AGENT_BATCH_UPDATE_MAX_ITEMS = 500
+"""Maximum number of job submissions the agent can update in a single batch request."""
+
+AGENT_NOTIFICATION_MAX_TIMEOUT = 60
+"""Maximum number of seconds the agent can wait for a notification in a single request."""
+
+
+JOB_METRIC_UPLOAD_COLUMNS = (
+    "time",
+    "node_host",
+    "step",
+    "task",
+    "cpu_frequency",
+    "cpu_time",
+    "cpu_utilization",
+    "gpu_memory",
+    "gpu_utilization",
+    "page_faults",
+    "memory_rss",
+    "disk_read",
+    "memory_virtual",
+    "disk_write",
+)
+"""Columns of each row of a job metric upload, in the order they are sent by the agent."""
+
+JOB_METRIC_UPLOAD_TYPES = (int, str, int, int, float, float, float, int, float, int, int, int, int, int)
+"""Types the values of each column of a job metric upload are cast to."""
+
+JOB_METRIC_UPLOAD_CHUNK_SIZE = 10_000
+"""Number of rows of a job metric upload that are validated and copied to the database at once."""
+
+JOB_METRIC_COLUMNAR_CONTENT_TYPE = "application/vnd.jobbergate.metrics-columnar+msgpack"
+"""Content type used to upload and to read job metrics in the columnar format."""
+
+JOB_METRIC_AGGREGATE_COLUMNS = (
+    "time",
+    "node_host",
+    "cpu_frequency",
+    "cpu_time",
+    "cpu_utilization",
+    "gpu_memory",
+    "gpu_utilization",
+    "page_faults",
+    "memory_rss",
+    "memory_virtual",
+    "disk_read",
+    "disk_write",
+)
+"""Columns of each row of the aggregated job metrics, in the order they are read from the views."""
+
+JOB_METRIC_MIN_POINTS = 3
+"""Minimum number of points per node that can be requested when downsampling the job metrics."""
+
+JOB_METRIC_MAX_POINTS = 10_000
+"""Maximum number of points per node that can be requested when downsampling the job metrics."""
+
+JOB_METRIC_MIN_RETENTION_DAYS = 21
+"""Minimum number of days the raw job metrics are kept, beyond the two weeks refreshed by the weekly views."""
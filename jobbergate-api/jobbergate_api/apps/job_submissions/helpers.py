@@ -1,22 +1,86 @@
 """Core helper functions for job submissions."""
 
-from collections.abc import Iterable
-from math import ceil
+import sys
+from array import array
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator, Sequence
+from datetime import datetime, timezone
 from textwrap import dedent
 from typing import Any, Type, assert_never
 
+import msgpack
+from fastapi import HTTPException, status
 from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from jobbergate_api.apps.job_submissions.constants import (
+    JOB_METRIC_AGGREGATE_COLUMNS,
+    JOB_METRIC_UPLOAD_COLUMNS,
+    JOB_METRIC_UPLOAD_TYPES,
     JobSubmissionMetricAggregateNames,
+    JobSubmissionMetricDownsampling,
     JobSubmissionMetricSampleRate,
+    JobSubmissionStatus,
+    slurm_job_state_details,
 )
+from jobbergate_api.apps.job_submissions.models import JobSubmission, JobSubmissionMetric
+from jobbergate_api.apps.job_submissions.schemas import JobSubmissionAgentUpdateRequest
+
+
+def build_agent_update_values(
+    job_submission: JobSubmission, update_params: JobSubmissionAgentUpdateRequest
+) -> dict[str, Any]:
+    """Validate an update reported by the agent and build the values to update the job submission with.
+
+    Note that if the new slurm_job_state is a termination state, the job submission status is updated as well.
+
+    Args:
+        job_submission (JobSubmission): The job submission on record.
+        update_params (JobSubmissionAgentUpdateRequest): The update reported by the agent.
+
+    Returns:
+        dict[str, Any]: The values to be set on the job submission.
+
+    Raises:
+        HTTPException: If the job submission can not be updated by the agent or the slurm job id does not match.
+    """
+    if job_submission.status not in {JobSubmissionStatus.SUBMITTED, JobSubmissionStatus.CANCELLED}:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Only SUBMITTED or CANCELLED jobs may be updated by the agent, got {job_submission.status}",
+        )
+
+    if job_submission.slurm_job_id != update_params.slurm_job_id:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=(
+                "Update slurm job id does not match the job id on record for job submission "
+                f"job_submission_id={job_submission.id}"
+            ),
+        )
+
+    update_dict: dict[str, Any] = {
+        "slurm_job_id": update_params.slurm_job_id,
+        "slurm_job_state": update_params.slurm_job_state,
+        "slurm_job_info": update_params.slurm_job_info,
+    }
+
+    job_state_details = slurm_job_state_details[update_params.slurm_job_state]
+    if job_state_details.is_abort_status:
+        update_dict["status"] = JobSubmissionStatus.ABORTED
+        update_dict["report_message"] = update_params.slurm_job_state_reason
+    elif job_state_details.is_done_status:
+        update_dict["status"] = JobSubmissionStatus.DONE
+
+    return update_dict
 
 
 def validate_job_metric_upload_input(data: Any, expected_types: tuple[Type[Any], ...]) -> Iterable[tuple[Any, ...]]:
     """Validate if the input data of job metric upload is correct once decoded.
 
     It will brute force apply the expected types to the data and raise an error in case it fails.
+    The values are cast column-wise, i.e., all the values of a column are cast at once
+    when the result is consumed.
 
     Args:
         data (Iterable[list[Any] | tuple[Any]]): The decoded data, which should be a list of lists or tuples,
@@ -28,12 +92,18 @@ def validate_job_metric_upload_input(data: Any, expected_types: tuple[Type[Any],
         Iterable[tuple[Any, ...]]: The validated data, where each tuple has the same length as expected_types.
     """
 
-    def _force_cast(value: Any, expected_type: Type[Any]) -> Any:
+    def _cast_columns() -> Iterator[tuple[Any, ...]]:
+        if not data:
+            return
         try:
-            return expected_type(value)
+            columns = [
+                list(map(expected_type, column))
+                for expected_type, column in zip(expected_types, zip(*data, strict=True), strict=True)
+            ]
         except Exception as e:
             logger.error(f"Failed to cast data to expected types: {e}")
             raise ValueError("Failed to cast data to expected types") from e
+        yield from zip(*columns, strict=True)
 
     if not isinstance(data, list):
         raise ValueError("Decoded data must be a list.")
@@ -41,28 +111,254 @@ def validate_job_metric_upload_input(data: Any, expected_types: tuple[Type[Any],
         raise ValueError("All elements of the inner data must be a Sequence")
     if not all(len(x) == len(expected_types) for x in data):
         raise ValueError("Every iterable in `data` must match the length of `expected_types`.")
-    # postgres limits the number of query params to 2**15 - 1
-    # https://www.postgresql.org/docs/17/protocol-message-formats.html
-    if len(expected_types) * len(data) > 2**15 - 1:
-        raise ValueError(
-            "The maximum number of elements has been exceeded. Maximum is {}, received {}".format(
-                ceil((2**15 - 1) / len(expected_types)), len(data)
-            )
-        )
 
-    return (
-        tuple(_force_cast(data, expected_types[idx]) for idx, data in enumerate(aggregated_data))
-        for aggregated_data in data
+    return _cast_columns()
+
+
+async def iter_job_metric_upload_chunks(stream: AsyncIterable[bytes], chunk_size: int) -> AsyncIterator[list[Any]]:
+    """Stream-decode a msgpack encoded job metric upload, yielding its rows in chunks.
+
+    The upload is expected to be a single msgpack array of rows, which is decoded as the bytes arrive,
+    so the whole upload is never held in memory at once.
+
+    Args:
+        stream (AsyncIterable[bytes]): The raw bytes of the upload.
+        chunk_size (int): The maximum number of rows on each chunk.
+
+    Yields:
+        list[Any]: The decoded rows, not validated yet.
+    """
+    unpacker = msgpack.Unpacker()
+    remaining: int | None = None
+    rows: list[Any] = []
+
+    async for data in stream:
+        unpacker.feed(data)
+        while remaining != 0:
+            try:
+                if remaining is None:
+                    remaining = unpacker.read_array_header()
+                    continue
+                rows.append(unpacker.unpack())
+            except msgpack.OutOfData:
+                break
+            except ValueError as e:
+                if remaining is None:
+                    raise ValueError("Decoded data must be a list.") from e
+                raise
+            remaining -= 1
+            if len(rows) >= chunk_size:
+                yield rows
+                rows = []
+
+    if remaining is None:
+        raise ValueError("Decoded data must be a list.")
+    if remaining != 0:
+        raise ValueError("Decoded data is incomplete.")
+    if rows:
+        yield rows
+
+
+def build_job_metric_records(rows: list[Any], job_submission_id: int, slurm_job_id: int) -> list[tuple[Any, ...]]:
+    """Validate the rows of a job metric upload and build the records to be copied to the database.
+
+    The records follow the order of ``JOB_METRIC_UPLOAD_COLUMNS`` and are
+    followed by the job submission id and the slurm job id.
+    """
+    try:
+        return [
+            (datetime.fromtimestamp(row[0], tz=timezone.utc), *row[1:], job_submission_id, slurm_job_id)
+            for row in validate_job_metric_upload_input(rows, JOB_METRIC_UPLOAD_TYPES)
+        ]
+    except (OverflowError, OSError) as e:
+        raise ValueError("Failed to cast data to expected types") from e
+
+
+async def iter_job_metric_records(
+    stream: AsyncIterable[bytes], job_submission_id: int, slurm_job_id: int, chunk_size: int
+) -> AsyncIterator[list[tuple[Any, ...]]]:
+    """Stream-decode a msgpack encoded job metric upload, yielding chunks of records ready to be copied."""
+    async for rows in iter_job_metric_upload_chunks(stream, chunk_size):
+        yield build_job_metric_records(rows, job_submission_id, slurm_job_id)
+
+
+def decode_columnar_job_metric_upload(body: bytes) -> list[Sequence[Any]]:
+    """Decode a job metric upload sent in the columnar format.
+
+    The body is a msgpack encoded map with the following keys:
+
+    - ``rows``: The number of rows in the upload.
+    - ``node_hosts``: The dictionary of node hosts, referenced by index from the ``node_host`` column.
+    - ``columns``: One little-endian buffer per column, following the order of ``JOB_METRIC_UPLOAD_COLUMNS``.
+      Columns of type ``float`` are encoded as float64, all the others (including ``node_host``) as int64.
+
+    Args:
+        body (bytes): The raw body of the upload.
+
+    Returns:
+        list[Sequence[Any]]: The decoded columns, with ``node_host`` already resolved from the dictionary.
+    """
+    try:
+        payload = msgpack.unpackb(body)
+    except ValueError as e:
+        raise ValueError("Failed to decode the columnar data.") from e
+    if not isinstance(payload, dict) or not {"rows", "node_hosts", "columns"} <= payload.keys():
+        raise ValueError("Columnar data must be a map with the keys `rows`, `node_hosts` and `columns`.")
+
+    num_rows, node_hosts, buffers = payload["rows"], payload["node_hosts"], payload["columns"]
+    if not isinstance(num_rows, int) or num_rows < 0:
+        raise ValueError("The number of rows must be a non negative integer.")
+    if not isinstance(node_hosts, list) or not all(isinstance(host, str) for host in node_hosts):
+        raise ValueError("The node hosts must be a list of strings.")
+    if not isinstance(buffers, list) or len(buffers) != len(JOB_METRIC_UPLOAD_COLUMNS):
+        raise ValueError(f"Columnar data must have exactly {len(JOB_METRIC_UPLOAD_COLUMNS)} columns.")
+
+    columns: list[Sequence[Any]] = []
+    for name, expected_type, buffer in zip(JOB_METRIC_UPLOAD_COLUMNS, JOB_METRIC_UPLOAD_TYPES, buffers, strict=True):
+        column = array("d" if expected_type is float else "q")
+        if not isinstance(buffer, bytes) or len(buffer) != num_rows * column.itemsize:
+            raise ValueError(f"Column `{name}` must be a buffer with {num_rows} values of {column.itemsize} bytes.")
+        column.frombytes(buffer)
+        if sys.byteorder == "big":
+            column.byteswap()
+        columns.append(column)
+
+    node_host_index = JOB_METRIC_UPLOAD_COLUMNS.index("node_host")
+    host_indices = columns[node_host_index]
+    if host_indices and (min(host_indices) < 0 or max(host_indices) >= len(node_hosts)):
+        raise ValueError("Column `node_host` references an unknown node host.")
+    columns[node_host_index] = [node_hosts[idx] for idx in host_indices]
+
+    return columns
+
+
+def _bucket_timestamp(bucket: datetime | int | float) -> float:
+    """Get the timestamp of a bucket, that is either a datetime or already a timestamp."""
+    if isinstance(bucket, datetime):
+        return bucket.timestamp()
+    return float(bucket)
+
+
+def encode_columnar_job_metrics(rows: Sequence[Sequence[Any]]) -> bytes:
+    """
+    Encode the aggregated metrics of a job submission in the columnar format.
+
+    The rows are encoded column by column, in the same layout as the columnar uploads: a msgpack
+    encoded map with the keys ``rows``, ``node_hosts`` and ``columns``, where the columns follow the
+    order of ``JOB_METRIC_AGGREGATE_COLUMNS``. The ``time`` column holds the timestamp of each bucket
+    and the ``node_host`` column the index on ``node_hosts``, both as int64, and every metric is
+    encoded as float64, as they are averaged or summed by the views.
+
+    Args:
+        rows (Sequence[Sequence[Any]]): The rows read from the views, each one as ``(bucket, node_host, *metrics)``.
+
+    Returns:
+        bytes: The encoded metrics.
+    """
+    node_hosts: dict[str, int] = {}
+    columns = list(zip(*rows, strict=True)) or [()] * len(JOB_METRIC_AGGREGATE_COLUMNS)
+    (buckets, hosts, *metrics) = columns
+    buffers: list[array] = [
+        array("q", (int(_bucket_timestamp(bucket)) for bucket in buckets)),
+        array("q", (node_hosts.setdefault(host, len(node_hosts)) for host in hosts)),
+        *(array("d", map(float, metric)) for metric in metrics),
+    ]
+    if sys.byteorder == "big":
+        for buffer in buffers:
+            buffer.byteswap()
+    return msgpack.packb(
+        {
+            "rows": len(rows),
+            "node_hosts": list(node_hosts),
+            "columns": [buffer.tobytes() for buffer in buffers],
+        }
     )
 
 
-def build_job_metric_aggregation_query(node: str | None, sample_rate: JobSubmissionMetricSampleRate) -> str:
+async def iter_columnar_job_metric_records(
+    body: bytes, job_submission_id: int, slurm_job_id: int, chunk_size: int
+) -> AsyncIterator[list[tuple[Any, ...]]]:
+    """Decode a job metric upload sent in the columnar format, yielding chunks of records ready to be copied.
+
+    The values are taken straight from the typed buffers, so no casting is needed.
+    """
+    columns = decode_columnar_job_metric_upload(body)
+    num_rows = len(columns[0])
+    try:
+        for start in range(0, num_rows, chunk_size):
+            end = start + chunk_size
+            times, *others = (column[start:end] for column in columns)
+            yield [
+                (datetime.fromtimestamp(time, tz=timezone.utc), *values, job_submission_id, slurm_job_id)
+                for time, *values in zip(times, *others, strict=True)
+            ]
+    except (OverflowError, OSError) as e:
+        raise ValueError("Failed to cast data to expected types") from e
+
+
+async def copy_job_metrics(
+    session: AsyncSession,
+    chunks: AsyncIterable[list[tuple[Any, ...]]],
+    ignore_duplicates: bool = False,
+) -> None:
+    """Insert the metrics of a job submission with PostgreSQL COPY, one chunk of records at a time.
+
+    When ``ignore_duplicates`` is set, the rows are copied to a temporary staging table first
+    and then moved to the metrics table skipping the ones that are already there.
+
+    Raises:
+        ValueError: If the records are invalid.
+        asyncpg.exceptions.IntegrityConstraintViolationError: If the rows conflict with the existing ones
+            and ``ignore_duplicates`` is not set.
+    """
+    columns = (*JOB_METRIC_UPLOAD_COLUMNS, "job_submission_id", "slurm_job_id")
+    target_table = JobSubmissionMetric.__tablename__
+    staging_table = f"{target_table}_staging"
+
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    assert driver_connection is not None  # make type checker happy
+
+    if ignore_duplicates:
+        await session.execute(
+            text(f"CREATE TEMPORARY TABLE {staging_table} (LIKE {target_table} INCLUDING DEFAULTS) ON COMMIT DROP")
+        )
+
+    total_rows = 0
+    async for records in chunks:
+        await driver_connection.copy_records_to_table(
+            staging_table if ignore_duplicates else target_table, records=records, columns=columns
+        )
+        total_rows += len(records)
+        logger.debug(f"Copied {total_rows} metric rows so far")
+
+    if ignore_duplicates:
+        column_list = ", ".join(columns)
+        result = await session.execute(
+            text(
+                f"INSERT INTO {target_table} ({column_list}) SELECT {column_list} FROM {staging_table} "
+                "ON CONFLICT DO NOTHING"
+            )
+        )
+        await session.execute(text(f"DROP TABLE {staging_table}"))
+        logger.debug(f"Inserted {result.rowcount} out of {total_rows} metric rows, skipping duplicates")  # type: ignore[attr-defined]
+
+
+def build_job_metric_aggregation_query(
+    node: str | None, sample_rate: JobSubmissionMetricSampleRate, real_time: bool = False
+) -> str:
     """
     Build a SQL query string to aggregate job metrics based on the provided node and sample rate.
 
+    When ``real_time`` is set, the buckets that may not be materialized yet, i.e. the current and the
+    previous ones, are aggregated from the raw metrics the same way the view does, and combined with
+    the older buckets read from the view.
+
     Args:
         node (str | None): The node host identifier. If None, the query will aggregate metrics for all nodes.
         sample_rate (JobSubmissionMetricSampleRate): The sample rate for the metrics aggregation. Determines the view name to use.
+        real_time (bool): Whether to include the recent metrics that are not materialized yet.
 
     Returns:
         str: The SQL query string for aggregating job metrics.
@@ -98,6 +394,31 @@ def build_job_metric_aggregation_query(node: str | None, sample_rate: JobSubmiss
             case _ as unreachable:
                 assert_never(unreachable)
 
+    if not real_time:
+        return dedent(
+            f"""
+            SELECT bucket,
+                node_host,
+                cpu_frequency,
+                cpu_time,
+                cpu_utilization,
+                gpu_memory,
+                gpu_utilization,
+                page_faults,
+                memory_rss,
+                memory_virtual,
+                disk_read,
+                disk_write
+            FROM {view_name}
+            {where_statement}
+            AND bucket >= :start_time
+            AND bucket <= :end_time
+            ORDER BY bucket
+            """
+        )
+
+    bucket_width = f"INTERVAL '{sample_rate.value} seconds'"
+    watermark = f"time_bucket({bucket_width}, now()) - {bucket_width}"
     return dedent(
         f"""
         SELECT bucket,
@@ -116,6 +437,161 @@ def build_job_metric_aggregation_query(node: str | None, sample_rate: JobSubmiss
         {where_statement}
         AND bucket >= :start_time
         AND bucket <= :end_time
+        AND bucket < {watermark}
+        UNION ALL
+        SELECT time_bucket({bucket_width}, time) AS bucket,
+            node_host,
+            AVG(cpu_frequency) AS cpu_frequency,
+            SUM(cpu_time) AS cpu_time,
+            AVG(cpu_utilization) AS cpu_utilization,
+            AVG(gpu_memory) AS gpu_memory,
+            AVG(gpu_utilization) AS gpu_utilization,
+            SUM(page_faults) AS page_faults,
+            AVG(memory_rss) AS memory_rss,
+            AVG(memory_virtual) AS memory_virtual,
+            SUM(disk_read) AS disk_read,
+            SUM(disk_write) AS disk_write
+        FROM job_submission_metrics
+        {where_statement}
+        AND time >= {watermark}
+        GROUP BY bucket, node_host
+        HAVING time_bucket({bucket_width}, time) >= :start_time
+        AND time_bucket({bucket_width}, time) <= :end_time
         ORDER BY bucket
         """
     )
+
+
+def choose_job_metric_sample_rate(
+    start_time: datetime, end_time: datetime, max_points: int
+) -> JobSubmissionMetricSampleRate:
+    """
+    Choose the coarsest sample rate that still provides ``max_points`` buckets over a time window.
+
+    The finest sample rate is chosen when none of them provides enough buckets over the window.
+
+    Args:
+        start_time (datetime): The start of the time window.
+        end_time (datetime): The end of the time window.
+        max_points (int): The maximum number of points per node.
+
+    Returns:
+        JobSubmissionMetricSampleRate: The sample rate whose view should be queried.
+    """
+    window = (end_time - start_time).total_seconds()
+    candidates = [rate for rate in JobSubmissionMetricSampleRate if window / rate >= max_points]
+    return max(candidates, default=min(JobSubmissionMetricSampleRate))
+
+
+def lttb_downsample_job_metrics(rows: Sequence[Sequence[Any]], max_points: int) -> list[Sequence[Any]]:
+    """
+    Downsample the aggregated metrics of a single node with the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and the last rows are always kept, and each of the other points is the row that forms the
+    largest triangle with the point kept before it and the average of the next group of rows. As there
+    are many metrics on each row, the area is summed over all of them, once normalized to their range,
+    so every metric weighs the same on the selection.
+
+    Args:
+        rows (Sequence[Sequence[Any]]): The rows ordered by bucket, each one as ``(bucket, node_host, *metrics)``.
+        max_points (int): The maximum number of rows to keep, which must be at least 3.
+
+    Returns:
+        list[Sequence[Any]]: The rows kept, in their original order.
+    """
+    if len(rows) <= max_points:
+        return list(rows)
+
+    x = [_bucket_timestamp(row[0]) for row in rows]
+    normalized = []
+    for column in zip(*(row[2:] for row in rows), strict=True):
+        values = [float(value) for value in column]
+        (low, high) = (min(values), max(values))
+        scale = (high - low) or 1.0
+        normalized.append([(value - low) / scale for value in values])
+    y = list(zip(*normalized, strict=True))
+
+    sampled = [rows[0]]
+    group_size = (len(rows) - 2) / (max_points - 2)
+    selected = 0
+    for i in range(max_points - 2):
+        start = int(i * group_size) + 1
+        end = int((i + 1) * group_size) + 1
+        next_end = min(int((i + 2) * group_size) + 1, len(rows))
+        next_x = sum(x[end:next_end]) / (next_end - end)
+        next_y = [sum(values) / (next_end - end) for values in zip(*y[end:next_end], strict=True)]
+        (a_x, a_y) = (x[selected], y[selected])
+        areas = [
+            sum(
+                abs((a_x - next_x) * (y[k][j] - a_y[j]) - (a_x - x[k]) * (next_y[j] - a_y[j]))
+                for j in range(len(next_y))
+            )
+            for k in range(start, end)
+        ]
+        selected = start + areas.index(max(areas))
+        sampled.append(rows[selected])
+
+    sampled.append(rows[-1])
+    return sampled
+
+
+def min_max_downsample_job_metrics(rows: Sequence[Sequence[Any]], max_points: int) -> list[Sequence[Any]]:
+    """
+    Downsample the aggregated metrics of a single node to the minimum and maximum of groups of rows.
+
+    The rows are split in ``max_points // 2`` groups of consecutive rows, and each group is replaced by
+    two rows: the minimum of every metric at the first bucket of the group and the maximum of every
+    metric at its last bucket. The peaks of every metric are kept, at the cost of the rows not being
+    actual samples anymore.
+
+    Args:
+        rows (Sequence[Sequence[Any]]): The rows ordered by bucket, each one as ``(bucket, node_host, *metrics)``.
+        max_points (int): The maximum number of rows to keep, which must be at least 2.
+
+    Returns:
+        list[Sequence[Any]]: The rows built, ordered by bucket.
+    """
+    if len(rows) <= max_points:
+        return list(rows)
+
+    num_groups = max_points // 2
+    sampled: list[Sequence[Any]] = []
+    for i in range(num_groups):
+        group = rows[i * len(rows) // num_groups : (i + 1) * len(rows) // num_groups]
+        metrics = list(zip(*(row[2:] for row in group), strict=True))
+        (first, last) = (group[0], group[-1])
+        sampled.append((first[0], first[1], *(min(values) for values in metrics)))
+        sampled.append((last[0], last[1], *(max(values) for values in metrics)))
+    return sampled
+
+
+def downsample_job_metrics(
+    rows: Sequence[Sequence[Any]], max_points: int, method: JobSubmissionMetricDownsampling
+) -> list[Sequence[Any]]:
+    """
+    Downsample the aggregated metrics to a maximum number of points per node.
+
+    Args:
+        rows (Sequence[Sequence[Any]]): The rows ordered by bucket, each one as ``(bucket, node_host, *metrics)``.
+        max_points (int): The maximum number of rows to keep for each node.
+        method (JobSubmissionMetricDownsampling): The method used to downsample the rows of each node.
+
+    Returns:
+        list[Sequence[Any]]: The rows kept, ordered by bucket and node.
+    """
+    rows_by_node: dict[str, list[Sequence[Any]]] = {}
+    for row in rows:
+        rows_by_node.setdefault(row[1], []).append(row)
+    if all(len(node_rows) <= max_points for node_rows in rows_by_node.values()):
+        return list(rows)
+
+    match method:
+        case JobSubmissionMetricDownsampling.lttb:
+            downsample = lttb_downsample_job_metrics
+        case JobSubmissionMetricDownsampling.min_max:
+            downsample = min_max_downsample_job_metrics
+        case _ as unreachable:
+            assert_never(unreachable)
+
+    sampled = [row for node_rows in rows_by_node.values() for row in downsample(node_rows, max_points)]
+    return sorted(sampled, key=lambda row: (_bucket_timestamp(row[0]), row[1]))
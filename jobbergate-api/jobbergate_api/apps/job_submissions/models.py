@@ -78,7 +78,10 @@ class JobSubmission(CrudMixin, Base):
     report_message: Mapped[str] = mapped_column(String, nullable=True)
     sbatch_arguments: Mapped[list[str]] = mapped_column(ARRAY(String), nullable=True)
 
-    __table_args__ = (Index("idx_job_submissions_is_archived_updated_at", "is_archived", "updated_at"),)
+    __table_args__ = (
+        Index("idx_job_submissions_is_archived_updated_at", "is_archived", "updated_at"),
+        Index("idx_job_submissions_client_id_updated_at_id", "client_id", "updated_at", "id"),
+    )
 
     job_script: Mapped[JobScript] = relationship(
         "JobScript",
@@ -146,6 +149,28 @@ class JobSubmission(CrudMixin, Base):
         return query.options(selectinload(cls.progress_entries))
 
 
+class JobSubmissionTombstone(CommonMixin, Base):
+    """
+    Job submission tombstone table definition.
+
+    A tombstone is written when a job submission is deleted, so the changes feed can report it as
+    removed to the agent. Tombstones are deleted after ``AGENT_CHANGES_TOMBSTONE_DAYS``.
+
+    Attributes:
+        id: The id of the deleted job submission.
+        client_id: The id of the cluster the deleted job submission ran on.
+        deleted_at: The time the job submission was deleted.
+    """
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    client_id: Mapped[str] = mapped_column(String, nullable=False)
+    deleted_at: Mapped[PendulumDateTime] = mapped_column(
+        DateTimeColumn(timezone=True), nullable=False, default=PendulumDateTime.utcnow
+    )
+
+    __table_args__ = (Index("idx_job_submission_tombstones_client_id_deleted_at_id", "client_id", "deleted_at", "id"),)
+
+
 class TimestampInt(TypeDecorator):
     impl = DateTime(timezone=True)
     cache_ok = True
@@ -2,36 +2,52 @@
 Router for the JobSubmission resource.
 """
 
+import asyncio
 from datetime import datetime, timedelta, timezone
-from typing import Annotated, Any
+from typing import Annotated, Any, Sequence
 
-import msgpack
-from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query, status
+from asyncpg.exceptions import IntegrityConstraintViolationError
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query, Request, status
 from fastapi import Response as FastAPIResponse
-from fastapi_pagination import Page
 from loguru import logger
-from sqlalchemy import insert, select
+from sqlalchemy import select
 from sqlalchemy import text as sa_text
-from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql.functions import max, min
 
+from jobbergate_api.agent_notification import agent_notification_listener
 from jobbergate_api.apps.constants import FileType
 from jobbergate_api.apps.dependencies import SecureService, secure_services
 from jobbergate_api.apps.job_submissions.constants import (
+    AGENT_BATCH_UPDATE_MAX_ITEMS,
+    AGENT_NOTIFICATION_MAX_TIMEOUT,
+    JOB_METRIC_COLUMNAR_CONTENT_TYPE,
+    JOB_METRIC_MAX_POINTS,
+    JOB_METRIC_MIN_POINTS,
+    JOB_METRIC_UPLOAD_CHUNK_SIZE,
+    JobSubmissionMetricDownsampling,
     JobSubmissionMetricSampleRate,
     JobSubmissionStatus,
-    slurm_job_state_details,
 )
 from jobbergate_api.apps.job_submissions.helpers import (
+    build_agent_update_values,
     build_job_metric_aggregation_query,
-    validate_job_metric_upload_input,
+    choose_job_metric_sample_rate,
+    copy_job_metrics,
+    downsample_job_metrics,
+    encode_columnar_job_metrics,
+    iter_columnar_job_metric_records,
+    iter_job_metric_records,
 )
 from jobbergate_api.apps.job_submissions.models import JobSubmissionMetric
 from jobbergate_api.apps.job_submissions.schemas import (
     ActiveJobSubmission,
     JobProgressDetail,
+    JobSubmissionAgentBatchUpdateItem,
+    JobSubmissionAgentBatchUpdateResult,
+    JobSubmissionAgentChanges,
     JobSubmissionAgentMaxTimes,
     JobSubmissionAgentMetricsRequest,
+    JobSubmissionAgentNotification,
     JobSubmissionAgentRejectedRequest,
     JobSubmissionAgentSubmittedRequest,
     JobSubmissionAgentUpdateRequest,
@@ -43,10 +59,11 @@ from jobbergate_api.apps.job_submissions.schemas import (
     JobSubmissionUpdateRequest,
     PendingJobSubmission,
 )
+from jobbergate_api.apps.pagination import Page
 from jobbergate_api.apps.permissions import Permissions, can_bypass_ownership_check
 from jobbergate_api.apps.schemas import ListParams
-from jobbergate_api.email_notification import notify_submission_rejected
-from jobbergate_api.rabbitmq_notification import publish_status_change
+from jobbergate_api.config import settings
+from jobbergate_api.security import IdentityPayload, lockdown_with_identity
 
 router = APIRouter(prefix="/job-submissions", tags=["Job Submissions"])
 
@@ -300,7 +317,7 @@ async def job_submission_cancel(
     )
 
     # Publish status change notification
-    await publish_status_change(
+    await secure_services.outbox.enqueue_status_change(
         updated_job_submission,
         organization_id=secure_services.identity_payload.organization_id,
     )
@@ -309,6 +326,111 @@ async def job_submission_cancel(
 
 
 # The "agent" routes are used for agents to fetch pending job submissions and update their statuses
+@router.put(
+    "/agent/batch",
+    status_code=status.HTTP_200_OK,
+    description="Endpoint for an agent to update the status of multiple job_submissions at once",
+    response_model=list[JobSubmissionAgentBatchUpdateResult],
+    tags=["Agent"],
+)
+async def job_submission_agent_batch_update(
+    secure_services: Annotated[
+        SecureService,
+        Depends(secure_services(Permissions.ADMIN, Permissions.JOB_SUBMISSIONS_UPDATE, ensure_client_id=True)),
+    ],
+    update_items: Annotated[
+        list[JobSubmissionAgentBatchUpdateItem], Body(min_length=1, max_length=AGENT_BATCH_UPDATE_MAX_ITEMS)
+    ],
+):
+    """
+    Update multiple job_submissions with slurm_job_state and slurm_job_info.
+
+    The same rules from the single update endpoint are applied to each item, but the job submissions
+    are loaded, progress entries are created, and job submissions are updated with one statement each.
+
+    An item that fails validation does not prevent the others from being applied. The outcome of each
+    item is reported back with the status code the single update endpoint would have returned for it.
+    """
+    client_id = secure_services.identity_payload.client_id
+    logger.debug(f"Agent is requesting to update {len(update_items)} job submissions on {client_id=}")
+
+    job_submissions = {
+        instance.id: instance
+        for instance in await secure_services.crud.job_submission.list(id={item.id for item in update_items})
+    }
+
+    results: dict[int, JobSubmissionAgentBatchUpdateResult] = {}
+    progress_rows: list[dict[str, Any]] = []
+    update_rows: list[dict[str, Any]] = []
+    finished_ids: set[int] = set()
+    now = datetime.now(timezone.utc)
+
+    for item in update_items:
+        if item.id in results:
+            results[item.id] = JobSubmissionAgentBatchUpdateResult(
+                id=item.id,
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Job submission {item.id} was included more than once in the batch",
+            )
+            continue
+
+        try:
+            job_submission = job_submissions.get(item.id)
+            if job_submission is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"{secure_services.crud.job_submission.name} entry was not found by locator={item.id}",
+                )
+            secure_services.crud.job_submission.ensure_attribute(job_submission, client_id=client_id)
+            update_dict = build_agent_update_values(job_submission, item)
+        except HTTPException as err:
+            logger.warning(f"Rejecting agent update for job_submission {item.id}: {err.detail}")
+            results[item.id] = JobSubmissionAgentBatchUpdateResult(
+                id=item.id, status_code=err.status_code, detail=err.detail
+            )
+            continue
+
+        if job_submission.slurm_job_state != item.slurm_job_state:
+            progress_rows.append(
+                dict(
+                    job_submission_id=item.id,
+                    timestamp=now,
+                    slurm_job_state=item.slurm_job_state,
+                    additional_info=item.slurm_job_state_reason,
+                )
+            )
+        if update_dict.get("status") in (JobSubmissionStatus.ABORTED, JobSubmissionStatus.DONE):
+            finished_ids.add(item.id)
+
+        update_rows.append(dict(id=item.id, **update_dict))
+        results[item.id] = JobSubmissionAgentBatchUpdateResult(id=item.id, status_code=status.HTTP_202_ACCEPTED)
+
+    # Duplicated items invalidate every update in the batch for the same job submission
+    update_rows = [row for row in update_rows if results[row["id"]].status_code == status.HTTP_202_ACCEPTED]
+    accepted_ids = {row["id"] for row in update_rows}
+    progress_rows = [row for row in progress_rows if row["job_submission_id"] in accepted_ids]
+    finished_ids &= accepted_ids
+
+    logger.info(
+        f"Applying {len(update_rows)} out of {len(update_items)} job submission updates on client_id: {client_id}"
+    )
+
+    await secure_services.crud.job_progress.bulk_create(progress_rows)
+    await secure_services.crud.job_submission.bulk_update(update_rows)
+
+    if finished_ids:
+        # The bulk update does not refresh the instances loaded above, so expire them to reload the new values
+        for job_submission_id in finished_ids:
+            secure_services.session.expire(job_submissions[job_submission_id])
+        for job_submission in await secure_services.crud.job_submission.list(id=finished_ids):
+            await secure_services.outbox.enqueue_status_change(
+                job_submission,
+                organization_id=secure_services.identity_payload.organization_id,
+            )
+
+    return [results[item.id] for item in update_items if item.id in results]
+
+
 @router.put(
     "/agent/{job_submission_id}",
     status_code=status.HTTP_202_ACCEPTED,
@@ -334,17 +456,7 @@ async def job_submission_agent_update(
         job_submission_id, ensure_attributes={"client_id": secure_services.identity_payload.client_id}
     )
 
-    if job_submission.status not in {JobSubmissionStatus.SUBMITTED, JobSubmissionStatus.CANCELLED}:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Only SUBMITTED or CANCELLED jobs may be updated by the agent, got {job_submission.status}",
-        )
-
-    if job_submission.slurm_job_id != update_params.slurm_job_id:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"Update slurm job id does not match the job id on record for job submission {job_submission_id=}",
-        )
+    update_dict = build_agent_update_values(job_submission, update_params)
 
     logger.info(
         f"Setting slurm job state status to: {update_params.slurm_job_state} "
@@ -361,26 +473,13 @@ async def job_submission_agent_update(
             additional_info=update_params.slurm_job_state_reason,
         )
 
-    update_dict: dict[str, Any] = {
-        "slurm_job_id": update_params.slurm_job_id,
-        "slurm_job_state": update_params.slurm_job_state,
-        "slurm_job_info": update_params.slurm_job_info,
-    }
-
-    job_state_details = slurm_job_state_details[update_params.slurm_job_state]
-    if job_state_details.is_abort_status:
-        update_dict["status"] = JobSubmissionStatus.ABORTED
-        update_dict["report_message"] = update_params.slurm_job_state_reason
-    elif job_state_details.is_done_status:
-        update_dict["status"] = JobSubmissionStatus.DONE
-
     job_submission = await secure_services.crud.job_submission.update(job_submission_id, **update_dict)
 
     if job_submission.status in (
         JobSubmissionStatus.ABORTED,
         JobSubmissionStatus.DONE,
     ):
-        await publish_status_change(
+        await secure_services.outbox.enqueue_status_change(
             job_submission,
             organization_id=secure_services.identity_payload.organization_id,
         )
@@ -478,13 +577,13 @@ async def job_submissions_agent_rejected(
         additional_info=rejected_request.report_message,
     )
 
-    notify_submission_rejected(
-        rejected_request.id,
+    await secure_services.outbox.enqueue_submission_rejected(
+        job_submission,
         rejected_request.report_message,
-        job_submission.owner_email,
+        organization_id=secure_services.identity_payload.organization_id,
     )
 
-    await publish_status_change(
+    await secure_services.outbox.enqueue_status_change(
         job_submission,
         organization_id=secure_services.identity_payload.organization_id,
     )
@@ -550,6 +649,108 @@ async def job_submissions_agent_active(
     return pages
 
 
+@router.get(
+    "/agent/pending/changes",
+    description="Endpoint to list the changes on pending job_submissions for the requesting client",
+    response_model=JobSubmissionAgentChanges[PendingJobSubmission],
+    response_model_exclude_none=True,
+    tags=["Agent"],
+)
+async def job_submissions_agent_pending_changes(
+    secure_services: Annotated[
+        SecureService,
+        Depends(
+            secure_services(Permissions.ADMIN, Permissions.JOB_SUBMISSIONS_READ, commit=False, ensure_client_id=True)
+        ),
+    ],
+    watermark: str | None = Query(None, description="The watermark returned by the previous request, if any"),
+    size: int = Query(50, ge=1, le=100, description="The maximum number of changes to return"),
+):
+    """Get the pending job submissions created or removed since the watermark for the cluster-agent."""
+    logger.debug("Agent is requesting the changes on pending job submissions")
+
+    client_id = secure_services.identity_payload.client_id
+    assert client_id is not None  # Guaranteed by ensure_client_id
+
+    logger.info(f"Fetching changes on pending job_submissions for {client_id=}")
+
+    changes = await secure_services.crud.job_submission.list_changes(
+        client_id=client_id,
+        statuses={JobSubmissionStatus.CREATED},
+        watermark=watermark,
+        size=size,
+        include_files=True,
+        include_parent=True,
+    )
+    return changes._asdict()
+
+
+@router.get(
+    "/agent/active/changes",
+    description="Endpoint to list the changes on active job_submissions for the requesting client",
+    response_model=JobSubmissionAgentChanges[ActiveJobSubmission],
+    tags=["Agent"],
+)
+async def job_submissions_agent_active_changes(
+    secure_services: Annotated[
+        SecureService,
+        Depends(
+            secure_services(Permissions.ADMIN, Permissions.JOB_SUBMISSIONS_READ, commit=False, ensure_client_id=True)
+        ),
+    ],
+    watermark: str | None = Query(None, description="The watermark returned by the previous request, if any"),
+    size: int = Query(50, ge=1, le=100, description="The maximum number of changes to return"),
+):
+    """Get the active job submissions updated or removed since the watermark for the cluster-agent."""
+    logger.debug("Agent is requesting the changes on active job submissions")
+
+    client_id = secure_services.identity_payload.client_id
+    assert client_id is not None  # Guaranteed by ensure_client_id
+
+    logger.info(f"Fetching changes on active job_submissions for {client_id=}")
+
+    changes = await secure_services.crud.job_submission.list_changes(
+        client_id=client_id,
+        statuses={JobSubmissionStatus.SUBMITTED, JobSubmissionStatus.CANCELLED},
+        watermark=watermark,
+        size=size,
+    )
+    return changes._asdict()
+
+
+@router.get(
+    "/agent/notifications",
+    description="Endpoint to wait until job_submissions are created or cancelled for the requesting client",
+    response_model=JobSubmissionAgentNotification,
+    tags=["Agent"],
+)
+async def job_submissions_agent_notifications(
+    identity_payload: Annotated[
+        IdentityPayload,
+        Depends(lockdown_with_identity(Permissions.ADMIN, Permissions.JOB_SUBMISSIONS_READ, ensure_client_id=True)),
+    ],
+    timeout: int = Query(
+        30,
+        ge=1,
+        le=AGENT_NOTIFICATION_MAX_TIMEOUT,
+        description="The maximum number of seconds to wait for a notification",
+    ),
+):
+    """
+    Wait until a job submission is created or cancelled for the cluster-agent (long-poll).
+
+    No database session is held while waiting, the notifications are received on a connection
+    shared by all the agents.
+    """
+    client_id = identity_payload.client_id
+    assert client_id is not None  # Guaranteed by ensure_client_id
+    logger.debug(f"Agent is waiting for notifications for {client_id=}")
+
+    override_db_name = identity_payload.organization_id if settings.MULTI_TENANCY_ENABLED else None
+    statuses = await agent_notification_listener.wait(client_id, timeout, override_db_name=override_db_name)
+    return JobSubmissionAgentNotification(statuses=sorted(statuses))
+
+
 @router.get(
     "/agent/metrics/{job_submission_id}",
     description="Endpoint to get metrics for a job submission",
@@ -598,19 +799,40 @@ async def job_submissions_agent_metrics(
         status.HTTP_204_NO_CONTENT: {"description": "Metrics uploaded successfully"},
         status.HTTP_400_BAD_REQUEST: {"description": "Either invalid metrics data or duplicate metrics data"},
     },
+    openapi_extra={
+        "requestBody": {
+            "description": "The binary data to upload, encoded with msgpack either as a list of rows or columnar",
+            "required": True,
+            "content": {
+                "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+                JOB_METRIC_COLUMNAR_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+            },
+        },
+    },
     tags=["Agent", "Metrics"],
 )
 async def job_submissions_agent_metrics_upload(
     job_submission_id: int,
+    request: Request,
     secure_services: Annotated[
         SecureService,
         Depends(
             secure_services(Permissions.ADMIN, Permissions.JOB_SUBMISSIONS_UPDATE, ensure_client_id=True, commit=True)
         ),
     ],
-    body: Annotated[bytes, Body(description="The binary data to upload")],
+    ignore_duplicates: Annotated[
+        bool,
+        Query(description="Skip the metrics that were already uploaded instead of rejecting the whole upload."),
+    ] = False,
 ):
-    """Upload metrics for a job submission."""
+    """
+    Upload metrics for a job submission.
+
+    The body is decoded as it is streamed and the metrics are inserted with PostgreSQL COPY,
+    so there is no limit on the number of rows that can be uploaded at once.
+
+    When the body is sent with the columnar content type, it is decoded from one typed buffer per column instead.
+    """
     logger.debug(f"Agent is uploading metrics for job submission {job_submission_id}")
 
     logger.debug(f"Getting slurm_job_id of job submission {job_submission_id}")
@@ -620,49 +842,24 @@ async def job_submissions_agent_metrics_upload(
     slurm_job_id = job_submission.slurm_job_id
     logger.debug(f"Got slurm_job_id {slurm_job_id}")
 
-    logger.debug("Decoding binary data")
-    data = msgpack.unpackb(body)
-
-    logger.debug("Asserting the decoded binary data structure")
+    logger.debug("Inserting metrics into the database")
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
     try:
-        data = validate_job_metric_upload_input(
-            data, (int, str, int, int, float, float, float, int, float, int, int, int, int, int)
-        )
+        if content_type == JOB_METRIC_COLUMNAR_CONTENT_TYPE:
+            records = iter_columnar_job_metric_records(
+                await request.body(), job_submission_id, slurm_job_id, JOB_METRIC_UPLOAD_CHUNK_SIZE
+            )
+        else:
+            records = iter_job_metric_records(
+                request.stream(), job_submission_id, slurm_job_id, JOB_METRIC_UPLOAD_CHUNK_SIZE
+            )
+        await copy_job_metrics(secure_services.session, records, ignore_duplicates=ignore_duplicates)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e),
         ) from e
-    else:
-        logger.debug("Decoded data is valid")
-
-    logger.debug("Inserting metrics into the database")
-    query = insert(JobSubmissionMetric).values(
-        [
-            {
-                "time": data_point[0],
-                "node_host": data_point[1],
-                "step": data_point[2],
-                "task": data_point[3],
-                "cpu_frequency": data_point[4],
-                "cpu_time": data_point[5],
-                "cpu_utilization": data_point[6],
-                "gpu_memory": data_point[7],
-                "gpu_utilization": data_point[8],
-                "page_faults": data_point[9],
-                "memory_rss": data_point[10],
-                "disk_read": data_point[11],
-                "memory_virtual": data_point[12],
-                "disk_write": data_point[13],
-                "job_submission_id": job_submission_id,
-                "slurm_job_id": slurm_job_id,
-            }
-            for data_point in data
-        ]
-    )
-    try:
-        await secure_services.session.execute(query)
-    except IntegrityError as e:
+    except IntegrityConstraintViolationError as e:
         logger.error(f"Failed to insert metrics: {e.args}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -676,10 +873,18 @@ async def job_submissions_agent_metrics_upload(
     "/{job_submission_id}/metrics",
     description="Endpoint to get metrics for a job submission",
     response_model=list[JobSubmissionMetricSchema],
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The metrics, either as JSON or in the columnar format if it is accepted",
+            "content": {JOB_METRIC_COLUMNAR_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}}},
+        },
+    },
     tags=["Metrics"],
 )
 async def job_submissions_metrics(
     job_submission_id: int,
+    request: Request,
+    response: FastAPIResponse,
     secure_services: Annotated[
         SecureService,
         Depends(secure_services(Permissions.ADMIN, Permissions.JOB_SUBMISSIONS_READ, commit=False)),
@@ -698,8 +903,35 @@ async def job_submissions_metrics(
         datetime | None,
         Query(description="End time for the metrics query. If omitted, assume the window to be up to the present."),
     ] = None,
+    max_points: Annotated[
+        int | None,
+        Query(
+            ge=JOB_METRIC_MIN_POINTS,
+            le=JOB_METRIC_MAX_POINTS,
+            description=(
+                "Maximum number of points per node. If provided, the sample rate is chosen from the time window "
+                "and the metrics are downsampled to fit, overriding the sample_rate."
+            ),
+        ),
+    ] = None,
+    downsampling: Annotated[
+        JobSubmissionMetricDownsampling,
+        Query(description="Method used to downsample the metrics when max_points is provided."),
+    ] = JobSubmissionMetricDownsampling.lttb,
 ):
-    """Get the metrics for a job submission."""
+    """
+    Get the metrics for a job submission.
+
+    When ``max_points`` is provided, the coarsest view that still provides that many buckets over the
+    time window is queried, and the rows of each node are downsampled if they are still too many,
+    in a separate thread so the event loop is not blocked.
+
+    The views of the sample rates in ``METRICS_REAL_TIME_SAMPLE_RATES`` are read in real-time, so the
+    metrics that are not materialized yet are included at the cost of aggregating them on the fly.
+
+    When the columnar content type is accepted, the metrics are encoded straight from the rows,
+    with one typed buffer per column, instead of being serialized as JSON.
+    """
     start_time = start_time or (datetime.now(tz=timezone.utc) - timedelta(hours=1))
     logger.debug(f"Getting metrics for job submission {job_submission_id}")
     if end_time is not None and end_time < start_time:
@@ -708,8 +940,11 @@ async def job_submissions_metrics(
             detail="End time must be greater than the start time.",
         )
     end_time = end_time or datetime.now(tz=timezone.utc)
+    if max_points is not None:
+        sample_rate = choose_job_metric_sample_rate(start_time, end_time, max_points)
 
-    query = build_job_metric_aggregation_query(node, sample_rate)
+    real_time = sample_rate in settings.METRICS_REAL_TIME_SAMPLE_RATES
+    query = build_job_metric_aggregation_query(node, sample_rate, real_time=real_time)
     query_params = {
         "job_submission_id": job_submission_id,
         "start_time": start_time,
@@ -719,7 +954,19 @@ async def job_submissions_metrics(
         query_params["node_host"] = node
 
     result = await secure_services.session.execute(sa_text(query), query_params)
-    return [JobSubmissionMetricSchema.from_iterable(row, skip_optional=True) for row in result.fetchall()]
+    rows: Sequence[Sequence[Any]] = result.fetchall()
+    if max_points is not None:
+        rows = await asyncio.to_thread(downsample_job_metrics, rows, max_points, downsampling)
+
+    response.headers["Vary"] = "Accept"
+    accepted_types = {media_type.split(";")[0].strip() for media_type in request.headers.get("accept", "").split(",")}
+    if JOB_METRIC_COLUMNAR_CONTENT_TYPE in accepted_types:
+        return FastAPIResponse(
+            content=encode_columnar_job_metrics(rows),
+            media_type=JOB_METRIC_COLUMNAR_CONTENT_TYPE,
+            headers={"Vary": "Accept"},
+        )
+    return [JobSubmissionMetricSchema.from_iterable(row, skip_optional=True) for row in rows]
 
 
 @router.get(
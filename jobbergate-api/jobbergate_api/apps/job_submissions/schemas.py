@@ -4,7 +4,7 @@ JobSubmission resource schema.
 
 from collections.abc import Iterable
 from datetime import datetime
-from typing import Self
+from typing import Generic, Self, TypeVar
 
 from pydantic import BaseModel, ConfigDict, Field, NonNegativeInt, field_validator
 
@@ -220,6 +220,32 @@ class ActiveJobSubmission(BaseModel):
     model_config = ConfigDict(from_attributes=True, extra="ignore")
 
 
+T = TypeVar("T")
+
+
+class JobSubmissionAgentChanges(BaseModel, Generic[T]):
+    """
+    Specialized model for the cluster-agent to pull the changes on a set of job_submissions.
+
+    The watermark should be passed back on the next request to get the changes that follow.
+    """
+
+    items: list[T] = Field(description="The job submissions that entered the set or changed in it")
+    removed_ids: list[int] = Field(description="The ids of the job submissions that left the set")
+    watermark: str = Field(description="Opaque token that marks the position of the changes already listed")
+    has_more: bool = Field(description="Whether more changes are available right away")
+
+
+class JobSubmissionAgentNotification(BaseModel):
+    """
+    Specialized model for the cluster-agent to be notified of the job_submissions it has to act on.
+    """
+
+    statuses: list[JobSubmissionStatus] = Field(
+        description="The statuses of the job submissions created or updated, empty if the wait timed out"
+    )
+
+
 class JobSubmissionAgentSubmittedRequest(BaseModel):
     """Request model for marking JobSubmission instances as SUBMITTED."""
 
@@ -252,6 +278,20 @@ class JobSubmissionAgentUpdateRequest(BaseModel):
     model_config = ConfigDict(json_schema_extra=job_submission_meta_mapper)
 
 
+class JobSubmissionAgentBatchUpdateItem(JobSubmissionAgentUpdateRequest):
+    """Request model for updating one of the JobSubmission instances included in a batch."""
+
+    id: int
+
+
+class JobSubmissionAgentBatchUpdateResult(BaseModel):
+    """Model for the outcome of each item in a batch update requested by the agent."""
+
+    id: int
+    status_code: int
+    detail: str | None = None
+
+
 class JobSubmissionAgentMaxTimes(BaseModel):
     """Model for the max_times field of the JobSubmissionMetricsMaxResponse."""
 
@@ -1,20 +1,99 @@
 """Services for the job_submissions resource, including module specific business logic."""
 
+from collections.abc import Collection, Iterable
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple
+
+from buzz import handle_errors, require_condition
+from fastapi import status
 from loguru import logger
 from pendulum.datetime import DateTime as PendulumDateTime
-from sqlalchemy import delete, select, update
+from sqlalchemy import delete, func, insert, null, select, text, union_all, update
 from sqlalchemy.sql.expression import Select
 
-from jobbergate_api.apps.job_submissions.models import JobSubmission
-from jobbergate_api.apps.services import AutoCleanResponse, CrudService
+from jobbergate_api.agent_notification import (
+    AGENT_NOTIFICATION_CHANNEL,
+    AGENT_NOTIFICATION_STATUSES,
+    build_agent_notification_payload,
+)
+from jobbergate_api.apps.job_submissions.constants import JOB_METRIC_MIN_RETENTION_DAYS, JobSubmissionStatus
+from jobbergate_api.apps.job_submissions.models import JobSubmission, JobSubmissionTombstone
+from jobbergate_api.apps.pagination import Cursor, keyset_clause
+from jobbergate_api.apps.services import AutoCleanResponse, CrudService, ServiceError
 from jobbergate_api.config import settings
 
 
+class ChangesResponse(NamedTuple):
+    """
+    Named tuple for the response of list_changes.
+    """
+
+    items: list[JobSubmission]
+    removed_ids: list[int]
+    watermark: str
+    has_more: bool
+
+
 class JobSubmissionService(CrudService):
     """
     Provide a CrudService that overloads the list query builder.
     """
 
+    async def create(self, **incoming_data) -> JobSubmission:
+        """
+        Add a new job submission to the database and notify its agent.
+        """
+        instance = await super().create(**incoming_data)
+        await self.notify_agent(instance)
+        return instance
+
+    async def update(self, locator, **incoming_data) -> JobSubmission:
+        """
+        Update a job submission and notify its agent if the status changed.
+        """
+        instance = await super().update(locator, **incoming_data)
+        if "status" in incoming_data:
+            await self.notify_agent(instance)
+        return instance
+
+    async def delete(self, locator: Any) -> None:
+        """
+        Delete a job submission and write its tombstone for the changes feed.
+        """
+        query = (
+            delete(JobSubmission)
+            .where(self.locate_where_clause(locator))
+            .returning(JobSubmission.id, JobSubmission.client_id)
+        )
+        deleted = [(id, client_id) for (id, client_id) in await self.session.execute(query)]
+        require_condition(
+            len(deleted) == 1,
+            f"{self.name} entry was not found by {locator=}",
+            raise_exc_class=ServiceError,
+            raise_kwargs={"status_code": status.HTTP_404_NOT_FOUND},
+        )
+        await self.write_tombstones(deleted)
+
+    async def write_tombstones(self, deleted: Iterable[tuple[int, str]]) -> None:
+        """
+        Write the tombstones of the deleted job submissions, given as pairs of id and client id.
+        """
+        values = [{"id": id, "client_id": client_id} for (id, client_id) in deleted]
+        if values:
+            await self.session.execute(insert(JobSubmissionTombstone), values)
+
+    async def notify_agent(self, instance: JobSubmission) -> None:
+        """
+        Notify the agent of a job submission that it has to act on it.
+
+        Only the statuses the agent acts on are notified. The notification is delivered by PostgreSQL
+        once the transaction is committed, so it is dropped if the transaction is rolled back.
+        """
+        if instance.status not in AGENT_NOTIFICATION_STATUSES:
+            return
+        payload = build_agent_notification_payload(instance.client_id, instance.status)
+        await self.session.execute(select(func.pg_notify(AGENT_NOTIFICATION_CHANNEL, payload)))
+
     def build_list_query(
         self,
         sort_ascending: bool = True,
@@ -42,12 +121,161 @@ class JobSubmissionService(CrudService):
             query = query.where(JobSubmission.slurm_job_id.in_(filter_slurm_job_ids))
         return query
 
+    async def list_changes(
+        self,
+        client_id: str,
+        statuses: Collection[JobSubmissionStatus],
+        watermark: str | None = None,
+        size: int = 50,
+        include_files: bool = False,
+        include_parent: bool = False,
+    ) -> ChangesResponse:
+        """
+        List the job submissions of a client that entered or left a set of statuses since a watermark.
+
+        Without a watermark, a snapshot of the set is returned, paged by id. Once the snapshot is
+        complete, the watermark switches to the last update time seen, so the following calls only
+        return the rows updated since then: the ones still in the set as items, and the others,
+        including the deleted ones, as removed ids. Rows updated within ``AGENT_CHANGES_SAFETY_WINDOW``
+        seconds are sent again in the next call, so updates committed out of order are not missed.
+
+        The deleted job submissions are only reported for ``AGENT_CHANGES_TOMBSTONE_DAYS``, so older
+        watermarks are rejected as expired and a new snapshot must be taken.
+        """
+        now = PendulumDateTime.utcnow()
+        if watermark is None:
+            cursor = Cursor(sort_field="id", sort_ascending=True, value=now, id=0)
+        else:
+            with handle_errors("Invalid watermark", handle_exc_class=ValueError, raise_exc_class=ServiceError):
+                cursor = Cursor.decode(watermark)
+            require_condition(
+                cursor.sort_field in {"id", "updated_at"}
+                and cursor.sort_ascending
+                and isinstance(cursor.value, datetime)
+                and cursor.value.tzinfo is not None,
+                "Invalid watermark",
+                raise_exc_class=ServiceError,
+            )
+            require_condition(
+                cursor.sort_field == "id"
+                or cursor.value >= now - timedelta(days=settings.AGENT_CHANGES_TOMBSTONE_DAYS),
+                "Expired watermark",
+                raise_exc_class=ServiceError,
+            )
+
+        if cursor.sort_field == "id":
+            return await self._list_snapshot(cursor, client_id, statuses, size, include_files, include_parent)
+        return await self._list_updates(cursor, now, client_id, statuses, size, include_files, include_parent)
+
+    async def _list_snapshot(
+        self,
+        cursor: Cursor,
+        client_id: str,
+        statuses: Collection[JobSubmissionStatus],
+        size: int,
+        include_files: bool,
+        include_parent: bool,
+    ) -> ChangesResponse:
+        """
+        List a page of the job submissions in the set, ordered by id, for the initial sync.
+
+        The time the snapshot started is carried in the watermark, so the updates made while
+        the snapshot is paged through are listed once it is complete.
+        """
+        query = (
+            self.build_list_query(
+                client_id=client_id,
+                status=set(statuses),
+                include_files=include_files,
+                include_parent=include_parent,
+            )
+            .where(JobSubmission.id > cursor.id)
+            .order_by(JobSubmission.id)
+            .limit(size + 1)
+        )
+        result = await self.session.execute(query)
+        instances = list(result.unique().scalars())
+
+        has_more = len(instances) > size
+        if has_more:
+            instances = instances[:size]
+            next_cursor = cursor._replace(id=instances[-1].id)
+        else:
+            next_cursor = Cursor(
+                sort_field="updated_at",
+                sort_ascending=True,
+                value=cursor.value - timedelta(seconds=settings.AGENT_CHANGES_SAFETY_WINDOW),
+                id=0,
+            )
+        return ChangesResponse(items=instances, removed_ids=[], watermark=next_cursor.encode(), has_more=has_more)
+
+    async def _list_updates(
+        self,
+        cursor: Cursor,
+        now: PendulumDateTime,
+        client_id: str,
+        statuses: Collection[JobSubmissionStatus],
+        size: int,
+        include_files: bool,
+        include_parent: bool,
+    ) -> ChangesResponse:
+        """
+        List the job submissions updated or deleted after the watermark, ordered by the time of the change.
+
+        Only the key columns are selected to tell the rows still in the set from the ones that left
+        it, then the rows still in the set are loaded in full. The tombstones of the deleted job
+        submissions have no status, so they are always reported as removed.
+        """
+        changes = union_all(
+            select(
+                JobSubmission.id,
+                JobSubmission.status,
+                JobSubmission.updated_at.label("changed_at"),
+            ).where(JobSubmission.client_id == client_id),
+            select(
+                JobSubmissionTombstone.id,
+                null().label("status"),
+                JobSubmissionTombstone.deleted_at.label("changed_at"),
+            ).where(JobSubmissionTombstone.client_id == client_id),
+        ).subquery()
+        query = (
+            select(changes)
+            .where(keyset_clause(changes.c.changed_at, changes.c.id, cursor))
+            .order_by(changes.c.changed_at, changes.c.id)
+            .limit(size + 1)
+        )
+        rows = list((await self.session.execute(query)).all())
+
+        has_more = len(rows) > size
+        rows = rows[:size]
+        current_ids = [row.id for row in rows if row.status in statuses]
+        removed_ids = [row.id for row in rows if row.status not in statuses]
+
+        items: list[JobSubmission] = []
+        if current_ids:
+            instances = await self.list(id=current_ids, include_files=include_files, include_parent=include_parent)
+            instances_by_id = {instance.id: instance for instance in instances}
+            items = [instances_by_id[id] for id in current_ids if id in instances_by_id]
+
+        if has_more:
+            next_cursor = cursor._replace(value=rows[-1].changed_at, id=rows[-1].id)
+        else:
+            settled = Cursor(
+                sort_field="updated_at",
+                sort_ascending=True,
+                value=now - timedelta(seconds=settings.AGENT_CHANGES_SAFETY_WINDOW),
+                id=0,
+            )
+            next_cursor = max(cursor, settled, key=lambda c: (c.value, c.id))
+        return ChangesResponse(items=items, removed_ids=removed_ids, watermark=next_cursor.encode(), has_more=has_more)
+
     async def clean_unused_entries(self) -> AutoCleanResponse:
         """
         Automatically clean unused job submissions depending on a threshold.
 
         Based on the last time each job submission was updated, this will archive job
         submissions that were unarchived and delete job submissions that were archived.
+        The tombstones older than ``AGENT_CHANGES_TOMBSTONE_DAYS`` are deleted as well.
         """
         result = AutoCleanResponse(archived=set(), deleted=set())
 
@@ -61,11 +289,17 @@ class JobSubmissionService(CrudService):
             delete_query = (
                 delete(self.model_type)  # type: ignore
                 .where(self.model_type.id.in_(query_unused_job_submissions))
-                .returning(self.model_type.id)
+                .returning(self.model_type.id, self.model_type.client_id)
             )
-            deleted = await self.session.execute(delete_query)
-            result.deleted.update(row[0] for row in deleted.all())
+            deleted = [(id, client_id) for (id, client_id) in await self.session.execute(delete_query)]
+            await self.write_tombstones(deleted)
+            result.deleted.update(row[0] for row in deleted)
         logger.debug(f"Job submissions deleted: {result.deleted}")
+
+        tombstones_threshold = PendulumDateTime.utcnow().subtract(days=settings.AGENT_CHANGES_TOMBSTONE_DAYS)
+        await self.session.execute(
+            delete(JobSubmissionTombstone).where(JobSubmissionTombstone.deleted_at < tombstones_threshold)
+        )
         logger.debug(f"{settings.AUTO_CLEAN_JOB_SUBMISSIONS_DAYS_TO_ARCHIVE=}")
 
         if settings.AUTO_CLEAN_JOB_SUBMISSIONS_DAYS_TO_ARCHIVE is not None:
@@ -87,6 +321,61 @@ class JobSubmissionService(CrudService):
 
         return result
 
+    async def sync_metric_policies(self) -> None:
+        """
+        Apply the compression and retention policies of the raw job metrics configured in the settings.
+
+        A policy is only replaced when its interval changed, so the schedule of the background job
+        TimescaleDB runs for it is kept otherwise.
+        """
+        await self._sync_metric_policy("compression", "compress_after", settings.METRICS_COMPRESS_AFTER_DAYS)
+        await self._sync_metric_policy("retention", "drop_after", get_job_metric_retention_days())
+
+    async def _sync_metric_policy(self, kind: str, interval_key: str, days: int | None) -> None:
+        """
+        Replace a policy of the raw job metrics if its interval does not match the given days.
+        """
+        current = await self.session.scalar(
+            text(
+                "SELECT (config->>:interval_key)::interval FROM timescaledb_information.jobs "
+                "WHERE hypertable_name = 'job_submission_metrics' AND proc_name = :proc_name"
+            ),
+            {"interval_key": interval_key, "proc_name": f"policy_{kind}"},
+        )
+        expected = None if days is None else timedelta(days=days)
+        if current == expected:
+            return
+
+        logger.info(f"Updating the {kind} policy of the job metrics from {current} to {expected}")
+        if current is not None:
+            await self.session.execute(
+                text(f"SELECT remove_{kind}_policy('job_submission_metrics', if_exists => true)")
+            )
+        if days is not None:
+            await self.session.execute(
+                text(f"SELECT add_{kind}_policy('job_submission_metrics', make_interval(days => :days))"),
+                {"days": days},
+            )
+
+
+def get_job_metric_retention_days() -> int | None:
+    """
+    Get the number of days the raw job metrics are kept for, according to the settings.
+    """
+    days = settings.METRICS_RETENTION_DAYS
+    if days is None and settings.METRICS_RETENTION_FROM_AUTO_CLEAN:
+        days_to_archive = settings.AUTO_CLEAN_JOB_SUBMISSIONS_DAYS_TO_ARCHIVE
+        days_to_delete = settings.AUTO_CLEAN_JOB_SUBMISSIONS_DAYS_TO_DELETE
+        if days_to_archive is not None and days_to_delete is not None:
+            days = days_to_archive + days_to_delete
+    if days is not None and days < JOB_METRIC_MIN_RETENTION_DAYS:
+        logger.warning(
+            f"Keeping the raw job metrics for {JOB_METRIC_MIN_RETENTION_DAYS} days instead of {days}, "
+            "so the weekly views can still be refreshed"
+        )
+        days = JOB_METRIC_MIN_RETENTION_DAYS
+    return days
+
 
 class JobProgressService(CrudService):
     """
@@ -189,17 +189,24 @@ class FileMixin(CommonMixin, TimestampMixin):
     Add needed columns and declared attributes for all models that support a FileService.
 
     Attributes:
-        parent_id:   The id of the parent row in another table.
-                     Note: Derived classes should override this attribute to make it a foreign key as well.
-        description: The description of the job script template.
+        parent_id:    The id of the parent row in another table.
+                      Note: Derived classes should override this attribute to make it a foreign key as well.
+        description:  The description of the job script template.
+        content_hash: The SHA-256 digest of the content, for files kept in the content-addressed storage.
     """
 
     parent_id: Mapped[int] = mapped_column(Integer, primary_key=True)
     filename: Mapped[str] = mapped_column(String, primary_key=True)
+    content_hash: Mapped[str | None] = mapped_column(String, nullable=True)
 
     @hybrid_property
     def file_key(self) -> str:
         """
         Dynamically define the s3 key for the file.
+
+        Files in the content-addressed storage are keyed by their content, so the files with the same
+        content in a table share a single object. Otherwise, each file has its own object.
         """
+        if self.content_hash is not None:
+            return f"{self.__tablename__}/sha256/{self.content_hash}"
         return f"{self.__tablename__}/{self.parent_id}/{self.filename}"
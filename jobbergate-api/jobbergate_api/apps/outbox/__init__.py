@@ -0,0 +1 @@
+"""Module to deliver the notifications of the job submissions through a transactional outbox."""
@@ -0,0 +1,14 @@
+"""
+Describe constants for the outbox module.
+"""
+
+from auto_name_enum import AutoNameEnum, auto
+
+
+class OutboxMessageKind(AutoNameEnum):
+    """
+    Defines the kinds of messages that can be delivered through the outbox.
+    """
+
+    STATUS_CHANGE = auto()
+    SUBMISSION_REJECTED = auto()
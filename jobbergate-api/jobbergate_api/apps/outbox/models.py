@@ -0,0 +1,47 @@
+"""
+Database model for the messages waiting in the outbox.
+"""
+
+from typing import Any
+
+from pendulum.datetime import DateTime as PendulumDateTime
+from sqlalchemy import BigInteger, DateTime, Enum, Index, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from jobbergate_api.apps.models import Base, CommonMixin
+from jobbergate_api.apps.outbox.constants import OutboxMessageKind
+
+
+class OutboxMessage(CommonMixin, Base):
+    """
+    Outbox message table definition.
+
+    A message is written in the same transaction as the change that causes it, and it is deleted
+    once it is delivered by the outbox dispatcher.
+
+    Attributes:
+        id: The id of the message, also used to deliver the messages in order.
+        kind: The kind of message, that determines how it is delivered.
+        payload: The content of the message.
+        organization_id: The organization the message belongs to.
+        attempts: The number of failed attempts to deliver the message.
+        available_at: The time after which the message may be delivered (again).
+        last_error: The error raised by the last failed attempt.
+        created_at: The time the message was written.
+    """
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    kind: Mapped[OutboxMessageKind] = mapped_column(Enum(OutboxMessageKind, native_enum=False), nullable=False)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
+    organization_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    available_at: Mapped[PendulumDateTime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=PendulumDateTime.utcnow
+    )
+    last_error: Mapped[str | None] = mapped_column(String, nullable=True)
+    created_at: Mapped[PendulumDateTime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=PendulumDateTime.utcnow
+    )
+
+    __table_args__ = (Index("idx_outbox_messages_available_at_id", "available_at", "id"),)
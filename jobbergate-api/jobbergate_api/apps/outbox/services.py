@@ -0,0 +1,244 @@
+"""
+Services for the outbox, where the notifications of the job submissions wait to be delivered.
+
+The notifications are written to the outbox in the same transaction as the change that causes them,
+so they are only delivered if the change is committed, and the requests do not wait on RabbitMQ or
+SendGrid. The outbox dispatcher delivers them in the background, in batches, retrying the ones that
+fail with an exponential backoff. A message may be delivered more than once if the API is stopped
+while delivering it, but it is never lost.
+"""
+
+import asyncio
+import contextlib
+from typing import Any
+
+from loguru import logger
+from pendulum.datetime import DateTime as PendulumDateTime
+from sqlalchemy import delete, event, select
+from sqlalchemy.orm import Session
+
+from jobbergate_api.apps.job_submissions.models import JobSubmission
+from jobbergate_api.apps.outbox.constants import OutboxMessageKind
+from jobbergate_api.apps.outbox.models import OutboxMessage
+from jobbergate_api.apps.services import DatabaseBoundService
+from jobbergate_api.config import settings
+from jobbergate_api.email_notification import notify_submission_rejected
+from jobbergate_api.rabbitmq_notification import build_status_change_payload, publish_notification
+from jobbergate_api.storage import engine_factory
+
+
+class OutboxService(DatabaseBoundService):
+    """
+    Provide a service to write messages to the outbox and to deliver them.
+    """
+
+    async def enqueue(
+        self,
+        kind: OutboxMessageKind,
+        payload: dict[str, Any],
+        organization_id: str | None = None,
+    ) -> OutboxMessage:
+        """
+        Write a message to the outbox in the current transaction.
+
+        The outbox dispatcher is woken up once the transaction is committed.
+        """
+        message = OutboxMessage(kind=kind, payload=payload, organization_id=organization_id)
+        self.session.add(message)
+        outbox_dispatcher.register(organization_id if settings.MULTI_TENANCY_ENABLED else None)
+        if not event.contains(self.session.sync_session, "after_commit", wake_outbox_dispatcher):
+            event.listen(self.session.sync_session, "after_commit", wake_outbox_dispatcher)
+        return message
+
+    async def enqueue_status_change(
+        self, job_submission: JobSubmission, organization_id: str | None = None
+    ) -> OutboxMessage | None:
+        """
+        Write the status change of a job submission to the outbox, unless RabbitMQ is not configured.
+        """
+        if settings.RABBITMQ_HOST is None:
+            return None
+        return await self.enqueue(
+            OutboxMessageKind.STATUS_CHANGE,
+            build_status_change_payload(job_submission),
+            organization_id=organization_id,
+        )
+
+    async def enqueue_submission_rejected(
+        self, job_submission: JobSubmission, report_message: str, organization_id: str | None = None
+    ) -> OutboxMessage | None:
+        """
+        Write the email notifying the owner of a rejected job submission to the outbox, unless SendGrid is not configured.
+        """
+        if settings.SENDGRID_API_KEY is None:
+            return None
+        return await self.enqueue(
+            OutboxMessageKind.SUBMISSION_REJECTED,
+            {
+                "job_submission_id": job_submission.id,
+                "report_message": report_message,
+                "to_emails": job_submission.owner_email,
+            },
+            organization_id=organization_id,
+        )
+
+    async def deliver(self, message: OutboxMessage) -> None:
+        """
+        Deliver a message, raising an exception if it fails.
+        """
+        match message.kind:
+            case OutboxMessageKind.STATUS_CHANGE:
+                if not await publish_notification(message.payload, organization_id=message.organization_id):
+                    raise RuntimeError("The status change was not confirmed by RabbitMQ")
+            case OutboxMessageKind.SUBMISSION_REJECTED:
+                await asyncio.to_thread(notify_submission_rejected, **message.payload, skip_on_failure=False)
+            case _:
+                raise ValueError(f"Unknown outbox message kind: {message.kind}")
+
+    async def dispatch(self, limit: int) -> int:
+        """
+        Deliver a batch of the messages that are available, up to ``limit``, in the order they were written.
+
+        The messages are locked while they are delivered, and the ones locked by another API instance
+        are skipped. The delivered messages are deleted, the failed ones are retried later with an
+        exponential backoff, until ``OUTBOX_MAX_ATTEMPTS`` is reached and they are dropped.
+
+        Returns the number of messages in the batch.
+        """
+        now = PendulumDateTime.utcnow()
+        query = (
+            select(OutboxMessage)
+            .where(OutboxMessage.available_at <= now)
+            .order_by(OutboxMessage.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        messages = (await self.session.execute(query)).scalars().all()
+        if not messages:
+            return 0
+
+        logger.debug(f"Delivering {len(messages)} outbox message(s)")
+        results = await asyncio.gather(*(self.deliver(message) for message in messages), return_exceptions=True)
+
+        finished_ids = []
+        for message, result in zip(messages, results, strict=True):
+            if not isinstance(result, BaseException):
+                finished_ids.append(message.id)
+                continue
+            message.attempts += 1
+            message.last_error = str(result)
+            if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                logger.error(
+                    f"Dropping outbox message {message.id} ({message.kind}) after {message.attempts} attempts: {result}"
+                )
+                finished_ids.append(message.id)
+                continue
+            delay = settings.OUTBOX_RETRY_DELAY * 2 ** (message.attempts - 1)
+            message.available_at = now.add(seconds=delay)
+            logger.warning(
+                f"Failed to deliver outbox message {message.id} ({message.kind}), retrying in {delay} seconds: {result}"
+            )
+
+        await self.session.flush()
+        if finished_ids:
+            await self.session.execute(
+                delete(OutboxMessage)
+                .where(OutboxMessage.id.in_(finished_ids))
+                .execution_options(synchronize_session=False)
+            )
+        return len(messages)
+
+
+def wake_outbox_dispatcher(_session: Session) -> None:
+    """
+    Wake up the outbox dispatcher when a transaction that wrote messages to the outbox is committed.
+    """
+    outbox_dispatcher.wake()
+
+
+class OutboxDispatcher:
+    """
+    Deliver the messages in the outbox of each database in the background.
+
+    The dispatcher is woken up when messages are committed to the outbox by this API instance, and it
+    also checks the outbox every ``OUTBOX_POLL_INTERVAL`` seconds to retry the failed messages and to
+    pick the ones written by other instances. With multi-tenancy, the outbox of an organization is
+    only checked once this instance has written to it, and the cron job drains the outbox of each
+    organization for the messages left over by a stopped instance.
+    """
+
+    def __init__(self):
+        """
+        Initialize the dispatcher with no databases and no worker.
+        """
+        self.databases: set[str | None] = set()
+        self.wakeup: asyncio.Event | None = None
+        self.worker: asyncio.Task | None = None
+
+    def register(self, override_db_name: str | None = None) -> None:
+        """
+        Register a database whose outbox should be checked.
+        """
+        self.databases.add(override_db_name)
+
+    def wake(self) -> None:
+        """
+        Wake up the dispatcher to check the outboxes right away.
+        """
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    async def dispatch(self, override_db_name: str | None = None) -> int:
+        """
+        Deliver a batch of messages from the outbox of a database, in its own transaction.
+
+        Returns the number of messages in the batch.
+        """
+        async with engine_factory.auto_session(override_db_name) as session:
+            with OutboxService().bound_session(session) as service:
+                return await service.dispatch(settings.OUTBOX_BATCH_SIZE)
+
+    async def drain(self, override_db_name: str | None = None) -> None:
+        """
+        Deliver batches of messages from the outbox of a database until a batch is not full.
+        """
+        while await self.dispatch(override_db_name) == settings.OUTBOX_BATCH_SIZE:
+            pass
+
+    async def run(self) -> None:
+        """
+        Check the outboxes whenever the dispatcher is woken up or the poll interval expires, until cancelled.
+        """
+        assert self.wakeup is not None
+        while True:
+            self.wakeup.clear()
+            for override_db_name in list(self.databases):
+                try:
+                    await self.drain(override_db_name)
+                except Exception as err:
+                    logger.error(f"Unexpected error delivering the outbox messages of {override_db_name=}: {err}")
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self.wakeup.wait(), timeout=settings.OUTBOX_POLL_INTERVAL)
+
+    def start(self) -> None:
+        """
+        Start delivering the messages in the background.
+        """
+        if not settings.MULTI_TENANCY_ENABLED:
+            self.register(None)
+        self.wakeup = asyncio.Event()
+        self.worker = asyncio.create_task(self.run())
+
+    async def close(self) -> None:
+        """
+        Stop delivering the messages. The ones left in the outbox are delivered on the next start.
+        """
+        if self.worker is not None:
+            self.worker.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.worker
+        self.worker = None
+        self.wakeup = None
+
+
+outbox_dispatcher = OutboxDispatcher()
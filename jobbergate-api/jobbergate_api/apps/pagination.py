@@ -0,0 +1,144 @@
+"""
+Provide the page and parameters used by list endpoints, including an opt-in keyset (cursor) mode.
+
+In the default mode, pages are selected by ``page`` and ``size`` with OFFSET/LIMIT and a total count.
+In the cursor mode, selected when a ``cursor`` is provided, the next page is located by the sort key
+of the last row already seen, so neither an OFFSET nor a total count is needed.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import datetime
+import json
+from enum import Enum
+from typing import Any, Generic, NamedTuple, Sequence, TypeVar, cast
+
+from fastapi import Query
+from fastapi_pagination import Page as BasePage
+from fastapi_pagination import Params as BaseParams
+from fastapi_pagination.bases import AbstractParams
+from fastapi_pagination.pydantic import create_pydantic_model
+from fastapi_pagination.types import GreaterEqualOne, GreaterEqualZero
+from sqlalchemy import and_, or_
+from sqlalchemy.sql.expression import ColumnElement
+
+T = TypeVar("T")
+
+
+class Params(BaseParams):
+    """
+    Describe the pagination parameters for a list request.
+    """
+
+    cursor: str | None = Query(
+        None,
+        description=(
+            "Opaque token to continue a keyset paginated listing. Pass it empty to fetch the first page. "
+            "When provided, the page number is ignored and no total count is computed."
+        ),
+    )
+
+
+class Page(BasePage[T], Generic[T]):
+    """
+    Describe a page of results for a list request.
+
+    The fields ``page``, ``pages`` and ``total`` are null in the cursor mode, where ``next_cursor``
+    is provided instead, unless it is the last page.
+    """
+
+    total: GreaterEqualZero | None = None  # type: ignore[assignment]
+    page: GreaterEqualOne | None = None  # type: ignore[assignment]
+    pages: GreaterEqualZero | None = None  # type: ignore[assignment]
+    next_cursor: str | None = None
+
+    __params_type__ = Params
+
+    @classmethod
+    def create(
+        cls,
+        items: Sequence[T],
+        params: AbstractParams,
+        *,
+        total: int | None = None,
+        **kwargs: Any,
+    ) -> Page[T]:
+        """
+        Create a page, leaving out the page number and count when the cursor mode is used.
+        """
+        if isinstance(params, Params) and params.cursor is not None:
+            return create_pydantic_model(cls, items=items, size=params.size, **kwargs)
+        return cast(Page[T], super().create(items, params, total=total, **kwargs))
+
+
+Params.set_page(Page)
+
+
+class Cursor(NamedTuple):
+    """
+    Describe the position of the last row of a page in the keyset pagination.
+
+    The sort field and direction are kept so a cursor can not be reused with another sort order.
+    """
+
+    sort_field: str
+    sort_ascending: bool
+    value: Any
+    id: int
+
+    def encode(self) -> str:
+        """
+        Encode the cursor as an opaque url-safe token.
+        """
+        if isinstance(self.value, datetime.datetime):
+            value: Any = {"datetime": self.value.isoformat()}
+        elif isinstance(self.value, Enum):
+            value = self.value.name
+        else:
+            value = self.value
+        payload = json.dumps([self.sort_field, self.sort_ascending, value, self.id], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> Cursor:
+        """
+        Decode a cursor from a token produced by ``encode()``.
+
+        Raise a ValueError if the token is malformed.
+        """
+        try:
+            payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            (sort_field, sort_ascending, value, id) = json.loads(payload)
+            if isinstance(value, dict):
+                value = datetime.datetime.fromisoformat(value["datetime"])
+        except (binascii.Error, json.JSONDecodeError, UnicodeDecodeError, TypeError, ValueError, KeyError) as err:
+            raise ValueError(f"Invalid cursor: {token}") from err
+        if not (isinstance(sort_field, str) and isinstance(sort_ascending, bool) and isinstance(id, int)):
+            raise ValueError(f"Invalid cursor: {token}")
+        return cls(sort_field=sort_field, sort_ascending=sort_ascending, value=value, id=id)
+
+
+def keyset_clause(sort_column: Any, id_column: Any, cursor: Cursor) -> ColumnElement[bool]:
+    """
+    Create the where clause that selects the rows following the cursor.
+
+    The rows are expected to be ordered by the sort column and then by the id column, both in the
+    direction of the cursor. PostgreSQL sorts nulls last in ascending order and first in descending
+    order, so the rows with a null sort value are selected accordingly.
+    """
+    if cursor.sort_ascending:
+        if cursor.value is None:
+            return and_(sort_column.is_(None), id_column > cursor.id)
+        return or_(
+            sort_column > cursor.value,
+            and_(sort_column == cursor.value, id_column > cursor.id),
+            sort_column.is_(None),
+        )
+    if cursor.value is None:
+        return or_(and_(sort_column.is_(None), id_column < cursor.id), sort_column.is_not(None))
+    return or_(
+        sort_column < cursor.value,
+        and_(sort_column == cursor.value, id_column < cursor.id),
+    )
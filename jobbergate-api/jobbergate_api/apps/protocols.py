@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Protocol, TypeVar
 
 from sqlalchemy.orm import Mapped
@@ -84,7 +85,9 @@ class FileModelProto(Protocol):
 
     parent_id: Mapped[int]
     filename: Mapped[str]
+    content_hash: str | None
     file_key: str
+    updated_at: datetime
 
     def __init__(self, **kwargs):
         """
@@ -4,6 +4,7 @@ import datetime
 from typing import Annotated, Any, List, Type
 
 import pendulum
+from fastapi import Query
 from pydantic import BaseModel, ConfigDict, Field, GetCoreSchemaHandler
 from pydantic_core import PydanticCustomError, core_schema
 
@@ -80,6 +81,9 @@ class TableResource(BaseModel):
 class ListParams(BaseModel):
     """
     Describe the shared parameters for a list request.
+
+    The sort parameters are also declared on ``__init__``, as its signature provides the query
+    parameters of the endpoints, along with their descriptions.
     """
 
     sort_ascending: bool = True
@@ -88,3 +92,27 @@ class ListParams(BaseModel):
     sort_field: LengthLimitedStr | None = None
     include_archived: bool = False
     include_parent: bool = False
+
+    def __init__(
+        self,
+        sort_ascending: Annotated[
+            bool,
+            Query(
+                description=(
+                    "Sort in ascending order. When sorting by relevance, the most relevant entries are listed "
+                    "first if set, and last otherwise."
+                )
+            ),
+        ] = True,
+        sort_field: Annotated[
+            LengthLimitedStr | None,
+            Query(
+                description=(
+                    "Field to sort by. The entries matching a search can be sorted by 'relevance', "
+                    "which is not supported with the cursor pagination."
+                )
+            ),
+        ] = None,
+        **data: Any,
+    ):
+        super().__init__(sort_ascending=sort_ascending, sort_field=sort_field, **data)
@@ -2,31 +2,115 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import io
-from contextlib import contextmanager
-from typing import Any, Generic, NamedTuple
+import tempfile
+from contextlib import closing, contextmanager
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    BinaryIO,
+    Callable,
+    Generic,
+    Iterable,
+    Mapping,
+    NamedTuple,
+    TypeVar,
+    cast,
+)
 
 import httpx
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
 from botocore.response import StreamingBody
 from buzz import enforce_defined, handle_errors, require_condition
-from fastapi import HTTPException, UploadFile, status
-from fastapi_pagination import Page
+from fastapi import HTTPException, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from fastapi_pagination import api as pagination_api
+from fastapi_pagination.bases import AbstractParams
 from fastapi_pagination.ext.sqlalchemy import apaginate
 from jinja2.exceptions import SecurityError, UndefinedError
-from jinja2.sandbox import SandboxedEnvironment
 from loguru import logger
 from pydantic import AnyUrl
-from sqlalchemy import delete, func, not_, select, update
+from sqlalchemy import delete, func, insert, not_, select, update
 from sqlalchemy.engine import Result
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql.expression import Select
 
 from jobbergate_api.apps.file_validation import check_uploaded_file_syntax
 from jobbergate_api.apps.garbage_collector import GarbageCollector
+from jobbergate_api.apps.pagination import Cursor, Page, Params, keyset_clause
 from jobbergate_api.apps.protocols import CrudModel, FileModel
+from jobbergate_api.apps.template_cache import (
+    CachedTemplate,
+    CompiledTemplate,
+    TemplateCache,
+    TemplateCacheKey,
+    compile_template,
+)
 from jobbergate_api.config import settings
 from jobbergate_api.safe_types import Bucket
-from jobbergate_api.storage import render_sql, search_clause, sort_clause
+from jobbergate_api.storage import (
+    SEARCH_RANK_SORT_FIELD,
+    find_sort_column,
+    render_sql,
+    search_clause,
+    search_rank,
+    sort_clause,
+)
+
+T = TypeVar("T")
+
+
+async def gather_with_limit(awaitables: Iterable[Awaitable[T]], limit: int | None = None) -> list[T]:
+    """
+    Await several awaitables concurrently, with at most ``limit`` of them running at a time.
+
+    The limit defaults to ``FILE_CONCURRENCY_LIMIT``, and the results are returned in order.
+    """
+    semaphore = asyncio.Semaphore(limit or settings.FILE_CONCURRENCY_LIMIT)
+
+    async def _run(awaitable: Awaitable[T]) -> T:
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(*(_run(awaitable) for awaitable in awaitables))
+
+
+async def iter_file_chunks(body: StreamingBody, chunk_size: int | None = None) -> AsyncIterator[bytes]:
+    """
+    Iterate over the content of a file stream in chunks, releasing its connection once done.
+
+    The chunk size defaults to ``FILE_STREAM_CHUNK_SIZE``.
+    """
+    # Mypy doesn't like aioboto3 much
+    async with body:  # type: ignore
+        async for chunk in body.iter_chunks(chunk_size or settings.FILE_STREAM_CHUNK_SIZE):  # type: ignore
+            yield chunk
+
+
+def s3_transfer_config() -> TransferConfig:
+    """
+    Get the configuration of the uploads to s3, sending the large files in parts with a multipart upload.
+    """
+    return TransferConfig(
+        multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+        multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE,
+    )
+
+
+def hash_file_content(file_obj: BinaryIO, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 digest of the content of a file object, rewinding it afterwards.
+    """
+    digest = hashlib.sha256()
+    while chunk := file_obj.read(chunk_size):
+        digest.update(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest()
 
 
 class AutoCleanResponse(NamedTuple):
@@ -131,6 +215,16 @@ class CrudService(DatabaseBoundService, Generic[CrudModel]):
         await self.session.refresh(instance)
         return instance
 
+    async def bulk_create(self, rows: list[dict[str, Any]]) -> None:
+        """
+        Add several new rows for the model to the database in a single statement.
+
+        Unlike ``create()``, the new instances are not loaded back from the database.
+        """
+        if not rows:
+            return
+        await self.session.execute(insert(self.model_type), rows)
+
     async def count(self) -> int:
         """
         Count the number of rows in the table on the database.
@@ -222,6 +316,17 @@ class CrudService(DatabaseBoundService, Generic[CrudModel]):
             raise_kwargs={"status_code": status.HTTP_404_NOT_FOUND},
         )
 
+    async def bulk_update(self, rows: list[dict[str, Any]]) -> None:
+        """
+        Update several rows by primary key using a single executemany statement.
+
+        Each entry in ``rows`` must include the ``id`` of the row to update alongside the values to set.
+        Instances already loaded in the session are not refreshed.
+        """
+        if not rows:
+            return
+        await self.session.execute(update(self.model_type), rows)
+
     def locate_where_clause(self, locator: Any) -> Any:
         """
         Provide the where clause expression to locate a row by locator.
@@ -252,6 +357,10 @@ class CrudService(DatabaseBoundService, Generic[CrudModel]):
         - Single values: {"status": "ACTIVE"} -> WHERE status = 'ACTIVE'
         - Multiple values (collections): {"status": {"ACTIVE", "DONE"}} -> WHERE status IN ('ACTIVE', 'DONE')
         - Supports lists, tuples, sets: {"status": ["ACTIVE", "DONE"]} -> WHERE status IN ('ACTIVE', 'DONE')
+
+        The rows matching a search can be sorted by relevance with the ``relevance`` sort field,
+        listing the most relevant ones first, or last if not ``sort_ascending``. Sorting by relevance
+        is not supported with the keyset pagination.
         """
         query = select(self.model_type)
         for key, value in additional_filters.items():
@@ -270,7 +379,16 @@ class CrudService(DatabaseBoundService, Generic[CrudModel]):
                 raise_kwargs={"status_code": status.HTTP_405_METHOD_NOT_ALLOWED},
             )
             query = query.where(search_clause(search, self.model_type.searchable_fields()))
-        if sort_field:
+        if sort_field == SEARCH_RANK_SORT_FIELD:
+            require_condition(
+                search,
+                f"Sorting by {SEARCH_RANK_SORT_FIELD} requires a search",
+                raise_exc_class=ServiceError,
+                raise_kwargs={"status_code": status.HTTP_400_BAD_REQUEST},
+            )
+            rank = search_rank(search, self.model_type.searchable_fields())  # type: ignore
+            query = query.order_by(rank.desc() if sort_ascending else rank.asc(), self.model_type.id)
+        elif sort_field:
             require_condition(
                 hasattr(self.model_type, "sortable_fields"),
                 f"{self.name} does not support sort",
@@ -294,9 +412,79 @@ class CrudService(DatabaseBoundService, Generic[CrudModel]):
         List all crud rows matching specified filters with pagination.
 
         For details on the supported filters, see the ``build_list_query()`` method.
+        The keyset pagination is used instead of OFFSET/LIMIT if a cursor is included in the pagination params.
         """
+        params: AbstractParams = pagination_api.resolve_params(None)
+        if isinstance(params, Params) and params.cursor is not None:
+            return await self.keyset_paginated_list(params, **filter_kwargs)
         return await apaginate(self.session, self.build_list_query(**filter_kwargs))
 
+    async def keyset_paginated_list(
+        self,
+        params: Params,
+        sort_field: str | None = None,
+        sort_ascending: bool = True,
+        **filter_kwargs,
+    ) -> Page[CrudModel]:
+        """
+        List crud rows matching specified filters with keyset pagination.
+
+        The rows are sorted by the sort field (``id`` by default) with the ``id`` as a tiebreak, so the
+        page following the cursor is selected with a where clause, without OFFSET nor a total count.
+        The page includes the cursor for the next one, unless it is the last page.
+        The rows cannot be sorted by relevance, as the rank of a row is not kept in the cursor.
+        """
+        require_condition(
+            sort_field != SEARCH_RANK_SORT_FIELD,
+            f"Sorting by {SEARCH_RANK_SORT_FIELD} is not supported with the cursor pagination, use the page number",
+            raise_exc_class=ServiceError,
+            raise_kwargs={"status_code": status.HTTP_400_BAD_REQUEST},
+        )
+        if sort_field is None:
+            sort_field = "id"
+            sort_column: Any = self.model_type.id
+        else:
+            require_condition(
+                hasattr(self.model_type, "sortable_fields"),
+                f"{self.name} does not support sort",
+                raise_exc_class=ServiceError,
+                raise_kwargs={"status_code": status.HTTP_405_METHOD_NOT_ALLOWED},
+            )
+            sort_column = find_sort_column(sort_field, self.model_type.sortable_fields())
+
+        query = self.build_list_query(**filter_kwargs)
+        if params.cursor:
+            with handle_errors("Invalid pagination cursor", handle_exc_class=ValueError, raise_exc_class=ServiceError):
+                cursor = Cursor.decode(params.cursor)
+            require_condition(
+                cursor.sort_field == sort_field and cursor.sort_ascending == sort_ascending,
+                "The pagination cursor does not match the requested sort order",
+                raise_exc_class=ServiceError,
+            )
+            query = query.where(keyset_clause(sort_column, self.model_type.id, cursor))
+
+        if sort_ascending:
+            query = query.order_by(sort_column.asc(), self.model_type.id.asc())
+        else:
+            query = query.order_by(sort_column.desc(), self.model_type.id.desc())
+        query = query.limit(params.size + 1)
+
+        result: Result = await self.session.execute(query)
+        instances: list[CrudModel] = list(result.unique().scalars())  # type: ignore
+
+        next_cursor = None
+        if len(instances) > params.size:
+            instances = instances[: params.size]
+            last_instance = instances[-1]
+            next_cursor = Cursor(
+                sort_field=sort_field,
+                sort_ascending=sort_ascending,
+                value=getattr(last_instance, sort_column.key),
+                id=cast(int, last_instance.id),
+            ).encode()
+
+        return pagination_api.create_page(instances, params=params, next_cursor=next_cursor)  # type: ignore
+
     async def list(self, **filter_kwargs) -> list[CrudModel]:
         """
         List all crud rows matching specified filters.
@@ -336,16 +524,19 @@ class BucketBoundService:
     Provide base class for services that bind to an s3 bucket.
 
     This class holds a reference to the bucket and provides methods to bind and unbind the bucket.
+    A loader can be bound instead, so the bucket is only acquired when it is first needed.
     It also keeps track of all instances of the service so that they can be iterated over.
     """
 
     _bucket: Bucket | None
+    _bucket_loader: Callable[[], Awaitable[Bucket]] | None
 
     def __init__(self):
         """
         Initialize the service with a null bucket.
         """
         self._bucket = None
+        self._bucket_loader = None
 
     def bind_bucket(self, bucket: Bucket):
         """
@@ -353,11 +544,18 @@ class BucketBoundService:
         """
         self._bucket = bucket
 
+    def bind_bucket_loader(self, bucket_loader: Callable[[], Awaitable[Bucket]]):
+        """
+        Bind the service to a loader that acquires the bucket on first use.
+        """
+        self._bucket_loader = bucket_loader
+
     def unbind_bucket(self):
         """
         Unbind the service from a bucket.
         """
         self._bucket = None
+        self._bucket_loader = None
 
     @contextmanager
     def bound_bucket(self, bucket: Bucket):
@@ -384,13 +582,41 @@ class BucketBoundService:
             raise_kwargs={"status_code": status.HTTP_503_SERVICE_UNAVAILABLE},
         )
 
+    async def load_bucket(self) -> Bucket:
+        """
+        Fetch the bound bucket, acquiring it with the bound loader if it was not acquired yet.
+
+        Raise an exception if the service is not bound to a bucket nor to a loader.
+        """
+        if self._bucket is None and self._bucket_loader is not None:
+            self._bucket = await self._bucket_loader()
+        return self.bucket
+
+
+class FileUpload(NamedTuple):
+    """
+    Describe a file to be created by ``FileService.bulk_create()``.
+    """
+
+    filename: str
+    content: str | bytes
+    attributes: Mapping[str, Any] = {}
+
 
 class FileService(DatabaseBoundService, BucketBoundService, Generic[FileModel]):
     """
     Provide a service that can perform various file management operations using a supplied ORM model type.
+
+    Services with a template cache keep the content of the files and their compiled templates in memory.
+
+    With ``FILE_STORAGE_CONTENT_ADDRESSED``, the new contents are stored by their SHA-256 digest, so
+    identical files share a single object and copying a file only copies its row. These objects are
+    never deleted along with a file, as other files may reference them; the garbage collector removes
+    them once no row references them anymore.
     """
 
     model_type: type[FileModel]
+    template_cache: TemplateCache | None = None
 
     def __init__(self, model_type: type[FileModel]):
         """
@@ -434,26 +660,115 @@ class FileService(DatabaseBoundService, BucketBoundService, Generic[FileModel]):
 
         The StreamingBody is an async generator that can be used for a StreamingResponse in a FastAPI app.
         """
+        bucket = await self.load_bucket()
         with handle_errors(
             f"{self.model_type.__tablename__} file content not found for {instance=}",
-            handle_exc_class=self.bucket.meta.client.exceptions.NoSuchKey,
+            handle_exc_class=bucket.meta.client.exceptions.NoSuchKey,
             raise_exc_class=ServiceError,
             raise_kwargs={"status_code": status.HTTP_500_INTERNAL_SERVER_ERROR},
         ):
             # Mypy doesn't like aioboto3 much
-            s3_object = await self.bucket.Object(instance.file_key)  # type: ignore
+            s3_object = await bucket.Object(instance.file_key)  # type: ignore
             file_object = await s3_object.get()
         return file_object["Body"]
 
-    async def get_file_content(self, instance: FileModel) -> bytes:
+    async def download_file_content(self, instance: FileModel) -> bytes:
         """
-        Get the full contents for a file entry.
+        Download the full contents for a file entry from s3.
         """
         stream: StreamingBody = await self.stream_file_content(instance)
         # Mypy doesn't like aioboto3 much
         data: bytes = await stream.read()  # type: ignore
         return data
 
+    async def stream_file_response(
+        self,
+        instance: FileModel,
+        range_header: str | None = None,
+        if_none_match: str | None = None,
+        media_type: str = "text/plain",
+    ) -> Response:
+        """
+        Stream the content of a file in chunks as the response to a request, without buffering it in memory.
+
+        The response carries the ETag of the object in the file storage. Conditional and range
+        requests are handled by the file storage: a request whose ``If-None-Match`` header matches
+        the ETag gets an empty 304 response, and a request with a ``Range`` header gets the part of
+        the content requested in a 206 response.
+        """
+        get_kwargs = {}
+        if range_header:
+            get_kwargs["Range"] = range_header
+        if if_none_match:
+            get_kwargs["IfNoneMatch"] = if_none_match
+
+        bucket = await self.load_bucket()
+        try:
+            # Mypy doesn't like aioboto3 much
+            s3_object = await bucket.Object(instance.file_key)  # type: ignore
+            file_object = await s3_object.get(**get_kwargs)
+        except ClientError as err:
+            error_code = err.response.get("Error", {}).get("Code")
+            if error_code in ("304", "NotModified"):
+                etag = err.response.get("ResponseMetadata", {}).get("HTTPHeaders", {}).get("etag")
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag} if etag else None,
+                )
+            if error_code == "InvalidRange":
+                object_size = err.response.get("Error", {}).get("ActualObjectSize", "*")
+                raise ServiceError(
+                    f"Range {range_header} is not satisfiable for {instance.filename}",
+                    status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+                    headers={"Content-Range": f"bytes */{object_size}"},
+                ) from err
+            if error_code == "NoSuchKey":
+                raise ServiceError(
+                    f"{self.model_type.__tablename__} file content not found for {instance=}",
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                ) from err
+            raise
+
+        headers = {
+            "filename": instance.filename,
+            "ETag": file_object["ETag"],
+            "Accept-Ranges": "bytes",
+            "Content-Length": str(file_object["ContentLength"]),
+        }
+        status_code = status.HTTP_200_OK
+        if file_object.get("ContentRange"):
+            headers["Content-Range"] = file_object["ContentRange"]
+            status_code = status.HTTP_206_PARTIAL_CONTENT
+        return StreamingResponse(
+            iter_file_chunks(file_object["Body"]),
+            status_code=status_code,
+            media_type=media_type,
+            headers=headers,
+        )
+
+    async def get_template_cache_key(self, instance: FileModel) -> TemplateCacheKey:
+        """
+        Get the key that identifies the current version of a file in the template cache.
+        """
+        bucket = await self.load_bucket()
+        return TemplateCacheKey(bucket.name, instance.file_key, instance.updated_at)
+
+    async def get_file_content(self, instance: FileModel) -> bytes:
+        """
+        Get the full contents for a file entry, from the template cache if the service has one.
+
+        The endpoints stream the contents instead, this method is kept as public API for the callers
+        that need a whole file in memory.
+        """
+        if self.template_cache is None:
+            return await self.download_file_content(instance)
+        key = await self.get_template_cache_key(instance)
+        entry = self.template_cache.get(key)
+        if entry is None:
+            entry = CachedTemplate(content=await self.download_file_content(instance))
+            self.template_cache.set(key, entry)
+        return entry.content
+
     async def upsert(
         self,
         parent_id: int,
@@ -470,6 +785,8 @@ class FileService(DatabaseBoundService, BucketBoundService, Generic[FileModel]):
         If a 'previous_filename' is provided, it is replaced by the new one, being deleted in the process.
         In this case, the 'upload_content' is optional, as the content can be copied from the previous file.
         """
+        # The template cache is keyed by the update time, so it must change even if only the content does
+        upsert_kwargs.setdefault("updated_at", datetime.now(timezone.utc))
         upsert_instance = await self.add_instance(parent_id, filename, upsert_kwargs)
 
         if previous_filename == filename:
@@ -490,13 +807,42 @@ class FileService(DatabaseBoundService, BucketBoundService, Generic[FileModel]):
             "Either a file or a previous filename must be provided", status_code=status.HTTP_400_BAD_REQUEST
         )
 
-    async def _get_file_data_from_url(self, file_url: AnyUrl) -> io.BytesIO:
+    async def bulk_create(self, parent_id: int, uploads: list[FileUpload]) -> list[FileModel]:
+        """
+        Create several files for a parent in a single statement, uploading their contents concurrently.
+
+        Unlike ``upsert()``, the files must not exist yet.
+        """
+        if not uploads:
+            return []
+        now = datetime.now(timezone.utc)
+        rows = [
+            dict(parent_id=parent_id, filename=upload.filename, updated_at=now, **upload.attributes)
+            for upload in uploads
+        ]
+        if settings.FILE_STORAGE_CONTENT_ADDRESSED:
+            # Hashed beforehand so the rows are not updated again once the contents are uploaded
+            for row, upload in zip(rows, uploads, strict=True):
+                content = upload.content if isinstance(upload.content, bytes) else upload.content.encode()
+                row["content_hash"] = hashlib.sha256(content).hexdigest()
+        query = insert(self.model_type).returning(self.model_type, sort_by_parameter_order=True)
+        instances: list[FileModel] = list((await self.session.scalars(query, rows)).all())
+        await gather_with_limit(
+            self.upload_file_content(instance, upload.content)
+            for (instance, upload) in zip(instances, uploads, strict=True)
+        )
+        return instances
+
+    async def _get_file_data_from_url(self, file_url: AnyUrl) -> BinaryIO:
         """
         Get file data given a URL.
 
         Suppports fetching data with the following protocols: http, https, s3
+
+        The data is streamed into a temporary file that is kept in memory up to ``UPLOAD_SPOOL_MAX_SIZE``
+        bytes and spilled to disk beyond that, and the download is aborted once it exceeds
+        ``MAX_UPLOAD_FILE_SIZE`` bytes.
         """
-        file_obj = io.BytesIO()
         file_url_string: str
 
         match file_url.scheme:
@@ -519,22 +865,40 @@ class FileService(DatabaseBoundService, BucketBoundService, Generic[FileModel]):
             case _:
                 raise ServiceError(f"Unsupported protocol to get file data by url for {file_url}")
 
-        with handle_errors(
-            f"Failed to download file from {file_url}",
-            raise_exc_class=ServiceError,
-            raise_kwargs={"status_code": status.HTTP_400_BAD_REQUEST},
-        ):
-            async with httpx.AsyncClient() as client:
-                response = await client.get(file_url_string)
-                response.raise_for_status()
+        file_obj: Any = tempfile.SpooledTemporaryFile(max_size=settings.UPLOAD_SPOOL_MAX_SIZE)
+        size = 0
+        try:
+            with handle_errors(
+                f"Failed to download file from {file_url}",
+                raise_exc_class=ServiceError,
+                raise_kwargs={"status_code": status.HTTP_400_BAD_REQUEST},
+                ignore_exc_class=ServiceError,
+            ):
+                async with httpx.AsyncClient() as client:
+                    async with client.stream("GET", file_url_string) as response:
+                        response.raise_for_status()
+                        async for chunk in response.aiter_bytes(settings.FILE_STREAM_CHUNK_SIZE):
+                            size += len(chunk)
+                            require_condition(
+                                size <= settings.MAX_UPLOAD_FILE_SIZE,
+                                f"Uploaded files cannot exceed {settings.MAX_UPLOAD_FILE_SIZE} bytes",
+                                raise_exc_class=ServiceError,
+                                raise_kwargs={"status_code": status.HTTP_413_CONTENT_TOO_LARGE},
+                            )
+                            file_obj.write(chunk)
+        except BaseException:
+            file_obj.close()
+            raise
 
-        file_obj.write(response.content)
         file_obj.seek(0)
         return file_obj
 
     async def upload_file_content(self, instance: FileModel, upload_content: str | bytes | AnyUrl | UploadFile) -> None:
         """
         Upload the content of a file to s3.
+
+        The content is read in chunks, so the files downloaded by url or received as an ``UploadFile``
+        (which are spilled to disk when large) are never held in full in memory.
         """
         if isinstance(upload_content, str):
             file_obj: Any = io.BytesIO(upload_content.encode())
@@ -543,8 +907,11 @@ class FileService(DatabaseBoundService, BucketBoundService, Generic[FileModel]):
             file_obj = io.BytesIO(upload_content)
             size = file_obj.getbuffer().nbytes
         elif isinstance(upload_content, AnyUrl):
-            file_obj = await self._get_file_data_from_url(upload_content)
-            size = file_obj.getbuffer().nbytes
+            with closing(await self._get_file_data_from_url(upload_content)) as file_obj:
+                size = file_obj.seek(0, io.SEEK_END)
+                file_obj.seek(0)
+                await self._upload_file_obj(instance, file_obj, size)
+            return
         elif hasattr(upload_content, "file") and hasattr(upload_content, "size"):
             file_obj = upload_content.file
             size = enforce_defined(
@@ -556,6 +923,12 @@ class FileService(DatabaseBoundService, BucketBoundService, Generic[FileModel]):
         else:
             raise TypeError(f"Unsupported file type {type(upload_content)}")
 
+        await self._upload_file_obj(instance, file_obj, size)
+
+    async def _upload_file_obj(self, instance: FileModel, file_obj: BinaryIO, size: int) -> None:
+        """
+        Validate a file object and upload it to s3, with a multipart upload if it is large.
+        """
         require_condition(
             size <= settings.MAX_UPLOAD_FILE_SIZE,
             f"Uploaded files cannot exceed {settings.MAX_UPLOAD_FILE_SIZE} bytes, got {size} bytes",
@@ -564,18 +937,25 @@ class FileService(DatabaseBoundService, BucketBoundService, Generic[FileModel]):
         )
 
         require_condition(
-            check_uploaded_file_syntax(file_obj, str(instance.filename)),
+            check_uploaded_file_syntax(file_obj, str(instance.filename), size=size),
             f"File {instance.filename} did not pass the syntax check for its extension",
             raise_exc_class=ServiceError,
             raise_kwargs={"status_code": status.HTTP_400_BAD_REQUEST},
         )
 
+        # The object is uploaded even if it already exists, so it is recently written and the garbage
+        # collector leaves it alone until the row referencing it is committed
+        instance.content_hash = hash_file_content(file_obj) if settings.FILE_STORAGE_CONTENT_ADDRESSED else None
+
+        bucket = await self.load_bucket()
         try:
             # Mypy doesn't like aioboto3 much
-            await self.bucket.upload_fileobj(Fileobj=file_obj, Key=instance.file_key)  # type: ignore
+            await bucket.upload_fileobj(  # type: ignore
+                Fileobj=file_obj, Key=instance.file_key, Config=s3_transfer_config()
+            )
         except Exception as e:
             message = "Error uploading file {} to {} on bucket {} -- {}".format(
-                instance.filename, instance.file_key, self.bucket.name, str(e)
+                instance.filename, instance.file_key, bucket.name, str(e)
             )
             logger.error(message)
             raise ServiceError(
@@ -597,30 +977,55 @@ class FileService(DatabaseBoundService, BucketBoundService, Generic[FileModel]):
         await self.session.refresh(instance)
         return instance
 
-    async def clone_instance(self, original_instance: FileModel, new_parent_id: int) -> FileModel:
+    async def bulk_clone(self, original_instances: Iterable[FileModel], new_parent_id: int) -> list[FileModel]:
         """
-        Clone a file instance and assign it to a new parent-id.
+        Clone several file instances to a new parent-id in a single statement, copying their contents concurrently.
+
+        The contents are copied on the file storage itself, so they are not downloaded by the API,
+        and the ones in the content-addressed storage are shared rather than copied.
         """
-        logger.info(f"Cloning file={original_instance.file_key} to {new_parent_id=}")
+        original_instances = list(original_instances)
+        if not original_instances:
+            return []
+        logger.info(f"Cloning {len(original_instances)} file(s) to {new_parent_id=}")
         table = self.model_type.__table__  # type: ignore
         non_primary_key_columns = [c.name for c in table.columns if not c.primary_key]
-        data = {c: getattr(original_instance, c) for c in non_primary_key_columns}
-
-        cloned_instance = await self.add_instance(new_parent_id, original_instance.filename, data)
-
-        await self.copy_file_content(original_instance, cloned_instance)
-        return cloned_instance
+        rows = [
+            dict(
+                {c: getattr(original_instance, c) for c in non_primary_key_columns},
+                parent_id=new_parent_id,
+                filename=original_instance.filename,
+            )
+            for original_instance in original_instances
+        ]
+        query = insert(self.model_type).returning(self.model_type, sort_by_parameter_order=True)
+        cloned_instances: list[FileModel] = list((await self.session.scalars(query, rows)).all())
+        await gather_with_limit(
+            self.copy_file_content(original_instance, cloned_instance)
+            for (original_instance, cloned_instance) in zip(original_instances, cloned_instances, strict=True)
+            if original_instance.content_hash is None
+        )
+        return cloned_instances
 
     async def copy_file_content(self, source_instance: FileModel, destination_instance: FileModel) -> None:
         """
         Copy the content of a file from one instance to another.
+
+        A content in the content-addressed storage is shared by the instances rather than copied.
         """
-        copy_source = {"Bucket": self.bucket.name, "Key": source_instance.file_key}
+        if source_instance.content_hash is not None:
+            destination_instance.content_hash = source_instance.content_hash
+            return
+
+        # The destination may be in the content-addressed storage, whose object is shared by other files
+        destination_instance.content_hash = None
+        bucket = await self.load_bucket()
+        copy_source = {"Bucket": bucket.name, "Key": source_instance.file_key}
         try:
-            await self.bucket.copy(copy_source, destination_instance.file_key)
+            await bucket.copy(copy_source, destination_instance.file_key)
         except Exception as e:
             message = "Error copying file {} to {} on bucket {} -- {}".format(
-                source_instance.file_key, destination_instance.file_key, self.bucket.name, str(e)
+                source_instance.file_key, destination_instance.file_key, bucket.name, str(e)
             )
             logger.error(message)
             raise ServiceError(
@@ -631,13 +1036,44 @@ class FileService(DatabaseBoundService, BucketBoundService, Generic[FileModel]):
     async def delete(self, instance: FileModel) -> None:
         """
         Delete a file from s3 and from the corresponding table.
+
+        A content in the content-addressed storage is left for the garbage collector, as it may be shared.
         """
         await self.session.delete(instance)
-        # Mypy doesn't like aioboto3 much
-        s3_object = await self.bucket.Object(instance.file_key)  # type: ignore
-        await s3_object.delete()
+        if instance.content_hash is None:
+            bucket = await self.load_bucket()
+            # Mypy doesn't like aioboto3 much
+            s3_object = await bucket.Object(instance.file_key)  # type: ignore
+            await s3_object.delete()
         await self.session.flush()
 
+    def compile_template(self, instance: FileModel, file_content: bytes) -> CompiledTemplate:
+        """
+        Compile the content of a file as a Jinja2 template.
+        """
+        with handle_errors(
+            f"Unable to process jinja template filename={instance.filename}",
+            raise_exc_class=ServiceError,
+            raise_kwargs={"status_code": status.HTTP_422_UNPROCESSABLE_CONTENT},
+        ):
+            return compile_template(file_content.decode("utf-8"))
+
+    async def get_compiled_template(self, instance: FileModel) -> CompiledTemplate:
+        """
+        Get the compiled template for a file, from the template cache if the service has one.
+        """
+        if self.template_cache is None:
+            return self.compile_template(instance, await self.download_file_content(instance))
+        key = await self.get_template_cache_key(instance)
+        entry = self.template_cache.get(key)
+        if entry is None:
+            entry = CachedTemplate(content=await self.download_file_content(instance))
+        if entry.compiled is not None:
+            return entry.compiled
+        compiled = self.compile_template(instance, entry.content)
+        self.template_cache.set(key, entry._replace(compiled=compiled))
+        return compiled
+
     async def render(self, instance: FileModel, parameters: dict[str, Any]) -> str:
         """
         Render the file using Jinja2.
@@ -647,21 +1083,22 @@ class FileService(DatabaseBoundService, BucketBoundService, Generic[FileModel]):
         * As a ``data`` key for backward compatibility, for instance, if the
           template contains ``{{ data.foo }}``.
 
+        The variables used by the template select the contexts to try, so a template that only uses
+        ``data`` is rendered once with the backward compatible context, and a template that does not
+        use ``data`` is never rendered with it.
         """
-        file_content = await self.get_file_content(instance)
-        with handle_errors(
-            f"Unable to process jinja template filename={instance.filename}",
-            raise_exc_class=ServiceError,
-            raise_kwargs={"status_code": status.HTTP_422_UNPROCESSABLE_CONTENT},
-        ):
-            sandbox_env = SandboxedEnvironment()
-            template = sandbox_env.from_string(file_content.decode("utf-8"))
+        compiled = await self.get_compiled_template(instance)
 
-        render_contexts = [parameters, {"data": parameters}]
+        if "data" not in compiled.variables:
+            render_contexts = [parameters]
+        elif compiled.variables == {"data"} and "data" not in parameters:
+            render_contexts = [{"data": parameters}]
+        else:
+            render_contexts = [parameters, {"data": parameters}]
 
         for context in render_contexts:
             try:
-                return template.render(**context)
+                return compiled.template.render(**context)
             except SecurityError as e:
                 logger.debug(
                     "Security error rendering filename={} with context={} -- Error: {}",
@@ -690,7 +1127,8 @@ class FileService(DatabaseBoundService, BucketBoundService, Generic[FileModel]):
         """
         Delete unused files from the bucket.
 
-        This method is used to delete files that are not referenced by any row in the database.
+        This method is used to delete files that are not referenced by any row in the database,
+        including the objects in the content-addressed storage that are no longer shared by any file.
         """
-        collector = collector_cls(model_type=self.model_type, bucket=self.bucket, session=self.session)
+        collector = collector_cls(model_type=self.model_type, bucket=await self.load_bucket(), session=self.session)
         await collector.run()
@@ -0,0 +1,107 @@
+"""
+Provide an in-memory cache for the content of the template files and their compiled Jinja templates.
+
+Entries are keyed by the bucket, the file key and the time the file was last updated, so an entry
+is never used once the file changes, and the stale entries are eventually evicted as the least
+recently used ones.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple
+
+from jinja2 import Template, meta
+from jinja2.sandbox import SandboxedEnvironment
+
+from jobbergate_api.config import settings
+
+sandbox_env = SandboxedEnvironment()
+
+
+class TemplateCacheKey(NamedTuple):
+    """
+    Identify a version of a template file.
+    """
+
+    bucket_name: str
+    file_key: str
+    updated_at: datetime
+
+
+class CompiledTemplate(NamedTuple):
+    """
+    Provide a container for a compiled template and the variables it takes from the context.
+    """
+
+    template: Template
+    variables: frozenset[str]
+
+
+def compile_template(source: str) -> CompiledTemplate:
+    """
+    Compile a template in the shared sandboxed environment, finding the variables it takes from the context.
+    """
+    variables = meta.find_undeclared_variables(sandbox_env.parse(source)) - set(sandbox_env.globals)
+    return CompiledTemplate(template=sandbox_env.from_string(source), variables=frozenset(variables))
+
+
+class CachedTemplate(NamedTuple):
+    """
+    Provide a container for the content of a template file and, once it is rendered, its compiled template.
+    """
+
+    content: bytes
+    compiled: CompiledTemplate | None = None
+
+
+class TemplateCache:
+    """
+    Provide a bounded LRU cache of template files, limited both in entries and in bytes of content.
+    """
+
+    entries: OrderedDict[TemplateCacheKey, CachedTemplate]
+
+    def __init__(self, max_size: int, max_bytes: int):
+        """
+        Initialize the cache with its maximum number of entries and total size of the content.
+        """
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.size_in_bytes = 0
+        self.entries = OrderedDict()
+
+    def get(self, key: TemplateCacheKey) -> CachedTemplate | None:
+        """
+        Get the entry cached for a template file, if any.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def set(self, key: TemplateCacheKey, entry: CachedTemplate):
+        """
+        Cache an entry, evicting the least recently used ones if the cache is full.
+
+        Entries larger than the whole cache are not kept.
+        """
+        if self.max_size <= 0 or len(entry.content) > self.max_bytes:
+            return
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.size_in_bytes -= len(previous.content)
+        self.entries[key] = entry
+        self.size_in_bytes += len(entry.content)
+        while len(self.entries) > self.max_size or self.size_in_bytes > self.max_bytes:
+            (_, evicted) = self.entries.popitem(last=False)
+            self.size_in_bytes -= len(evicted.content)
+
+    def clear(self):
+        """
+        Remove all the entries from the cache.
+        """
+        self.entries.clear()
+        self.size_in_bytes = 0
+
+
+template_cache = TemplateCache(max_size=settings.TEMPLATE_CACHE_SIZE, max_bytes=settings.TEMPLATE_CACHE_MAX_BYTES)
@@ -65,6 +65,13 @@ class Settings(BaseSettings):
     # S3 configuration
     S3_BUCKET_NAME: str = Field("jobbergate-staging-eu-north-1-resources")
     S3_ENDPOINT_URL: Optional[str] = None
+    S3_MAX_POOL_CONNECTIONS: int = Field(50, ge=1)
+    S3_MULTIPART_THRESHOLD: int = Field(8 * 1024 * 1024, ge=5 * 1024 * 1024)  # larger uploads are sent in parts
+    S3_MULTIPART_CHUNKSIZE: int = Field(8 * 1024 * 1024, ge=5 * 1024 * 1024)
+    FILE_CONCURRENCY_LIMIT: int = Field(10, ge=1)  # files processed concurrently by a single request
+    FILE_STORAGE_CONTENT_ADDRESSED: bool = False  # store new files by content, sharing identical ones
+    FILE_STORAGE_GC_MIN_AGE: int = Field(3600, ge=0)  # seconds before the collector may delete a written object
+    FILE_STREAM_CHUNK_SIZE: int = Field(64 * 1024, ge=1)  # bytes read at a time when streaming a file
 
     # Test S3 configuration
     TEST_S3_BUCKET_NAME: str = Field("test-jobbergate-resources")
@@ -75,11 +82,23 @@ class Settings(BaseSettings):
     RABBITMQ_USERNAME: Optional[str] = None
     RABBITMQ_PASSWORD: Optional[str] = None
     RABBITMQ_DEFAULT_EXCHANGE: str = "default"
+    RABBITMQ_CHANNEL_POOL_SIZE: int = Field(4, ge=1)  # idle channels kept per exchange
+    RABBITMQ_PUBLISH_BATCH_SIZE: int = Field(100, ge=1)
+    RABBITMQ_SHUTDOWN_TIMEOUT: float = Field(10.0, ge=0)  # seconds
+
+    # Outbox configuration for the notifications delivered in the background
+    OUTBOX_BATCH_SIZE: int = Field(100, ge=1)
+    OUTBOX_POLL_INTERVAL: float = Field(5.0, gt=0)  # seconds
+    OUTBOX_RETRY_DELAY: float = Field(5.0, ge=0)  # seconds, doubled on each failed attempt
+    OUTBOX_MAX_ATTEMPTS: int = Field(10, ge=1)
 
     # Security Settings. For details, see https://github.com/omnivector-solutions/armasec
     ARMASEC_DOMAIN: str
     ARMASEC_USE_HTTPS: bool = Field(True)
     ARMASEC_DEBUG: bool = Field(False)
+    ARMASEC_TOKEN_CACHE_SIZE: int = Field(1024, ge=0)
+    ARMASEC_TOKEN_CACHE_TTL: int = Field(300, ge=0)  # seconds
+    ARMASEC_JWKS_REFRESH_INTERVAL: int = Field(3600, ge=0)  # seconds
 
     # Sentry configuration
     SENTRY_DSN: Optional[HttpUrl] = None
@@ -89,6 +108,13 @@ class Settings(BaseSettings):
 
     # Maximum number of bytes allowed for file uploads
     MAX_UPLOAD_FILE_SIZE: int = 5 * 1024 * 1024  # 100 MB
+    # Files downloaded by url are spilled to disk beyond this size, and larger files skip the syntax validation
+    UPLOAD_SPOOL_MAX_SIZE: int = Field(1024 * 1024, ge=0)
+    SYNTAX_VALIDATION_MAX_SIZE: int = Field(1024 * 1024, ge=0)
+
+    # In-memory cache of the template files and their compiled templates, set the size to 0 to disable it
+    TEMPLATE_CACHE_SIZE: int = Field(256, ge=0)
+    TEMPLATE_CACHE_MAX_BYTES: int = Field(64 * 1024 * 1024, ge=0)
 
     # Sendgrid configuration for email notification
     SENDGRID_FROM_EMAIL: Optional[str] = None
@@ -109,6 +135,26 @@ class Settings(BaseSettings):
     AUTO_CLEAN_JOB_SUBMISSIONS_DAYS_TO_ARCHIVE: int | None = None
     AUTO_CLEAN_JOB_SUBMISSIONS_DAYS_TO_DELETE: int | None = None
 
+    # Seconds of recent updates sent again by the agent changes feed, to cover out of order commits
+    AGENT_CHANGES_SAFETY_WINDOW: int = Field(30, ge=0)
+
+    # Days the deleted job submissions are reported by the agent changes feed, older watermarks must resync
+    AGENT_CHANGES_TOMBSTONE_DAYS: int = Field(7, ge=1)
+
+    # Sample rates (in seconds) whose metrics views are read in real-time, combining the materialized buckets
+    # with the raw metrics not materialized yet. Given as a JSON list, e.g. [10, 60]
+    METRICS_REAL_TIME_SAMPLE_RATES: set[int] = set()
+
+    # Compress the chunks of the raw job metrics older than these days, set to None to leave them uncompressed
+    METRICS_COMPRESS_AFTER_DAYS: int | None = Field(7, ge=1)
+
+    # Drop the chunks of the raw job metrics older than these days, set to None to keep them forever. The views keep
+    # the aggregated metrics, and the retention is raised to the minimum the weekly views need to be refreshed.
+    # If unset and METRICS_RETENTION_FROM_AUTO_CLEAN is enabled, the raw metrics are kept as long as the job
+    # submissions, i.e. AUTO_CLEAN_JOB_SUBMISSIONS_DAYS_TO_ARCHIVE + AUTO_CLEAN_JOB_SUBMISSIONS_DAYS_TO_DELETE days
+    METRICS_RETENTION_DAYS: int | None = Field(None, ge=1)
+    METRICS_RETENTION_FROM_AUTO_CLEAN: bool = False
+
     # Metadata for the API Documentation
     METADATA_API_TITLE: str = "Jobbergate-API"
     METADATA_CONTACT_NAME: str = "Omnivector Solutions"
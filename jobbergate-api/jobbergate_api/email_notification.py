@@ -105,14 +105,23 @@ class EmailManager:
         return message
 
 
-def notify_submission_rejected(job_submission_id: str | int, report_message: str, to_emails: str | List[str]) -> None:
+def notify_submission_rejected(
+    job_submission_id: str | int,
+    report_message: str,
+    to_emails: str | List[str],
+    skip_on_failure: bool = True,
+) -> bool:
     """
     Notify an email or a list of emails about a job submission that has been rejected.
+
+    Returns True if the email was sent, False if it was skipped on failure.
     """
     subject = f"Job Submission Rejected (id={job_submission_id})"
 
     logger.debug(f"Notifying {to_emails=} that {job_submission_id=} was rejected: {report_message=}")
-    email_manager.send_email(to_emails, subject, skip_on_failure=True, plain_text_content=report_message)
+    return email_manager.send_email(
+        to_emails, subject, skip_on_failure=skip_on_failure, plain_text_content=report_message
+    )
 
 
 email_client = SendGridAPIClient(settings.SENDGRID_API_KEY)
@@ -14,12 +14,17 @@ from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
 from starlette.middleware.cors import CORSMiddleware
 
 from jobbergate_api import __version__
+from jobbergate_api.agent_notification import agent_notification_listener
 from jobbergate_api.apps.clusters.routers import router as cluster_status_router
+from jobbergate_api.apps.dependencies import bucket_factory
 from jobbergate_api.apps.job_script_templates.routers import router as job_script_templates_router
 from jobbergate_api.apps.job_scripts.routers import router as job_scripts_router
 from jobbergate_api.apps.job_submissions.routers import router as job_submissions_router
+from jobbergate_api.apps.outbox.services import outbox_dispatcher
 from jobbergate_api.config import settings
 from jobbergate_api.logging import init_logging
+from jobbergate_api.rabbitmq_notification import rabbitmq_publisher
+from jobbergate_api.security import jwks_cache
 from jobbergate_api.storage import engine_factory, handle_fk_error
 
 subapp = FastAPI(
@@ -84,14 +89,24 @@ async def lifespan(_: FastAPI):
     """
     Provide a lifespan context for the app.
 
-    Will set up logging and cleanup database engines when the app is shut down.
+    Will set up logging, the JWKS refresh and the outbox dispatcher. When the app is shut down, it will stop
+    the outbox dispatcher, flush the pending RabbitMQ notifications, then cleanup database engines, s3 resources
+    and the agent notification listener.
 
     This is the preferred method of handling lifespan events in FastAPI.
     For mor details, see: https://fastapi.tiangolo.com/advanced/events/
     """
     init_logging()
 
-    yield
+    outbox_dispatcher.start()
+
+    async with jwks_cache.background_refresh(settings.ARMASEC_JWKS_REFRESH_INTERVAL):
+        yield
+
+    await outbox_dispatcher.close()
+    await rabbitmq_publisher.close()
+    await bucket_factory.cleanup()
+    await agent_notification_listener.cleanup()
 
     # Skip cleanup if in test mode so that model instances can be used after processing http requests.
     if settings.DEPLOY_ENV.lower() != "test":
@@ -3,18 +3,24 @@ RabbitMQ notification system for Jobbergate.
 """
 
 import asyncio
+import contextlib
 import json
 import socket
+from collections import defaultdict
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import Any, NamedTuple, Optional
 
 import aio_pika
+from buzz import enforce_defined
 from loguru import logger
 
 from jobbergate_api.apps.job_submissions.models import JobSubmission
 from jobbergate_api.config import settings
 from jobbergate_api.retry_utils import async_retry
 
+NOTIFICATION_QUEUE_NAME = "jobs"
+NOTIFICATION_ROUTING_KEY = "status"
+
 
 @asynccontextmanager
 async def rabbitmq_connect(
@@ -41,10 +47,8 @@ async def rabbitmq_connect(
         type=aio_pika.ExchangeType.DIRECT,
         durable=True,
     )
-    queue_name = "jobs"
-    routing_key = "status"
-    declared_queue = await channel.declare_queue(name=queue_name, durable=True)
-    await declared_queue.bind(exchange, routing_key)
+    declared_queue = await channel.declare_queue(name=NOTIFICATION_QUEUE_NAME, durable=True)
+    await declared_queue.bind(exchange, NOTIFICATION_ROUTING_KEY)
 
     try:
         yield (exchange, declared_queue)
@@ -52,41 +56,201 @@ async def rabbitmq_connect(
     finally:
         if do_purge:
             await declared_queue.purge(timeout=1)
-        await declared_queue.unbind(exchange, routing_key)
+        await declared_queue.unbind(exchange, NOTIFICATION_ROUTING_KEY)
         await connection.close()
 
 
-async def _publish_message(
-    exchange: aio_pika.Exchange,
-    message_payload: dict,
-    organization_id: Optional[str],
-) -> None:
-    """Publish a single message to RabbitMQ exchange."""
-    await exchange.publish(
-        message=aio_pika.Message(
-            body=json.dumps(message_payload).encode("utf-8"),
-            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-            headers={"organization": organization_id},
-        ),
-        routing_key="status",
-    )
+class PendingMessage(NamedTuple):
+    """A message waiting to be published, with the future resolved once it is confirmed."""
 
+    exchange_name: str
+    message: aio_pika.Message
+    confirmed: asyncio.Future[bool]
 
-async def publish_status_change(
-    job_submission: JobSubmission,
-    organization_id: Optional[str] = None,
-) -> bool:
+
+class PooledChannel(NamedTuple):
+    """A channel kept in the pool of an exchange, along with the exchange declared on it."""
+
+    channel: aio_pika.abc.AbstractChannel
+    exchange: aio_pika.abc.AbstractExchange
+
+
+class RabbitMQPublisher:
     """
-    Publish a status change for a JobSubmission to the RabbitMQ exchange used for notifications.
+    Publish the notifications to RabbitMQ over a connection kept for the lifetime of the app.
 
-    Returns True if successful, False if failed after max retries.
+    Messages are put on an in-process queue and published in batches by a background worker,
+    with publisher confirms. Each exchange has a pool of channels on which the exchange and the
+    queue are declared only once. A channel is discarded when a publish fails on it, so the
+    declarations are made again on a fresh one.
     """
-    if settings.RABBITMQ_HOST is None:
-        return True  # Skip when RabbitMQ is not configured
 
-    logger.debug("Publishing status change to notification queue")
+    def __init__(self):
+        """
+        Initialize the publisher without connecting, the connection is made on the first publish.
+        """
+        self.connection: Optional[aio_pika.abc.AbstractRobustConnection] = None
+        self.pools: dict[str, list[PooledChannel]] = defaultdict(list)
+        self.queue: Optional[asyncio.Queue[PendingMessage]] = None
+        self.worker: Optional[asyncio.Task] = None
+        self.lock = asyncio.Lock()
+
+    async def connect(self) -> aio_pika.abc.AbstractRobustConnection:
+        """
+        Provide the connection to RabbitMQ, opening it if needed.
+        """
+        host = enforce_defined(settings.RABBITMQ_HOST, "RabbitMQ is not configured")
+        async with self.lock:
+            if self.connection is None or self.connection.is_closed:
+                # Unset credentials fall back to the guest user, as aio_pika does when they are omitted
+                self.connection = await aio_pika.connect_robust(
+                    host=host,
+                    login=settings.RABBITMQ_USERNAME or "guest",
+                    password=settings.RABBITMQ_PASSWORD or "guest",
+                    client_properties={"connection_name": socket.gethostname()},
+                )
+                self.pools.clear()
+            return self.connection
+
+    async def acquire(self, exchange_name: str) -> PooledChannel:
+        """
+        Take a channel from the pool of an exchange, or open a new one and declare the exchange on it.
+        """
+        pool = self.pools[exchange_name]
+        while pool:
+            pooled = pool.pop()
+            if not pooled.channel.is_closed:
+                return pooled
+        connection = await self.connect()
+        channel = await connection.channel(publisher_confirms=True, on_return_raises=True)
+        exchange = await channel.declare_exchange(name=exchange_name, type=aio_pika.ExchangeType.DIRECT, durable=True)
+        declared_queue = await channel.declare_queue(name=NOTIFICATION_QUEUE_NAME, durable=True)
+        await declared_queue.bind(exchange, NOTIFICATION_ROUTING_KEY)
+        return PooledChannel(channel, exchange)
+
+    async def release(self, exchange_name: str, pooled: PooledChannel, discard: bool) -> None:
+        """
+        Put a channel back in the pool of an exchange, or close it if it failed or the pool is full.
+        """
+        pool = self.pools[exchange_name]
+        if discard or len(pool) >= settings.RABBITMQ_CHANNEL_POOL_SIZE or pooled.channel.is_closed:
+            if not pooled.channel.is_closed:
+                await pooled.channel.close()
+            return
+        pool.append(pooled)
+
+    async def publish(self, exchange_name: str, message: aio_pika.Message) -> bool:
+        """
+        Queue a message to be published and wait until the broker confirms it.
+
+        Returns True if successful, False if failed after max retries.
+        """
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self.run())
+        pending = PendingMessage(exchange_name, message, asyncio.get_running_loop().create_future())
+        await self.queue.put(pending)
+        return await pending.confirmed
+
+    async def run(self) -> None:
+        """
+        Publish the queued messages in batches, grouped by exchange, until cancelled.
+        """
+        assert self.queue is not None
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < settings.RABBITMQ_PUBLISH_BATCH_SIZE and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                by_exchange: dict[str, list[PendingMessage]] = defaultdict(list)
+                for pending in batch:
+                    by_exchange[pending.exchange_name].append(pending)
+                await asyncio.gather(*(self.publish_batch(name, items) for (name, items) in by_exchange.items()))
+            except Exception as err:
+                logger.error(f"Unexpected error publishing status change notifications: {err}")
+            finally:
+                for pending in batch:
+                    if not pending.confirmed.done():
+                        pending.confirmed.set_result(False)
+                    self.queue.task_done()
+
+    async def publish_batch(self, exchange_name: str, batch: list[PendingMessage]) -> None:
+        """
+        Publish a batch of messages on a single channel, retrying the ones that are not confirmed.
+        """
+        remaining = batch
+
+        async def _publish_remaining():
+            nonlocal remaining
+            pooled = await self.acquire(exchange_name)
+            results = await asyncio.gather(
+                *(
+                    pooled.exchange.publish(p.message, routing_key=NOTIFICATION_ROUTING_KEY, mandatory=True)
+                    for p in remaining
+                ),
+                return_exceptions=True,
+            )
+            published = [p for (p, r) in zip(remaining, results, strict=True) if not isinstance(r, BaseException)]
+            failed = [(p, r) for (p, r) in zip(remaining, results, strict=True) if isinstance(r, BaseException)]
+            remaining = [p for (p, _) in failed]
+            for pending in published:
+                if not pending.confirmed.done():
+                    pending.confirmed.set_result(True)
+            await self.release(exchange_name, pooled, discard=bool(failed))
+            if failed:
+                raise failed[0][1]  # type: ignore[misc]
+            return True
+
+        def on_retry_error(exc: BaseException, attempt: int) -> None:
+            logger.warning(
+                f"Failed to publish {len(remaining)} status change notification(s) (attempt {attempt}): {exc}"
+            )
+
+        result = await async_retry(
+            _publish_remaining,
+            max_attempts=3,
+            initial_delay=1.0,
+            backoff_factor=2.0,
+            on_error=on_retry_error,
+        )
+        if result is None:
+            logger.error(f"Failed to publish {len(remaining)} status change notification(s) after 3 retry attempts")
+
+    async def close(self) -> None:
+        """
+        Publish the queued messages, up to ``RABBITMQ_SHUTDOWN_TIMEOUT`` seconds, then close the connection.
+        """
+        if self.queue is not None and self.worker is not None and not self.worker.done():
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=settings.RABBITMQ_SHUTDOWN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"Dropping {self.queue.qsize()} status change notification(s) on shutdown")
+        if self.worker is not None:
+            self.worker.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.worker
+        if self.queue is not None:
+            while not self.queue.empty():
+                pending = self.queue.get_nowait()
+                if not pending.confirmed.done():
+                    pending.confirmed.set_result(False)
+        if self.connection is not None and not self.connection.is_closed:
+            await self.connection.close()
+        self.connection = None
+        self.pools.clear()
+        self.queue = None
+        self.worker = None
 
-    message_payload = {
+
+rabbitmq_publisher = RabbitMQPublisher()
+
+
+def build_status_change_payload(job_submission: JobSubmission) -> dict[str, Any]:
+    """
+    Build the payload of the notification published when the status of a JobSubmission changes.
+    """
+    return {
         "path": f"jobs.job_submissions.{job_submission.id}",
         "user_email": job_submission.owner_email,
         "action": "status",
@@ -96,23 +260,37 @@ async def publish_status_change(
         },
     }
 
-    async def _publish_with_connection():
-        async with rabbitmq_connect(exchange_name=organization_id) as (exchange, _):
-            await _publish_message(exchange, message_payload, organization_id)
 
-    def on_retry_error(exc: Exception, attempt: int) -> None:
-        logger.warning(f"Failed to publish status change notification (attempt {attempt}): {exc}")
+async def publish_notification(
+    message_payload: dict[str, Any],
+    organization_id: Optional[str] = None,
+) -> bool:
+    """
+    Publish a notification payload to the RabbitMQ exchange used for notifications.
+
+    Returns True if successful, False if failed after max retries.
+    """
+    if settings.RABBITMQ_HOST is None:
+        return True  # Skip when RabbitMQ is not configured
 
-    result = await async_retry(
-        _publish_with_connection,
-        max_attempts=3,
-        initial_delay=1.0,
-        backoff_factor=2.0,
-        on_error=on_retry_error,
+    logger.debug("Publishing status change to notification queue")
+
+    message = aio_pika.Message(
+        body=json.dumps(message_payload).encode("utf-8"),
+        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+        headers={"organization": organization_id},
     )
 
-    if result is None:
-        logger.error("Failed to publish status change notification after 3 retry attempts")
-        return False
+    return await rabbitmq_publisher.publish(organization_id or settings.RABBITMQ_DEFAULT_EXCHANGE, message)
+
+
+async def publish_status_change(
+    job_submission: JobSubmission,
+    organization_id: Optional[str] = None,
+) -> bool:
+    """
+    Publish a status change for a JobSubmission to the RabbitMQ exchange used for notifications.
 
-    return True
+    Returns True if successful, False if failed after max retries.
+    """
+    return await publish_notification(build_status_change_payload(job_submission), organization_id)
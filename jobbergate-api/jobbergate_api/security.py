@@ -4,24 +4,28 @@ Instantiates armasec resources for auth on api endpoints using project settings.
 Also provides a factory function for TokenSecurity to reduce boilerplate.
 """
 
-from typing import Annotated
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, suppress
+from functools import lru_cache
+from typing import Annotated, AsyncIterator, Callable, NamedTuple
 
 from armasec import Armasec, TokenPayload
-from armasec.token_security import PermissionMode
+from armasec.openid_config_loader import OpenidConfigLoader
+from armasec.schemas import DomainConfig
+from armasec.token_decoder import TokenDecoder
+from armasec.token_manager import TokenManager
+from armasec.token_security import PermissionMode, TokenSecurity
 from buzz import check_expressions
 from fastapi import Depends, HTTPException, status
 from loguru import logger
-from pydantic import EmailStr, model_validator
+from pydantic import EmailStr, ValidationError, model_validator
+from starlette.requests import Request
 
 from jobbergate_api.config import settings
 
-guard = Armasec(
-    domain=settings.ARMASEC_DOMAIN,
-    debug_logger=logger.debug if settings.ARMASEC_DEBUG else None,
-    use_https=settings.ARMASEC_USE_HTTPS,
-    ignore_audience=True,
-)
-
 
 class IdentityPayload(TokenPayload):
     """
@@ -82,6 +86,221 @@ class IdentityPayload(TokenPayload):
         return {**values, "organization_id": org_id}
 
 
+class CachedToken(NamedTuple):
+    """
+    Provide a container for a verified token payload and the time (in seconds since the epoch) it expires.
+    """
+
+    identity_payload: IdentityPayload
+    expires_at: float
+
+
+class TokenCache:
+    """
+    Provide a bounded LRU cache of verified token payloads.
+
+    Entries are keyed by the hash of the authorization header, so the tokens are not kept in memory,
+    and they are evicted once the token expires or the configured time to live elapses.
+    """
+
+    entries: OrderedDict[bytes, CachedToken]
+
+    def __init__(self, max_size: int, ttl: int):
+        """
+        Initialize the cache with its maximum number of entries and time to live (in seconds).
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    @staticmethod
+    def build_key(auth_header: str) -> bytes:
+        """
+        Build the cache key for an authorization header.
+        """
+        return hashlib.sha256(auth_header.encode()).digest()
+
+    def get(self, auth_header: str) -> IdentityPayload | None:
+        """
+        Get the payload cached for an authorization header, if any and if it did not expire yet.
+        """
+        key = self.build_key(auth_header)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry.identity_payload
+
+    def set(self, auth_header: str, identity_payload: IdentityPayload):
+        """
+        Cache the payload of a verified token, evicting the least recently used entries if the cache is full.
+        """
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if identity_payload.expire is not None:
+            expires_at = min(expires_at, identity_payload.expire.timestamp())
+        key = self.build_key(auth_header)
+        self.entries[key] = CachedToken(identity_payload=identity_payload, expires_at=expires_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all the entries from the cache.
+        """
+        self.entries.clear()
+
+
+class JWKSCache:
+    """
+    Provide token managers that share the OIDC configuration and JWKS of their domain.
+
+    Armasec loads (and never refreshes) the JWKS once per route scope, so they are shared here
+    across all TokenSecurity instances and can be refreshed in the background to pick up rotated keys.
+    """
+
+    managers: dict[str, TokenManager]
+    domain_configs: dict[str, DomainConfig]
+
+    def __init__(self):
+        """
+        Initialize the cache with no token managers.
+        """
+        self.managers = {}
+        self.domain_configs = {}
+
+    def get_manager(self, domain_config: DomainConfig, debug_logger: Callable[..., None]) -> TokenManager:
+        """
+        Get the token manager for a domain, loading its OIDC configuration and JWKS on first use.
+        """
+        if domain_config.domain not in self.managers:
+            debug_logger(f"Loading shared TokenManager for domain {domain_config.domain}")
+            loader = OpenidConfigLoader(
+                domain_config.domain, use_https=domain_config.use_https, debug_logger=debug_logger
+            )
+            decoder = TokenDecoder(
+                loader.jwks,
+                domain_config.algorithm,
+                debug_logger=debug_logger,
+                permission_extractor=domain_config.permission_extractor,
+            )
+            self.domain_configs[domain_config.domain] = domain_config
+            self.managers[domain_config.domain] = TokenManager(
+                loader.config,
+                decoder,
+                audience=domain_config.audience,
+                ignore_audience=domain_config.ignore_audience,
+                debug_logger=debug_logger,
+            )
+        return self.managers[domain_config.domain]
+
+    def refresh(self):
+        """
+        Fetch the JWKS of every loaded domain again and swap them into the token decoders.
+        """
+        for domain, manager in self.managers.items():
+            loader = OpenidConfigLoader(domain, use_https=self.domain_configs[domain].use_https)
+            manager.token_decoder.jwks = loader.jwks
+            logger.debug(f"Refreshed JWKS for domain {domain}")
+
+    async def refresh_periodically(self, interval: float):
+        """
+        Refresh the JWKS every ``interval`` seconds, logging the failures instead of raising them.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as err:
+                logger.warning(f"Failed to refresh JWKS: {err}")
+
+    @asynccontextmanager
+    async def background_refresh(self, interval: float) -> AsyncIterator[None]:
+        """
+        Provide a context within which the JWKS are refreshed in the background.
+
+        No refresh is scheduled if the interval is not positive.
+        """
+        task = asyncio.create_task(self.refresh_periodically(interval)) if interval > 0 else None
+        try:
+            yield
+        finally:
+            if task is not None:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+
+
+token_cache = TokenCache(max_size=settings.ARMASEC_TOKEN_CACHE_SIZE, ttl=settings.ARMASEC_TOKEN_CACHE_TTL)
+jwks_cache = JWKSCache()
+
+
+class CachedTokenSecurity(TokenSecurity):
+    """
+    Provide a TokenSecurity that skips the verification of tokens that were recently verified.
+
+    The permission checks and plugins are still applied for every request. The private methods of
+    ``TokenSecurity`` are overridden, so armasec is pinned to the minor version they were written for.
+    """
+
+    def _load_manager(self, domain_config: DomainConfig) -> TokenManager:
+        return jwks_cache.get_manager(domain_config, self.debug_logger)
+
+    def _extract_token_payload_from_manager(self, request: Request) -> TokenPayload:
+        auth_header = request.headers.get(TokenManager.header_key)
+        if auth_header:
+            cached_payload = token_cache.get(auth_header)
+            if cached_payload is not None:
+                return cached_payload
+
+        token_payload = super()._extract_token_payload_from_manager(request)
+        if not auth_header:
+            return token_payload
+
+        try:
+            identity_payload = IdentityPayload(**token_payload.model_dump())
+        except ValidationError:
+            # Not cached, so the error is reported when the identity is extracted from the token
+            return token_payload
+        token_cache.set(auth_header, identity_payload)
+        return identity_payload
+
+
+class CachedArmasec(Armasec):
+    """
+    Provide an Armasec factory that locks down routes with CachedTokenSecurity instances.
+    """
+
+    @lru_cache(maxsize=128)  # noqa: B019 -- the guard lives as long as the app, as in Armasec
+    def lockdown(
+        self,
+        *scopes: str,
+        permission_mode: PermissionMode = PermissionMode.ALL,
+        skip_plugins: bool = False,
+    ) -> TokenSecurity:
+        return CachedTokenSecurity(
+            domain_configs=self.domain_configs,
+            scopes=scopes,
+            permission_mode=permission_mode,
+            debug_logger=self.debug_logger,
+            debug_exceptions=self.debug_exceptions,
+            skip_plugins=skip_plugins,
+        )
+
+
+guard = CachedArmasec(
+    domain=settings.ARMASEC_DOMAIN,
+    debug_logger=logger.debug if settings.ARMASEC_DEBUG else None,
+    use_https=settings.ARMASEC_USE_HTTPS,
+    ignore_audience=True,
+)
+
+
 def lockdown_with_identity(
     *scopes: str,
     permission_mode: PermissionMode = PermissionMode.SOME,
@@ -99,7 +318,10 @@ def lockdown_with_identity(
         """
         Provide an injectable function to lockdown a route and extract the identity payload.
         """
-        identity_payload = IdentityPayload(**token_payload.model_dump())
+        if isinstance(token_payload, IdentityPayload):
+            identity_payload = token_payload
+        else:
+            identity_payload = IdentityPayload(**token_payload.model_dump())
 
         with check_expressions(
             base_message="Access token does not contain",
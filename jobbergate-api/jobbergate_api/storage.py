@@ -15,7 +15,7 @@ import sqlalchemy
 from asyncpg.exceptions import UniqueViolationError
 from fastapi.exceptions import HTTPException
 from loguru import logger
-from sqlalchemy import Column, Enum, or_
+from sqlalchemy import Column, Enum, String, case, func, literal_column, or_
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import Mapped
 from sqlalchemy.sql.expression import Case, ColumnElement, UnaryExpression
@@ -209,6 +209,35 @@ def render_sql(session: AsyncSession, query) -> str:
     return str(query.compile(dialect=session.bind.dialect))
 
 
+SEARCH_RANK_SORT_FIELD = "relevance"
+"""Sort field used to rank the rows matching a search by relevance."""
+
+
+def search_document(searchable_fields: set) -> ColumnElement[str]:
+    """
+    Concatenate the searchable fields into a single document to search, sorted by their names.
+
+    The fields are separated by a space, which search terms never include, and the wildcards in the
+    terms are escaped, so a term only matches the document if it matches one of the fields. The expression matches the one of the trigram
+    indexes created by the migrations, so it must only include constants, never bound parameters.
+    """
+    fields = sorted(searchable_fields, key=lambda field: field.name)
+    document: ColumnElement[str] = func.coalesce(fields[0], literal_column("''"), type_=String)
+    for field in fields[1:]:
+        document = document + literal_column("' '") + func.coalesce(field, literal_column("''"), type_=String)
+    return document
+
+
+def search_pattern(search_term: str) -> str:
+    """
+    Build the ILIKE pattern matching a search term anywhere, escaping its wildcards with a backslash.
+
+    Otherwise, a ``_`` or a ``%`` in a term could match the space between two fields of the search document.
+    """
+    escaped_term = search_term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped_term}%"
+
+
 def search_clause(
     search_terms: str,
     searchable_fields: set,
@@ -216,15 +245,27 @@ def search_clause(
     """
     Create search clause across searchable fields with search terms.
 
+    A row matches if any of the terms is found in any of the fields. The terms are matched against
+    the concatenated search document, so a trigram index on it can be used instead of scanning the table.
+
     Regarding the False first argument to or_():
         The or_() function must have one fixed positional argument.
         See: https://docs.sqlalchemy.org/en/20/core/sqlelement.html#sqlalchemy.sql.expression.or_
     """
-    search_pairs = product(searchable_fields, search_terms.split())
-    search_expressions = (field.ilike(f"%{term}%") for (field, term) in search_pairs)
+    document = search_document(searchable_fields)
+    search_expressions = (document.ilike(search_pattern(term), escape="\\") for term in search_terms.split())
     return or_(False, *search_expressions)
 
 
+def search_rank(search_terms: str, searchable_fields: set) -> ColumnElement[int]:
+    """
+    Score the relevance of a row for the search terms as the number of fields matching each of them.
+    """
+    search_pairs = product(searchable_fields, search_terms.split())
+    scores = (case((field.ilike(search_pattern(term), escape="\\"), 1), else_=0) for (field, term) in search_pairs)
+    return sum(scores, literal_column("0"))
+
+
 def _build_enum_sort_clause(sort_column: Column, sort_ascending: bool) -> Case:
     """
     Build a Case statement that can be used as a sort clause for an enum column.
@@ -259,6 +300,20 @@ def _build_enum_sort_clause(sort_column: Column, sort_ascending: bool) -> Case:
     return sqlalchemy.case(dict(sort_tuple), value=sort_column)
 
 
+def find_sort_column(sort_field: str, sortable_fields: set) -> Mapped:
+    """
+    Find the column to sort by given a sort field and the list of sortable fields.
+    """
+    for sortable_field in sortable_fields:
+        if sortable_field.name == sort_field:
+            return sortable_field
+
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Invalid sorting column requested: {sort_field}. Must be one of {sortable_fields}",
+    )
+
+
 def sort_clause(
     sort_field: str,
     sortable_fields: set,
@@ -267,17 +322,7 @@ def sort_clause(
     """
     Create a sort clause given a sort field, the list of sortable fields, and a sort_ascending flag.
     """
-    sort_column: Mapped[typing.Any] | UnaryExpression | Case | None = None
-    for sortable_field in sortable_fields:
-        if sortable_field.name == sort_field:
-            sort_column = sortable_field
-            break
-
-    if sort_column is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid sorting column requested: {sort_field}. Must be one of {sortable_fields}",
-        )
+    sort_column: Mapped[typing.Any] | UnaryExpression | Case = find_sort_column(sort_field, sortable_fields)
 
     if isinstance(sort_column, Column) and isinstance(sort_column.type, sqlalchemy.Enum):
         sort_column = _build_enum_sort_clause(sort_column, sort_ascending)
@@ -12,7 +12,9 @@ from jobbergate_api.apps.dependencies import (
     s3_bucket,
     service_factory,
 )
+from jobbergate_api.apps.outbox.services import outbox_dispatcher
 from jobbergate_api.config import settings
+from jobbergate_api.rabbitmq_notification import rabbitmq_publisher
 from jobbergate_api.storage import engine_factory
 
 
@@ -36,18 +38,26 @@ async def run_cron_job(organization_id: str | None = None) -> None:
     async with cleanup_services(organization_id, commit=True) as services:
         for c in services.crud:
             await c.clean_unused_entries()
+        await services.crud.job_submission.sync_metric_policies()
 
     async with cleanup_services(organization_id, commit=False) as services:
         for f in services.file:
             await f.clean_unused_files()
 
+    # The API only checks the outbox of an organization once it has written to it, so the messages
+    # left over by a stopped instance are delivered here
+    await outbox_dispatcher.drain(organization_id if settings.MULTI_TENANCY_ENABLED else None)
+
     logger.success(f"Finished running cron jobs for organization ID: {organization_id}")
 
 
 async def main_async(targets: list[str] | list[None]) -> None:
     """Main function to run the cron jobs."""
     tasks = [run_cron_job(t) for t in targets]
-    await asyncio.gather(*tasks)
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        await rabbitmq_publisher.close()
 
 
 def main() -> None:
@@ -89,6 +89,15 @@ async def test_clone_job_script__success(
     assert response_data["cloned_from_id"] == original_instance.id
 
     assert {f["filename"] for f in response_data["files"]} == {"entrypoint.py", "support.sh"}
+    assert all(f["parent_id"] == cloned_id for f in response_data["files"])
+
+    cloned_files = {f.filename: f for f in await synth_services.file.job_script.find_children(cloned_id)}
+    assert await synth_services.file.job_script.get_file_content(cloned_files["entrypoint.py"]) == (
+        b"print('dummy file data')"
+    )
+    assert await synth_services.file.job_script.get_file_content(cloned_files["support.sh"]) == (
+        b"echo 'dummy file data'"
+    )
 
 
 async def test_clone_job_script__replace_base_values(
@@ -198,6 +207,72 @@ async def test_render_job_script_from_template__success(
     assert rendered_file_contents.decode("utf-8") == job_script_data_as_string
 
 
+async def test_render_job_script_from_template__multiple_files(
+    fill_job_template_data,
+    fill_job_script_data,
+    client,
+    inject_security_header,
+    tester_email,
+    synth_services,
+):
+    """
+    Test POST /job_scripts/render-from-template renders and creates every mapped file of a template.
+    """
+    base_template = await synth_services.crud.template.create(**fill_job_template_data())
+
+    await synth_services.file.template.upsert(
+        parent_id=base_template.id,
+        file_type="ENTRYPOINT",
+        filename="entrypoint.sh.j2",
+        upload_content="#!/bin/bash\necho {{ name }}\n",
+    )
+    for i in range(5):
+        await synth_services.file.template.upsert(
+            parent_id=base_template.id,
+            file_type="SUPPORT",
+            filename=f"support-{i}.txt.j2",
+            upload_content=f"support {i} for {{{{ name }}}}",
+        )
+    await synth_services.file.template.upsert(
+        parent_id=base_template.id,
+        file_type="SUPPORT",
+        filename="unmapped.txt.j2",
+        upload_content="not rendered",
+    )
+
+    output_name_mapping = {"entrypoint.sh.j2": "entrypoint.sh"}
+    output_name_mapping.update({f"support-{i}.txt.j2": f"support-{i}.txt" for i in range(5)})
+    payload = {
+        "create_request": fill_job_script_data(),
+        "render_request": {
+            "template_output_name_mapping": output_name_mapping,
+            "sbatch_params": ["--partition=debug"],
+            "param_dict": {"name": "rats"},
+        },
+    }
+
+    inject_security_header(tester_email, Permissions.JOB_SCRIPTS_CREATE)
+    response = await client.post(
+        f"/jobbergate/job-scripts/render-from-template/{base_template.id}",
+        json=payload,
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED, f"Render failed: {response.text}"
+    response_data = response.json()
+    assert {(f["filename"], f["file_type"]) for f in response_data["files"]} == {
+        ("entrypoint.sh", "ENTRYPOINT"),
+        *{(f"support-{i}.txt", "SUPPORT") for i in range(5)},
+    }
+
+    entrypoint = await synth_services.file.job_script.get(response_data["id"], "entrypoint.sh")
+    entrypoint_content = (await synth_services.file.job_script.get_file_content(entrypoint)).decode()
+    assert "#SBATCH --partition=debug\n" in entrypoint_content
+    assert entrypoint_content.endswith("echo rats")
+    for i in range(5):
+        support = await synth_services.file.job_script.get(response_data["id"], f"support-{i}.txt")
+        assert await synth_services.file.job_script.get_file_content(support) == f"support {i} for rats".encode()
+
+
 async def test_render_job_script_from_template__no_entrypoint(
     fill_job_template_data,
     fill_job_script_data,
@@ -1258,6 +1333,79 @@ class TestJobScriptFiles:
         assert response.status_code == status.HTTP_200_OK, f"Get failed: {response.text}"
         assert response.content.decode() == large_string
 
+    async def test_get__not_modified_with_matching_etag(
+        self,
+        client,
+        tester_email,
+        inject_security_header,
+        job_script_data,
+        job_script_data_as_string,
+        synth_services,
+    ):
+        job_script_id = job_script_data.id
+        job_script_filename = "entrypoint.sh"
+
+        await synth_services.file.job_script.upsert(
+            parent_id=job_script_id,
+            filename=job_script_filename,
+            upload_content=job_script_data_as_string,
+            file_type="ENTRYPOINT",
+        )
+
+        inject_security_header(tester_email, Permissions.JOB_SCRIPTS_READ)
+        response = await client.get(f"jobbergate/job-scripts/{job_script_id}/upload/{job_script_filename}")
+
+        assert response.status_code == status.HTTP_200_OK, f"Get failed: {response.text}"
+        assert response.headers["accept-ranges"] == "bytes"
+        etag = response.headers["etag"]
+
+        response = await client.get(
+            f"jobbergate/job-scripts/{job_script_id}/upload/{job_script_filename}",
+            headers={"If-None-Match": etag},
+        )
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+    async def test_get__partial_content_with_range(
+        self,
+        client,
+        tester_email,
+        inject_security_header,
+        job_script_data,
+        synth_services,
+    ):
+        job_script_id = job_script_data.id
+        job_script_filename = "entrypoint.sh"
+        content = "0123456789" * 10
+
+        await synth_services.file.job_script.upsert(
+            parent_id=job_script_id,
+            filename=job_script_filename,
+            upload_content=content,
+            file_type="ENTRYPOINT",
+        )
+
+        inject_security_header(tester_email, Permissions.JOB_SCRIPTS_READ)
+        response = await client.get(
+            f"jobbergate/job-scripts/{job_script_id}/upload/{job_script_filename}",
+            headers={"Range": "bytes=10-24"},
+        )
+
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT, f"Get failed: {response.text}"
+        assert response.content.decode() == content[10:25]
+        assert response.headers["content-range"] == f"bytes 10-24/{len(content)}"
+        assert response.headers["content-length"] == "15"
+
+        response = await client.get(
+            f"jobbergate/job-scripts/{job_script_id}/upload/{job_script_filename}",
+            headers={"Range": f"bytes={len(content)}-"},
+        )
+
+        assert response.status_code == status.HTTP_416_RANGE_NOT_SATISFIABLE
+        assert response.headers["content-range"] == f"bytes */{len(content)}"
+
     @pytest.mark.parametrize(
         "is_owner, permissions",
         [
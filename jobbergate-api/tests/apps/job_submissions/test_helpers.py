@@ -1,16 +1,27 @@
 """Core module for testing the helper functions of the job submissions app."""
 
+import struct
+import time
+from datetime import datetime, timedelta, timezone
 from math import ceil
 from textwrap import dedent
 
+import msgpack
 import pytest
 
 from jobbergate_api.apps.job_submissions.constants import (
+    JOB_METRIC_AGGREGATE_COLUMNS,
     JobSubmissionMetricAggregateNames,
+    JobSubmissionMetricDownsampling,
     JobSubmissionMetricSampleRate,
 )
 from jobbergate_api.apps.job_submissions.helpers import (
     build_job_metric_aggregation_query,
+    choose_job_metric_sample_rate,
+    decode_columnar_job_metric_upload,
+    downsample_job_metrics,
+    encode_columnar_job_metrics,
+    iter_job_metric_upload_chunks,
     validate_job_metric_upload_input,
 )
 
@@ -29,7 +40,7 @@ class TestValidateJobMetricUploadInput:
     - `test_validate_job_metric_upload_input_invalid_data_type`: Tests that the function raises a ValueError for invalid data types.
     - `test_validate_job_metric_upload_input_invalid_inner_type`: Tests that the function raises a ValueError for invalid inner types.
     - `test_validate_job_metric_upload_input_invalid_length`: Tests that the function raises a ValueError when the length of any iterable in `data` does not match the length of `expected_types`.
-    - `test_validate_job_metric_upload_input_exceeds_max_elements`: Tests that the function raises a ValueError when the input data exceeds the maximum number of allowed elements.
+    - `test_validate_job_metric_upload_input_accepts_more_than_the_bind_parameter_limit`: Tests that the function accepts input data beyond the number of query params supported by Postgres.
     - `test_validate_job_metric_upload_input_cast_failure`: Tests that the function raises a ValueError when data cannot be cast to the expected types.
     - `test_validate_job_metric_upload_input_cast_success`: Tests that the function successfully casts data to the expected types.
     """
@@ -94,35 +105,17 @@ class TestValidateJobMetricUploadInput:
             validate_job_metric_upload_input(data, expected_types)
 
     @pytest.mark.parametrize("num_of_elements", [3, 8, 83])
-    def test_validate_job_metric_upload_input_exceeds_max_elements(self, num_of_elements: int):
+    def test_validate_job_metric_upload_input_accepts_more_than_the_bind_parameter_limit(self, num_of_elements: int):
         """
-        Test that the `validate_job_metric_upload_input` function raises a `ValueError`
-        when the input data exceeds the maximum number of allowed elements.
+        Test that the `validate_job_metric_upload_input` function accepts input data beyond the
+        number of query params supported by Postgres (2**15 - 1).
 
-        The test creates a list of lists `data` where each sublist contains three identical
-        integers. The length of `data` is set to exceed the maximum allowed elements.
-        The `expected_types` tuple specifies the expected types for each element in the sublists.
-
-        The test asserts that a `ValueError` is raised with the message "The maximum number of elements
-        has been exceeded." when `validate_job_metric_upload_input` is called with the `data` and
-        `expected_types` arguments.
-
-        Postgres limits the number of query params to 2**15 - 1. Considering that each
-        element in the sublists will generate len(data) * len(expected_types) query params, the maximum
-        number of elements is calculated as ceil((2**15 - 1) / num_of_elements).
-        [Reference](https://www.postgresql.org/docs/17/protocol-message-formats.html)
+        The metrics are inserted with COPY, so the number of elements is no longer bound to that limit.
         """
         data = [[i] * num_of_elements for i in range(ceil((2**15 - 1) / num_of_elements) + 1)]
         expected_types = [int] * num_of_elements
-        with pytest.raises(
-            ValueError,
-            match=(
-                "The maximum number of elements has been exceeded. Maximum is {}, received {}".format(
-                    ceil((2**15 - 1) / num_of_elements), len(data)
-                )
-            ),
-        ):
-            validate_job_metric_upload_input(data, expected_types)
+        result = validate_job_metric_upload_input(data, expected_types)
+        assert list(result) == [tuple(row) for row in data]
 
     def test_validate_job_metric_upload_input_cast_failure(self):
         """
@@ -150,6 +143,120 @@ class TestValidateJobMetricUploadInput:
         assert list(result) == [(1, "test", 3.5)]
 
 
+async def _stream(data: bytes, piece_size: int):
+    """Yield the data in pieces to simulate a request body being streamed."""
+    for start in range(0, len(data), piece_size):
+        yield data[start : start + piece_size]
+
+
+class TestIterJobMetricUploadChunks:
+    """
+    Test suite for the `iter_job_metric_upload_chunks` function.
+    """
+
+    @pytest.mark.parametrize("piece_size", [1, 7, 4096])
+    async def test_iter_job_metric_upload_chunks__yields_rows_in_chunks(self, piece_size: int):
+        """
+        Test that the rows are decoded as the data is streamed and yielded in chunks of the given size,
+        regardless of how the data is split.
+        """
+        data = [[i, f"node-{i}", 1.5 * i] for i in range(25)]
+
+        chunks = [chunk async for chunk in iter_job_metric_upload_chunks(_stream(msgpack.packb(data), piece_size), 10)]
+
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+        assert [row for chunk in chunks for row in chunk] == data
+
+    async def test_iter_job_metric_upload_chunks__empty_list(self):
+        """
+        Test that nothing is yielded for an empty list of rows.
+        """
+        chunks = [chunk async for chunk in iter_job_metric_upload_chunks(_stream(msgpack.packb([]), 4096), 10)]
+
+        assert chunks == []
+
+    @pytest.mark.parametrize("data", [msgpack.packb("not a list"), msgpack.packb({"foo": "bar"}), b""])
+    async def test_iter_job_metric_upload_chunks__raises_if_data_is_not_a_list(self, data: bytes):
+        """
+        Test that a ValueError is raised when the data is not a msgpack encoded list.
+        """
+        with pytest.raises(ValueError, match="Decoded data must be a list."):
+            [chunk async for chunk in iter_job_metric_upload_chunks(_stream(data, 4096), 10)]
+
+    async def test_iter_job_metric_upload_chunks__raises_if_data_is_incomplete(self):
+        """
+        Test that a ValueError is raised when the stream ends before all the rows are received.
+        """
+        data = msgpack.packb([[1, "node", 1.5], [2, "node", 2.5]])[:-5]
+
+        with pytest.raises(ValueError, match="Decoded data is incomplete."):
+            [chunk async for chunk in iter_job_metric_upload_chunks(_stream(data, 4096), 10)]
+
+
+def _encode_columnar(rows: list[tuple], node_hosts: list[str]) -> bytes:
+    """Encode the rows in the columnar format, the same way the agent does."""
+    formats = "qqqqdddqdqqqqq"
+    columns = [
+        struct.pack(f"<{len(rows)}{fmt}", *(node_hosts.index(v) if i == 1 else v for v in column))
+        for i, (fmt, column) in enumerate(zip(formats, zip(*rows, strict=True) if rows else [()] * 14, strict=True))
+    ]
+    return msgpack.packb({"rows": len(rows), "node_hosts": node_hosts, "columns": columns})
+
+
+class TestDecodeColumnarJobMetricUpload:
+    """
+    Test suite for the `decode_columnar_job_metric_upload` function.
+    """
+
+    rows = [
+        (1700000000, "node-b", 0, 1, 1.5, 2.5, 3.5, 4, 5.5, 6, 7, 8, 9, 10),
+        (1700000010, "node-a", 1, 2, 0.5, 1.0, 1.5, 2, 2.5, 3, 4, 5, 6, 7),
+    ]
+
+    def test_decode_columnar_job_metric_upload__success(self):
+        """
+        Test that the columns are decoded from the typed buffers and the node hosts are resolved.
+        """
+        columns = decode_columnar_job_metric_upload(_encode_columnar(self.rows, ["node-a", "node-b"]))
+
+        assert list(zip(*columns, strict=True)) == self.rows
+
+    def test_decode_columnar_job_metric_upload__empty(self):
+        """
+        Test that an upload with no rows is decoded into empty columns.
+        """
+        columns = decode_columnar_job_metric_upload(_encode_columnar([], []))
+
+        assert [list(column) for column in columns] == [[]] * 14
+
+    @pytest.mark.parametrize(
+        "payload, message",
+        [
+            (b"\xc1", "Failed to decode the columnar data."),
+            (msgpack.packb([[1, 2, 3]]), "Columnar data must be a map"),
+            (msgpack.packb({"rows": -1, "node_hosts": [], "columns": []}), "non negative integer"),
+            (msgpack.packb({"rows": 0, "node_hosts": [1], "columns": []}), "must be a list of strings"),
+            (msgpack.packb({"rows": 0, "node_hosts": [], "columns": [b""] * 3}), "exactly 14 columns"),
+            (msgpack.packb({"rows": 1, "node_hosts": ["a"], "columns": [b""] * 14}), "Column `time` must be a buffer"),
+        ],
+    )
+    def test_decode_columnar_job_metric_upload__invalid_payload(self, payload: bytes, message: str):
+        """
+        Test that a ValueError is raised when the payload does not follow the columnar format.
+        """
+        with pytest.raises(ValueError, match=message):
+            decode_columnar_job_metric_upload(payload)
+
+    def test_decode_columnar_job_metric_upload__unknown_node_host(self):
+        """
+        Test that a ValueError is raised when the node_host column references a host out of the dictionary.
+        """
+        payload = msgpack.unpackb(_encode_columnar(self.rows, ["node-a", "node-b"]))
+        payload["node_hosts"] = ["node-a"]
+        with pytest.raises(ValueError, match="references an unknown node host"):
+            decode_columnar_job_metric_upload(msgpack.packb(payload))
+
+
 class TestBuildJobMetricAggregationQuery:
     """
     Test suite for the `build_job_metric_aggregation_query` function.
@@ -227,3 +334,147 @@ class TestBuildJobMetricAggregationQuery:
         )
         result = build_job_metric_aggregation_query(node, sample_rate)
         assert result == expected_query
+
+    def test_build_query_real_time(self):
+        """
+        Test the `build_job_metric_aggregation_query` function with real-time aggregation.
+
+        This test checks if the recent buckets are aggregated from the raw metrics and combined with the view.
+        """
+        result = build_job_metric_aggregation_query("node1", JobSubmissionMetricSampleRate.ten_minutes, real_time=True)
+
+        (materialized, raw) = result.split("UNION ALL")
+        assert f"FROM {JobSubmissionMetricAggregateNames.metrics_nodes_mv_10_minutes_by_node}" in materialized
+        assert "AND bucket < time_bucket(INTERVAL '600 seconds', now()) - INTERVAL '600 seconds'" in materialized
+        assert "FROM job_submission_metrics" in raw
+        assert "WHERE job_submission_id = :job_submission_id AND node_host = :node_host" in raw
+        assert "AND time >= time_bucket(INTERVAL '600 seconds', now()) - INTERVAL '600 seconds'" in raw
+        assert "SUM(cpu_time) AS cpu_time" in raw
+        assert "AVG(memory_rss) AS memory_rss" in raw
+        assert raw.rstrip().endswith("ORDER BY bucket")
+
+
+@pytest.mark.parametrize(
+    "window, max_points, expected_sample_rate",
+    [
+        (timedelta(hours=1), 100, JobSubmissionMetricSampleRate.ten_seconds),
+        (timedelta(hours=1), 60, JobSubmissionMetricSampleRate.one_minute),
+        (timedelta(days=1), 100, JobSubmissionMetricSampleRate.ten_minutes),
+        (timedelta(days=7), 100, JobSubmissionMetricSampleRate.one_hour),
+        (timedelta(days=7 * 52), 10, JobSubmissionMetricSampleRate.one_week),
+        (timedelta(minutes=1), 100, JobSubmissionMetricSampleRate.ten_seconds),
+    ],
+)
+def test_choose_job_metric_sample_rate(window, max_points, expected_sample_rate):
+    """
+    Test that the coarsest sample rate providing enough buckets over the window is chosen.
+    """
+    start_time = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    assert choose_job_metric_sample_rate(start_time, start_time + window, max_points) == expected_sample_rate
+
+
+def build_metric_rows(node_host: str, num_rows: int, base_time: int = 1_600_000_000) -> list[tuple]:
+    """
+    Build the rows of the aggregated metrics of a node, with a single spike on the middle.
+    """
+    return [
+        (
+            datetime.fromtimestamp(base_time + 10 * i, tz=timezone.utc),
+            node_host,
+            *([100.0 if i == num_rows // 2 else float(i % 3)] * 10),
+        )
+        for i in range(num_rows)
+    ]
+
+
+class TestDownsampleJobMetrics:
+    """
+    Test suite for the `downsample_job_metrics` function.
+    """
+
+    @pytest.mark.parametrize("method", list(JobSubmissionMetricDownsampling))
+    def test_downsample__keeps_rows_within_budget(self, method):
+        """
+        Test that the rows are returned untouched when they already fit the budget.
+        """
+        rows = build_metric_rows("node-1", 10) + build_metric_rows("node-2", 10)
+        assert downsample_job_metrics(rows, 10, method) == rows
+
+    def test_downsample__lttb(self):
+        """
+        Test that LTTB keeps the first, the last and the spike rows of each node, ordered by bucket and node.
+        """
+        rows = sorted(
+            build_metric_rows("node-1", 1000) + build_metric_rows("node-2", 500),
+            key=lambda row: row[0],
+        )
+
+        result = downsample_job_metrics(rows, 50, JobSubmissionMetricDownsampling.lttb)
+
+        for node_host, num_rows in (("node-1", 1000), ("node-2", 500)):
+            node_rows = [row for row in rows if row[1] == node_host]
+            node_result = [row for row in result if row[1] == node_host]
+            assert len(node_result) == 50
+            assert node_result[0] == node_rows[0]
+            assert node_result[-1] == node_rows[-1]
+            assert node_rows[num_rows // 2] in node_result
+            assert all(row in node_rows for row in node_result)
+        assert result == sorted(result, key=lambda row: (row[0], row[1]))
+
+    def test_downsample__lttb_scales_linearly(self):
+        """
+        Test that LTTB handles a day of 10 seconds buckets quickly, as it did not when it was quadratic.
+        """
+        rows = build_metric_rows("node-1", 8640)
+
+        start = time.perf_counter()
+        result = downsample_job_metrics(rows, 5000, JobSubmissionMetricDownsampling.lttb)
+
+        assert len(result) == 5000
+        assert time.perf_counter() - start < 5
+
+    def test_downsample__min_max(self):
+        """
+        Test that min/max keeps the envelope of every metric on each group of rows.
+        """
+        rows = build_metric_rows("node-1", 1000)
+
+        result = downsample_job_metrics(rows, 51, JobSubmissionMetricDownsampling.min_max)
+
+        assert len(result) == 50
+        assert result[0][0] == rows[0][0]
+        assert result[-1][0] == rows[-1][0]
+        assert max(row[2] for row in result) == 100.0
+        assert min(row[2] for row in result) == 0.0
+        assert all(result[i][2:] == (0.0,) * 10 for i in range(0, 50, 2))
+
+
+class TestEncodeColumnarJobMetrics:
+    """
+    Test suite for the `encode_columnar_job_metrics` function.
+    """
+
+    def test_encode__success(self):
+        """
+        Test that the rows are encoded as one typed buffer per column, with a dictionary of node hosts.
+        """
+        rows = build_metric_rows("node-1", 3) + build_metric_rows("node-2", 2)
+
+        payload = msgpack.unpackb(encode_columnar_job_metrics(rows))
+
+        assert payload["rows"] == 5
+        assert payload["node_hosts"] == ["node-1", "node-2"]
+        assert len(payload["columns"]) == len(JOB_METRIC_AGGREGATE_COLUMNS)
+        (times, hosts, *metrics) = payload["columns"]
+        assert list(struct.unpack("<5q", times)) == [int(row[0].timestamp()) for row in rows]
+        assert list(struct.unpack("<5q", hosts)) == [0, 0, 0, 1, 1]
+        for index, metric in enumerate(metrics, start=2):
+            assert list(struct.unpack("<5d", metric)) == [row[index] for row in rows]
+
+    def test_encode__empty(self):
+        """
+        Test that no rows are encoded as empty buffers.
+        """
+        payload = msgpack.unpackb(encode_columnar_job_metrics([]))
+
+        assert payload == {"rows": 0, "node_hosts": [], "columns": [b""] * len(JOB_METRIC_AGGREGATE_COLUMNS)}
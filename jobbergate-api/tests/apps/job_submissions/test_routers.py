@@ -3,19 +3,21 @@ Tests for the /job-submissions/ endpoint.
 """
 
 import itertools
-import json
+import struct
 import uuid
 from datetime import datetime, timedelta, timezone
 from textwrap import dedent
 from unittest import mock
 
 import msgpack
+import pendulum
 import pytest
 from faker import Faker
 from fastapi import status
-from sqlalchemy import insert, select
+from sqlalchemy import func, insert, select
 
 from jobbergate_api.apps.job_submissions.constants import (
+    JOB_METRIC_COLUMNAR_CONTENT_TYPE,
     JobSubmissionMetricAggregateNames,
     JobSubmissionMetricSampleRate,
     JobSubmissionStatus,
@@ -23,8 +25,9 @@ from jobbergate_api.apps.job_submissions.constants import (
 )
 from jobbergate_api.apps.job_submissions.models import JobProgress, JobSubmissionMetric
 from jobbergate_api.apps.job_submissions.schemas import JobSubmissionAgentMaxTimes, JobSubmissionMetricSchema
+from jobbergate_api.apps.outbox.constants import OutboxMessageKind
+from jobbergate_api.apps.outbox.models import OutboxMessage
 from jobbergate_api.apps.permissions import Permissions
-from jobbergate_api.rabbitmq_notification import rabbitmq_connect
 
 # Not using the synth_session fixture in a route that needs the database is unsafe
 pytest.mark.usefixtures("synth_session")
@@ -62,6 +65,19 @@ def generate_job_submission_metric_columns(base_time: int, num_rows: int = 5) ->
     ]
 
 
+def encode_job_submission_metric_columns(rows: list[tuple]) -> bytes:
+    """
+    Encode the rows generated by ``generate_job_submission_metric_columns`` in the columnar upload format.
+    """
+    node_hosts = sorted({row[1] for row in rows})
+    formats = "qqqqdddqdqqqqq"
+    columns = [
+        struct.pack(f"<{len(rows)}{fmt}", *(node_hosts.index(v) if i == 1 else v for v in column))
+        for i, (fmt, column) in enumerate(zip(formats, zip(*rows, strict=True), strict=True))
+    ]
+    return msgpack.packb({"rows": len(rows), "node_hosts": node_hosts, "columns": columns})
+
+
 @pytest.mark.parametrize("permission", (Permissions.ADMIN, Permissions.JOB_SUBMISSIONS_CREATE))
 async def test_create_job_submission__on_site_submission(
     permission,
@@ -928,6 +944,61 @@ async def test_list_job_submission_pagination(
     ) == ["sub5"]
 
 
+async def test_list_job_submission_keyset_pagination(
+    client,
+    fill_job_script_data,
+    fill_all_job_submission_data,
+    inject_security_header,
+    synth_services,
+    unpack_response,
+):
+    """
+    Test that listing job_submissions works with the keyset pagination.
+
+    We show this by creating five job_submissions and following the cursors until the last page.
+    """
+    base_job_script = await synth_services.crud.job_script.create(**fill_job_script_data())
+
+    submission_list = fill_all_job_submission_data(
+        *[
+            {
+                "job_script_id": base_job_script.id,
+                "name": f"sub{i}",
+                "owner_email": "owner1@org.com",
+            }
+            for i in range(1, 6)
+        ]
+    )
+
+    for item in submission_list:
+        await synth_services.crud.job_submission.create(**item)
+
+    inject_security_header("owner1@org.com", Permissions.JOB_SUBMISSIONS_READ)
+
+    (cursor, pages) = ("", [])
+    while cursor is not None:
+        response = await client.get(
+            "/jobbergate/job-submissions",
+            params={"cursor": cursor, "size": 2, "sort_field": "name", "sort_ascending": False},
+        )
+        pages.append(unpack_response(response, key="name", check_size=2))
+        response_data = response.json()
+        assert response_data["total"] is None
+        assert response_data["pages"] is None
+        cursor = response_data["next_cursor"]
+
+    assert pages == [["sub5", "sub4"], ["sub3", "sub2"], ["sub1"]]
+
+    response = await client.get("/jobbergate/job-submissions", params={"cursor": "not-a-cursor"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = await client.get(
+        "/jobbergate/job-submissions", params={"cursor": "", "search": "sub1", "sort_field": "relevance"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "not supported with the cursor pagination" in response.json()["detail"]
+
+
 async def test_get_job_submissions_with_slurm_job_ids_param(
     client,
     fill_job_script_data,
@@ -1656,22 +1727,20 @@ async def test_job_submissions_agent_rejected__success(
     assert result[0].additional_info == payload["report_message"]
 
 
-@pytest.mark.flaky(max_runs=3)
-async def test_job_submissions_agent_rejected__publishes_status_change_to_rabbitmq_when_enabled(
+async def test_job_submissions_agent_rejected__writes_notifications_to_the_outbox(
     fill_job_script_data,
     fill_job_submission_data,
     client,
     inject_security_header,
     synth_services,
+    synth_session,
     tester_email,
 ):
     """
-    Test POST /job-submissions/agent/rejected publishes a status change to rabbitmq.
-
-    This test proves that when a job_submission is REJECTED, a notification is sent to rabbitmq.
+    Test POST /job-submissions/agent/rejected writes the status change and the email to the outbox.
 
-    This is an unstable test that may break when run with other tests that use rabbitmq. Thus,
-    it is marked flaky.
+    This test proves that when a job_submission is REJECTED, the notifications are written to the
+    outbox, to be delivered in the background, instead of being sent during the request.
     """
     base_job_script = await synth_services.crud.job_script.create(**fill_job_script_data())
 
@@ -1697,15 +1766,22 @@ async def test_job_submissions_agent_rejected__publishes_status_change_to_rabbit
         client_id="dummy-client",
         organization_id="dummy-org",
     )
-    response = await client.post("/jobbergate/job-submissions/agent/rejected", json=payload)
+    with mock.patch("jobbergate_api.apps.outbox.services.publish_notification") as mocked_publish:
+        response = await client.post("/jobbergate/job-submissions/agent/rejected", json=payload)
     assert response.status_code == status.HTTP_202_ACCEPTED
+    mocked_publish.assert_not_called()
 
-    async with rabbitmq_connect(exchange_name="dummy-org", do_purge=True) as (_, queue):
-        message = await queue.get(timeout=1, no_ack=True)
-
-    assert message
-    assert message.headers == {"organization": "dummy-org"}
-    assert json.loads(message.body.decode()) == {
+    messages = (await synth_session.execute(select(OutboxMessage).order_by(OutboxMessage.id))).scalars().all()
+    assert [(m.kind, m.organization_id, m.attempts) for m in messages] == [
+        (OutboxMessageKind.SUBMISSION_REJECTED, "dummy-org", 0),
+        (OutboxMessageKind.STATUS_CHANGE, "dummy-org", 0),
+    ]
+    assert messages[0].payload == {
+        "job_submission_id": inserted_job_submission_id,
+        "report_message": "Something went wrong",
+        "to_emails": tester_email,
+    }
+    assert messages[1].payload == {
         "path": f"jobs.job_submissions.{inserted_submission.id}",
         "user_email": tester_email,
         "action": "status",
@@ -1951,25 +2027,22 @@ async def test_job_submissions_agent_update__sets_done_status(
         (SlurmJobState.CANCELLED, JobSubmissionStatus.ABORTED),
     ],
 )
-@pytest.mark.flaky(max_runs=3)
-async def test_job_submissions_agent_update__publishes_status_change_to_rabbitmq_when_enabled(
+async def test_job_submissions_agent_update__writes_status_change_to_the_outbox(
     fill_job_script_data,
     fill_job_submission_data,
     client,
     inject_security_header,
     synth_services,
+    synth_session,
     tester_email,
     slurm_job_state,
     expected_status,
 ):
     """
-    Test PUT /job-submissions/agent/{job_submission_id} publishes status changes to rabbitmq.
+    Test PUT /job-submissions/agent/{job_submission_id} writes status changes to the outbox.
 
     This test proves that when a job_submission is successfully updated to a DONE or ABORTED
-    status, a notification is sent to rabbitmq.
-
-    This is an unstable test that may break when run with other tests that use rabbitmq. Thus,
-    it is marked flaky.
+    status, a notification is written to the outbox to be published to rabbitmq in the background.
     """
     base_job_script = await synth_services.crud.job_script.create(**fill_job_script_data())
 
@@ -2004,12 +2077,10 @@ async def test_job_submissions_agent_update__publishes_status_change_to_rabbitmq
     )
     assert response.status_code == status.HTTP_202_ACCEPTED
 
-    async with rabbitmq_connect(exchange_name="dummy-org", do_purge=True) as (_, queue):
-        message = await queue.get(timeout=1, no_ack=True)
-
-    assert message
-    assert message.headers == {"organization": "dummy-org"}
-    assert json.loads(message.body.decode()) == {
+    message = (await synth_session.execute(select(OutboxMessage))).scalar_one()
+    assert message.kind == OutboxMessageKind.STATUS_CHANGE
+    assert message.organization_id == "dummy-org"
+    assert message.payload == {
         "path": f"jobs.job_submissions.{inserted_submission.id}",
         "user_email": tester_email,
         "action": "status",
@@ -2115,6 +2186,282 @@ async def test_job_submissions_agent_update__returns_409_if_slurm_job_id_differs
     assert response.status_code == status.HTTP_409_CONFLICT
 
 
+@pytest.mark.parametrize("permission", (Permissions.ADMIN, Permissions.JOB_SUBMISSIONS_UPDATE))
+async def test_job_submissions_agent_batch_update__success(
+    permission,
+    fill_job_script_data,
+    fill_job_submission_data,
+    client,
+    inject_security_header,
+    synth_services,
+    synth_session,
+):
+    """
+    Test PUT /job-submissions/agent/batch correctly updates multiple job_submissions.
+
+    This test proves that all job_submissions in the batch are updated, that progress entries are created only
+    for the ones whose slurm_job_state changed, and that the status is set to DONE for terminated jobs.
+    """
+    base_job_script = await synth_services.crud.job_script.create(**fill_job_script_data())
+
+    running_submission = await synth_services.crud.job_submission.create(
+        job_script_id=base_job_script.id,
+        **fill_job_submission_data(
+            client_id="dummy-client",
+            status=JobSubmissionStatus.SUBMITTED,
+            slurm_job_id=111,
+            slurm_job_state=SlurmJobState.PENDING,
+            slurm_job_info="Fake slurm job info",
+        ),
+    )
+    completed_submission = await synth_services.crud.job_submission.create(
+        job_script_id=base_job_script.id,
+        **fill_job_submission_data(
+            client_id="dummy-client",
+            status=JobSubmissionStatus.SUBMITTED,
+            slurm_job_id=222,
+            slurm_job_state=SlurmJobState.RUNNING,
+            slurm_job_info="Fake slurm job info",
+        ),
+    )
+    unchanged_submission = await synth_services.crud.job_submission.create(
+        job_script_id=base_job_script.id,
+        **fill_job_submission_data(
+            client_id="dummy-client",
+            status=JobSubmissionStatus.SUBMITTED,
+            slurm_job_id=333,
+            slurm_job_state=SlurmJobState.RUNNING,
+            slurm_job_info="Fake slurm job info",
+        ),
+    )
+
+    running_id, completed_id, unchanged_id = running_submission.id, completed_submission.id, unchanged_submission.id
+
+    inject_security_header("who@cares.com", permission, client_id="dummy-client")
+    with mock.patch("jobbergate_api.apps.outbox.services.publish_notification") as mocked_publish:
+        response = await client.put(
+            "/jobbergate/job-submissions/agent/batch",
+            json=[
+                {
+                    "id": running_id,
+                    "slurm_job_state": SlurmJobState.RUNNING,
+                    "slurm_job_info": "Dummy slurm job info 1",
+                    "slurm_job_id": 111,
+                },
+                {
+                    "id": completed_id,
+                    "slurm_job_state": SlurmJobState.COMPLETED,
+                    "slurm_job_info": "Dummy slurm job info 2",
+                    "slurm_job_id": 222,
+                    "slurm_job_state_reason": "Finished",
+                },
+                {
+                    "id": unchanged_id,
+                    "slurm_job_state": SlurmJobState.RUNNING,
+                    "slurm_job_info": "Dummy slurm job info 3",
+                    "slurm_job_id": 333,
+                },
+            ],
+        )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == [
+        {"id": running_id, "status_code": status.HTTP_202_ACCEPTED, "detail": None},
+        {"id": completed_id, "status_code": status.HTTP_202_ACCEPTED, "detail": None},
+        {"id": unchanged_id, "status_code": status.HTTP_202_ACCEPTED, "detail": None},
+    ]
+
+    synth_session.expire_all()
+
+    instance = await synth_services.crud.job_submission.get(running_id)
+    assert instance.status == JobSubmissionStatus.SUBMITTED
+    assert instance.slurm_job_state == SlurmJobState.RUNNING
+    assert instance.slurm_job_info == "Dummy slurm job info 1"
+
+    instance = await synth_services.crud.job_submission.get(completed_id)
+    assert instance.status == JobSubmissionStatus.DONE
+    assert instance.slurm_job_state == SlurmJobState.COMPLETED
+    assert instance.slurm_job_info == "Dummy slurm job info 2"
+
+    instance = await synth_services.crud.job_submission.get(unchanged_id)
+    assert instance.status == JobSubmissionStatus.SUBMITTED
+    assert instance.slurm_job_info == "Dummy slurm job info 3"
+
+    query = select(JobProgress).where(
+        JobProgress.job_submission_id.in_(
+            [running_id, completed_id, unchanged_id],
+        )
+    )
+    result = (await synth_session.execute(query)).scalars().all()
+    assert {(r.job_submission_id, r.slurm_job_state, r.additional_info) for r in result} == {
+        (running_id, SlurmJobState.RUNNING, None),
+        (completed_id, SlurmJobState.COMPLETED, "Finished"),
+    }
+
+    mocked_publish.assert_not_called()
+    message = (await synth_session.execute(select(OutboxMessage))).scalar_one()
+    assert message.kind == OutboxMessageKind.STATUS_CHANGE
+    assert message.payload["path"] == f"jobs.job_submissions.{completed_id}"
+    assert message.payload["additional_context"] == {
+        "status": JobSubmissionStatus.DONE,
+        "slurm_job_state": SlurmJobState.COMPLETED,
+    }
+
+
+async def test_job_submissions_agent_batch_update__reports_failures_per_item(
+    fill_job_script_data,
+    fill_job_submission_data,
+    client,
+    inject_security_header,
+    synth_services,
+    synth_session,
+):
+    """
+    Test PUT /job-submissions/agent/batch reports invalid items without failing the whole batch.
+
+    This test proves that each invalid item receives the same status code the single update endpoint
+    would return for it, while the valid items are still applied.
+    """
+    base_job_script = await synth_services.crud.job_script.create(**fill_job_script_data())
+
+    valid_submission, other_client_submission, mismatched_submission, done_submission = [
+        await synth_services.crud.job_submission.create(
+            job_script_id=base_job_script.id,
+            **fill_job_submission_data(
+                client_id=client_id,
+                status=submission_status,
+                slurm_job_id=slurm_job_id,
+                slurm_job_state=SlurmJobState.PENDING,
+                slurm_job_info="Fake slurm job info",
+            ),
+        )
+        for (client_id, submission_status, slurm_job_id) in [
+            ("dummy-client", JobSubmissionStatus.SUBMITTED, 111),
+            ("other-client", JobSubmissionStatus.SUBMITTED, 222),
+            ("dummy-client", JobSubmissionStatus.SUBMITTED, 333),
+            ("dummy-client", JobSubmissionStatus.DONE, 444),
+        ]
+    ]
+    valid_id, other_client_id, mismatched_id, done_id = (
+        valid_submission.id,
+        other_client_submission.id,
+        mismatched_submission.id,
+        done_submission.id,
+    )
+    missing_id = done_id + 1000
+
+    def _item(job_submission_id: int, slurm_job_id: int) -> dict:
+        return {
+            "id": job_submission_id,
+            "slurm_job_state": SlurmJobState.RUNNING,
+            "slurm_job_info": "Dummy slurm job info",
+            "slurm_job_id": slurm_job_id,
+        }
+
+    inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_UPDATE, client_id="dummy-client")
+    response = await client.put(
+        "/jobbergate/job-submissions/agent/batch",
+        json=[
+            _item(valid_id, 111),
+            _item(other_client_id, 222),
+            _item(mismatched_id, 999),
+            _item(done_id, 444),
+            _item(missing_id, 555),
+        ],
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert [(r["id"], r["status_code"]) for r in response.json()] == [
+        (valid_id, status.HTTP_202_ACCEPTED),
+        (other_client_id, status.HTTP_403_FORBIDDEN),
+        (mismatched_id, status.HTTP_409_CONFLICT),
+        (done_id, status.HTTP_400_BAD_REQUEST),
+        (missing_id, status.HTTP_404_NOT_FOUND),
+    ]
+
+    synth_session.expire_all()
+
+    instance = await synth_services.crud.job_submission.get(valid_id)
+    assert instance.slurm_job_state == SlurmJobState.RUNNING
+
+    for unchanged_id in (other_client_id, mismatched_id, done_id):
+        instance = await synth_services.crud.job_submission.get(unchanged_id)
+        assert instance.slurm_job_state == SlurmJobState.PENDING
+
+
+async def test_job_submissions_agent_batch_update__rejects_duplicated_items(
+    fill_job_script_data,
+    fill_job_submission_data,
+    client,
+    inject_security_header,
+    synth_services,
+    synth_session,
+):
+    """
+    Test PUT /job-submissions/agent/batch rejects every item for a job_submission included more than once.
+    """
+    base_job_script = await synth_services.crud.job_script.create(**fill_job_script_data())
+
+    inserted_submission = await synth_services.crud.job_submission.create(
+        job_script_id=base_job_script.id,
+        **fill_job_submission_data(
+            client_id="dummy-client",
+            status=JobSubmissionStatus.SUBMITTED,
+            slurm_job_id=111,
+            slurm_job_state=SlurmJobState.PENDING,
+            slurm_job_info="Fake slurm job info",
+        ),
+    )
+
+    inserted_job_submission_id = inserted_submission.id
+    item = {
+        "id": inserted_job_submission_id,
+        "slurm_job_state": SlurmJobState.RUNNING,
+        "slurm_job_info": "Dummy slurm job info",
+        "slurm_job_id": 111,
+    }
+
+    inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_UPDATE, client_id="dummy-client")
+    response = await client.put("/jobbergate/job-submissions/agent/batch", json=[item, item])
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert [r["status_code"] for r in response.json()] == [status.HTTP_400_BAD_REQUEST] * 2
+
+    synth_session.expire_all()
+
+    instance = await synth_services.crud.job_submission.get(inserted_job_submission_id)
+    assert instance.slurm_job_state == SlurmJobState.PENDING
+
+    query = select(JobProgress).where(JobProgress.job_submission_id == inserted_job_submission_id)
+    assert (await synth_session.execute(query)).scalars().all() == []
+
+
+async def test_job_submissions_agent_batch_update__returns_400_if_token_does_not_carry_client_id(
+    client,
+    inject_security_header,
+):
+    """
+    Test PUT /job-submissions/agent/batch returns 400 if client_id not in token payload.
+    """
+    inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_UPDATE)
+    response = await client.put(
+        "/jobbergate/job-submissions/agent/batch",
+        json=[{"id": 1, "slurm_job_state": SlurmJobState.RUNNING, "slurm_job_info": "info", "slurm_job_id": 111}],
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "Checked expressions failed: Access token does not contain\\n  1: client_id" in response.text
+
+
+async def test_job_submissions_agent_batch_update__returns_422_on_empty_batch(
+    client,
+    inject_security_header,
+    synth_session,
+):
+    """
+    Test PUT /job-submissions/agent/batch returns 422 if no items are provided.
+    """
+    inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_UPDATE, client_id="dummy-client")
+    response = await client.put("/jobbergate/job-submissions/agent/batch", json=[])
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
 @pytest.mark.parametrize("permission", (Permissions.ADMIN, Permissions.JOB_SUBMISSIONS_READ))
 async def test_job_submissions_agent_active__success(
     permission,
@@ -2194,6 +2541,146 @@ async def test_job_submissions_agent_active__returns_400_if_token_does_not_carry
     assert "Access token does not contain\\n  1: client_id" in response.text
 
 
+@pytest.mark.parametrize("permission", (Permissions.ADMIN, Permissions.JOB_SUBMISSIONS_READ))
+async def test_job_submissions_agent_active_changes__success(
+    permission,
+    client,
+    fill_job_script_data,
+    fill_all_job_submission_data,
+    inject_security_header,
+    synth_services,
+):
+    """
+    Test GET /job-submissions/agent/active/changes returns the changes on active job_submissions.
+
+    This test proves that the first request lists the active job_submissions of the requesting agent and
+    that a request with the returned watermark lists the ones updated since then, as items if they are
+    still active and as removed ids otherwise.
+    """
+    base_job_script = await synth_services.crud.job_script.create(**fill_job_script_data())
+
+    submission_list = fill_all_job_submission_data(
+        {"name": "sub1", "status": JobSubmissionStatus.CREATED, "client_id": "dummy-client", "slurm_job_id": 11},
+        {"name": "sub2", "status": JobSubmissionStatus.SUBMITTED, "client_id": "dummy-client", "slurm_job_id": 22},
+        {"name": "sub3", "status": JobSubmissionStatus.SUBMITTED, "client_id": "silly-client", "slurm_job_id": 33},
+        {"name": "sub4", "status": JobSubmissionStatus.CANCELLED, "client_id": "dummy-client", "slurm_job_id": 44},
+    )
+    with pendulum.travel_to(pendulum.datetime(2026, 1, 1, tz="UTC"), freeze=True):
+        created = [
+            await synth_services.crud.job_submission.create(job_script_id=base_job_script.id, **item)
+            for item in submission_list
+        ]
+
+    inject_security_header("who@cares.com", permission, client_id="dummy-client")
+    with pendulum.travel_to(pendulum.datetime(2026, 1, 1, 0, 1, tz="UTC"), freeze=True):
+        response = await client.get("/jobbergate/job-submissions/agent/active/changes")
+    assert response.status_code == status.HTTP_200_OK, f"Get failed: {response.text}"
+
+    response_data = response.json()
+    assert {d["name"] for d in response_data["items"]} == {"sub2", "sub4"}
+    assert response_data["removed_ids"] == []
+    assert response_data["has_more"] is False
+
+    with pendulum.travel_to(pendulum.datetime(2026, 1, 1, 0, 2, tz="UTC"), freeze=True):
+        await synth_services.crud.job_submission.update(created[0].id, status=JobSubmissionStatus.SUBMITTED)
+        await synth_services.crud.job_submission.update(created[1].id, status=JobSubmissionStatus.DONE)
+
+    with pendulum.travel_to(pendulum.datetime(2026, 1, 1, 0, 3, tz="UTC"), freeze=True):
+        response = await client.get(
+            "/jobbergate/job-submissions/agent/active/changes",
+            params={"watermark": response_data["watermark"]},
+        )
+    assert response.status_code == status.HTTP_200_OK, f"Get failed: {response.text}"
+
+    response_data = response.json()
+    assert [d["name"] for d in response_data["items"]] == ["sub1"]
+    assert response_data["removed_ids"] == [created[1].id]
+
+
+async def test_job_submissions_agent_pending_changes__reports_deleted_submissions(
+    client,
+    fill_job_script_data,
+    fill_job_submission_data,
+    inject_security_header,
+    synth_services,
+):
+    """
+    Test GET /job-submissions/agent/pending/changes reports a pending job_submission deleted via DELETE as removed.
+    """
+    base_job_script = await synth_services.crud.job_script.create(**fill_job_script_data())
+    with pendulum.travel_to(pendulum.datetime(2026, 1, 1, tz="UTC"), freeze=True):
+        pending = await synth_services.crud.job_submission.create(
+            job_script_id=base_job_script.id,
+            **fill_job_submission_data(status=JobSubmissionStatus.CREATED, client_id="dummy-client"),
+        )
+
+    inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_READ, client_id="dummy-client")
+    with pendulum.travel_to(pendulum.datetime(2026, 1, 1, 0, 1, tz="UTC"), freeze=True):
+        response = await client.get("/jobbergate/job-submissions/agent/pending/changes")
+    assert response.status_code == status.HTTP_200_OK, f"Get failed: {response.text}"
+    snapshot = response.json()
+    assert [d["id"] for d in snapshot["items"]] == [pending.id]
+
+    inject_security_header(pending.owner_email, Permissions.JOB_SUBMISSIONS_DELETE)
+    with pendulum.travel_to(pendulum.datetime(2026, 1, 1, 0, 2, tz="UTC"), freeze=True):
+        response = await client.delete(f"/jobbergate/job-submissions/{pending.id}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT, f"Delete failed: {response.text}"
+
+    inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_READ, client_id="dummy-client")
+    with pendulum.travel_to(pendulum.datetime(2026, 1, 1, 0, 3, tz="UTC"), freeze=True):
+        response = await client.get(
+            "/jobbergate/job-submissions/agent/pending/changes",
+            params={"watermark": snapshot["watermark"]},
+        )
+    assert response.status_code == status.HTTP_200_OK, f"Get failed: {response.text}"
+    assert response.json()["items"] == []
+    assert response.json()["removed_ids"] == [pending.id]
+
+
+async def test_job_submissions_agent_pending_changes__returns_400_on_invalid_watermark(
+    client,
+    inject_security_header,
+    synth_services,
+):
+    """
+    Test GET /job-submissions/agent/pending/changes returns a 400 if the watermark is invalid.
+    """
+    inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_READ, client_id="dummy-client")
+    response = await client.get(
+        "/jobbergate/job-submissions/agent/pending/changes",
+        params={"watermark": "not-a-watermark"},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "Invalid watermark" in response.text
+
+
+async def test_job_submissions_agent_notifications__success(client, inject_security_header, mocker):
+    """
+    Test GET /job-submissions/agent/notifications returns the statuses notified to the requesting agent.
+    """
+    mocked_wait = mocker.patch(
+        "jobbergate_api.apps.job_submissions.routers.agent_notification_listener.wait",
+        return_value={JobSubmissionStatus.CREATED, JobSubmissionStatus.CANCELLED},
+    )
+
+    inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_READ, client_id="dummy-client")
+    response = await client.get("/jobbergate/job-submissions/agent/notifications", params={"timeout": 10})
+
+    assert response.status_code == status.HTTP_200_OK, f"Get failed: {response.text}"
+    assert response.json() == {"statuses": ["CANCELLED", "CREATED"]}
+    mocked_wait.assert_awaited_once_with("dummy-client", 10, override_db_name=None)
+
+
+async def test_job_submissions_agent_notifications__rejects_long_timeout(client, inject_security_header):
+    """
+    Test GET /job-submissions/agent/notifications rejects a timeout above the maximum.
+    """
+    inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_READ, client_id="dummy-client")
+    response = await client.get("/jobbergate/job-submissions/agent/notifications", params={"timeout": 3600})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
 @pytest.mark.parametrize("permission", (Permissions.ADMIN, Permissions.JOB_SUBMISSIONS_READ))
 async def test_job_submissions_agent_metrics__returns_successful_request__empty_list(
     permission,
@@ -2303,17 +2790,18 @@ async def test_job_submissions_agent_metrics__returns_successful_request(
 
 
 @pytest.mark.parametrize(
-    "permission, data",
+    "permission, data, detail",
     [
-        (Permissions.ADMIN, "dummy-string-data"),
-        (Permissions.JOB_SUBMISSIONS_UPDATE, {"dummy": "data"}),
+        (Permissions.ADMIN, "dummy-string-data", "Decoded data must be a list."),
+        (Permissions.JOB_SUBMISSIONS_UPDATE, {"dummy": "data"}, "Decoded data must be a list."),
+        (Permissions.ADMIN, [[1, 2, 3]], "Every iterable in `data` must match the length of `expected_types`."),
+        (Permissions.ADMIN, [[1, "node", 1, 1, "not a float", *[1] * 9]], "Failed to cast data to expected types"),
     ],
 )
-@mock.patch("jobbergate_api.apps.job_submissions.routers.validate_job_metric_upload_input")
 async def test_job_submissions_agent_metrics_upload__400_uploading_invalid_data(
-    mocked_validate_job_metric_upload_input,
     permission,
     data,
+    detail,
     fill_job_script_data,
     fill_job_submission_data,
     client,
@@ -2324,8 +2812,6 @@ async def test_job_submissions_agent_metrics_upload__400_uploading_invalid_data(
     Test PUT /job-submissions/agent/metrics/{job_submission_id} returns 400 when the input data
     is invalid.
     """
-    mocked_validate_job_metric_upload_input.side_effect = ValueError("Invalid data")
-
     base_job_script = await synth_services.crud.job_script.create(**fill_job_script_data())
 
     inserted_job_script_id = base_job_script.id
@@ -2351,10 +2837,7 @@ async def test_job_submissions_agent_metrics_upload__400_uploading_invalid_data(
         headers={"Content-Type": "application/octet-stream"},
     )
     assert response.status_code == status.HTTP_400_BAD_REQUEST
-    assert response.json() == {"detail": "Invalid data"}
-    mocked_validate_job_metric_upload_input.assert_called_once_with(
-        data, (int, str, int, int, float, float, float, int, float, int, int, int, int, int)
-    )
+    assert response.json() == {"detail": detail}
 
 
 @pytest.mark.parametrize(
@@ -2506,6 +2989,185 @@ async def test_job_submissions_agent_metrics_upload__400_duplicated_data(
     assert response.json() == {"detail": "Failed to insert metrics"}
 
 
+async def test_job_submissions_agent_metrics_upload__accepts_uploads_beyond_the_bind_parameter_limit(
+    fill_job_script_data,
+    fill_job_submission_data,
+    client,
+    inject_security_header,
+    synth_services,
+    synth_session,
+):
+    """
+    Test PUT /job-submissions/agent/metrics/{job_submission_id} inserts uploads larger than what would fit
+    in a single insert statement, copying them to the database in multiple chunks.
+    """
+    base_job_script = await synth_services.crud.job_script.create(**fill_job_script_data())
+    inserted_submission = await synth_services.crud.job_submission.create(
+        job_script_id=base_job_script.id,
+        **fill_job_submission_data(
+            client_id="dummy-client",
+            status=JobSubmissionStatus.SUBMITTED,
+            slurm_job_id=111,
+        ),
+    )
+    inserted_job_submission_id = inserted_submission.id
+
+    num_rows = 2**15 // 14 + 1
+    raw_data = generate_job_submission_metric_columns(int(datetime.now().timestamp()), num_rows)
+
+    inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_UPDATE, client_id="dummy-client")
+    with mock.patch("jobbergate_api.apps.job_submissions.routers.JOB_METRIC_UPLOAD_CHUNK_SIZE", 1000):
+        response = await client.put(
+            f"/jobbergate/job-submissions/agent/metrics/{inserted_job_submission_id}",
+            content=msgpack.packb(raw_data),
+            headers={"Content-Type": "application/octet-stream"},
+        )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    query = select(func.count()).where(JobSubmissionMetric.job_submission_id == inserted_job_submission_id)
+    assert (await synth_session.execute(query)).scalar_one() == num_rows
+
+
+async def test_job_submissions_agent_metrics_upload__ignore_duplicates(
+    fill_job_script_data,
+    fill_job_submission_data,
+    client,
+    inject_security_header,
+    synth_services,
+    synth_session,
+):
+    """
+    Test PUT /job-submissions/agent/metrics/{job_submission_id} skips the rows already uploaded
+    and inserts the new ones when ``ignore_duplicates`` is set.
+    """
+    base_job_script = await synth_services.crud.job_script.create(**fill_job_script_data())
+    inserted_submission = await synth_services.crud.job_submission.create(
+        job_script_id=base_job_script.id,
+        **fill_job_submission_data(
+            client_id="dummy-client",
+            status=JobSubmissionStatus.SUBMITTED,
+            slurm_job_id=111,
+        ),
+    )
+    inserted_job_submission_id = inserted_submission.id
+
+    raw_data = generate_job_submission_metric_columns(int(datetime.now().timestamp()), 10)
+
+    inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_UPDATE, client_id="dummy-client")
+    response = await client.put(
+        f"/jobbergate/job-submissions/agent/metrics/{inserted_job_submission_id}",
+        content=msgpack.packb(raw_data[:6]),
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    response = await client.put(
+        f"/jobbergate/job-submissions/agent/metrics/{inserted_job_submission_id}",
+        content=msgpack.packb(raw_data),
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = await client.put(
+        f"/jobbergate/job-submissions/agent/metrics/{inserted_job_submission_id}",
+        params={"ignore_duplicates": True},
+        content=msgpack.packb(raw_data),
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    query = select(JobSubmissionMetric.time).where(JobSubmissionMetric.job_submission_id == inserted_job_submission_id)
+    assert sorted((await synth_session.execute(query)).scalars()) == [row[0] for row in raw_data]
+
+
+async def test_job_submissions_agent_metrics_upload__columnar_format(
+    fill_job_script_data,
+    fill_job_submission_data,
+    client,
+    inject_security_header,
+    synth_services,
+    synth_session,
+):
+    """
+    Test PUT /job-submissions/agent/metrics/{job_submission_id} accepts the columnar format when
+    the matching content type is sent.
+    """
+    base_job_script = await synth_services.crud.job_script.create(**fill_job_script_data())
+    inserted_submission = await synth_services.crud.job_submission.create(
+        job_script_id=base_job_script.id,
+        **fill_job_submission_data(
+            client_id="dummy-client",
+            status=JobSubmissionStatus.SUBMITTED,
+            slurm_job_id=111,
+        ),
+    )
+    inserted_job_submission_id = inserted_submission.id
+
+    raw_data = generate_job_submission_metric_columns(int(datetime.now().timestamp()), 25)
+
+    inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_UPDATE, client_id="dummy-client")
+    with mock.patch("jobbergate_api.apps.job_submissions.routers.JOB_METRIC_UPLOAD_CHUNK_SIZE", 10):
+        response = await client.put(
+            f"/jobbergate/job-submissions/agent/metrics/{inserted_job_submission_id}",
+            content=encode_job_submission_metric_columns(raw_data),
+            headers={"Content-Type": "application/vnd.jobbergate.metrics-columnar+msgpack"},
+        )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    query = select(JobSubmissionMetric).where(JobSubmissionMetric.job_submission_id == inserted_job_submission_id)
+    result = await synth_session.execute(query)
+    assert sorted(
+        (
+            scalar.time,
+            scalar.node_host,
+            scalar.step,
+            scalar.task,
+            scalar.cpu_frequency,
+            scalar.cpu_time,
+            scalar.cpu_utilization,
+            scalar.gpu_memory,
+            scalar.gpu_utilization,
+            scalar.page_faults,
+            scalar.memory_rss,
+            scalar.disk_read,
+            scalar.memory_virtual,
+            scalar.disk_write,
+        )
+        for scalar in result.scalars()
+    ) == sorted(raw_data)
+
+
+async def test_job_submissions_agent_metrics_upload__400_invalid_columnar_data(
+    fill_job_script_data,
+    fill_job_submission_data,
+    client,
+    inject_security_header,
+    synth_services,
+):
+    """
+    Test PUT /job-submissions/agent/metrics/{job_submission_id} returns 400 when the columnar data is invalid.
+    """
+    base_job_script = await synth_services.crud.job_script.create(**fill_job_script_data())
+    inserted_submission = await synth_services.crud.job_submission.create(
+        job_script_id=base_job_script.id,
+        **fill_job_submission_data(
+            client_id="dummy-client",
+            status=JobSubmissionStatus.SUBMITTED,
+            slurm_job_id=111,
+        ),
+    )
+    inserted_job_submission_id = inserted_submission.id
+
+    inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_UPDATE, client_id="dummy-client")
+    response = await client.put(
+        f"/jobbergate/job-submissions/agent/metrics/{inserted_job_submission_id}",
+        content=msgpack.packb([[1, 2, 3]]),
+        headers={"Content-Type": "application/vnd.jobbergate.metrics-columnar+msgpack"},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "Columnar data must be a map" in response.json()["detail"]
+
+
 @pytest.mark.parametrize(
     "permission, sample_rate, node_host",
     list(
@@ -2677,6 +3339,140 @@ async def test_job_submissions_metrics__start_time_less_greater_than_end_time(
     assert response.json() == {"detail": "End time must be greater than the start time."}
 
 
+@pytest.mark.parametrize("downsampling", ["lttb", "min_max"])
+@mock.patch("jobbergate_api.apps.job_submissions.routers.build_job_metric_aggregation_query")
+async def test_job_submissions_metrics__max_points(
+    mocked_build_query,
+    downsampling,
+    client,
+    inject_security_header,
+    synth_session,
+):
+    """
+    Test GET /job-submissions/{job_submission_id}/metrics chooses the sample rate from the time window
+    and downsamples the rows of each node to max_points.
+    """
+    job_submission_id = 1
+    mocked_build_query.return_value = "SELECT 1"
+    mocked_session_execute = mock.AsyncMock()
+    mocked_session_execute.return_value.fetchall = mock.Mock()
+
+    start_time = datetime(2021, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    end_time = start_time + timedelta(days=7)
+    raw_data = generate_job_submission_metric_columns(int(start_time.timestamp()), 168)
+    mocked_session_execute.return_value.fetchall.return_value = [
+        (data_point[0], data_point[1], *data_point[4:14]) for data_point in raw_data
+    ]
+
+    http_query_params = {
+        "start_time": start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "end_time": end_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "sample_rate": JobSubmissionMetricSampleRate.ten_seconds,
+        "max_points": 100,
+        "downsampling": downsampling,
+    }
+
+    with mock.patch.object(synth_session, "execute", mocked_session_execute):
+        inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_READ, client_id="dummy-client")
+        response = await client.get(
+            f"/jobbergate/job-submissions/{job_submission_id}/metrics", params=http_query_params
+        )
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    mocked_build_query.assert_called_once_with(None, JobSubmissionMetricSampleRate.one_hour, real_time=False)
+    assert len(response.json()) == 100
+    assert response.json()[0]["time"] == raw_data[0][0]
+    assert response.json()[-1]["time"] == raw_data[-1][0]
+
+
+@pytest.mark.parametrize(
+    "sample_rate", [JobSubmissionMetricSampleRate.ten_seconds, JobSubmissionMetricSampleRate.one_hour]
+)
+@mock.patch("jobbergate_api.apps.job_submissions.routers.build_job_metric_aggregation_query")
+async def test_job_submissions_metrics__real_time(
+    mocked_build_query,
+    sample_rate,
+    client,
+    inject_security_header,
+    synth_session,
+    tweak_settings,
+):
+    """
+    Test GET /job-submissions/{job_submission_id}/metrics reads in real-time only the configured sample rates.
+    """
+    mocked_build_query.return_value = "SELECT 1"
+    mocked_session_execute = mock.AsyncMock()
+    mocked_session_execute.return_value.fetchall = mock.Mock(return_value=[])
+
+    with (
+        tweak_settings(METRICS_REAL_TIME_SAMPLE_RATES={JobSubmissionMetricSampleRate.ten_seconds}),
+        mock.patch.object(synth_session, "execute", mocked_session_execute),
+    ):
+        inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_READ, client_id="dummy-client")
+        response = await client.get(
+            "/jobbergate/job-submissions/1/metrics", params={"sample_rate": sample_rate, "node": "node-1"}
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    mocked_build_query.assert_called_once_with(
+        "node-1", sample_rate, real_time=sample_rate == JobSubmissionMetricSampleRate.ten_seconds
+    )
+
+
+@mock.patch("jobbergate_api.apps.job_submissions.routers.sa_text")
+async def test_job_submissions_metrics__columnar(
+    mocked_sa_text,
+    client,
+    inject_security_header,
+    synth_session,
+):
+    """
+    Test GET /job-submissions/{job_submission_id}/metrics returns the columnar format when it is accepted.
+    """
+    mocked_session_execute = mock.AsyncMock()
+    mocked_session_execute.return_value.fetchall = mock.Mock()
+
+    base_time = int(datetime.now().timestamp())
+    raw_data = generate_job_submission_metric_columns(base_time, 5)
+    mocked_session_execute.return_value.fetchall.return_value = [
+        (data_point[0], data_point[1], *data_point[4:14]) for data_point in raw_data
+    ]
+
+    with mock.patch.object(synth_session, "execute", mocked_session_execute):
+        inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_READ, client_id="dummy-client")
+        response = await client.get(
+            "/jobbergate/job-submissions/1/metrics",
+            headers={"Accept": f"{JOB_METRIC_COLUMNAR_CONTENT_TYPE}, application/json;q=0.5"},
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == JOB_METRIC_COLUMNAR_CONTENT_TYPE
+    assert "Accept" in response.headers["vary"]
+    payload = msgpack.unpackb(response.content)
+    assert payload["rows"] == 5
+    assert payload["node_hosts"] == [raw_data[0][1]]
+    (times, hosts, cpu_frequency, *_) = payload["columns"]
+    assert list(struct.unpack("<5q", times)) == [data_point[0] for data_point in raw_data]
+    assert list(struct.unpack("<5q", hosts)) == [0] * 5
+    assert list(struct.unpack("<5d", cpu_frequency)) == [data_point[4] for data_point in raw_data]
+
+
+@pytest.mark.parametrize("max_points", [0, 2, 10_001])
+async def test_job_submissions_metrics__max_points_out_of_range(
+    max_points,
+    client,
+    inject_security_header,
+    synth_session,
+):
+    """
+    Test GET /job-submissions/{job_submission_id}/metrics returns 422 when max_points is out of range.
+    """
+    inject_security_header("who@cares.com", Permissions.JOB_SUBMISSIONS_READ, client_id="dummy-client")
+    response = await client.get("/jobbergate/job-submissions/1/metrics", params={"max_points": max_points})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
 @pytest.mark.parametrize(
     "permission, num_rows",
     [
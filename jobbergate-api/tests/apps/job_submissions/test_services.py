@@ -1,13 +1,19 @@
 """Tests for the job submission service module."""
 
+from datetime import timedelta
 from itertools import product
 from typing import Any, NamedTuple
+from unittest import mock
 
 import pendulum
 import pytest
-from sqlalchemy import inspect
+from sqlalchemy import inspect, select
 
 from jobbergate_api.apps.constants import FileType
+from jobbergate_api.apps.job_submissions.constants import JOB_METRIC_MIN_RETENTION_DAYS, JobSubmissionStatus
+from jobbergate_api.apps.job_submissions.models import JobSubmissionTombstone
+from jobbergate_api.apps.job_submissions.services import get_job_metric_retention_days
+from jobbergate_api.apps.services import ServiceError
 
 
 class TestIntegration:
@@ -225,3 +231,281 @@ class TestAutoCleanUnusedJobSubmissions:
         # Assert the deleted entries are not in the list of job submissions
         submissions_list = await synth_services.crud.job_submission.list()
         assert {s.id for s in submissions_list} == {s["id"] for s in dummy_data.values()} - result.deleted
+
+
+class TestNotifyAgent:
+    """
+    Test that the agent is notified of the job submissions it has to act on.
+    """
+
+    @pytest.mark.parametrize(
+        "status, notified",
+        [
+            (JobSubmissionStatus.CREATED, True),
+            (JobSubmissionStatus.CANCELLED, True),
+            (JobSubmissionStatus.SUBMITTED, False),
+        ],
+    )
+    async def test_create__notifies_agent(
+        self, status, notified, fill_job_script_data, fill_job_submission_data, synth_services, mocker
+    ):
+        script_instance = await synth_services.crud.job_script.create(**fill_job_script_data())
+        execute_spy = mocker.spy(synth_services.crud.job_submission.session, "execute")
+
+        await synth_services.crud.job_submission.create(
+            **fill_job_submission_data(status=status), job_script_id=script_instance.id
+        )
+
+        assert any("pg_notify" in str(call.args[0]) for call in execute_spy.call_args_list) is notified
+
+    async def test_update__notifies_agent_on_status_change_only(
+        self, fill_job_script_data, fill_job_submission_data, synth_services, mocker
+    ):
+        script_instance = await synth_services.crud.job_script.create(**fill_job_script_data())
+        instance = await synth_services.crud.job_submission.create(
+            **fill_job_submission_data(status=JobSubmissionStatus.SUBMITTED), job_script_id=script_instance.id
+        )
+        notify_spy = mocker.spy(synth_services.crud.job_submission, "notify_agent")
+
+        await synth_services.crud.job_submission.update(instance.id, report_message="dummy")
+        assert notify_spy.call_count == 0
+
+        await synth_services.crud.job_submission.update(instance.id, status=JobSubmissionStatus.CANCELLED)
+        assert notify_spy.call_count == 1
+
+
+class TestListChanges:
+    """
+    Test the changes feed on a set of job submissions.
+    """
+
+    STATUSES = {JobSubmissionStatus.CREATED}
+
+    async def test_list_changes__snapshot_then_updates(
+        self, fill_job_script_data, fill_job_submission_data, synth_services
+    ):
+        time_now = pendulum.datetime(2026, 1, 1, tz="UTC")
+        crud = synth_services.crud.job_submission
+
+        with pendulum.travel_to(time_now, freeze=True):
+            script_instance = await synth_services.crud.job_script.create(**fill_job_script_data())
+            (first, second, third, _, _) = [
+                await crud.create(**fill_job_submission_data(**data), job_script_id=script_instance.id)
+                for data in (
+                    dict(status=JobSubmissionStatus.CREATED, client_id="dummy-client"),
+                    dict(status=JobSubmissionStatus.CREATED, client_id="dummy-client"),
+                    dict(status=JobSubmissionStatus.CREATED, client_id="dummy-client"),
+                    dict(status=JobSubmissionStatus.SUBMITTED, client_id="dummy-client"),
+                    dict(status=JobSubmissionStatus.CREATED, client_id="silly-client"),
+                )
+            ]
+
+        with pendulum.travel_to(time_now.add(minutes=1), freeze=True):
+            snapshot_page_1 = await crud.list_changes("dummy-client", self.STATUSES, size=2)
+            snapshot_page_2 = await crud.list_changes(
+                "dummy-client", self.STATUSES, watermark=snapshot_page_1.watermark, size=2
+            )
+
+        assert snapshot_page_1.items == [first, second]
+        assert snapshot_page_1.has_more is True
+        assert snapshot_page_2.items == [third]
+        assert snapshot_page_2.removed_ids == []
+        assert snapshot_page_2.has_more is False
+
+        with pendulum.travel_to(time_now.add(minutes=2), freeze=True):
+            await crud.update(second.id, status=JobSubmissionStatus.SUBMITTED)
+            fourth = await crud.create(
+                **fill_job_submission_data(status=JobSubmissionStatus.CREATED, client_id="dummy-client"),
+                job_script_id=script_instance.id,
+            )
+
+        with pendulum.travel_to(time_now.add(minutes=3), freeze=True):
+            changes = await crud.list_changes("dummy-client", self.STATUSES, watermark=snapshot_page_2.watermark)
+
+        assert changes.items == [fourth]
+        assert changes.removed_ids == [second.id]
+        assert changes.has_more is False
+
+        with pendulum.travel_to(time_now.add(minutes=4), freeze=True):
+            no_changes = await crud.list_changes("dummy-client", self.STATUSES, watermark=changes.watermark)
+
+        assert no_changes.items == []
+        assert no_changes.removed_ids == []
+        assert no_changes.has_more is False
+
+    async def test_list_changes__resends_updates_within_safety_window(
+        self, fill_job_script_data, fill_job_submission_data, synth_services, tweak_settings
+    ):
+        time_now = pendulum.datetime(2026, 1, 1, tz="UTC")
+        crud = synth_services.crud.job_submission
+
+        with pendulum.travel_to(time_now, freeze=True):
+            script_instance = await synth_services.crud.job_script.create(**fill_job_script_data())
+            snapshot = await crud.list_changes("dummy-client", self.STATUSES)
+            instance = await crud.create(
+                **fill_job_submission_data(status=JobSubmissionStatus.CREATED, client_id="dummy-client"),
+                job_script_id=script_instance.id,
+            )
+
+        with tweak_settings(AGENT_CHANGES_SAFETY_WINDOW=30):
+            with pendulum.travel_to(time_now.add(seconds=10), freeze=True):
+                changes = await crud.list_changes("dummy-client", self.STATUSES, watermark=snapshot.watermark)
+            with pendulum.travel_to(time_now.add(seconds=60), freeze=True):
+                resent = await crud.list_changes("dummy-client", self.STATUSES, watermark=changes.watermark)
+            with pendulum.travel_to(time_now.add(seconds=90), freeze=True):
+                settled = await crud.list_changes("dummy-client", self.STATUSES, watermark=resent.watermark)
+
+        assert changes.items == [instance]
+        assert resent.items == [instance]
+        assert settled.items == []
+
+    async def test_list_changes__reports_deleted_submissions(
+        self, fill_job_script_data, fill_job_submission_data, synth_services, tweak_settings
+    ):
+        time_now = pendulum.datetime(2026, 1, 1, tz="UTC")
+        crud = synth_services.crud.job_submission
+
+        with pendulum.travel_to(time_now, freeze=True):
+            script_instance = await synth_services.crud.job_script.create(**fill_job_script_data())
+            (pending, archived, other) = [
+                await crud.create(**fill_job_submission_data(**data), job_script_id=script_instance.id)
+                for data in (
+                    dict(status=JobSubmissionStatus.CREATED, client_id="dummy-client"),
+                    dict(status=JobSubmissionStatus.CREATED, client_id="dummy-client", is_archived=True),
+                    dict(status=JobSubmissionStatus.CREATED, client_id="silly-client"),
+                )
+            ]
+
+        with pendulum.travel_to(time_now.add(minutes=1), freeze=True):
+            snapshot = await crud.list_changes("dummy-client", self.STATUSES)
+        assert snapshot.items == [pending, archived]
+
+        with pendulum.travel_to(time_now.add(days=3), freeze=True):
+            await crud.delete(pending.id)
+            await crud.delete(other.id)
+            with tweak_settings(
+                AUTO_CLEAN_JOB_SUBMISSIONS_DAYS_TO_DELETE=2, AUTO_CLEAN_JOB_SUBMISSIONS_DAYS_TO_ARCHIVE=None
+            ):
+                cleaned = await crud.clean_unused_entries()
+        assert cleaned.deleted == {archived.id}
+
+        with pendulum.travel_to(time_now.add(days=3, minutes=1), freeze=True):
+            changes = await crud.list_changes("dummy-client", self.STATUSES, watermark=snapshot.watermark)
+
+        assert changes.items == []
+        assert sorted(changes.removed_ids) == sorted([pending.id, archived.id])
+
+    async def test_list_changes__expired_watermark(self, synth_services, tweak_settings):
+        time_now = pendulum.datetime(2026, 1, 1, tz="UTC")
+        crud = synth_services.crud.job_submission
+
+        with pendulum.travel_to(time_now, freeze=True):
+            snapshot = await crud.list_changes("dummy-client", self.STATUSES)
+
+        with tweak_settings(AGENT_CHANGES_TOMBSTONE_DAYS=7):
+            with pendulum.travel_to(time_now.add(days=6), freeze=True):
+                await crud.list_changes("dummy-client", self.STATUSES, watermark=snapshot.watermark)
+            with pendulum.travel_to(time_now.add(days=8), freeze=True):
+                with pytest.raises(ServiceError, match="Expired watermark"):
+                    await crud.list_changes("dummy-client", self.STATUSES, watermark=snapshot.watermark)
+
+    async def test_clean_unused_entries__deletes_old_tombstones(self, synth_services, synth_session, tweak_settings):
+        time_now = pendulum.datetime(2026, 1, 1, tz="UTC")
+        crud = synth_services.crud.job_submission
+
+        with pendulum.travel_to(time_now, freeze=True):
+            await crud.write_tombstones([(1, "dummy-client")])
+        with pendulum.travel_to(time_now.add(days=5), freeze=True):
+            await crud.write_tombstones([(2, "dummy-client")])
+
+        with (
+            tweak_settings(
+                AGENT_CHANGES_TOMBSTONE_DAYS=7,
+                AUTO_CLEAN_JOB_SUBMISSIONS_DAYS_TO_DELETE=None,
+                AUTO_CLEAN_JOB_SUBMISSIONS_DAYS_TO_ARCHIVE=None,
+            ),
+            pendulum.travel_to(time_now.add(days=8), freeze=True),
+        ):
+            await crud.clean_unused_entries()
+
+        remaining = (await synth_session.execute(select(JobSubmissionTombstone.id))).scalars().all()
+        assert remaining == [2]
+
+    @pytest.mark.parametrize("watermark", ["not-a-watermark", "WyJuYW1lIix0cnVlLCJmb28iLDFd"])
+    async def test_list_changes__invalid_watermark(self, watermark, synth_services):
+        with pytest.raises(ServiceError, match="Invalid watermark"):
+            await synth_services.crud.job_submission.list_changes("dummy-client", self.STATUSES, watermark=watermark)
+
+
+class TestMetricPolicies:
+    """
+    Test the compression and retention policies of the raw job metrics.
+    """
+
+    @pytest.mark.parametrize(
+        "retention_days, from_auto_clean, days_to_archive, days_to_delete, expected",
+        [
+            (None, False, 30, 60, None),
+            (40, False, None, None, 40),
+            (40, True, 30, 60, 40),
+            (None, True, 30, 60, 90),
+            (None, True, 30, None, None),
+            (None, True, None, 60, None),
+            (7, False, None, None, JOB_METRIC_MIN_RETENTION_DAYS),
+            (None, True, 1, 2, JOB_METRIC_MIN_RETENTION_DAYS),
+        ],
+    )
+    def test_get_job_metric_retention_days(
+        self, retention_days, from_auto_clean, days_to_archive, days_to_delete, expected, tweak_settings
+    ):
+        with tweak_settings(
+            METRICS_RETENTION_DAYS=retention_days,
+            METRICS_RETENTION_FROM_AUTO_CLEAN=from_auto_clean,
+            AUTO_CLEAN_JOB_SUBMISSIONS_DAYS_TO_ARCHIVE=days_to_archive,
+            AUTO_CLEAN_JOB_SUBMISSIONS_DAYS_TO_DELETE=days_to_delete,
+        ):
+            assert get_job_metric_retention_days() == expected
+
+    async def test_sync_metric_policies__replaces_changed_policies(self, synth_services, synth_session, tweak_settings):
+        current_policies = {"policy_compression": timedelta(days=7), "policy_retention": timedelta(days=30)}
+
+        async def scalar(_query, params):
+            return current_policies.get(params["proc_name"])
+
+        with (
+            tweak_settings(METRICS_COMPRESS_AFTER_DAYS=7, METRICS_RETENTION_DAYS=60),
+            mock.patch.object(synth_session, "scalar", side_effect=scalar),
+            mock.patch.object(synth_session, "execute") as mocked_execute,
+        ):
+            await synth_services.crud.job_submission.sync_metric_policies()
+
+        statements = [(str(call.args[0]), call.args[1:]) for call in mocked_execute.call_args_list]
+        assert statements == [
+            ("SELECT remove_retention_policy('job_submission_metrics', if_exists => true)", ()),
+            (
+                "SELECT add_retention_policy('job_submission_metrics', make_interval(days => :days))",
+                ({"days": 60},),
+            ),
+        ]
+
+    async def test_sync_metric_policies__adds_and_removes_policies(self, synth_services, synth_session, tweak_settings):
+        current_policies = {"policy_retention": timedelta(days=30)}
+
+        async def scalar(_query, params):
+            return current_policies.get(params["proc_name"])
+
+        with (
+            tweak_settings(METRICS_COMPRESS_AFTER_DAYS=14, METRICS_RETENTION_DAYS=None),
+            mock.patch.object(synth_session, "scalar", side_effect=scalar),
+            mock.patch.object(synth_session, "execute") as mocked_execute,
+        ):
+            await synth_services.crud.job_submission.sync_metric_policies()
+
+        statements = [(str(call.args[0]), call.args[1:]) for call in mocked_execute.call_args_list]
+        assert statements == [
+            (
+                "SELECT add_compression_policy('job_submission_metrics', make_interval(days => :days))",
+                ({"days": 14},),
+            ),
+            ("SELECT remove_retention_policy('job_submission_metrics', if_exists => true)", ()),
+        ]
@@ -0,0 +1,251 @@
+"""
+Test the services for the outbox.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import select
+
+from jobbergate_api.apps.job_submissions.constants import JobSubmissionStatus
+from jobbergate_api.apps.outbox.constants import OutboxMessageKind
+from jobbergate_api.apps.outbox.models import OutboxMessage
+from jobbergate_api.apps.outbox.services import OutboxDispatcher, outbox_dispatcher
+from jobbergate_api.email_notification import EmailNotificationError
+
+
+@pytest.fixture
+async def dummy_job_submission(synth_services, fill_job_script_data, fill_job_submission_data):
+    """
+    Provide a job submission rejected by the agent.
+    """
+    job_script = await synth_services.crud.job_script.create(**fill_job_script_data())
+    return await synth_services.crud.job_submission.create(
+        job_script_id=job_script.id,
+        **fill_job_submission_data(status=JobSubmissionStatus.REJECTED),
+    )
+
+
+async def fetch_messages(synth_session) -> list[OutboxMessage]:
+    """
+    Fetch the messages in the outbox in the order they were written.
+    """
+    return list((await synth_session.execute(select(OutboxMessage).order_by(OutboxMessage.id))).scalars().all())
+
+
+class TestEnqueue:
+    """
+    Test the messages written to the outbox.
+    """
+
+    async def test_enqueue_status_change(self, synth_services, synth_session, dummy_job_submission, tester_email):
+        message = await synth_services.outbox.enqueue_status_change(dummy_job_submission, organization_id="dummy-org")
+
+        assert await fetch_messages(synth_session) == [message]
+        assert message.kind == OutboxMessageKind.STATUS_CHANGE
+        assert message.organization_id == "dummy-org"
+        assert message.attempts == 0
+        assert message.payload == {
+            "path": f"jobs.job_submissions.{dummy_job_submission.id}",
+            "user_email": tester_email,
+            "action": "status",
+            "additional_context": {"status": "REJECTED", "slurm_job_state": None},
+        }
+
+    async def test_enqueue_status_change__skipped_if_rabbitmq_host_is_undefined(
+        self, synth_services, synth_session, dummy_job_submission, tweak_settings
+    ):
+        with tweak_settings(RABBITMQ_HOST=None):
+            assert await synth_services.outbox.enqueue_status_change(dummy_job_submission) is None
+
+        assert await fetch_messages(synth_session) == []
+
+    async def test_enqueue_submission_rejected(self, synth_services, synth_session, dummy_job_submission, tester_email):
+        message = await synth_services.outbox.enqueue_submission_rejected(dummy_job_submission, "Something went wrong")
+
+        assert await fetch_messages(synth_session) == [message]
+        assert message.kind == OutboxMessageKind.SUBMISSION_REJECTED
+        assert message.organization_id is None
+        assert message.payload == {
+            "job_submission_id": dummy_job_submission.id,
+            "report_message": "Something went wrong",
+            "to_emails": tester_email,
+        }
+
+    async def test_enqueue_submission_rejected__skipped_if_sendgrid_is_not_configured(
+        self, synth_services, synth_session, dummy_job_submission, tweak_settings
+    ):
+        with tweak_settings(SENDGRID_API_KEY=None):
+            assert await synth_services.outbox.enqueue_submission_rejected(dummy_job_submission, "Oops") is None
+
+        assert await fetch_messages(synth_session) == []
+
+    async def test_enqueue__registers_the_database_of_the_organization(
+        self, synth_services, dummy_job_submission, tweak_settings
+    ):
+        with (
+            tweak_settings(MULTI_TENANCY_ENABLED=True),
+            patch.object(outbox_dispatcher, "databases", set()) as databases,
+        ):
+            await synth_services.outbox.enqueue_status_change(dummy_job_submission, organization_id="dummy-org")
+
+        assert databases == {"dummy-org"}
+
+
+class TestDispatch:
+    """
+    Test the delivery of the messages in the outbox.
+    """
+
+    async def test_dispatch__delivers_and_deletes_the_messages(
+        self, synth_services, synth_session, dummy_job_submission
+    ):
+        await synth_services.outbox.enqueue_submission_rejected(dummy_job_submission, "Oops", organization_id="org")
+        status_change = await synth_services.outbox.enqueue_status_change(dummy_job_submission, organization_id="org")
+        await synth_session.flush()
+
+        with (
+            patch("jobbergate_api.apps.outbox.services.publish_notification", return_value=True) as mocked_publish,
+            patch("jobbergate_api.apps.outbox.services.notify_submission_rejected") as mocked_notify,
+        ):
+            assert await synth_services.outbox.dispatch(limit=10) == 2
+
+        mocked_publish.assert_awaited_once_with(status_change.payload, organization_id="org")
+        mocked_notify.assert_called_once_with(
+            job_submission_id=dummy_job_submission.id,
+            report_message="Oops",
+            to_emails=dummy_job_submission.owner_email,
+            skip_on_failure=False,
+        )
+        assert await fetch_messages(synth_session) == []
+
+    async def test_dispatch__delivers_up_to_the_limit_in_order(
+        self, synth_services, synth_session, dummy_job_submission
+    ):
+        for _ in range(3):
+            await synth_services.outbox.enqueue_status_change(dummy_job_submission)
+        remaining_id = (await fetch_messages(synth_session))[2].id
+
+        with patch("jobbergate_api.apps.outbox.services.publish_notification", return_value=True):
+            assert await synth_services.outbox.dispatch(limit=2) == 2
+
+        assert [message.id for message in await fetch_messages(synth_session)] == [remaining_id]
+
+    async def test_dispatch__retries_failed_messages_with_backoff(
+        self, synth_services, synth_session, dummy_job_submission, tweak_settings
+    ):
+        await synth_services.outbox.enqueue_status_change(dummy_job_submission)
+        await synth_services.outbox.enqueue_submission_rejected(dummy_job_submission, "Oops")
+        await synth_session.flush()
+
+        with (
+            tweak_settings(OUTBOX_RETRY_DELAY=10.0),
+            patch("jobbergate_api.apps.outbox.services.publish_notification", return_value=False),
+            patch(
+                "jobbergate_api.apps.outbox.services.notify_submission_rejected",
+                side_effect=EmailNotificationError("SendGrid is down"),
+            ),
+        ):
+            before = datetime.now(timezone.utc)
+            assert await synth_services.outbox.dispatch(limit=10) == 2
+            assert await synth_services.outbox.dispatch(limit=10) == 0
+
+        (status_change, rejected) = await fetch_messages(synth_session)
+        assert status_change.attempts == 1
+        assert status_change.last_error == "The status change was not confirmed by RabbitMQ"
+        assert rejected.attempts == 1
+        assert rejected.last_error == "SendGrid is down"
+        for message in (status_change, rejected):
+            assert before + timedelta(seconds=10) <= message.available_at <= before + timedelta(seconds=11)
+
+    async def test_dispatch__doubles_the_delay_on_each_attempt(
+        self, synth_services, synth_session, dummy_job_submission, tweak_settings
+    ):
+        message = await synth_services.outbox.enqueue_status_change(dummy_job_submission)
+        message.attempts = 2
+        await synth_session.flush()
+
+        with (
+            tweak_settings(OUTBOX_RETRY_DELAY=10.0),
+            patch("jobbergate_api.apps.outbox.services.publish_notification", return_value=False),
+        ):
+            before = datetime.now(timezone.utc)
+            await synth_services.outbox.dispatch(limit=10)
+
+        (message,) = await fetch_messages(synth_session)
+        assert message.attempts == 3
+        assert before + timedelta(seconds=40) <= message.available_at <= before + timedelta(seconds=41)
+
+    async def test_dispatch__drops_messages_after_max_attempts(
+        self, synth_services, synth_session, dummy_job_submission, tweak_settings
+    ):
+        message = await synth_services.outbox.enqueue_status_change(dummy_job_submission)
+        message.attempts = 2
+        await synth_session.flush()
+
+        with (
+            tweak_settings(OUTBOX_MAX_ATTEMPTS=3),
+            patch("jobbergate_api.apps.outbox.services.publish_notification", side_effect=RuntimeError("Boom!")),
+        ):
+            assert await synth_services.outbox.dispatch(limit=10) == 1
+
+        assert await fetch_messages(synth_session) == []
+
+
+class TestOutboxDispatcher:
+    """
+    Test the dispatcher that delivers the messages in the background.
+    """
+
+    async def test_drain__dispatches_batches_until_one_is_not_full(
+        self, synth_services, synth_session, dummy_job_submission, tweak_settings
+    ):
+        for _ in range(5):
+            await synth_services.outbox.enqueue_status_change(dummy_job_submission)
+
+        dispatcher = OutboxDispatcher()
+        with (
+            tweak_settings(OUTBOX_BATCH_SIZE=2),
+            patch("jobbergate_api.apps.outbox.services.publish_notification", return_value=True) as mocked_publish,
+        ):
+            await dispatcher.drain()
+
+        assert mocked_publish.await_count == 5
+        assert await fetch_messages(synth_session) == []
+
+    async def test_run__checks_the_outboxes_when_woken_up(self, tweak_settings):
+        dispatcher = OutboxDispatcher()
+        with (
+            tweak_settings(OUTBOX_POLL_INTERVAL=60.0, MULTI_TENANCY_ENABLED=True),
+            patch.object(dispatcher, "drain", AsyncMock()) as mocked_drain,
+        ):
+            dispatcher.start()
+            try:
+                await asyncio.sleep(0.01)
+                mocked_drain.assert_not_called()
+
+                dispatcher.register("dummy-org")
+                dispatcher.wake()
+                await asyncio.sleep(0.01)
+                mocked_drain.assert_awaited_once_with("dummy-org")
+            finally:
+                await dispatcher.close()
+
+        assert dispatcher.worker is None
+
+    async def test_run__keeps_running_after_an_error(self, tweak_settings):
+        dispatcher = OutboxDispatcher()
+        with (
+            tweak_settings(OUTBOX_POLL_INTERVAL=0.01),
+            patch.object(dispatcher, "drain", AsyncMock(side_effect=RuntimeError("Boom!"))) as mocked_drain,
+        ):
+            dispatcher.start()
+            try:
+                await asyncio.sleep(0.05)
+            finally:
+                await dispatcher.close()
+
+        assert mocked_drain.await_count > 1
+        mocked_drain.assert_awaited_with(None)
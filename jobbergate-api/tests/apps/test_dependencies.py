@@ -0,0 +1,32 @@
+"""
+Test the router dependencies shared for multiple resources.
+"""
+
+from jobbergate_api.apps.dependencies import BucketFactory, get_bucket_name, get_bucket_url
+
+
+async def test_bucket_factory__reuses_resources_and_buckets(synth_bucket):
+    """
+    Test that the ``BucketFactory`` creates one s3 resource per endpoint url and reuses the buckets it creates.
+    """
+    factory = BucketFactory()
+    bucket_name = get_bucket_name()
+    s3_url = get_bucket_url()
+
+    try:
+        bucket = await factory.get_bucket(bucket_name, s3_url)
+        assert bucket.name == bucket_name
+        assert await factory.get_bucket(bucket_name, s3_url) is bucket
+
+        other_bucket = await factory.get_bucket("other-bucket", s3_url)
+        assert other_bucket.name == "other-bucket"
+        assert other_bucket.meta.client is bucket.meta.client
+        assert list(factory.resource_map) == [s3_url]
+
+        await bucket.put_object(Key="dummy-file.txt", Body=b"dummy content")
+        assert [obj.key async for obj in synth_bucket.objects.all()] == ["dummy-file.txt"]
+    finally:
+        await factory.cleanup()
+
+    assert factory.resource_map == {}
+    assert factory.bucket_map == {}
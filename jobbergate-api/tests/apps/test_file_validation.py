@@ -2,9 +2,12 @@
 Test the components used to validate the uploaded files.
 """
 
+from io import BytesIO
+
 import pytest
 
 from jobbergate_api.apps.file_validation import (
+    check_uploaded_file_syntax,
     get_suffix,
     is_valid_jinja2_template,
     is_valid_python_file,
@@ -70,3 +73,18 @@ def test_is_valid_jinja2_template(is_valid, template):
     Test if a given python source code is correctly checked as valid or not.
     """
     assert is_valid_jinja2_template(template) is is_valid
+
+
+def test_check_uploaded_file_syntax__skips_files_above_the_size_limit(tweak_settings):
+    """
+    Test that the syntax of the files larger than ``SYNTAX_VALIDATION_MAX_SIZE`` is not checked.
+    """
+    source_code = b"for i in range(10):\nprint(i)"
+    file_obj = BytesIO(source_code)
+
+    with tweak_settings(SYNTAX_VALIDATION_MAX_SIZE=len(source_code)):
+        assert check_uploaded_file_syntax(file_obj, "jobbergate.py", size=len(source_code)) is False
+
+    with tweak_settings(SYNTAX_VALIDATION_MAX_SIZE=len(source_code) - 1):
+        assert check_uploaded_file_syntax(file_obj, "jobbergate.py", size=len(source_code)) is True
+    assert file_obj.tell() == 0
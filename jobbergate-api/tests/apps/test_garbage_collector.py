@@ -32,15 +32,16 @@ def insert_file(file_service):
 
 
 @pytest.fixture
-def garbage_collector(file_service):
+def garbage_collector(file_service, tweak_settings):
     """
-    Create a garbage collector instance.
+    Create a garbage collector instance that does not skip the recently written files.
     """
-    return GarbageCollector(
-        model_type=file_service.model_type,
-        bucket=file_service.bucket,
-        session=file_service.session,
-    )
+    with tweak_settings(FILE_STORAGE_GC_MIN_AGE=0):
+        yield GarbageCollector(
+            model_type=file_service.model_type,
+            bucket=file_service.bucket,
+            session=file_service.session,
+        )
 
 
 async def test_get_set_of_files_from_database(insert_file, garbage_collector):
@@ -120,3 +121,37 @@ async def test_garbage_collect(synth_session, insert_file, garbage_collector):
             file3.file_key,
         ]
     )
+
+
+async def test_garbage_collect__content_addressed_storage(
+    synth_session, insert_file, garbage_collector, tweak_settings
+):
+    with tweak_settings(FILE_STORAGE_CONTENT_ADDRESSED=True):
+        file1 = await insert_file(filename="one.txt", upload_content="shared content")
+        file2 = await insert_file(filename="two.txt", upload_content="shared content")
+        file3 = await insert_file(filename="three.txt", upload_content="other content")
+    shared_key = file1.file_key
+    assert file2.file_key == shared_key
+
+    await synth_session.delete(file1)
+    await synth_session.delete(file3)
+
+    await garbage_collector.run()
+
+    bucket_files = await garbage_collector._get_set_of_files_from_bucket()
+    assert bucket_files == {shared_key}
+
+
+async def test_garbage_collect__skips_recently_written_files(
+    synth_session, insert_file, garbage_collector, tweak_settings
+):
+    file1 = await insert_file(filename="one.txt")
+    file2 = await insert_file(filename="two.txt")
+    file2_key = file2.file_key
+    await synth_session.delete(file2)
+
+    with tweak_settings(FILE_STORAGE_GC_MIN_AGE=3600):
+        await garbage_collector.run()
+
+    bucket_files = await garbage_collector._get_set_of_files_from_bucket()
+    assert bucket_files == {file1.file_key, file2_key}
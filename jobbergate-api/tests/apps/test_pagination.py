@@ -0,0 +1,49 @@
+"""
+Test the pagination module.
+"""
+
+import datetime
+
+import pytest
+
+from jobbergate_api.apps.job_submissions.constants import JobSubmissionStatus
+from jobbergate_api.apps.pagination import Cursor
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        None,
+        42,
+        "dummy-name",
+        datetime.datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+    ],
+)
+def test_cursor__encode_and_decode(value):
+    """
+    Test that a cursor is restored from its token.
+    """
+    cursor = Cursor(sort_field="dummy-field", sort_ascending=False, value=value, id=13)
+
+    token = cursor.encode()
+
+    assert "=" not in token
+    assert Cursor.decode(token) == cursor
+
+
+def test_cursor__encode_enum_by_name():
+    """
+    Test that an enum value is stored in the cursor by its name, which is how it is stored in the database.
+    """
+    cursor = Cursor(sort_field="status", sort_ascending=True, value=JobSubmissionStatus.CREATED, id=1)
+
+    assert Cursor.decode(cursor.encode()).value == JobSubmissionStatus.CREATED.name
+
+
+@pytest.mark.parametrize("token", ["not-a-cursor", "", "W10", "WyJkdW1teSIsdHJ1ZSwxLCJub3QtYW4taWQiXQ"])
+def test_cursor__decode_invalid_token(token):
+    """
+    Test that a malformed token raises a ValueError.
+    """
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        Cursor.decode(token)
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 from contextlib import contextmanager
 from io import BytesIO
 from itertools import product
@@ -10,11 +12,13 @@ from unittest import mock
 import httpx
 import pytest
 from fastapi import HTTPException, UploadFile
-from fastapi_pagination.default import Params
+from jinja2 import Template
 from pydantic import AnyUrl
 
 from jobbergate_api.apps.models import Base, CrudMixin, FileMixin
-from jobbergate_api.apps.services import CrudService, FileService, ServiceError
+from jobbergate_api.apps.pagination import Params
+from jobbergate_api.apps.services import CrudService, FileService, FileUpload, ServiceError, gather_with_limit
+from jobbergate_api.apps.template_cache import TemplateCache
 
 
 class DummyCrud(CrudMixin, Base):
@@ -42,14 +46,14 @@ def paginated():
 
     Note that without providing a FastAPI app and a route, pagination will throw an error due to having
     the ``resolve_params()`` method receiving no default params. This fixture patches the method to use
-    the pagination parameters passed to the context manager.
+    the pagination parameters passed to the context manager. Providing a ``cursor`` enables the keyset pagination.
     """
 
     @contextmanager
-    def _helper(page=1, size=10):
+    def _helper(page=1, size=10, cursor=None):
         with mock.patch(
             "fastapi_pagination.api.resolve_params",
-            side_effect=lambda _: Params(page=page, size=size),
+            side_effect=lambda _: Params(page=page, size=size, cursor=cursor),
         ):
             yield
 
@@ -357,6 +361,53 @@ class TestCrudService:
         all_fetched_instances = await dummy_crud_service.list(search="user")
         assert ["user1@test.com", "user2@test.com"] == [i.owner_email for i in all_fetched_instances]
 
+    async def test_list__with_search_escapes_wildcards(
+        self,
+        dummy_crud_service,
+    ):
+        """
+        Test that the wildcards in the search terms are matched literally, never across two fields.
+        """
+        await dummy_crud_service.create(name="job-one", description="about my", owner_email="one@test.com")
+        await dummy_crud_service.create(name="my_job", description="100% done", owner_email="two@test.com")
+
+        assert [i.name for i in await dummy_crud_service.list(search="my_job")] == ["my_job"]
+        assert [i.name for i in await dummy_crud_service.list(search="100%")] == ["my_job"]
+        assert [i.name for i in await dummy_crud_service.list(search="about%job")] == []
+
+    async def test_list__with_search_sorted_by_relevance(
+        self,
+        dummy_crud_service,
+    ):
+        """
+        Test that the ``list()`` method sorts the instances matching a search by relevance.
+        """
+        await dummy_crud_service.create(name="instance-one", description="the first", owner_email="one@test.com")
+        await dummy_crud_service.create(
+            name="instance-two", description="a second instance", owner_email="instance@test.com"
+        )
+        await dummy_crud_service.create(name="item-three", description="an instance", owner_email="three@test.com")
+        await dummy_crud_service.create(name="item-four", description="no match", owner_email="four@test.com")
+
+        all_fetched_instances = await dummy_crud_service.list(search="instance first", sort_field="relevance")
+        assert ["instance-two", "instance-one", "item-three"] == [i.name for i in all_fetched_instances]
+
+        all_fetched_instances = await dummy_crud_service.list(
+            search="instance first", sort_field="relevance", sort_ascending=False
+        )
+        assert ["item-three", "instance-one", "instance-two"] == [i.name for i in all_fetched_instances]
+
+    async def test_list__sorted_by_relevance_requires_a_search(
+        self,
+        dummy_crud_service,
+    ):
+        """
+        Test that the ``list()`` method raises a 400 error if sorting by relevance without a search.
+        """
+        with pytest.raises(HTTPException) as exc_info:
+            await dummy_crud_service.list(sort_field="relevance")
+        assert exc_info.value.status_code == 400
+
     async def test_list__with_sort(
         self,
         dummy_crud_service,
@@ -445,6 +496,93 @@ class TestCrudService:
         assert page.total == 3
         assert ["two"] == [i.name for i in page.items]
 
+    async def test_paginated_list__keyset(
+        self,
+        dummy_crud_service,
+        paginated,
+    ):
+        """
+        Test that the ``paginated_list()`` paginates with a cursor, without OFFSET nor total count.
+        """
+        for name in ("one", "two", "three"):
+            await dummy_crud_service.create(name=name, owner_email="1@test.com")
+
+        with paginated(size=2, cursor=""):
+            page = await dummy_crud_service.paginated_list()
+        assert page.size == 2
+        assert page.total is None
+        assert page.page is None
+        assert page.pages is None
+        assert ["one", "two"] == [i.name for i in page.items]
+        assert page.next_cursor is not None
+
+        with paginated(size=2, cursor=page.next_cursor):
+            page = await dummy_crud_service.paginated_list()
+        assert ["three"] == [i.name for i in page.items]
+        assert page.next_cursor is None
+
+    async def test_paginated_list__keyset_with_sort_field(
+        self,
+        dummy_crud_service,
+        paginated,
+    ):
+        """
+        Test that the keyset pagination follows the sort field, using the id as a tiebreak.
+        """
+        for name in ("b", "a", "c", "a", "b"):
+            await dummy_crud_service.create(name=name, owner_email="1@test.com")
+
+        for sort_ascending in (True, False):
+            (cursor, pages) = ("", [])
+            while cursor is not None:
+                with paginated(size=2, cursor=cursor):
+                    page = await dummy_crud_service.paginated_list(sort_field="name", sort_ascending=sort_ascending)
+                pages.append([(i.name, i.id) for i in page.items])
+                cursor = page.next_cursor
+
+            expected_list = await dummy_crud_service.list()
+            expected_items = sorted(((i.name, i.id) for i in expected_list), reverse=not sort_ascending)
+            assert [len(p) for p in pages] == [2, 2, 1]
+            assert [item for p in pages for item in p] == expected_items
+
+    async def test_paginated_list__keyset_with_invalid_cursor(
+        self,
+        dummy_crud_service,
+        paginated,
+    ):
+        """
+        Test that the keyset pagination rejects malformed cursors and cursors for another sort order.
+        """
+        for name in ("one", "two", "three"):
+            await dummy_crud_service.create(name=name, owner_email="1@test.com")
+
+        with paginated(size=1, cursor="not-a-cursor"):
+            with pytest.raises(ServiceError, match="Invalid pagination cursor") as exc_info:
+                await dummy_crud_service.paginated_list()
+        assert exc_info.value.status_code == 400
+
+        with paginated(size=1, cursor=""):
+            page = await dummy_crud_service.paginated_list()
+        with paginated(size=1, cursor=page.next_cursor):
+            with pytest.raises(ServiceError, match="does not match the requested sort order") as exc_info:
+                await dummy_crud_service.paginated_list(sort_field="name")
+        assert exc_info.value.status_code == 400
+
+    async def test_paginated_list__keyset_sorted_by_relevance(
+        self,
+        dummy_crud_service,
+        paginated,
+    ):
+        """
+        Test that the keyset pagination rejects sorting by relevance with a clear error.
+        """
+        await dummy_crud_service.create(name="instance", owner_email="1@test.com")
+
+        with paginated(size=1, cursor=""):
+            with pytest.raises(ServiceError, match="not supported with the cursor pagination") as exc_info:
+                await dummy_crud_service.paginated_list(search="instance", sort_field="relevance")
+        assert exc_info.value.status_code == 400
+
     async def test_get_ensure_ownership__success(
         self,
         dummy_crud_service,
@@ -747,22 +885,52 @@ class TestFileService:
             await dummy_file_service.get(13, "file-one.txt")
         assert exc_info.value.status_code == 404
 
-    async def test_clone_instance__success(self, dummy_file_service):
+    async def test_load_bucket__acquires_the_bucket_lazily(self, synth_session, synth_bucket):
         """
-        Test that the ``clone_instance`` method successfully clones an instance of the served model.
+        Test that a service bound to a bucket loader only acquires the bucket when a file operation needs it.
         """
-        filename = "file-one.txt"
-        file_content = b"dummy string content"
+        bucket_loader = mock.AsyncMock(return_value=synth_bucket)
+        service = FileService(model_type=DummyFile)
+        service.bind_bucket_loader(bucket_loader)
 
-        original_instance = await dummy_file_service.upsert(13, filename, file_content)
+        with service.bound_session(synth_session):
+            await service.find_children(13)
+            bucket_loader.assert_not_called()
 
-        cloned_instance = await dummy_file_service.clone_instance(original_instance, 14)
+            instance = await service.upsert(13, "file-one.txt", "dummy string content")
+            assert await service.get_file_content(instance) == b"dummy string content"
 
-        assert cloned_instance.parent_id != original_instance.parent_id
-        assert cloned_instance.parent_id == 14
-        assert cloned_instance.filename == filename
-        assert cloned_instance.file_key != original_instance.file_key
-        assert await dummy_file_service.get_file_content(cloned_instance) == file_content
+        bucket_loader.assert_awaited_once_with()
+
+        service.unbind_bucket()
+        with pytest.raises(HTTPException) as exc_info:
+            await service.load_bucket()
+        assert exc_info.value.status_code == 503
+
+    async def test_bulk_clone__success(self, dummy_file_service):
+        """
+        Test that the ``bulk_clone()`` method clones all the instances and copies all the contents.
+        """
+        contents = {f"file-{i}.txt": f"dummy content {i}".encode() for i in range(5)}
+        original_instances = [
+            await dummy_file_service.upsert(13, filename, content) for (filename, content) in contents.items()
+        ]
+
+        cloned_instances = await dummy_file_service.bulk_clone(original_instances, 14)
+
+        assert [instance.filename for instance in cloned_instances] == list(contents)
+        assert {instance.filename for instance in await dummy_file_service.find_children(14)} == set(contents)
+        for original_instance, cloned_instance in zip(original_instances, cloned_instances, strict=True):
+            assert cloned_instance.parent_id == 14
+            assert cloned_instance.file_key != original_instance.file_key
+            assert await dummy_file_service.get_file_content(cloned_instance) == contents[cloned_instance.filename]
+
+    async def test_bulk_clone__does_nothing_without_instances(self, dummy_file_service):
+        """
+        Test that the ``bulk_clone()`` method does nothing if there are no files to clone.
+        """
+        assert await dummy_file_service.bulk_clone([], 14) == []
+        assert await dummy_file_service.find_children(14) == []
 
     async def test_find_children(self, dummy_file_service):
         """
@@ -966,6 +1134,38 @@ class TestFileService:
         file_obj = await dummy_file_service._get_file_data_from_url(AnyUrl(s3_url))
         assert file_obj.read() == file_content
 
+    async def test__get_file_data_from_url__raises_413_if_download_is_too_large(
+        self, dummy_file_service, respx_mock, tweak_settings
+    ):
+        """
+        Test that the ``_get_file_data_from_url()`` method aborts the download once it exceeds the maximum upload size.
+        """
+        file_url = "https://dummy-domain.com/dummy-file.txt"
+        respx_mock.get(file_url).mock(return_value=httpx.Response(httpx.codes.OK, content=b"dummy bytes content"))
+
+        with tweak_settings(MAX_UPLOAD_FILE_SIZE=10, FILE_STREAM_CHUNK_SIZE=4):
+            with pytest.raises(ServiceError, match="cannot exceed 10 bytes") as exc_info:
+                await dummy_file_service._get_file_data_from_url(AnyUrl(file_url))
+        assert exc_info.value.status_code == 413
+
+    async def test_upsert__uploads_large_files_in_parts(self, dummy_file_service, synth_bucket, tweak_settings):
+        """
+        Test that the ``upsert()`` method sends the files above the multipart threshold with a multipart upload.
+        """
+        part_size = 5 * 1024 * 1024
+        file_content = b"x" * part_size + b"y" * 1024
+
+        with tweak_settings(
+            MAX_UPLOAD_FILE_SIZE=2 * part_size,
+            S3_MULTIPART_THRESHOLD=part_size,
+            S3_MULTIPART_CHUNKSIZE=part_size,
+        ):
+            instance = await dummy_file_service.upsert(13, "file-one.txt", file_content)
+
+        s3_object = await synth_bucket.Object(instance.file_key)
+        assert (await s3_object.e_tag).endswith('-2"')
+        assert await dummy_file_service.get_file_content(instance) == file_content
+
     async def test__get_file_data_from_url__raises_400_if_download_fails(self, dummy_file_service, respx_mock):
         """
         Test that the ``_get_file_data_from_url()`` method raises a 400 error if the download fails.
@@ -1017,6 +1217,128 @@ class TestFileService:
             await dummy_file_service.get_file_content(upserted_instance)
         assert exc_info.value.status_code == 500
 
+    async def test_stream_file_response__streams_the_content_in_chunks(self, dummy_file_service, tweak_settings):
+        """
+        Test that the ``stream_file_response()`` method streams the content of a file in chunks.
+        """
+        instance = await dummy_file_service.upsert(13, "file-one.txt", "dummy string content")
+
+        with tweak_settings(FILE_STREAM_CHUNK_SIZE=4):
+            response = await dummy_file_service.stream_file_response(instance)
+            chunks = [chunk async for chunk in response.body_iterator]
+
+        assert response.status_code == 200
+        assert response.headers["filename"] == "file-one.txt"
+        assert response.headers["content-length"] == "20"
+        assert chunks == [b"dumm", b"y st", b"ring", b" con", b"tent"]
+
+    async def test_stream_file_response__raises_500_if_the_content_is_missing(self, dummy_file_service):
+        """
+        Test that the ``stream_file_response()`` method raises a 500 error if the content is not in the file storage.
+        """
+        instance = await dummy_file_service.upsert(13, "file-one.txt", "dummy string content")
+        s3_object = await dummy_file_service.bucket.Object(instance.file_key)
+        await s3_object.delete()
+
+        with pytest.raises(HTTPException) as exc_info:
+            await dummy_file_service.stream_file_response(instance)
+        assert exc_info.value.status_code == 500
+
+    async def test_upsert__content_addressed_storage_shares_identical_contents(
+        self, dummy_file_service, synth_bucket, tweak_settings
+    ):
+        """
+        Test that files with the same content share a single object keyed by the content in the content-addressed storage.
+        """
+        with tweak_settings(FILE_STORAGE_CONTENT_ADDRESSED=True):
+            instance_one = await dummy_file_service.upsert(13, "file-one.txt", "dummy shared content")
+            instance_two = await dummy_file_service.upsert(14, "file-two.txt", b"dummy shared content")
+
+        expected_hash = hashlib.sha256(b"dummy shared content").hexdigest()
+        assert instance_one.content_hash == instance_two.content_hash == expected_hash
+        assert instance_one.file_key == instance_two.file_key == f"dummy_files/sha256/{expected_hash}"
+        assert [obj.key async for obj in synth_bucket.objects.filter(Prefix="dummy_files")] == [instance_one.file_key]
+        assert await dummy_file_service.get_file_content(instance_two) == b"dummy shared content"
+
+    async def test_upsert__content_addressed_storage_can_be_disabled_for_new_contents(
+        self, dummy_file_service, tweak_settings
+    ):
+        """
+        Test that a file in the content-addressed storage gets its own object when its content changes with the mode disabled.
+        """
+        with tweak_settings(FILE_STORAGE_CONTENT_ADDRESSED=True):
+            instance = await dummy_file_service.upsert(13, "file-one.txt", "dummy content")
+        assert instance.content_hash is not None
+
+        instance = await dummy_file_service.upsert(13, "file-one.txt", "dummy new content")
+
+        assert instance.content_hash is None
+        assert instance.file_key == "dummy_files/13/file-one.txt"
+        assert await dummy_file_service.get_file_content(instance) == b"dummy new content"
+
+    async def test_bulk_clone__content_addressed_storage_only_clones_the_rows(
+        self, dummy_file_service, synth_bucket, tweak_settings
+    ):
+        """
+        Test that the ``bulk_clone()`` method shares the contents in the content-addressed storage instead of copying them.
+        """
+        with tweak_settings(FILE_STORAGE_CONTENT_ADDRESSED=True):
+            original_instance = await dummy_file_service.upsert(13, "file-one.txt", "dummy content")
+
+        with mock.patch.object(dummy_file_service, "copy_file_content", wraps=dummy_file_service.copy_file_content):
+            (cloned_instance,) = await dummy_file_service.bulk_clone([original_instance], 14)
+            dummy_file_service.copy_file_content.assert_not_called()
+
+        assert cloned_instance.content_hash == original_instance.content_hash
+        assert cloned_instance.file_key == original_instance.file_key
+        assert len([obj async for obj in synth_bucket.objects.filter(Prefix="dummy_files")]) == 1
+        assert await dummy_file_service.get_file_content(cloned_instance) == b"dummy content"
+
+    async def test_delete__content_addressed_storage_keeps_the_shared_content(self, dummy_file_service, tweak_settings):
+        """
+        Test that the ``delete()`` method leaves the contents in the content-addressed storage for the garbage collector.
+        """
+        with tweak_settings(FILE_STORAGE_CONTENT_ADDRESSED=True):
+            instance_one = await dummy_file_service.upsert(13, "file-one.txt", "dummy shared content")
+            instance_two = await dummy_file_service.upsert(14, "file-two.txt", "dummy shared content")
+
+        await dummy_file_service.delete(instance_one)
+
+        assert await dummy_file_service.find_children(13) == []
+        assert await dummy_file_service.get_file_content(instance_two) == b"dummy shared content"
+
+    async def test_upsert__content_addressed_storage_renames_without_copying(self, dummy_file_service, tweak_settings):
+        """
+        Test that renaming a file in the content-addressed storage keeps its content.
+        """
+        with tweak_settings(FILE_STORAGE_CONTENT_ADDRESSED=True):
+            original_instance = await dummy_file_service.upsert(13, "file-one.txt", "dummy content")
+        content_hash = original_instance.content_hash
+
+        renamed_instance = await dummy_file_service.upsert(13, "file-two.txt", None, previous_filename="file-one.txt")
+
+        assert renamed_instance.content_hash == content_hash
+        assert [instance.filename for instance in await dummy_file_service.find_children(13)] == ["file-two.txt"]
+        assert await dummy_file_service.get_file_content(renamed_instance) == b"dummy content"
+
+    async def test_upsert__renames_a_legacy_file_onto_a_content_addressed_one(self, dummy_file_service, tweak_settings):
+        """
+        Test that renaming a file outside the content-addressed storage onto one inside it leaves the shared content.
+        """
+        legacy_instance = await dummy_file_service.upsert(13, "file-one.txt", "dummy legacy content")
+        with tweak_settings(FILE_STORAGE_CONTENT_ADDRESSED=True):
+            await dummy_file_service.upsert(13, "file-two.txt", "dummy shared content")
+            shared_instance = await dummy_file_service.upsert(14, "file-two.txt", "dummy shared content")
+        assert legacy_instance.content_hash is None
+
+        renamed_instance = await dummy_file_service.upsert(13, "file-two.txt", None, previous_filename="file-one.txt")
+
+        assert renamed_instance.content_hash is None
+        assert renamed_instance.file_key == "dummy_files/13/file-two.txt"
+        assert [instance.filename for instance in await dummy_file_service.find_children(13)] == ["file-two.txt"]
+        assert await dummy_file_service.get_file_content(renamed_instance) == b"dummy legacy content"
+        assert await dummy_file_service.get_file_content(shared_instance) == b"dummy shared content"
+
     async def test_render__success(self, make_upload_file, dummy_file_service):
         """
         Test that the ``render()`` method can render a template loaded from the file store.
@@ -1097,6 +1419,80 @@ class TestFileService:
 
         assert rendered_reference == rendered_backward_compatible
 
+    async def test_render__skips_the_data_context_for_templates_that_do_not_use_it(
+        self, make_upload_file, dummy_file_service
+    ):
+        """
+        Test that the ``render()`` method renders a template once, with the context its variables need.
+        """
+        with make_upload_file(content="dummy {{ data.foo }} content") as dummy_upload_file:
+            legacy_instance = await dummy_file_service.upsert(13, "legacy.txt", dummy_upload_file)
+        with make_upload_file(content="dummy {{ foo.bar }} content") as dummy_upload_file:
+            modern_instance = await dummy_file_service.upsert(13, "modern.txt", dummy_upload_file)
+
+        with mock.patch.object(Template, "render", autospec=True, side_effect=Template.render) as mocked_render:
+            assert await dummy_file_service.render(legacy_instance, parameters={"foo": "bar"}) == "dummy bar content"
+            assert mocked_render.call_count == 1
+
+            with pytest.raises(HTTPException) as exc_info:
+                await dummy_file_service.render(modern_instance, parameters={"baz": "bar"})
+            assert exc_info.value.status_code == 422
+            assert mocked_render.call_count == 2
+
+    async def test_render__uses_the_template_cache(self, make_upload_file, dummy_file_service):
+        """
+        Test that the content and the compiled template are reused until the file is updated.
+        """
+        dummy_file_service.template_cache = TemplateCache(max_size=8, max_bytes=1024)
+
+        with make_upload_file(content="dummy {{ foo }} content") as dummy_upload_file:
+            upserted_instance = await dummy_file_service.upsert(13, "file-one.txt", dummy_upload_file)
+
+        with (
+            mock.patch.object(
+                dummy_file_service, "download_file_content", wraps=dummy_file_service.download_file_content
+            ) as mocked_download,
+            mock.patch.object(
+                dummy_file_service, "compile_template", wraps=dummy_file_service.compile_template
+            ) as mocked_compile,
+        ):
+            assert await dummy_file_service.render(upserted_instance, parameters={"foo": "bar"}) == "dummy bar content"
+            assert await dummy_file_service.render(upserted_instance, parameters={"foo": "baz"}) == "dummy baz content"
+            assert await dummy_file_service.get_file_content(upserted_instance) == b"dummy {{ foo }} content"
+            assert mocked_download.call_count == 1
+            assert mocked_compile.call_count == 1
+
+            upserted_instance = await dummy_file_service.upsert(13, "file-one.txt", "updated {{ foo }} content")
+            assert (
+                await dummy_file_service.render(upserted_instance, parameters={"foo": "bar"}) == "updated bar content"
+            )
+            assert mocked_download.call_count == 2
+            assert mocked_compile.call_count == 2
+
+    async def test_bulk_create__success(self, dummy_file_service, synth_bucket):
+        """
+        Test that the ``bulk_create()`` method adds all the rows and uploads all the contents.
+        """
+        uploads = [FileUpload(f"file-{i}.txt", f"dummy content {i}") for i in range(5)]
+        uploads.append(FileUpload("file-5.txt", b"dummy bytes"))
+
+        instances = await dummy_file_service.bulk_create(13, uploads)
+
+        assert [instance.filename for instance in instances] == [upload.filename for upload in uploads]
+        assert {instance.filename for instance in await dummy_file_service.find_children(13)} == {
+            upload.filename for upload in uploads
+        }
+        for instance, upload in zip(instances, uploads, strict=True):
+            content = upload.content if isinstance(upload.content, bytes) else upload.content.encode()
+            assert await dummy_file_service.get_file_content(instance) == content
+
+    async def test_bulk_create__does_nothing_without_uploads(self, dummy_file_service):
+        """
+        Test that the ``bulk_create()`` method does nothing if there are no files to create.
+        """
+        assert await dummy_file_service.bulk_create(13, []) == []
+        assert await dummy_file_service.find_children(13) == []
+
     async def test_clean_unused_files(self, dummy_file_service):
         """
         Test that the ``clean_unused_files()`` method removes unused files from the storage.
@@ -1112,3 +1508,22 @@ class TestFileService:
             session=dummy_file_service.session,
         )
         mocked_collector.run.assert_called_once()
+
+
+async def test_gather_with_limit__runs_at_most_limit_awaitables_at_a_time():
+    """
+    Test that ``gather_with_limit()`` bounds the concurrency and keeps the results in order.
+    """
+    running = 0
+    max_running = 0
+
+    async def _dummy(value: int) -> int:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return value
+
+    assert await gather_with_limit((_dummy(i) for i in range(10)), limit=3) == list(range(10))
+    assert max_running == 3
@@ -0,0 +1,74 @@
+"""
+Test the in-memory cache of the template files.
+"""
+
+from datetime import datetime, timezone
+
+from jobbergate_api.apps.template_cache import (
+    CachedTemplate,
+    TemplateCache,
+    TemplateCacheKey,
+    compile_template,
+)
+
+DUMMY_TIME = datetime(2026, 10, 16, tzinfo=timezone.utc)
+
+
+def make_key(file_key: str, updated_at: datetime = DUMMY_TIME) -> TemplateCacheKey:
+    return TemplateCacheKey("dummy-bucket", file_key, updated_at)
+
+
+def test_compile_template__finds_the_variables_from_the_context():
+    compiled = compile_template("{% set x = 1 %}{{ foo }} {{ data.bar }} {% for i in range(x) %}{{ i }}{% endfor %}")
+
+    assert compiled.variables == {"foo", "data"}
+    assert compiled.template.render(foo="a", data={"bar": "b"}) == "a b 0"
+
+
+def test_get__is_keyed_by_the_update_time():
+    cache = TemplateCache(max_size=8, max_bytes=1024)
+    cache.set(make_key("a"), CachedTemplate(content=b"a"))
+
+    assert cache.get(make_key("a")) == CachedTemplate(content=b"a")
+    assert cache.get(make_key("a", datetime.now(timezone.utc))) is None
+
+
+def test_set__evicts_the_least_recently_used_entries_when_full():
+    cache = TemplateCache(max_size=2, max_bytes=1024)
+    cache.set(make_key("a"), CachedTemplate(content=b"a"))
+    cache.set(make_key("b"), CachedTemplate(content=b"b"))
+    cache.get(make_key("a"))
+    cache.set(make_key("c"), CachedTemplate(content=b"c"))
+
+    assert list(cache.entries) == [make_key("a"), make_key("c")]
+
+
+def test_set__evicts_entries_to_stay_under_the_size_limit():
+    cache = TemplateCache(max_size=8, max_bytes=10)
+    cache.set(make_key("a"), CachedTemplate(content=b"a" * 4))
+    cache.set(make_key("b"), CachedTemplate(content=b"b" * 4))
+    cache.set(make_key("b"), CachedTemplate(content=b"b" * 5))
+    assert cache.size_in_bytes == 9
+
+    cache.set(make_key("c"), CachedTemplate(content=b"c" * 4))
+    assert list(cache.entries) == [make_key("b"), make_key("c")]
+    assert cache.size_in_bytes == 9
+
+    cache.set(make_key("d"), CachedTemplate(content=b"d" * 11))
+    assert cache.get(make_key("d")) is None
+
+
+def test_set__does_nothing_if_disabled():
+    cache = TemplateCache(max_size=0, max_bytes=1024)
+    cache.set(make_key("a"), CachedTemplate(content=b"a"))
+
+    assert cache.entries == {}
+
+
+def test_clear():
+    cache = TemplateCache(max_size=8, max_bytes=1024)
+    cache.set(make_key("a"), CachedTemplate(content=b"a"))
+    cache.clear()
+
+    assert cache.entries == {}
+    assert cache.size_in_bytes == 0
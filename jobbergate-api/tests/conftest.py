@@ -16,8 +16,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from jobbergate_api.apps.dependencies import get_bucket_name, get_bucket_url, s3_bucket, service_factory
 from jobbergate_api.apps.models import Base
+from jobbergate_api.apps.template_cache import template_cache
 from jobbergate_api.config import settings
 from jobbergate_api.main import app
+from jobbergate_api.security import token_cache
 from jobbergate_api.storage import engine_factory
 
 
@@ -120,6 +122,24 @@ def enforce_mocked_oidc_provider(mock_openid_server):
     yield
 
 
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    """
+    Clear the cache of verified tokens after each test, so no identity leaks from one test to another.
+    """
+    yield
+    token_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_template_cache():
+    """
+    Clear the cache of template files after each test, so no content leaks from one test to another.
+    """
+    yield
+    template_cache.clear()
+
+
 @pytest.fixture
 def tester_email() -> str:
     """Dummy tester email."""
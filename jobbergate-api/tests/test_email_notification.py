@@ -135,3 +135,19 @@ def test_notify_submission_rejected__from_email_unset():
                 to_emails=["support@pytesting.com", "someone@pytesting.com"],
             )
         mocked.assert_not_called()
+
+
+def test_notify_submission_rejected__raises_if_not_skipping_on_failure():
+    """
+    Test that an exception is raised when the email can not be sent and ``skip_on_failure`` is disabled.
+
+    This is how the outbox learns that the email must be sent again later.
+    """
+    with mock.patch.object(target=email_manager, attribute="from_email", new=None):
+        with pytest.raises(EmailNotificationError):
+            notify_submission_rejected(
+                job_submission_id=0,
+                report_message="something went wrong!",
+                to_emails=["support@pytesting.com"],
+                skip_on_failure=False,
+            )
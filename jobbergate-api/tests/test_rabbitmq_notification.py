@@ -2,14 +2,21 @@
 Test the rabbitmq_notification module.
 """
 
+import asyncio
 import json
-from unittest.mock import patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import aio_pika
 import pytest
 
 from jobbergate_api.apps.job_submissions.constants import JobSubmissionStatus, SlurmJobState
 from jobbergate_api.config import settings
-from jobbergate_api.rabbitmq_notification import publish_status_change, rabbitmq_connect
+from jobbergate_api.rabbitmq_notification import (
+    PendingMessage,
+    RabbitMQPublisher,
+    publish_status_change,
+    rabbitmq_connect,
+)
 
 
 @pytest.mark.flaky(max_runs=3)
@@ -113,3 +120,193 @@ async def test_publish_status_change__does_nothing_if_rabbitmq_host_is_undefined
         with tweak_settings(RABBITMQ_HOST=None):
             await publish_status_change(dummy_job_submission, organization_id="dummy-org")
             mock_connect.assert_not_called()
+
+
+@pytest.fixture
+def mocked_connection():
+    """
+    Provide a mocked RabbitMQ connection that opens a new mocked channel on each call.
+    """
+
+    def _make_channel(**_):
+        channel = MagicMock(is_closed=False)
+        channel.close = AsyncMock()
+        exchange = MagicMock()
+        exchange.publish = AsyncMock()
+        channel.declare_exchange = AsyncMock(return_value=exchange)
+        channel.declare_queue = AsyncMock(return_value=MagicMock(bind=AsyncMock()))
+        return channel
+
+    connection = MagicMock(is_closed=False)
+    connection.close = AsyncMock()
+    connection.channel = AsyncMock(side_effect=_make_channel)
+    with patch("jobbergate_api.rabbitmq_notification.aio_pika.connect_robust", return_value=connection) as mock_connect:
+        yield (mock_connect, connection)
+
+
+def _message(body: str) -> aio_pika.Message:
+    return aio_pika.Message(body=body.encode("utf-8"))
+
+
+async def test_publisher__batches_messages_on_a_pooled_channel(mocked_connection):
+    """
+    Verify that the messages are published over a single connection and a pooled channel.
+    """
+    (mock_connect, connection) = mocked_connection
+    publisher = RabbitMQPublisher()
+
+    results = await asyncio.gather(*(publisher.publish("dummy-org", _message(str(i))) for i in range(3)))
+    assert results == [True, True, True]
+    assert await publisher.publish("dummy-org", _message("3")) is True
+
+    assert mock_connect.call_count == 1
+    assert connection.channel.call_count == 1
+
+    [(channel, exchange)] = publisher.pools["dummy-org"]
+    assert exchange.publish.call_count == 4
+    assert channel.declare_exchange.call_count == 1
+
+    await publisher.close()
+    connection.close.assert_awaited_once()
+
+
+async def test_publisher__uses_a_channel_per_exchange(mocked_connection):
+    """
+    Verify that each exchange is declared on its own channel.
+    """
+    (_, connection) = mocked_connection
+    publisher = RabbitMQPublisher()
+
+    results = await asyncio.gather(publisher.publish("org-1", _message("1")), publisher.publish("org-2", _message("2")))
+
+    assert results == [True, True]
+    assert connection.channel.call_count == 2
+    assert set(publisher.pools) == {"org-1", "org-2"}
+    await publisher.close()
+
+
+async def test_publisher__discards_channel_and_retries_on_failure(mocked_connection):
+    """
+    Verify that a channel is discarded when a publish fails, and the message is published again on a new one.
+    """
+    (_, connection) = mocked_connection
+    publisher = RabbitMQPublisher()
+    failing_channel = connection.channel.side_effect()
+    failing_exchange = failing_channel.declare_exchange.return_value
+    failing_exchange.publish.side_effect = aio_pika.exceptions.ChannelClosed(404, "NOT_FOUND")
+    connection.channel.side_effect = [failing_channel, connection.channel.side_effect()]
+
+    with patch("jobbergate_api.retry_utils.asyncio.sleep", new_callable=AsyncMock):
+        assert await publisher.publish("dummy-org", _message("1")) is True
+
+    failing_channel.close.assert_awaited_once()
+    assert connection.channel.call_count == 2
+    [(channel, exchange)] = publisher.pools["dummy-org"]
+    assert channel is not failing_channel
+    assert exchange is not failing_exchange
+    await publisher.close()
+
+
+async def test_publisher__returns_false_after_max_retries(mocked_connection):
+    """
+    Verify that publish returns False if the message could not be published after the retries.
+    """
+    (mock_connect, _) = mocked_connection
+    mock_connect.side_effect = ConnectionError("Broker is down")
+    publisher = RabbitMQPublisher()
+
+    with patch("jobbergate_api.retry_utils.asyncio.sleep", new_callable=AsyncMock):
+        assert await publisher.publish("dummy-org", _message("1")) is False
+
+    assert mock_connect.call_count == 3
+    await publisher.close()
+
+
+async def test_publisher__close_flushes_queued_messages(mocked_connection):
+    """
+    Verify that the queued messages are published before the connection is closed.
+    """
+    (_, connection) = mocked_connection
+    publisher = RabbitMQPublisher()
+
+    publish_tasks = [asyncio.create_task(publisher.publish("dummy-org", _message(str(i)))) for i in range(5)]
+    await asyncio.sleep(0)
+    await publisher.close()
+
+    assert [await task for task in publish_tasks] == [True] * 5
+    connection.close.assert_awaited_once()
+    assert publisher.worker is None
+
+
+async def test_publisher__does_not_republish_when_a_caller_gave_up(mocked_connection):
+    """
+    Verify that a message whose caller stopped waiting does not make the batch be published again.
+    """
+    (_, connection) = mocked_connection
+    publisher = RabbitMQPublisher()
+    channel = connection.channel.side_effect()
+    exchange = channel.declare_exchange.return_value
+    connection.channel.side_effect = [channel]
+    release = asyncio.Event()
+
+    async def _slow_publish(*_, **__):
+        await release.wait()
+
+    exchange.publish.side_effect = _slow_publish
+
+    abandoned = asyncio.create_task(publisher.publish("dummy-org", _message("1")))
+    awaited = asyncio.create_task(publisher.publish("dummy-org", _message("2")))
+    while exchange.publish.call_count < 2:
+        await asyncio.sleep(0)
+    abandoned.cancel()
+    release.set()
+
+    assert await awaited is True
+    assert exchange.publish.call_count == 2
+    await publisher.close()
+
+
+async def test_publisher__close_skips_messages_already_resolved(mocked_connection):
+    """
+    Verify that closing the publisher ignores the queued messages whose callers stopped waiting.
+    """
+    publisher = RabbitMQPublisher()
+    publisher.queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+    abandoned = PendingMessage("dummy-org", _message("1"), loop.create_future())
+    abandoned.confirmed.cancel()
+    waiting = PendingMessage("dummy-org", _message("2"), loop.create_future())
+    publisher.queue.put_nowait(abandoned)
+    publisher.queue.put_nowait(waiting)
+
+    await publisher.close()
+
+    assert waiting.confirmed.result() is False
+    assert publisher.queue is None
+
+
+async def test_publish_status_change__queues_message_on_publisher(synth_services, tester_email, tweak_settings):
+    """
+    Verify that publish_status_change hands the message to the app publisher, on the default exchange if needed.
+    """
+    dummy_job_submission = await synth_services.crud.job_submission.create(
+        id=13,
+        name="test_name",
+        owner_email=tester_email,
+        is_archived=False,
+        client_id="dummy-client-id",
+        status=JobSubmissionStatus.DONE,
+        slurm_job_state=SlurmJobState.COMPLETED,
+    )
+
+    with (
+        tweak_settings(RABBITMQ_HOST="dummy-host"),
+        patch("jobbergate_api.rabbitmq_notification.rabbitmq_publisher.publish", return_value=True) as mock_publish,
+    ):
+        assert await publish_status_change(dummy_job_submission) is True
+
+    (exchange_name, message) = mock_publish.call_args.args
+    assert exchange_name == settings.RABBITMQ_DEFAULT_EXCHANGE
+    assert message.headers == {"organization": None}
+    assert message.delivery_mode == aio_pika.DeliveryMode.PERSISTENT
+    assert json.loads(message.body.decode())["path"] == "jobs.job_submissions.13"
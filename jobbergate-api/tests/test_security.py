@@ -2,13 +2,23 @@
 Test the security module.
 """
 
+import asyncio
+import time
+from unittest import mock
+
 import pytest
+from armasec.token_manager import TokenManager
+from fastapi import status
 
+from jobbergate_api.apps.permissions import Permissions
 from jobbergate_api.security import (
     HTTPException,
     IdentityPayload,
+    JWKSCache,
+    TokenCache,
     TokenPayload,
     lockdown_with_identity,
+    token_cache,
 )
 
 
@@ -110,3 +120,114 @@ def test_lockdown_extracting_organization_id_from_new_token_structure():
     actual_identity = lock(token_payload)
 
     assert actual_identity.organization_id == org_id
+
+
+def test_lockdown_with_identity__reuses_identity_payload():
+    """Check if the lockdown_with_identity decorator returns an identity payload as is, without rebuilding it."""
+    identity_payload = IdentityPayload.model_validate({"sub": "dummy-sub", "email": "dummy-email@pytest.com"})
+    lock = lockdown_with_identity(ensure_email=True)
+
+    assert lock(identity_payload) is identity_payload
+
+
+class TestTokenCache:
+    """
+    Group tests for the TokenCache.
+    """
+
+    def test_get__returns_cached_payload(self):
+        """Check if a cached payload is returned for the same authorization header only."""
+        cache = TokenCache(max_size=10, ttl=60)
+        identity_payload = IdentityPayload.model_validate({"sub": "dummy-sub"})
+
+        cache.set("Bearer dummy-token", identity_payload)
+
+        assert cache.get("Bearer dummy-token") is identity_payload
+        assert cache.get("Bearer other-token") is None
+
+    def test_set__evicts_least_recently_used_entries(self):
+        """Check if the least recently used entries are evicted when the cache is full."""
+        cache = TokenCache(max_size=2, ttl=60)
+        payloads = [IdentityPayload.model_validate({"sub": f"dummy-sub-{i}"}) for i in range(3)]
+
+        cache.set("Bearer token-0", payloads[0])
+        cache.set("Bearer token-1", payloads[1])
+        cache.get("Bearer token-0")
+        cache.set("Bearer token-2", payloads[2])
+
+        assert cache.get("Bearer token-0") is payloads[0]
+        assert cache.get("Bearer token-1") is None
+        assert cache.get("Bearer token-2") is payloads[2]
+
+    def test_get__evicts_expired_entries(self):
+        """Check if the entries are evicted once the token expires or the time to live elapses."""
+        cache = TokenCache(max_size=10, ttl=60)
+        expired_payload = IdentityPayload.model_validate({"sub": "dummy-sub", "exp": int(time.time()) - 1})
+        valid_payload = IdentityPayload.model_validate({"sub": "dummy-sub", "exp": int(time.time()) + 3600})
+
+        cache.set("Bearer expired-token", expired_payload)
+        cache.set("Bearer valid-token", valid_payload)
+
+        assert cache.get("Bearer expired-token") is None
+        assert cache.get("Bearer valid-token") is valid_payload
+        with mock.patch("jobbergate_api.security.time.time", return_value=time.time() + 61):
+            assert cache.get("Bearer valid-token") is None
+        assert cache.entries == {}
+
+    @pytest.mark.parametrize("max_size, ttl", [(0, 60), (10, 0)])
+    def test_set__does_nothing_if_disabled(self, max_size, ttl):
+        """Check if nothing is cached when the size or the time to live of the cache is zero."""
+        cache = TokenCache(max_size=max_size, ttl=ttl)
+
+        cache.set("Bearer dummy-token", IdentityPayload.model_validate({"sub": "dummy-sub"}))
+
+        assert cache.get("Bearer dummy-token") is None
+
+
+@pytest.mark.usefixtures("synth_session")
+async def test_cached_token_security__skips_verification_of_cached_tokens(client, inject_security_header, tester_email):
+    """
+    Check if repeated requests with the same token are only verified once, while permissions are still checked.
+    """
+    token_cache.clear()
+    inject_security_header(tester_email, Permissions.JOB_SCRIPTS_READ)
+
+    with mock.patch.object(
+        TokenManager, "extract_token_payload", autospec=True, side_effect=TokenManager.extract_token_payload
+    ) as spied_extract:
+        for _ in range(3):
+            response = await client.get("jobbergate/job-scripts")
+            assert response.status_code == status.HTTP_200_OK
+
+        response = await client.post("jobbergate/job-scripts", json={"name": "dummy"})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    assert spied_extract.call_count == 1
+
+
+def test_jwks_cache__refresh_swaps_the_jwks():
+    """Check if the JWKSCache refreshes the JWKS of every loaded domain."""
+    cache = JWKSCache()
+    manager = mock.Mock()
+    cache.managers = {"dummy-domain": manager}
+    cache.domain_configs = {"dummy-domain": mock.Mock(use_https=False)}
+
+    with mock.patch("jobbergate_api.security.OpenidConfigLoader") as mocked_loader:
+        cache.refresh()
+
+    mocked_loader.assert_called_once_with("dummy-domain", use_https=False)
+    assert manager.token_decoder.jwks is mocked_loader.return_value.jwks
+
+
+async def test_jwks_cache__background_refresh():
+    """Check if the JWKSCache keeps refreshing the JWKS in the background, even after a failure."""
+    cache = JWKSCache()
+
+    with mock.patch.object(cache, "refresh", side_effect=[RuntimeError("BOOM!"), None, None, None]) as mocked_refresh:
+        async with cache.background_refresh(0):
+            await asyncio.sleep(0.05)
+        assert mocked_refresh.call_count == 0
+
+        async with cache.background_refresh(0.01):
+            await asyncio.sleep(0.05)
+        assert mocked_refresh.call_count >= 2
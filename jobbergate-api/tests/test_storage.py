@@ -3,16 +3,24 @@ Test the storage module.
 """
 
 import enum
+import importlib.util
 import json
+from pathlib import Path
 from unittest import mock
 
 import asyncpg
 import pytest
 from sqlalchemy import Enum, select
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Mapped, mapped_column
 
+from jobbergate_api.apps.job_script_templates.models import JobScriptTemplate
+from jobbergate_api.apps.job_scripts.models import JobScript
+from jobbergate_api.apps.job_submissions.models import JobSubmission
 from jobbergate_api.apps.models import Base, CommonMixin, IdMixin
-from jobbergate_api.storage import build_db_url, handle_fk_error, sort_clause
+from jobbergate_api.storage import build_db_url, handle_fk_error, search_document, sort_clause
+
+ALEMBIC_VERSIONS_PATH = Path(__file__).parent.parent / "alembic" / "versions"
 
 
 class DummyStatusEnum(str, enum.Enum):
@@ -166,3 +174,22 @@ def test_handle_fk_error():
     assert response_data["detail"]["message"] == "Delete failed due to foreign-key constraint"
     assert response_data["detail"]["table"] == "blah"
     assert response_data["detail"]["pk_id"] == "13"
+
+
+@pytest.mark.parametrize("model", [JobScriptTemplate, JobScript, JobSubmission])
+def test_search_document__matches_the_trigram_search_indexes(model):
+    """
+    Test that the search document of each model matches the expression of its trigram index.
+
+    Otherwise, the search would not use the index.
+    """
+    migration_path = next(ALEMBIC_VERSIONS_PATH.glob("*_add_trigram_search_indexes.py"))
+    spec = importlib.util.spec_from_file_location("add_trigram_search_indexes", migration_path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    (table_name, fields) = next(entry for entry in migration.SEARCH_INDEXES.values() if entry[0] == model.__tablename__)
+    indexed_document = " || ' ' || ".join(f"coalesce({field}, '')" for field in fields)
+
+    document = str(search_document(model.searchable_fields()).compile(dialect=postgresql.dialect()))
+    assert document.replace(f"{table_name}.", "") == indexed_document
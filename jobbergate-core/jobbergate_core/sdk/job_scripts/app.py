@@ -211,6 +211,7 @@ class JobScripts:
         from_job_script_template_id: NonNegativeInt | None = None,
         size: PositiveInt = 50,
         page: PositiveInt = 1,
+        cursor: str | None = None,
     ) -> ListResponseEnvelope[JobScriptListView]:
         """
         List job scripts.
@@ -224,6 +225,8 @@ class JobScripts:
             include_archived: Whether to include archived scripts.
             size: The number of scripts per page.
             page: The page number.
+            cursor: The cursor to continue a keyset paginated listing (empty for the first page).
+                When provided, the page number is ignored and the total count is not computed.
 
         Returns:
             The list response envelope containing job script list views.
@@ -239,6 +242,7 @@ class JobScripts:
                 "from_job_script_template_id": from_job_script_template_id,
                 "size": size,
                 "page": page,
+                "cursor": cursor,
             }
         )
         return (
@@ -168,6 +168,7 @@ class JobSubmissions:
         from_job_script_id: NonNegativeInt | None = None,
         size: PositiveInt = 50,
         page: PositiveInt = 1,
+        cursor: str | None = None,
     ) -> ListResponseEnvelope[JobSubmissionListView]:
         """
         List job submissions.
@@ -184,6 +185,8 @@ class JobSubmissions:
             from_job_script_id: Filter by job script ID.
             size: The number of submissions per page.
             page: The page number.
+            cursor: The cursor to continue a keyset paginated listing (empty for the first page).
+                When provided, the page number is ignored and the total count is not computed.
 
         Returns:
             The list response envelope containing job submission list views.
@@ -200,6 +203,7 @@ class JobSubmissions:
                 "from_job_script_id": from_job_script_id,
                 "size": size,
                 "page": page,
+                "cursor": cursor,
             }
         )
         if slurm_job_ids:
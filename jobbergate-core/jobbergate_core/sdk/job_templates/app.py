@@ -338,6 +338,7 @@ class JobTemplates:
         include_archived: bool = False,
         size: PositiveInt = 50,
         page: PositiveInt = 1,
+        cursor: str | None = None,
     ) -> ListResponseEnvelope[JobTemplateListView]:
         """
         List job templates.
@@ -351,6 +352,8 @@ class JobTemplates:
             include_archived: Whether to include archived templates.
             size: The number of templates per page.
             page: The page number.
+            cursor: The cursor to continue a keyset paginated listing (empty for the first page).
+                When provided, the page number is ignored and the total count is not computed.
 
         Returns:
             The list response envelope containing job template list views.
@@ -365,6 +368,7 @@ class JobTemplates:
                 "include_archived": include_archived,
                 "size": size,
                 "page": page,
+                "cursor": cursor,
             }
         )
         result = (
@@ -76,10 +76,14 @@ EnvelopeT = TypeVar("EnvelopeT")
 class ListResponseEnvelope(BaseModel, Generic[EnvelopeT]):
     """
     A model describing the structure of response envelopes from "list" endpoints.
+
+    The fields ``total``, ``page`` and ``pages`` are null with the keyset pagination,
+    where ``next_cursor`` is provided instead, unless it is the last page.
     """
 
     items: list[EnvelopeT]
-    total: int
-    page: int
+    total: int | None = None
+    page: int | None = None
     size: int
-    pages: int
+    pages: int | None = None
+    next_cursor: str | None = None
@@ -6,7 +6,7 @@ import shlex
 import subprocess
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, ClassVar, Sequence
+from typing import Any, ClassVar, Iterable, Sequence
 
 from buzz import check_expressions
 from loguru import logger
@@ -103,6 +103,35 @@ class InfoHandler:
             logger.warning(message)
             raise RuntimeError(message) from e
 
+    def get_jobs_info(self, slurm_ids: Iterable[int]) -> dict[int, dict[str, Any]]:
+        """
+        Gets info for multiple jobs with a single call to scontrol.
+
+        The result is keyed by slurm job id. Jobs that are no longer known by Slurm are missing from it.
+        The jobs in hidden partitions are included, as they are when the info of a single job is fetched.
+        """
+        wanted_ids = set(slurm_ids)
+        if not wanted_ids:
+            return {}
+
+        command = (
+            self.scontrol_path.as_posix(),
+            "show",
+            "job",
+            "--json",
+            "--all",
+        )
+        completed_process = self.subprocess_handler.run(command, capture_output=True, text=True)
+        data = json.loads(completed_process.stdout)
+        try:
+            jobs_info = {job["job_id"]: job for job in data["jobs"] if job["job_id"] in wanted_ids}
+        except (KeyError, TypeError) as e:
+            message = f"Failed to parse jobs info from {completed_process.stdout}"
+            logger.error(message)
+            raise RuntimeError(message) from e
+        logger.debug(f"Information found for {len(jobs_info)} out of {len(wanted_ids)} jobs")
+        return jobs_info
+
 
 @dataclass(frozen=True)
 class SubmissionHandler:
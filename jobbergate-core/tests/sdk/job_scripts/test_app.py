@@ -13,7 +13,7 @@ from jobbergate_core.sdk.job_scripts.schemas import (
     JobScriptFileDetailedView,
     JobScriptListView,
 )
-from jobbergate_core.sdk.schemas import PydanticDateTime
+from jobbergate_core.sdk.schemas import ListResponseEnvelope, PydanticDateTime
 from jobbergate_core.sdk.utils import filter_null_out
 from jobbergate_core.tools.requests import Client, JobbergateResponseError
 
@@ -396,6 +396,25 @@ class TestJobScripts:
         assert route.call_count == 1
         assert result == response_data
 
+    def test_list_with_cursor(self) -> None:
+        """Test the list method of JobScripts with the keyset pagination."""
+        size = 5
+        response_data = ListResponseEnvelope(
+            items=JobScriptListViewFactory.batch(size), size=size, next_cursor="dummy-next-cursor"
+        )
+        list_kwargs = {"size": size, "cursor": "dummy-cursor"}
+
+        with respx.mock(base_url=BASE_URL, assert_all_called=True, assert_all_mocked=True) as respx_mock:
+            route = respx_mock.get("/jobbergate/job-scripts", params=list_kwargs).mock(
+                return_value=Response(codes.OK, content=response_data.model_dump_json(exclude_none=True)),
+            )
+            result = self.job_scripts.get_list(**list_kwargs)
+
+        assert route.call_count == 1
+        assert result == response_data
+        assert result.total is None
+        assert result.next_cursor == "dummy-next-cursor"
+
     def test_list_request_error(self) -> None:
         """Test the list method of JobScripts with a request error."""
         with (
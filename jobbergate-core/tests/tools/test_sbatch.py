@@ -182,6 +182,51 @@ class TestInfoHandler:
             text=True,
         )
 
+    def test_get_jobs_info__success(self, mocker, scontrol_path):
+        jobs_info = [
+            {"job_id": 123, "cluster_name": "cluster", "job_state": ["RUNNING"], "user_name": "test-user"},
+            {"job_id": 456, "cluster_name": "cluster", "job_state": ["PENDING"], "user_name": "test-user"},
+            {"job_id": 789, "cluster_name": "cluster", "job_state": ["RUNNING"], "user_name": "other-user"},
+        ]
+        response_data = json.dumps({"jobs": jobs_info})
+        response = subprocess.CompletedProcess(args=[], stdout=response_data, returncode=0)
+        mocked_run = mocker.patch("jobbergate_core.tools.sbatch.subprocess.run", return_value=response)
+
+        sbatch_handler = InfoHandler(scontrol_path=scontrol_path)
+
+        assert sbatch_handler.get_jobs_info([123, 456, 999]) == {123: jobs_info[0], 456: jobs_info[1]}
+        mocked_run.assert_called_once_with(
+            (
+                scontrol_path.as_posix(),
+                "show",
+                "job",
+                "--json",
+                "--all",
+            ),
+            check=True,
+            shell=False,
+            capture_output=True,
+            text=True,
+        )
+
+    def test_get_jobs_info__no_ids(self, mocker, scontrol_path):
+        mocked_run = mocker.patch("jobbergate_core.tools.sbatch.subprocess.run")
+
+        sbatch_handler = InfoHandler(scontrol_path=scontrol_path)
+
+        assert sbatch_handler.get_jobs_info([]) == {}
+        mocked_run.assert_not_called()
+
+    def test_get_jobs_info__failed_to_parse(self, mocker, scontrol_path):
+        response_data = json.dumps({"foo": "bar"})
+        response = subprocess.CompletedProcess(args=[], stdout=response_data, returncode=0)
+        mocker.patch("jobbergate_core.tools.sbatch.subprocess.run", return_value=response)
+
+        sbatch_handler = InfoHandler(scontrol_path=scontrol_path)
+
+        with pytest.raises(RuntimeError, match="^Failed to parse jobs info from"):
+            sbatch_handler.get_jobs_info([123])
+
 
 class TestInjectSbatchParameters:
     def test_with_header(self):